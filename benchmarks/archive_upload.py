@@ -0,0 +1,271 @@
+"""Measure what archiving a bulletin to S3 adds to the download, against a local stand-in.
+
+A stand-in of an S3 compatible storage (path style, Signature Version 4, PUT and multipart
+uploads, in memory) runs in a separate process and accepts uploads at a limited rate, like an
+uplink to a cloud storage. A bulletin is "downloaded" at a fixed rate and archived in two ways:
+
+- after: written to disk, then read again and uploaded in one PUT (the old way)
+- tee: uploaded through the archive writer while it is written to disk
+
+Reported are the seconds from the first byte until the file is on disk and in the storage, and
+the peak memory of the upload. Every stored object is read back and compared with the bulletin.
+
+Usage: python -m benchmarks.archive_upload [--minutes 5] [--rate-mbps 40] [--upload-mbps 100]
+    [--part-size-mb 5] [--runs 3]
+"""
+
+import argparse
+import hashlib
+import hmac
+import http.server
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from urllib.parse import parse_qsl, quote, urlsplit
+from xml.etree import ElementTree
+
+from benchmarks.bench_mp3_validator import CHUNK_SIZE, build_mp3
+from srgssr_news_downloader.utils.storage import MB, S3Storage
+
+ACCESS_KEY = "standin"
+SECRET_KEY = "standin-secret"
+
+
+class StandInS3(http.server.BaseHTTPRequestHandler):
+    """Buckets, objects and multipart uploads of an S3 compatible storage, checks the signatures."""
+
+    protocol_version = "HTTP/1.1"
+    upload_rate = 0.0  # Bytes per second a request body is read with, 0 is unlimited
+    objects = {}  # (bucket, key): bytes
+    uploads = {}  # upload ID: {part number: bytes}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def error(self, status: int, code: str):
+        self.reply(status, f"<Error><Code>{code}</Code></Error>".encode())
+
+    def signature_valid(self, body: bytes) -> bool:
+        # Rebuilt from the request as received, independent of the client
+        authorization = dict(
+            item.strip().split("=", 1) for item in self.headers["Authorization"].split(" ", 1)[1].split(",")
+        )
+        access_key, date, region, service, _ = authorization["Credential"].split("/")
+        payload_hash = self.headers["x-amz-content-sha256"]
+        if payload_hash != "UNSIGNED-PAYLOAD" and payload_hash != hashlib.sha256(body).hexdigest():
+            return False
+        parts = urlsplit(self.path)
+        query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted(parse_qsl(parts.query, keep_blank_values=True))
+        )
+        names = authorization["SignedHeaders"].split(";")
+        canonical_request = "\n".join(
+            [
+                self.command,
+                parts.path,
+                query,
+                "".join(f"{name}:{self.headers[name].strip()}\n" for name in names),
+                ";".join(names),
+                payload_hash,
+            ]
+        )
+        scope = f"{date}/{region}/{service}/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                self.headers["x-amz-date"],
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        key = f"AWS4{SECRET_KEY}".encode()
+        for part in (date, region, service, "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        expected = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return access_key == ACCESS_KEY and hmac.compare_digest(expected, authorization["Signature"])
+
+    def read_body(self) -> bytes | None:
+        size = int(self.headers.get("Content-Length", 0))
+        body = bytearray()
+        start = time.perf_counter()
+        while len(body) < size:
+            data = self.rfile.read(min(CHUNK_SIZE, size - len(body)))
+            if not data:
+                return None  # The client gave up, f.ex. an aborted upload
+            body += data
+            if self.upload_rate:
+                delay = start + len(body) / self.upload_rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        return bytes(body)
+
+    def handle_request(self):
+        body = self.read_body()
+        if body is None:
+            self.close_connection = True
+            return
+        if not self.signature_valid(body):
+            return self.error(403, "SignatureDoesNotMatch")
+
+        parts = urlsplit(self.path)
+        bucket, _, key = parts.path.lstrip("/").partition("/")
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        with self.lock:
+            if self.command == "POST" and "uploads" in params:
+                upload_id = os.urandom(8).hex()
+                self.uploads[upload_id] = {}
+                return self.reply(
+                    200,
+                    f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId>"
+                    f"</InitiateMultipartUploadResult>".encode(),
+                )
+            if "uploadId" in params and params["uploadId"] not in self.uploads:
+                return self.error(404, "NoSuchUpload")
+            if self.command == "PUT" and "partNumber" in params:
+                self.uploads[params["uploadId"]][int(params["partNumber"])] = body
+                return self.reply(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+            if self.command == "PUT":
+                self.objects[(bucket, key)] = body
+                return self.reply(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+            if self.command == "POST" and "uploadId" in params:
+                stored = self.uploads.pop(params["uploadId"])
+                numbers = [int(e.text) for e in ElementTree.fromstring(body).iter("PartNumber")]
+                if numbers != sorted(stored) or any(len(stored[n]) < 5 * MB for n in numbers[:-1]):
+                    return self.error(400, "InvalidPart")
+                self.objects[(bucket, key)] = b"".join(stored[n] for n in numbers)
+                return self.reply(200, b"<CompleteMultipartUploadResult></CompleteMultipartUploadResult>")
+            if self.command == "DELETE" and "uploadId" in params:
+                del self.uploads[params["uploadId"]]
+                return self.reply(204)
+            if (bucket, key) not in self.objects:
+                return self.error(404, "NoSuchKey")
+            if self.command == "GET":
+                return self.reply(200, self.objects[(bucket, key)])
+            if self.command == "DELETE":
+                del self.objects[(bucket, key)]
+                return self.reply(204)
+        self.error(400, "NotImplemented")
+
+    do_GET = do_PUT = do_POST = do_DELETE = handle_request
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def serve(ports: multiprocessing.Queue, upload_rate: float) -> None:
+    """Run the stand-in, in its own process so its memory and CPU are not measured."""
+    StandInS3.upload_rate = upload_rate
+    server = StandInServer(("127.0.0.1", 0), StandInS3)
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def download(data: bytes, rate: float, write):
+    """Hand the data to write() chunk by chunk at the given bytes per second."""
+    start = time.perf_counter()
+    for offset in range(0, len(data), CHUNK_SIZE):
+        write(data[offset : offset + CHUNK_SIZE])
+        delay = start + (offset + CHUNK_SIZE) / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def archive_after(storage: S3Storage, data: bytes, rate: float, key: str) -> float:
+    start = time.perf_counter()
+    fd, path = tempfile.mkstemp(suffix=".part")
+    with os.fdopen(fd, "wb") as file:
+        download(data, rate, file.write)
+    with open(path, "rb") as file:
+        storage.request("PUT", key, body=file.read(), headers={"Content-Type": "audio/mpeg"})
+    os.remove(path)
+    return time.perf_counter() - start
+
+
+def archive_tee(storage: S3Storage, data: bytes, rate: float, key: str, size: int | None) -> float:
+    start = time.perf_counter()
+    fd, path = tempfile.mkstemp(suffix=".part")
+    writer = storage.open(key, size)
+    with os.fdopen(fd, "wb") as file:
+
+        def write(chunk):
+            file.write(chunk)
+            writer.write(chunk)
+
+        download(data, rate, write)
+    writer.finish()
+    os.remove(path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=5, help="Length of the bulletin")
+    parser.add_argument("--rate-mbps", type=float, default=40, help="Download rate in Mbit/s")
+    parser.add_argument("--upload-mbps", type=float, default=100, help="Upload rate of the storage, 0 is unlimited")
+    parser.add_argument("--part-size-mb", type=float, default=5, help="Part size of multipart uploads")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    ports = context.Queue()
+    context.Process(target=serve, args=(ports, args.upload_mbps * 1e6 / 8), daemon=True).start()
+    storage = S3Storage(
+        f"http://127.0.0.1:{ports.get(timeout=30)}",
+        "news",
+        ACCESS_KEY,
+        SECRET_KEY,
+        part_size=int(args.part_size_mb * MB),
+    )
+    rate = args.rate_mbps * 1e6 / 8
+    for minutes in (args.minutes, args.minutes * 4):
+        data = build_mp3(minutes)
+        print(
+            f"\nBulletin {minutes:g} min, {len(data) / MB:.1f} MB, download {args.rate_mbps:g} Mbit/s, "
+            f"upload {args.upload_mbps:g} Mbit/s"
+        )
+        print(f"{'mode':<22} {'seconds':>8} {'added':>8} {'peak MB':>8}")
+        plain = min(_time(lambda: download(data, rate, len)) for _ in range(args.runs))
+        modes = (
+            ("after", lambda key: archive_after(storage, data, rate, key)),
+            ("tee, size known", lambda key: archive_tee(storage, data, rate, key, len(data))),
+            ("tee, size unknown", lambda key: archive_tee(storage, data, rate, key, None)),
+        )
+        for name, run in modes:
+            times = []
+            peak = 0.0
+            for index in range(args.runs):
+                key = f"srf/{name.replace(' ', '_').replace(',', '')}_{index}.mp3"
+                tracemalloc.start()
+                times.append(run(key))
+                peak = max(peak, tracemalloc.get_traced_memory()[1] / MB)
+                tracemalloc.stop()
+                if storage.request("GET", key).content != data:
+                    raise SystemExit(f"FAILED: stored object {key} differs from the bulletin")
+                storage.request("DELETE", key)
+            best = min(times)
+            print(f"{name:<22} {best:>8.3f} {best - plain:>+8.3f} {peak:>8.1f}")
+    print("\n'added' is the time on top of the download alone.")
+
+
+def _time(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
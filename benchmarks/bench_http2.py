@@ -0,0 +1,177 @@
+"""Compare the HTTP/1.1 connection pool with the HTTP/2 client for concurrent requests.
+
+Starts two local test servers with the same simulated network delay, one speaking HTTP/1.1
+and one speaking HTTP/2 (cleartext, prior knowledge) with the h2 package. Worker threads share
+one client, like several business units in one process, and send requests at the same time.
+Every new connection costs the handshake delay, every response the round trip time.
+
+Needs httpx[http2]. Usage: python -m benchmarks.bench_http2 [--threads 20] [--requests 10]
+"""
+
+import argparse
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import h2.config
+import h2.connection
+import h2.events
+
+from srgssr_news_downloader.utils.http_client import HTTP2Client, HTTPClient
+
+
+class Network:
+    rtt = 0.02  # Seconds per request
+    handshake = 0.06  # Seconds per new connection, TCP and TLS
+    body = b"x" * 4096
+    connections = 0
+    lock = threading.Lock()
+
+    @classmethod
+    def accepted(cls, sock: socket.socket) -> None:
+        # Without Nagle's algorithm, so small writes do not wait for delayed ACKs
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with cls.lock:
+            cls.connections += 1
+        time.sleep(cls.handshake)
+
+
+class HTTP1Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        Network.accepted(self.request)
+        super().setup()
+
+    def do_GET(self):
+        time.sleep(Network.rtt)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(Network.body)))
+        self.end_headers()
+        self.wfile.write(Network.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HTTP2Connection:
+    def __init__(self, sock: socket.socket):
+        """Serve one HTTP/2 connection, every stream is answered from its own thread."""
+        self.sock = sock
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        self.lock = threading.Lock()
+        self.pending = {}  # stream_id: bytes waiting for flow control window
+
+    def serve(self) -> None:
+        Network.accepted(self.sock)
+        with self.lock:
+            self.conn.initiate_connection()
+            self.sock.sendall(self.conn.data_to_send())
+
+        while data := self.sock.recv(65536):
+            with self.lock:
+                events = self.conn.receive_data(data)
+                for event in events:
+                    if isinstance(event, h2.events.RequestReceived):
+                        threading.Thread(target=self.respond, args=(event.stream_id,), daemon=True).start()
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        self.flush()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                self.sock.sendall(self.conn.data_to_send())
+        self.sock.close()
+
+    def respond(self, stream_id: int) -> None:
+        time.sleep(Network.rtt)
+        with self.lock:
+            self.conn.send_headers(
+                stream_id, [(":status", "200"), ("content-length", str(len(Network.body)))]
+            )
+            self.pending[stream_id] = Network.body
+            self.flush()
+            self.sock.sendall(self.conn.data_to_send())
+
+    def flush(self) -> None:
+        for stream_id, data in list(self.pending.items()):
+            size = min(
+                len(data),
+                self.conn.local_flow_control_window(stream_id),
+                self.conn.max_outbound_frame_size,
+            )
+            while size > 0:
+                self.conn.send_data(stream_id, data[:size])
+                data = data[size:]
+                size = min(
+                    len(data),
+                    self.conn.local_flow_control_window(stream_id),
+                    self.conn.max_outbound_frame_size,
+                )
+            if data:
+                self.pending[stream_id] = data
+            else:
+                self.conn.end_stream(stream_id)
+                del self.pending[stream_id]
+
+
+def start_http2_server() -> int:
+    listener = socket.create_server(("127.0.0.1", 0))
+    listener.listen(64)
+
+    def accept():
+        while True:
+            sock, _ = listener.accept()
+            threading.Thread(target=HTTP2Connection(sock).serve, daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def run(client: HTTPClient, url: str, threads: int, requests_per_thread: int) -> tuple[float, int]:
+    """Send the requests, return the duration and the number of opened connections."""
+    Network.connections = 0
+
+    def worker(_):
+        for _ in range(requests_per_thread):
+            response = client.get(url)
+            assert response.status_code == 200 and len(response.text) == len(Network.body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, range(threads)))
+    return time.perf_counter() - start, Network.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=20, help="Concurrent workers")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per worker")
+    parser.add_argument("--rtt", type=float, default=20, help="Round trip time in ms")
+    parser.add_argument("--handshake", type=float, default=60, help="Connection setup in ms")
+    args = parser.parse_args()
+    Network.rtt = args.rtt / 1000
+    Network.handshake = args.handshake / 1000
+
+    http1_server = ThreadingHTTPServer(("127.0.0.1", 0), HTTP1Handler)
+    http1_server.daemon_threads = True
+    threading.Thread(target=http1_server.serve_forever, daemon=True).start()
+    http2_port = start_http2_server()
+
+    total = args.threads * args.requests
+    print(f"{args.threads} threads x {args.requests} requests, RTT {args.rtt} ms, handshake {args.handshake} ms")
+    for name, client, url in (
+        ("HTTP/1.1 pool", HTTPClient(), f"http://127.0.0.1:{http1_server.server_port}/"),
+        ("HTTP/2", HTTP2Client(prior_knowledge=True), f"http://127.0.0.1:{http2_port}/"),
+    ):
+        duration, connections = run(client, url, args.threads, args.requests)
+        client.close()
+        print(
+            f"{name:14} {duration * 1000:8.1f} ms  {total / duration:7.1f} req/s  {connections:3} connections"
+        )
+
+    http1_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Measure the cost of the streaming MP3 validation in the download path.
+
+Writes a synthetic bulletin chunk by chunk to a temporary file, once plain and once with the
+validator running on every chunk, like APIWorker.download() does.
+
+Usage: python -m benchmarks.bench_mp3_validator [--minutes 5] [--runs 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from srgssr_news_downloader.utils.mp3_validator import MP3StreamValidator
+
+CHUNK_SIZE = 65536
+
+
+def build_mp3(minutes: float) -> bytes:
+    """Build an MPEG1 Layer 3, 128 kbit/s, 44.1 kHz file with an ID3v2 and ID3v1 tag."""
+    id3v2 = b"ID3\x03\x00\x00\x00\x00\x00\x20" + b"\x00" * 32
+    frame = b"\xff\xfb\x90\x64" + b"\x00" * 413  # 417 bytes without padding
+    frame_count = int(minutes * 60 * 44100 / 1152)
+    id3v1 = b"TAG" + b"\x00" * 125
+    return id3v2 + frame * frame_count + id3v1
+
+
+def write_file(data: bytes, validate: bool) -> float:
+    fd, path = tempfile.mkstemp(suffix=".part")
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        validator = MP3StreamValidator()
+        with open(path, "wb") as file:
+            for offset in range(0, len(data), CHUNK_SIZE):
+                chunk = data[offset : offset + CHUNK_SIZE]
+                if validate:
+                    validator.feed(chunk)
+                file.write(chunk)
+        if validate:
+            validator.finish()
+        return time.perf_counter() - start
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=5, help="Bulletin length")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    data = build_mp3(args.minutes)
+    plain = min(write_file(data, False) for _ in range(args.runs))
+    validated = min(write_file(data, True) for _ in range(args.runs))
+
+    print(f"Bulletin: {args.minutes} min, {len(data) / 1e6:.2f} MB, chunk size {CHUNK_SIZE}")
+    print(f"Write only:          {plain * 1000:8.2f} ms")
+    print(f"Write and validate:  {validated * 1000:8.2f} ms")
+    print(f"Overhead per file:   {(validated - plain) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Replay a synthetic day of the news API with different update cycles.
+
+Builds a cassette of 24 hours: no bulletin after midnight (empty podcasts list), hourly
+bulletins from 06:00 that appear a few minutes after the hour, an expired token every six
+hours and a 15 minute outage of the API in the afternoon. Every update cycle is replayed in
+its own process and compared by requests, publication delay and duration.
+
+Usage: python -m benchmarks.replay_day [--cycles 60,30] [--keep DIR]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks.bench_mp3_validator import build_mp3
+from srgssr_news_downloader.utils.cassette import Cassette
+
+OAUTH_URL = "https://oauth.replay.test/oauth/v1/accesstoken"
+API_URL = "https://api.replay.test/news/srf/podcasts"
+MEDIA_URL = "https://media.replay.test/audio/srf_news_{hour:02d}.mp3"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def podcasts(episodes: list[dict]) -> bytes:
+    return json.dumps({"podcasts": episodes}).encode()
+
+
+def build_cassette(path: str, start: float) -> None:
+    """Write the synthetic day, only the changes of the API are recorded."""
+    cassette = Cassette(path)
+    cassette.create(start)
+    tz = datetime.fromtimestamp(start).astimezone().strftime("%z")
+    day = datetime.fromtimestamp(start).strftime("%Y-%m-%d")
+
+    # Connection test of the worker and the first token, one after the other
+    cassette.add(0, "GET", OAUTH_URL, 0.08, 401, {"Content-Length": "0"})
+    cassette.add(0.08, "GET", API_URL, 0.12, 401, {"Content-Length": "0"})
+    cassette.add(0.2, "POST", OAUTH_URL, 0.15, 200, JSON_HEADERS, json.dumps({"access_token": "x"}).encode())
+    cassette.add(0.35, "GET", API_URL, 0.2, 200, JSON_HEADERS, podcasts([]))
+
+    episodes = []
+    for hour in range(6, 24):
+        episode = {
+            "id": f"news-{hour:02d}",
+            "date": f"{day}T{hour:02d}:00:00{tz}",
+            "podcastHdUrl": MEDIA_URL.format(hour=hour),
+        }
+        episodes.insert(0, episode)
+        # The bulletin appears 3 minutes after the hour, with its own audio content
+        offset = hour * 3600 + 180
+        cassette.add(offset, "GET", API_URL, 0.2, 200, JSON_HEADERS, podcasts(episodes))
+        audio = build_mp3(0.5)[:-128] + b"TAG" + episode["id"].encode().ljust(125, b"\x00")
+        headers = {"Content-Type": "audio/mpeg", "Content-Length": str(len(audio)), "ETag": f'"{episode["id"]}"'}
+        cassette.add(offset, "GET", episode["podcastHdUrl"], 0.9, 200, headers, audio)
+        # Revalidation of the published file: unchanged
+        cassette.add(offset + 1, "HEAD", episode["podcastHdUrl"], 0.05, 304, {"ETag": headers["ETag"]})
+
+        if hour in (6, 12, 18):
+            # The token expires: one 401, the poll with the new token gets the bulletins again
+            cassette.add(offset + 420, "GET", API_URL, 0.1, 401, {"Content-Length": "0"})
+            cassette.add(offset + 480, "GET", API_URL, 0.2, 200, JSON_HEADERS, podcasts(episodes))
+        if hour == 14:
+            # Outage from 14:10 to 14:25
+            cassette.add(offset + 420, "GET", API_URL, 5.0, error="ConnectionError")
+            cassette.add(offset + 1320, "GET", API_URL, 0.2, 200, JSON_HEADERS, podcasts(episodes))
+
+
+def write_config(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            "[auth]\n"
+            f"auth_url = {OAUTH_URL}\n"
+            "client_id = replay\n"
+            "client_secret = replay\n"
+            "[api]\n"
+            f"api_url = {API_URL}\n"
+            "business_unit = srf\n"
+            "update_cycle = 60\n"
+            "[audio_file]\n"
+            "filename = {bu}_news\n"
+            "filepath = .\n"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", default="60,30", help="Update cycles in seconds, comma separated")
+    parser.add_argument("--keep", help="Write cassette, config and reports to this folder")
+    args = parser.parse_args()
+
+    folder = args.keep or tempfile.mkdtemp()
+    os.makedirs(folder, exist_ok=True)
+    cassette_path = os.path.join(folder, "day.jsonl")
+    config_path = os.path.join(folder, "replay.ini")
+    start = datetime(2025, 3, 3).timestamp()
+    build_cassette(cassette_path, start)
+    write_config(config_path)
+
+    print(f"{'cycle s':>8} {'requests':>9} {'published':>10} {'missed':>7} {'median delay s':>15} {'max delay s':>12} {'real s':>7}")
+    for cycle in args.cycles.split(","):
+        report_path = os.path.join(folder, f"report_{cycle}.json")
+        subprocess.run(
+            [
+                sys.executable, "-m", "srgssr_news_downloader.replay", "replay",
+                "--config", config_path, "--cassette", cassette_path, "--duration", "86400",
+                "--set", f"api.update_cycle={cycle}", "--report", report_path,
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+        delays = sorted(p["delay"] for p in report["publications"] if p["delay"] is not None)
+        median = delays[len(delays) // 2] if delays else float("nan")
+        print(
+            f"{cycle:>8} {sum(e['requests'] for e in report['endpoints'].values()):>9} "
+            f"{len(report['publications']):>10} {len(report['missed']):>7} {median:>15.1f} "
+            f"{max(delays, default=float('nan')):>12.1f} {report['real_seconds']:>7.2f}"
+        )
+    if args.keep:
+        print(f"\nCassette and reports in {folder}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Soak test: run the worker for weeks of accelerated time and check for leaks.
+
+A local stand-in API publishes a bulletin every hour from 06:00 (empty podcasts list after
+midnight), hands out tokens that expire and fails for ten minutes every afternoon. The worker
+runs against it under a virtual clock and is restarted like after saving the configuration.
+RSS, open file descriptors, threads and Python objects are measured regularly, the growth
+after the warm-up must stay within the budgets.
+
+Usage: python -m benchmarks.soak [--days 28] [--restart-hours 24] [--max-rss-mb 10]
+    [--max-fds 4] [--max-threads 2] [--max-objects 5000]
+
+Exit code 1 if a budget was exceeded. RSS and file descriptors are measured on Linux only.
+A virtual day takes about a minute.
+"""
+
+import argparse
+import gc
+import http.server
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from PyQt6.QtCore import QCoreApplication
+
+from benchmarks.bench_mp3_validator import build_mp3
+from srgssr_news_downloader.utils.clock import VirtualClock, clock
+from srgssr_news_downloader.utils.config_helper import ConfigHelper
+from srgssr_news_downloader.utils.profile_supervisor import ProfileSupervisor
+
+TOKEN_LIFETIME = 4 * 3600  # Virtual seconds a token is valid
+AUDIO = build_mp3(0.2)[:-128]  # 12 seconds, the ID3v1 tag makes every bulletin unique
+
+
+class StandInAPI(http.server.BaseHTTPRequestHandler):
+    """OAuth, podcasts and media of the SRGSSR API, driven by the current clock."""
+
+    protocol_version = "HTTP/1.1"
+    tokens = {}  # token: expiry
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: bytes = b"", content_type: str = "application/json", head: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", f'"{hash(body)}"')
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def latest_bulletin(self) -> datetime | None:
+        now = clock.now().astimezone()
+        if now.hour < 6 or (now.hour == 6 and now.minute < 3):
+            return None  # No bulletin since midnight
+        published = now - timedelta(minutes=3)
+        return published.replace(minute=0, second=0, microsecond=0)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.lock:
+            token = f"token-{len(self.tokens)}"
+            self.tokens[token] = clock.time() + TOKEN_LIFETIME
+        self.reply(200, json.dumps({"access_token": token}).encode())
+
+    def do_GET(self, head: bool = False):
+        if self.path.startswith("/oauth"):
+            return self.reply(401, head=head)
+
+        if self.path.startswith("/api"):
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+            with self.lock:
+                if self.tokens.get(token, 0) < clock.time():
+                    return self.reply(401, head=head)
+            now = clock.now()
+            if now.hour == 14 and 10 <= now.minute < 20:
+                return self.reply(503, head=head)
+            bulletin = self.latest_bulletin()
+            podcasts = []
+            if bulletin:
+                podcasts.append(
+                    {
+                        "id": bulletin.strftime("%Y%m%d%H"),
+                        "date": bulletin.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                        "podcastHdUrl": f"http://{self.headers['Host']}/media/{bulletin:%Y%m%d%H}.mp3",
+                    }
+                )
+            return self.reply(200, json.dumps({"podcasts": podcasts}).encode(), head=head)
+
+        if self.path.startswith("/media/"):
+            bulletin_id = self.path.removeprefix("/media/").removesuffix(".mp3")
+            body = AUDIO + b"TAG" + bulletin_id.encode().ljust(125, b"\x00")
+            return self.reply(200, body, "audio/mpeg", head=head)
+
+        self.reply(404, head=head)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def process_request(self, request, client_address):
+        # Named, so the threads of the stand-in are not counted
+        threading.Thread(
+            target=self.process_request_thread, args=(request, client_address), name="stand-in", daemon=True
+        ).start()
+
+
+def measure() -> dict:
+    """Resources of the process, threads of the stand-in API excluded."""
+    gc.collect()
+    objects = Counter(type(o).__name__ for o in gc.get_objects())
+    sample = {
+        "rss_mb": None,
+        "fds": None,
+        "threads": threading.active_count()
+        - sum(thread.name == "stand-in" for thread in threading.enumerate()),
+        "objects": sum(objects.values()),
+        "types": objects,
+    }
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        sample["rss_mb"] = int(status["VmRSS"].split()[0]) / 1024
+        # OS threads also include QThreads that never ran Python code
+        sample["threads"] = int(status["Threads"]) - sum(
+            thread.name == "stand-in" for thread in threading.enumerate()
+        )
+        sample["fds"] = len(os.listdir("/proc/self/fd"))
+    return sample
+
+
+def write_config(path: str, port: int, audio_folder: str) -> ConfigHelper:
+    config_helper = ConfigHelper(path)
+    config_helper.create_config()
+    for section, key, value in (
+        ("auth", "auth_url", f"http://127.0.0.1:{port}/oauth/token"),
+        ("auth", "client_id", "soak"),
+        ("auth", "client_secret", "soak"),
+        ("api", "api_url", f"http://127.0.0.1:{port}/api/{{bu}}/podcasts"),
+        ("audio_file", "filepath", audio_folder),
+        ("publish", "gc_grace_period", "0"),  # File times are real time, old versions go at once
+    ):
+        config_helper.set_value(section, key, value)
+    return config_helper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=28, help="Virtual days")
+    parser.add_argument("--restart-hours", type=float, default=24, help="Restart the worker every N virtual hours")
+    parser.add_argument("--warmup-days", type=float, default=1, help="Growth is measured from here on")
+    parser.add_argument("--sample-hours", type=float, default=24, help="Virtual hours between two measurements")
+    parser.add_argument("--max-rss-mb", type=float, default=10, help="Allowed RSS growth")
+    parser.add_argument("--max-fds", type=int, default=4, help="Allowed growth of open file descriptors")
+    parser.add_argument("--max-threads", type=int, default=2, help="Allowed growth of threads")
+    parser.add_argument("--max-objects", type=int, default=5000, help="Allowed growth of Python objects")
+    parser.add_argument("--DEBUG", action="store_true", help="Log the worker")
+    args = parser.parse_args()
+
+    if not args.DEBUG:
+        logging.getLogger("news_downloader").setLevel(logging.WARNING)
+
+    app = QCoreApplication(sys.argv)
+    start = datetime(2025, 3, 3).timestamp()
+    clock.use(VirtualClock(start))
+    end = start + args.days * 86400
+
+    server = StandInServer(("127.0.0.1", 0), StandInAPI)
+    threading.Thread(target=server.serve_forever, name="stand-in", daemon=True).start()
+
+    folder = tempfile.mkdtemp()
+    audio_folder = os.path.join(folder, "audio")
+    os.makedirs(audio_folder)
+    config_helper = write_config(os.path.join(folder, "config.ini"), server.server_port, audio_folder)
+
+    supervisor = ProfileSupervisor(config_helper)
+    supervisor.start()
+    restarts = 0
+    next_restart = start + args.restart_hours * 3600
+    next_sample = start + args.warmup_days * 86400
+    samples = []  # (virtual day, sample)
+    started = time.perf_counter()
+
+    print(f"{'day':>6} {'RSS MB':>8} {'FDs':>5} {'threads':>8} {'objects':>9}")
+    while clock.time() < end:
+        app.processEvents()
+        time.sleep(0.005)
+        if clock.time() >= next_restart:
+            # Like saving the configuration in the window
+            supervisor.stop()
+            supervisor = ProfileSupervisor(config_helper)
+            supervisor.start()
+            restarts += 1
+            next_restart += args.restart_hours * 3600
+        if clock.time() >= next_sample or clock.time() >= end:
+            day = (clock.time() - start) / 86400
+            sample = measure()
+            samples.append((day, sample))
+            rss = "-" if sample["rss_mb"] is None else f"{sample['rss_mb']:.1f}"
+            fds = "-" if sample["fds"] is None else sample["fds"]
+            print(f"{day:>6.1f} {rss:>8} {fds:>5} {sample['threads']:>8} {sample['objects']:>9}")
+            next_sample += args.sample_hours * 3600
+    supervisor.stop()
+    real_seconds = time.perf_counter() - started
+
+    history = os.path.join(audio_folder, "versions", "download_history.jsonl")
+    with open(history, encoding="utf-8") as f:
+        published = sum(json.loads(line)["event"] == "published" for line in f)
+    print(
+        f"\n{args.days:.0f} days in {real_seconds:.0f}s, {restarts} restarts, {published} bulletins published "
+        f"(expected about {args.days * 18:.0f})"
+    )
+
+    baseline, last = samples[0][1], samples[-1][1]
+    failed = []
+    for key, budget, unit in (
+        ("rss_mb", args.max_rss_mb, "MB"),
+        ("fds", args.max_fds, ""),
+        ("threads", args.max_threads, ""),
+        ("objects", args.max_objects, ""),
+    ):
+        if baseline[key] is None:
+            continue
+        growth = last[key] - baseline[key]
+        verdict = "ok" if growth <= budget else "OVER BUDGET"
+        print(f"{key:<8} growth {growth:>+10.1f}{unit}  budget {budget}{unit}  {verdict}")
+        if growth > budget:
+            failed.append(key)
+
+    print("\nObject types with the most growth:")
+    for name, count in (last["types"] - baseline["types"]).most_common(10):
+        print(f"{count:>+9}  {name}")
+
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
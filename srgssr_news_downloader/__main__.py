@@ -1,8 +1,13 @@
 import logging
+import math
 import os
 import sys
+import time
+from datetime import datetime
 
 from PyQt6 import QtGui, QtWidgets, uic
+from PyQt6.QtCore import QPointF, Qt, QTimer
+from PyQt6.QtGui import QColor, QPainter, QPen
 from PyQt6.QtWidgets import (
     QApplication,
     QComboBox,
@@ -16,10 +21,13 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QPushButton,
     QVBoxLayout,
+    QWidget,
 )
 
 from srgssr_news_downloader.utils.config_helper import ConfigHelper
-from srgssr_news_downloader.utils.srgssr_api_helper import APIThread
+from srgssr_news_downloader.utils.profile_supervisor import ProfileSupervisor
+from srgssr_news_downloader.utils.profiling import profiled
+from srgssr_news_downloader.utils.progress import format_rate
 from srgssr_news_downloader.version import __version__
 
 main_window_ui_file = "srgssr_news_downloader/gui/main_window.ui"
@@ -38,34 +46,56 @@ class Window(QtWidgets.QMainWindow):
 
         # MenuBar Setup
         self.configMenu = QtGui.QAction("Konfiguration", self)
+        self.performanceMenu = QtGui.QAction("Verlauf", self)
         self.infoMenu = QtGui.QAction("Info", self)
         self.menuBar.addAction(self.configMenu)
+        self.menuBar.addAction(self.performanceMenu)
         self.menuBar.addAction(self.infoMenu)
         self.configMenu.triggered.connect(self.config_menu_clicked)
+        self.performanceMenu.triggered.connect(self.performance_menu_clicked)
         self.infoMenu.triggered.connect(self.info_menu_clicked)
 
         self.label_status_value.setText("Initialisiere Programm")
         self.label_download_value.setText("-")
+        self.update_download_progress({})
 
         ## Helper Setup
         self.log = logging.getLogger("news_downloader")
         self.config_helper = ConfigHelper(config_file_name)
         self.setup_config()
 
+        # Profile selection, only shown with several profiles
+        self.profile_status = {}  # profile: last label dict
+        self.profile_progress = {}  # profile: last download progress
+        self.profile_select = QComboBox()
+        self.profile_select.currentTextChanged.connect(self.profile_selected)
+        self.menuBar.setCornerWidget(self.profile_select)
+
         ## Init Api Worker
         self.start_api_worker()
 
     ## API Worker
     def start_api_worker(self):
-        self.api_thread = APIThread(self.config_helper)
-        self.api_thread.worker.connection_status.connect(self.update_status_labels)
-        self.api_thread.worker.error.connect(self.api_error_return)
-        self.api_thread.start()
+        self.supervisor = ProfileSupervisor(self.config_helper)
+        self.supervisor.connection_status.connect(self.update_profile_status)
+        self.supervisor.download_progress.connect(self.update_profile_progress)
+        self.supervisor.error.connect(self.profile_error_return)
+
+        profiles = self.supervisor.profiles
+        self.profile_status = {profile: {} for profile in profiles}
+        self.profile_progress = {}
+        self.profile_select.blockSignals(True)
+        self.profile_select.clear()
+        self.profile_select.addItems(profiles)
+        self.profile_select.blockSignals(False)
+        self.profile_select.setVisible(len(profiles) > 1)
+
+        self.supervisor.start()
 
     ## GUI Events
     def closeEvent(self, event):
-        # Stop API thread when window is closed
-        self.api_thread.stop()
+        # Stop API threads when window is closed
+        self.supervisor.stop()
         self.log.info("---  End Session")
         event.accept()  # Execute close event
 
@@ -76,16 +106,62 @@ class Window(QtWidgets.QMainWindow):
             self.log.info("New configuration saved by user.")
             # Restart API Worker
             try:
-                self.api_thread.stop()
+                self.supervisor.stop()
             except Exception:
                 pass
             self.start_api_worker()
 
+    def performance_menu_clicked(self) -> None:
+        profile = self.profile_select.currentText()
+        thread = self.supervisor.threads.get(profile)
+        if thread is None or thread.worker.perf_history is None:
+            QMessageBox.information(self, "Verlauf", "Keine Messwerte vorhanden.")
+            return
+        dlg = performanceWindow(self, thread.worker.perf_history, profile)
+        dlg.show()
+
     def info_menu_clicked(self) -> None:
         dlg = infoWindow(self)
         dlg.show()
 
     ## GUI / API Worker Signals
+    @profiled("gui")
+    def update_profile_status(self, profile: str, label_dict: dict):
+        """Remember the status of a profile and show it if the profile is selected.
+
+        Args:
+            profile (str): Profile name.
+            label_dict (dict): Same as in update_status_labels.
+        """
+        self.profile_status.setdefault(profile, {}).update(label_dict)
+        if profile == self.profile_select.currentText():
+            self.update_status_labels(label_dict)
+
+    @profiled("gui")
+    def update_profile_progress(self, profile: str, report: dict):
+        """Remember the download progress of a profile and show it if the profile is selected.
+
+        Args:
+            profile (str): Profile name.
+            report (dict): Same as in update_download_progress.
+        """
+        self.profile_progress[profile] = report
+        if profile == self.profile_select.currentText():
+            self.update_download_progress(report)
+
+    def profile_selected(self, profile: str):
+        """Show the last status of the selected profile."""
+        self.label_status_value.setText("-")
+        self.label_download_value.setText("-")
+        self.update_status_labels(self.profile_status.get(profile, {}))
+        self.update_download_progress(self.profile_progress.get(profile, {}))
+
+    def profile_error_return(self, profile: str, value):
+        """Log the uncaught error of a profile's worker, the other profiles keep running."""
+        if profile:
+            self.log.critical(f"Error in profile '{profile}'")
+        self.api_error_return(value)
+
     def update_status_labels(self, label_dict: dict):
         """Change labels based on values in dict. Only send dict for the label you want to change.
 
@@ -131,6 +207,32 @@ class Window(QtWidgets.QMainWindow):
                     "Error in text label change: 'label_download_value' was sent but no text information was given."
                 )
 
+    def update_download_progress(self, report: dict):
+        """Show the progress of the running download. The worker sends a few reports per second.
+
+        Args:
+            report (dict): DownloadProgress.report(), empty or done if no download is running.
+        """
+        if not report or report["done"]:
+            self.progress_download.setRange(0, 100)
+            self.progress_download.setValue(0)
+            self.label_speed_value.setText("-")
+            self.label_speed_value.setStyleSheet("color: black")
+            return
+
+        if report["percent"] is None:
+            self.progress_download.setRange(0, 0)  # Size unknown, busy indicator
+        else:
+            self.progress_download.setRange(0, 100)
+            self.progress_download.setValue(int(report["percent"]))
+
+        text = format_rate(report["rate"])
+        if report["eta"] is not None:
+            text += f", noch {report['eta']:.0f}s"
+        self.label_speed_value.setText(text)
+        # Red if the file will not be ready before the deadline
+        self.label_speed_value.setStyleSheet(f"color: {'red' if report['late'] else 'black'};")
+
     def api_error_return(self, value):
         """Log Critical error and call error dialog window.
 
@@ -331,6 +433,165 @@ class infoWindow(QMessageBox):
         self.exec()
 
 
+class PerformancePlot(QWidget):
+    # Column of the history, lane title and color
+    LANES = (
+        ("poll_latency", "API Anfrage (s)", "#1f77b4"),
+        ("download_seconds", "Download (s)", "#2ca02c"),
+        ("publish_lag", "Verzögerung Publikation (s)", "#ff7f0e"),
+    )
+
+    def __init__(self, parent: QWidget = None):
+        """Plot of the performance history, one lane per measurement, errors as red marks."""
+        super().__init__(parent)
+        self.setMinimumSize(720, 380)
+        self.series = {}
+        self.since = 0.0
+        self.until = 0.0
+
+    def set_series(self, series: dict, since: float, until: float):
+        """Show new data.
+
+        Args:
+            series (dict): PerfHistory.series().
+            since (float): Unix time at the left edge.
+            until (float): Unix time at the right edge.
+        """
+        self.series = series
+        self.since = since
+        self.until = until
+        self.update()
+
+    @profiled("gui")
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("white"))
+        if not self.series or not len(self.series["time"]):
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Keine Messwerte im Zeitraum.")
+            return
+
+        left, right, axis_height = 10, self.width() - 10, 20
+        width = right - left
+        lane_height = (self.height() - axis_height) / len(self.LANES)
+        span = max(self.until - self.since, 1)
+        times = self.series["time"]
+
+        def column(timestamp: float) -> int:
+            return min(int((timestamp - self.since) / span * width), width - 1)
+
+        for index, (name, title, color) in enumerate(self.LANES):
+            top = index * lane_height
+            bottom = top + lane_height - 4
+
+            # Highest value per pixel column, the plot costs the same for a day or a week
+            buckets = {}
+            for timestamp, value in zip(times, self.series[name]):
+                if not math.isnan(value):
+                    x = column(timestamp)
+                    buckets[x] = max(buckets.get(x, 0.0), value)
+            maximum = max(buckets.values(), default=0.0) or 1.0
+
+            painter.setPen(QPen(QColor(color)))
+            for x, value in buckets.items():
+                y = bottom - value / maximum * (lane_height - 22)
+                painter.drawLine(QPointF(left + x, bottom), QPointF(left + x, y))
+
+            painter.setPen(QPen(QColor("black")))
+            painter.drawText(left + 4, int(top) + 14, f"{title}, max {maximum:.1f}")
+            painter.setPen(QPen(QColor("lightgray")))
+            painter.drawLine(QPointF(left, bottom), QPointF(right, bottom))
+
+        # Errors
+        axis_top = self.height() - axis_height
+        painter.setPen(QPen(QColor("red")))
+        for timestamp, errors in zip(times, self.series["errors"]):
+            if errors:
+                x = left + column(timestamp)
+                painter.drawLine(QPointF(x, axis_top - 8), QPointF(x, axis_top))
+
+        painter.setPen(QPen(QColor("black")))
+        time_format = "%H:%M" if span <= 86400 else "%d.%m. %H:%M"
+        painter.drawText(left, self.height() - 4, datetime.fromtimestamp(self.since).strftime(time_format))
+        end_text = datetime.fromtimestamp(self.until).strftime(time_format)
+        painter.drawText(right - painter.fontMetrics().horizontalAdvance(end_text), self.height() - 4, end_text)
+
+
+class performanceWindow(QDialog):
+    # Selectable time ranges in seconds
+    RANGES = {"6 Stunden": 6 * 3600, "24 Stunden": 86400, "7 Tage": 7 * 86400}
+
+    def __init__(self, parent: QtWidgets.QMainWindow, perf_history, profile: str = ""):
+        """Window with the measurements of the last cycles.
+
+        The history is only read while the window is open, every few seconds if new cycles were added.
+
+        Args:
+            parent (QtWidgets.QMainWindow): Main window object
+            perf_history (PerfHistory): History of the worker.
+            profile (str): Profile name for the title. Default "".
+        """
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setWindowTitle(f"Verlauf {profile}".strip())
+        self.perf_history = perf_history
+        self.shown_version = None
+
+        layout = QVBoxLayout(self)
+        self.range_input = QComboBox()
+        self.range_input.addItems(self.RANGES)
+        self.range_input.setCurrentText("24 Stunden")
+        self.range_input.currentTextChanged.connect(self.refresh)
+        layout.addWidget(self.range_input)
+
+        self.plot = PerformancePlot(self)
+        layout.addWidget(self.plot)
+
+        button_layout = QHBoxLayout()
+        self.info_label = QLabel("")
+        export_button = QPushButton("CSV exportieren...")
+        export_button.clicked.connect(self.export_csv)
+        close_button = QPushButton("Schliessen")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(self.info_label)
+        button_layout.addStretch()
+        button_layout.addWidget(export_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(lambda: self.refresh(force=False))
+        self.timer.start(5000)
+        self.refresh()
+
+    @profiled("gui")
+    def refresh(self, *args, force: bool = True):
+        """Read the history and redraw the plot.
+
+        Args:
+            force (bool): Redraw even if no cycle was added. Default True.
+        """
+        if not force and self.perf_history.version == self.shown_version:
+            return
+        self.shown_version = self.perf_history.version
+        until = time.time()
+        since = until - self.RANGES[self.range_input.currentText()]
+        series = self.perf_history.series(since)
+        errors = sum(series["errors"])
+        self.info_label.setText(f"{len(series['time'])} Zyklen, {errors} Fehler")
+        self.plot.set_series(series, since, until)
+
+    def export_csv(self):
+        path, _ = QFileDialog.getSaveFileName(self, "CSV exportieren", "performance.csv", "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            rows = self.perf_history.to_csv(path)
+        except OSError as ex:
+            QMessageBox.warning(self, "Fehler", f"CSV konnte nicht gespeichert werden:\n{ex}")
+            return
+        QMessageBox.information(self, "Info", f"{rows} Zyklen exportiert.")
+
+
 class ErrorDialog(QDialog):
     def __init__(self, error: Exception, parent: QtWidgets.QMainWindow = None):
         """Show Error Dialog with information from raised exception.
@@ -23,6 +23,7 @@ from PySide6.QtWidgets import (
     QGroupBox,
     QLabel,
     QMenuBar,
+    QProgressBar,
     QVBoxLayout,
     QWidget,
 )
@@ -32,17 +33,17 @@ class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
         if not MainWindow.objectName():
             MainWindow.setObjectName("MainWindow")
-        MainWindow.resize(800, 173)
+        MainWindow.resize(800, 230)
         self.actionBearbeiten = QAction(MainWindow)
         self.actionBearbeiten.setObjectName("actionBearbeiten")
         self.centralwidget = QWidget(MainWindow)
         self.centralwidget.setObjectName("centralwidget")
         self.groupBox = QGroupBox(self.centralwidget)
         self.groupBox.setObjectName("groupBox")
-        self.groupBox.setGeometry(QRect(10, 10, 781, 131))
+        self.groupBox.setGeometry(QRect(10, 10, 781, 188))
         self.verticalLayoutWidget = QWidget(self.groupBox)
         self.verticalLayoutWidget.setObjectName("verticalLayoutWidget")
-        self.verticalLayoutWidget.setGeometry(QRect(10, 10, 761, 111))
+        self.verticalLayoutWidget.setGeometry(QRect(10, 10, 761, 168))
         self.verticalLayout = QVBoxLayout(self.verticalLayoutWidget)
         self.verticalLayout.setObjectName("verticalLayout")
         self.verticalLayout.setContentsMargins(0, 0, 0, 0)
@@ -106,6 +107,26 @@ class Ui_MainWindow(object):
 
         self.verticalLayout.addWidget(self.frame_2)
 
+        self.frame_3 = QFrame(self.verticalLayoutWidget)
+        self.frame_3.setObjectName("frame_3")
+        self.frame_3.setFrameShape(QFrame.Shape.StyledPanel)
+        self.frame_3.setFrameShadow(QFrame.Shadow.Raised)
+        self.progress_download = QProgressBar(self.frame_3)
+        self.progress_download.setObjectName("progress_download")
+        self.progress_download.setGeometry(QRect(10, 13, 341, 25))
+        self.progress_download.setValue(0)
+        self.label_speed_value = QLabel(self.frame_3)
+        self.label_speed_value.setObjectName("label_speed_value")
+        self.label_speed_value.setGeometry(QRect(370, 0, 381, 51))
+        self.label_speed_value.setFont(font1)
+        self.label_speed_value.setAlignment(
+            Qt.AlignmentFlag.AlignLeading
+            | Qt.AlignmentFlag.AlignLeft
+            | Qt.AlignmentFlag.AlignVCenter
+        )
+
+        self.verticalLayout.addWidget(self.frame_3)
+
         MainWindow.setCentralWidget(self.centralwidget)
         self.menuBar = QMenuBar(MainWindow)
         self.menuBar.setObjectName("menuBar")
@@ -138,5 +159,8 @@ class Ui_MainWindow(object):
         self.label_download_value.setText(
             QCoreApplication.translate("MainWindow", "VALUE", None)
         )
+        self.label_speed_value.setText(
+            QCoreApplication.translate("MainWindow", "VALUE", None)
+        )
 
     # retranslateUi
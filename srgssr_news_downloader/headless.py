@@ -0,0 +1,64 @@
+"""Run the downloader without GUI, f.ex. as a service on a server.
+
+All profiles of the configuration are spread over a pool of worker processes.
+
+Usage: python -m srgssr_news_downloader.headless [--config config.ini] [--processes N] [--DEBUG] [--PROFILE]
+"""
+
+import argparse
+import signal
+import sys
+
+from srgssr_news_downloader.utils.config_helper import ConfigHelper
+from srgssr_news_downloader.utils.logging_setup import get_logger
+from srgssr_news_downloader.utils.process_supervisor import ProcessPoolSupervisor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.ini", help="Configuration file")
+    parser.add_argument("--processes", type=int, help="Worker processes, overrides pool.processes")
+    parser.add_argument("--DEBUG", action="store_true", help="Debug logging")
+    parser.add_argument("--PROFILE", action="store_true", help="CPU and memory profiling, see [profiling]")
+    args = parser.parse_args()
+
+    log = get_logger()
+    log.info("---   New headless session started")
+
+    config_helper = ConfigHelper(args.config)
+    try:
+        config_helper.load_config()
+        config_helper.validate_config()
+    except (FileNotFoundError, KeyError) as ex:
+        log.critical(f"Configuration not usable: {repr(ex)}")
+        sys.exit(1)
+
+    processes = args.processes
+    if processes is None:
+        processes = int(config_helper.get_value("pool", "processes"))
+    supervisor = ProcessPoolSupervisor(
+        config_helper,
+        processes=processes,
+        restart_delay=float(config_helper.get_value("pool", "restart_delay")),
+    )
+
+    signal.signal(signal.SIGINT, lambda *_: supervisor.stop())
+    signal.signal(signal.SIGTERM, lambda *_: supervisor.stop())
+
+    try:
+        supervisor.start(
+            metrics_host=config_helper.get_value("pool", "metrics_host"),
+            metrics_port=int(config_helper.get_value("pool", "metrics_port")),
+            health_host=config_helper.get_value("health", "host"),
+            health_port=int(config_helper.get_value("health", "port")),
+            health_socket=config_helper.get_value("health", "unix_socket"),
+        )
+    except KeyError as ex:
+        log.critical(f"Health endpoint not usable: {repr(ex)}")
+        sys.exit(1)
+    supervisor.run()
+    log.info("---  End Session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Record the HTTP exchanges of the worker and replay them under a virtual clock.
+
+A recording runs the worker in real time and writes OAuth, podcasts and media exchanges to a
+cassette. A replay runs the worker against the cassette, the clock only moves while the worker
+sleeps or waits for a response, so a day of polling takes seconds. Both write the audio files
+to a temporary folder and leave server, HA, notifications and tracing off.
+
+Usage:
+    python -m srgssr_news_downloader.replay record --cassette day.jsonl [--duration 86400]
+    python -m srgssr_news_downloader.replay replay --cassette day.jsonl [--set api.update_cycle=30]
+        [--duration SECONDS] [--report report.json]
+"""
+
+import argparse
+import json
+import signal
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from srgssr_news_downloader.utils.cassette import (
+    Cassette,
+    RecordingHTTPClient,
+    ReplayHTTPClient,
+)
+from srgssr_news_downloader.utils.clock import VirtualClock, clock
+from srgssr_news_downloader.utils.config_helper import ConfigHelper
+from srgssr_news_downloader.utils.logging_setup import get_logger
+from srgssr_news_downloader.utils.srgssr_api_helper import APIWorker
+
+# Settings of a recording or replay, nothing outside the temporary folder is touched
+ISOLATED_SETTINGS = (
+    ("server", "enabled", "no"),
+    ("ha", "enabled", "no"),
+    ("notify", "webhook_url", ""),
+    ("notify", "unix_socket", ""),
+    ("notify", "command", ""),
+    ("tracing", "enabled", "no"),
+    ("ratelimit", "state_file", ""),
+)
+
+# Additionally for a replay: no DNS lookups and connections outside the cassette
+REPLAY_SETTINGS = (
+    ("prewarm", "lead_time", "0"),
+    ("prewarm", "dns_ttl", "0"),
+)
+
+
+def load_config(args, audio_folder: str, settings: tuple) -> ConfigHelper:
+    """Load the configuration and apply the isolated settings and the --set overrides in memory.
+
+    Raises:
+        KeyError: Raised for an invalid configuration or override.
+    """
+    config_helper = ConfigHelper(args.config)
+    try:
+        config_helper.load_config()
+    except FileNotFoundError as ex:
+        raise KeyError(str(ex))
+    config_helper.validate_config()
+
+    overrides = [*settings, ("audio_file", "filepath", audio_folder)]
+    for override in args.set:
+        name, _, value = override.partition("=")
+        section, _, key = name.partition(".")
+        if not key:
+            raise KeyError(f"Ungültige Einstellung: {override}")
+        overrides.append((section, key, value))
+    for section, key, value in overrides:
+        config_helper.set_value(section, key, value, save=False)
+
+    if args.profile:
+        return config_helper.profile(args.profile)
+    return config_helper
+
+
+def record(args, log) -> None:
+    cassette = Cassette(args.cassette)
+    with tempfile.TemporaryDirectory() as audio_folder:
+        config_helper = load_config(args, audio_folder, ISOLATED_SETTINGS)
+        cassette.create(clock.time())
+        worker = APIWorker(config_helper, args.profile or "", http_client=RecordingHTTPClient(cassette))
+
+        timer = threading.Timer(args.duration, worker.stop)
+        timer.daemon = True
+        timer.start()
+        signal.signal(signal.SIGINT, lambda *_: worker.stop())
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+
+        log.info(f"Replay: Recording {args.duration:.0f}s to {args.cassette}")
+        worker.run()
+        timer.cancel()
+    print(f"{len(cassette.interactions)} exchanges recorded in {args.cassette}")
+
+
+def replay(args, log) -> dict:
+    """Run the worker against a cassette.
+
+    Returns:
+        dict: The report, see build_report().
+    """
+    cassette = Cassette(args.cassette)
+    cassette.load()
+
+    virtual_clock = VirtualClock(cassette.start)
+    previous_clock = clock.use(virtual_clock)
+    client = ReplayHTTPClient(cassette)
+    errors = []
+    try:
+        with tempfile.TemporaryDirectory() as audio_folder:
+            config_helper = load_config(args, audio_folder, ISOLATED_SETTINGS + REPLAY_SETTINGS)
+            worker = APIWorker(config_helper, args.profile or "", http_client=client)
+            worker.error.connect(lambda ex: errors.append(repr(ex)))
+            # By default up to the last exchange and one more cycle
+            duration = args.duration or cassette.duration + int(config_helper.get_value("api", "update_cycle"))
+            virtual_clock.call_at(cassette.start + duration, worker.stop)
+
+            log.info(f"Replay: {duration:.0f}s of {args.cassette}")
+            started = time.perf_counter()
+            worker.run()
+            real_seconds = time.perf_counter() - started
+
+            published = worker.history.entries() if worker.history else []
+            cycles = len(worker.perf_history) if worker.perf_history else 0
+    finally:
+        clock.use(previous_clock)
+
+    return build_report(cassette, client, virtual_clock.time() - cassette.start, real_seconds, cycles, published, errors)
+
+
+def episode_availability(cassette: Cassette) -> dict[str, float]:
+    """Offset of the first recorded podcasts response that lists an episode as latest.
+
+    Returns:
+        dict[str, float]: Seconds since the start per episode date.
+    """
+    available = {}
+    for interaction in cassette.interactions:
+        if interaction.get("status") != 200 or "podcasts" not in interaction.get("body", ""):
+            continue
+        try:
+            podcasts = json.loads(interaction["body"])["podcasts"]
+            available.setdefault(podcasts[0]["date"], interaction["offset"])
+        except (ValueError, KeyError, IndexError, TypeError):
+            continue
+    return available
+
+
+def build_report(
+    cassette: Cassette,
+    client: ReplayHTTPClient,
+    virtual_seconds: float,
+    real_seconds: float,
+    cycles: int,
+    history: list[dict],
+    errors: list[str],
+) -> dict:
+    """Summarise a replay: requests and latency per endpoint and the delay of every publication.
+
+    Returns:
+        dict: {
+            virtual_seconds, real_seconds, speedup, cycles,
+            endpoints: {"METHOD host/path": {requests, errors, status, p50_ms, p95_ms, max_ms}},
+            unmatched: [str],
+            publications: [{episode_date, available, first_seen, published, delay}],
+            missed: [episode date],
+            worker_errors: [str]
+        }
+    """
+    # Media URLs change with every episode, they are grouped per folder
+    media_urls = {url.split("?")[0] for url in (r["url"] for r in client.requests if r["media"])}
+    endpoints = {}
+    unmatched = []
+    for request in client.requests:
+        method, url = request["method"], request["url"]
+        if not request["matched"]:
+            unmatched.append(f"{method} {url}")
+        parts = urlsplit(url)
+        if url.split("?")[0] in media_urls:
+            name = f"{method} {parts.netloc}{parts.path.rpartition('/')[0]}/* (media)"
+        else:
+            name = f"{method} {parts.netloc}{parts.path}"
+        endpoint = endpoints.setdefault(name, {"requests": 0, "errors": 0, "status": {}, "durations": []})
+        endpoint["requests"] += 1
+        status = request.get("error") or str(request["status"])
+        endpoint["status"][status] = endpoint["status"].get(status, 0) + 1
+        if request.get("error") or request["status"] >= 400:
+            endpoint["errors"] += 1
+        endpoint["durations"].append(request["duration"] * 1000)
+
+    for endpoint in endpoints.values():
+        durations = endpoint.pop("durations")
+        endpoint["p50_ms"] = round(statistics.median(durations), 1)
+        endpoint["p95_ms"] = round(
+            statistics.quantiles(durations, n=20, method="inclusive")[-1] if len(durations) > 1 else durations[0], 1
+        )
+        endpoint["max_ms"] = round(max(durations), 1)
+
+    available = episode_availability(cassette)
+    publications = []
+    for entry in history:
+        if entry.get("event") != "published":
+            continue
+        published = datetime.fromisoformat(entry["time"]).timestamp() - cassette.start
+        first_seen = client.first_seen.get(entry["episode_date"])
+        since = available.get(entry["episode_date"])
+        publications.append(
+            {
+                "episode_date": entry["episode_date"],
+                "available": since,
+                "first_seen": None if first_seen is None else round(first_seen, 1),
+                "published": round(published, 1),
+                "delay": None if since is None else round(max(published - since, 0), 1),
+            }
+        )
+    published_dates = {publication["episode_date"] for publication in publications}
+
+    return {
+        "virtual_seconds": round(virtual_seconds, 1),
+        "real_seconds": round(real_seconds, 2),
+        "speedup": round(virtual_seconds / real_seconds) if real_seconds else None,
+        "cycles": cycles,
+        "endpoints": endpoints,
+        "unmatched": sorted(set(unmatched)),
+        "publications": publications,
+        "missed": [date for date in client.first_seen if date not in published_dates],
+        "worker_errors": errors,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['virtual_seconds']:.0f}s replayed in {report['real_seconds']:.2f}s "
+        f"({report['speedup']}x), {report['cycles']} cycles\n"
+    )
+    print(f"{'endpoint':<60} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, endpoint in sorted(report["endpoints"].items(), key=lambda item: -item[1]["requests"]):
+        print(
+            f"{name[:60]:<60} {endpoint['requests']:>8} {endpoint['errors']:>6} "
+            f"{endpoint['p50_ms']:>8.1f} {endpoint['p95_ms']:>8.1f} {endpoint['max_ms']:>8.1f}"
+        )
+
+    delays = [p["delay"] for p in report["publications"] if p["delay"] is not None]
+    print(f"\n{len(report['publications'])} publications, {len(report['missed'])} episodes missed")
+    if delays:
+        print(f"Delay available -> published: median {statistics.median(delays):.1f}s, max {max(delays):.1f}s")
+    for request in report["unmatched"]:
+        print(f"Not in cassette: {request}")
+    for error in report["worker_errors"]:
+        print(f"Worker error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("--config", default="config.ini", help="Configuration file")
+    parser.add_argument("--profile", help="Profile of the configuration")
+    parser.add_argument("--cassette", required=True, help="Cassette file")
+    parser.add_argument(
+        "--duration", type=float, help="Seconds, default 86400 to record and the cassette length and one cycle to replay"
+    )
+    parser.add_argument("--set", action="append", default=[], metavar="SECTION.KEY=VALUE", help="Override a setting")
+    parser.add_argument("--report", help="Write the replay report as JSON to this file")
+    parser.add_argument("--DEBUG", action="store_true", help="Debug logging")
+    parser.add_argument("--PROFILE", action="store_true", help="CPU and memory profiling, see [profiling]")
+    args = parser.parse_args()
+
+    log = get_logger()
+    try:
+        if args.mode == "record":
+            args.duration = args.duration or 86400
+            record(args, log)
+            return
+        report = replay(args, log)
+    except (FileNotFoundError, KeyError) as ex:
+        log.critical(f"Replay: {repr(ex)}")
+        sys.exit(1)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Summarise the cycle traces: slowest cycles and time per stage.
+
+Usage: python -m srgssr_news_downloader.trace_summary [traces.jsonl ...] [--top 5] [--profile NAME]
+"""
+
+import argparse
+import json
+import statistics
+from datetime import datetime
+
+
+def load_traces(paths: list[str]) -> dict[str, list[dict]]:
+    """Read span files.
+
+    Args:
+        paths (list[str]): Files written by the tracing of the worker.
+
+    Returns:
+        dict[str, list[dict]]: Spans per trace id, in the order they were written.
+    """
+    traces = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Cut off by a crash
+                traces.setdefault(span["trace_id"], []).append(span)
+    return traces
+
+
+def print_tree(spans: list[dict], parent_id: str | None, depth: int) -> None:
+    for span in spans:
+        if span["parent_id"] != parent_id:
+            continue
+        details = " ".join(f"{key}={value}" for key, value in span["attributes"].items())
+        error = f"  ERROR {span['error']}" if "error" in span else ""
+        print(f"{'  ' * depth}{span['name']:<{24 - 2 * depth}} {span['duration_ms']:10.1f} ms  {details}{error}")
+        print_tree(spans, span["span_id"], depth + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", default=["traces.jsonl"], help="Span files")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest cycles")
+    parser.add_argument("--profile", help="Only cycles of this profile")
+    args = parser.parse_args()
+
+    roots = []
+    traces = load_traces(args.files)
+    for trace_id, spans in traces.items():
+        root = next((span for span in spans if span["parent_id"] is None), None)
+        if root is None:
+            continue
+        if args.profile is not None and root["attributes"].get("profile") != args.profile:
+            continue
+        roots.append(root)
+
+    if not roots:
+        print("No cycles found.")
+        return
+
+    print(f"{len(roots)} cycles, slowest {min(args.top, len(roots))}:\n")
+    for root in sorted(roots, key=lambda span: span["duration_ms"], reverse=True)[: args.top]:
+        started = datetime.fromtimestamp(root["start"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{started}  {root['attributes'].get('profile') or 'default'}  {root['duration_ms']:.1f} ms")
+        print_tree(traces[root["trace_id"]], root["span_id"], 1)
+        print()
+
+    # Time per stage over all selected cycles
+    durations = {}  # name: [ms, ...]
+    errors = {}  # name: count
+    for root in roots:
+        for span in traces[root["trace_id"]]:
+            if span is root:
+                continue
+            durations.setdefault(span["name"], []).append(span["duration_ms"])
+            if "error" in span:
+                errors[span["name"]] = errors.get(span["name"], 0) + 1
+
+    print(f"{'stage':<16} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'total s':>10} {'errors':>7}")
+    for name, values in sorted(durations.items(), key=lambda item: sum(item[1]), reverse=True):
+        p95 = statistics.quantiles(values, n=20, method="inclusive")[-1] if len(values) > 1 else values[0]
+        print(
+            f"{name:<16} {len(values):>7} {statistics.median(values):>10.1f} {p95:>10.1f} "
+            f"{max(values):>10.1f} {sum(values) / 1000:>10.2f} {errors.get(name, 0):>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
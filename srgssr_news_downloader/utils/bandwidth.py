@@ -0,0 +1,153 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.rate_limiter import TokenBucket
+
+
+def seconds_until_airtime(airtime_minutes: list[int], now: datetime | None = None) -> float | None:
+    """Return the seconds until the next airtime.
+
+    Args:
+        airtime_minutes (list[int]): Minutes of the hour when news go on air.
+        now (datetime | None): Reference time, default the current time.
+
+    Returns:
+        float | None: Seconds or None if no airtime is configured.
+    """
+    if not airtime_minutes:
+        return None
+
+    now = now or clock.now()
+    seconds = []
+    for minute in airtime_minutes:
+        airtime = now.replace(minute=minute, second=0, microsecond=0)
+        if airtime <= now:
+            airtime += timedelta(hours=1)
+        seconds.append((airtime - now).total_seconds())
+    return min(seconds)
+
+
+def in_airtime_window(
+    airtime_minutes: list[int], before: float, after: float, now: datetime | None = None
+) -> bool:
+    """Check if the time is around an airtime.
+
+    Args:
+        airtime_minutes (list[int]): Minutes of the hour when news go on air.
+        before (float): Seconds before airtime when the window opens.
+        after (float): Seconds after airtime when the window closes.
+        now (datetime | None): Time to check, default the current time.
+
+    Returns:
+        bool: True if the time is in the window of one of the airtimes.
+    """
+    now = now or clock.now()
+    for minute in airtime_minutes:
+        # Check this hour and the next one, airtime can be after the hour boundary
+        for hour_offset in (-1, 0, 1):
+            airtime = now.replace(minute=minute, second=0, microsecond=0) + timedelta(
+                hours=hour_offset
+            )
+            if -after <= (airtime - now).total_seconds() <= before:
+                return True
+    return False
+
+
+class BandwidthShaper:
+    def __init__(self):
+        """Process wide bandwidth limit and download slots for media downloads.
+
+        All workers of the process share the same link, so they share one shaper.
+        Without configuration nothing is limited.
+        """
+        self.max_rate = 0  # Bytes per second, 0 is unlimited
+        self.airtime_minutes = []  # Minutes of the hour, empty caps all the time
+        self.burst_until = 0  # Seconds before airtime when the cap starts
+        self.cap_duration = 0  # Seconds after airtime when the cap ends
+
+        self._bucket = None
+        self._slots = None
+        self._max_concurrent = 0
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        max_rate: int = 0,
+        airtime_minutes: list[int] | None = None,
+        burst_until: int = 0,
+        cap_duration: int = 0,
+        max_concurrent: int = 0,
+    ) -> None:
+        """Set the limits.
+
+        Args:
+            max_rate (int): Bytes per second, 0 is unlimited. Default 0.
+            airtime_minutes (list[int] | None): Minutes of the hour when news go on air.
+                If set, the limit only applies from `burst_until` seconds before until
+                `cap_duration` seconds after these minutes. Default None (always limited).
+            burst_until (int): Seconds before airtime. Default 0.
+            cap_duration (int): Seconds after airtime. Default 0.
+            max_concurrent (int): Downloads at the same time, 0 is unlimited. Default 0.
+        """
+        with self._lock:
+            self.max_rate = max_rate
+            self.airtime_minutes = airtime_minutes or []
+            self.burst_until = burst_until
+            self.cap_duration = cap_duration
+
+            if max_rate:
+                # One second of burst, but at least one full chunk
+                capacity = max(max_rate, 65536)
+                if self._bucket is None:
+                    self._bucket = TokenBucket(max_rate, capacity)
+                else:
+                    self._bucket.rate, self._bucket.capacity = max_rate, capacity
+            else:
+                self._bucket = None
+
+            if max_concurrent != self._max_concurrent:
+                self._max_concurrent = max_concurrent
+                self._slots = threading.Semaphore(max_concurrent) if max_concurrent else None
+
+    def current_limit(self, now: datetime | None = None) -> int:
+        """Return the limit that applies now.
+
+        Args:
+            now (datetime | None): Time to check, default the current time.
+
+        Returns:
+            int: Bytes per second, 0 is unlimited.
+        """
+        if not self.max_rate or not self.airtime_minutes:
+            return self.max_rate
+
+        if in_airtime_window(self.airtime_minutes, self.burst_until, self.cap_duration, now):
+            return self.max_rate
+        return 0
+
+    def throttle(self, size: int) -> None:
+        """Wait until `size` bytes may be received. Call after each chunk.
+
+        Args:
+            size (int): Bytes of the received chunk.
+        """
+        bucket = self._bucket
+        if bucket is None or not self.current_limit():
+            return
+        bucket.acquire(min(size, bucket.capacity))
+
+    @contextmanager
+    def download_slot(self):
+        """Hold one of the process wide download slots while downloading."""
+        slots = self._slots
+        if slots is None:
+            yield
+            return
+        with slots:
+            yield
+
+
+# Process wide shaper, shared by all workers
+shaper = BandwidthShaper()
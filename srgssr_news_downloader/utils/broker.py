@@ -0,0 +1,298 @@
+import os
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from srgssr_news_downloader.utils.metrics import MetricsRegistry
+from srgssr_news_downloader.utils.rate_limiter import RateLimiter, register_rate_limiter
+from srgssr_news_downloader.utils.token_store import TokenStore, token_store
+
+
+class TokenBroker:
+    def __init__(self):
+        """Tokens, rate limits and metrics of all worker processes, kept in the supervisor.
+
+        Runs in the manager process of the supervisor. The worker processes call it over IPC,
+        so a credential gets one OAuth token and one rate limit for the whole host.
+        """
+        self._limiters = {}  # client id: RateLimiter
+        self._tokens = TokenStore()
+        self._token_leases = {}  # key: (owner, monotonic expiry)
+        self._token_condition = threading.Condition()
+        self._metrics = {}  # worker index: (types, snapshot)
+        self._health = {}  # worker index: (monotonic time of the report, {profile: health snapshot})
+        self._lock = threading.Lock()
+        self._stop = False
+
+    # Rate limit and quota
+    def configure(self, client_id: str, settings: dict) -> None:
+        """Create or update the limiter of a credential.
+
+        Args:
+            client_id (str): API client id.
+            settings (dict): Arguments for RateLimiter.
+        """
+        with self._lock:
+            limiter = self._limiters.get(client_id)
+            if limiter is None:
+                self._limiters[client_id] = RateLimiter(client_id[:8] or "default", **settings)
+            else:
+                limiter.bucket.rate = settings["requests_per_minute"] / 60
+                limiter.bucket.capacity = settings["burst"]
+                limiter.quota.daily_limit = settings["daily_limit"]
+                limiter.quota.state_file = settings["state_file"]
+
+    def acquire(self, client_id: str, tokens: float, timeout: float | None) -> bool:
+        return self._limiters[client_id].bucket.acquire(tokens, timeout)
+
+    def block(self, client_id: str, seconds: float) -> None:
+        self._limiters[client_id].bucket.block(seconds)
+
+    def blocked_for(self, client_id: str) -> float:
+        return self._limiters[client_id].bucket.blocked_for()
+
+    def count(self, client_id: str, requests: int) -> int:
+        return self._limiters[client_id].quota.count(requests)
+
+    def used(self, client_id: str) -> int:
+        return self._limiters[client_id].quota.used
+
+    def remaining(self, client_id: str) -> int | None:
+        return self._limiters[client_id].quota.remaining()
+
+    # OAuth tokens
+    def token_get(self, key: tuple) -> str:
+        return self._tokens.get(key)
+
+    def token_put(self, key: tuple, token: str) -> None:
+        self._tokens.put(key, token)
+
+    def token_invalidate(self, key: tuple, token: str) -> None:
+        self._tokens.invalidate(key, token)
+
+    def token_lease_acquire(self, key: tuple, owner: tuple, duration: float, timeout: float) -> bool:
+        """Take the lease of a credential, held while one worker requests its token.
+
+        A lease ends when it is released, when it expires or when the process of its owner is
+        gone, so a crashed worker does not block the token of the other processes.
+
+        Args:
+            key (tuple): Credential, see TokenStore.
+            owner (tuple): (process ID, thread ID) of the caller.
+            duration (float): Seconds until the lease expires without release.
+            timeout (float): Maximum wait for the lease in seconds.
+
+        Returns:
+            bool: False if the lease is still held by another owner after the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._token_condition:
+            while True:
+                lease = self._token_leases.get(key)
+                now = time.monotonic()
+                if lease is None or lease[1] <= now or not _process_alive(lease[0][0]):
+                    self._token_leases[key] = (owner, now + duration)
+                    return True
+                if now >= deadline:
+                    return False
+                # Woken by a release, checks expiry and owner again at least every second
+                self._token_condition.wait(min(deadline - now, 1))
+
+    def token_lease_release(self, key: tuple, owner: tuple) -> None:
+        """End the lease of a credential, unless another owner took it over meanwhile."""
+        with self._token_condition:
+            lease = self._token_leases.get(key)
+            if lease is not None and lease[0] == owner:
+                del self._token_leases[key]
+                self._token_condition.notify_all()
+
+    # Shutdown
+    def request_stop(self) -> None:
+        """Ask all worker processes to stop."""
+        self._stop = True
+
+    def stop_requested(self) -> bool:
+        return self._stop
+
+    # Metrics
+    def report_metrics(self, worker: int, types: dict, snapshot: dict) -> None:
+        """Store the latest metrics of a worker process."""
+        with self._lock:
+            self._metrics[worker] = (types, snapshot)
+
+    def aggregated_metrics(self) -> str:
+        """Metrics of all worker processes in the Prometheus text format.
+
+        Counters are summed up. Gauges are shown per worker process with a "worker" label.
+        """
+        registry = MetricsRegistry()
+        with self._lock:
+            reports = list(self._metrics.items())
+        for worker, (types, snapshot) in reports:
+            for name, series in snapshot.items():
+                for labels, value in series:
+                    if types.get(name) == "counter":
+                        registry.inc(name, value, **labels)
+                    else:
+                        registry.set(name, value, worker=str(worker), **labels)
+        return registry.render_prometheus()
+
+
+    # Health
+    def report_health(self, worker: int, snapshot: dict) -> None:
+        """Store the latest health of the API workers of a worker process."""
+        with self._lock:
+            self._health[worker] = (time.monotonic(), snapshot)
+
+    def health_reports(self) -> dict:
+        """Return {worker index: (seconds since the report, {profile: health snapshot})}."""
+        now = time.monotonic()
+        with self._lock:
+            return {worker: (now - received, snapshot) for worker, (received, snapshot) in self._health.items()}
+
+
+def _process_alive(pid: int) -> bool:
+    """Check if a process of this host still runs. Always True on Windows, a lease only expires there."""
+    if os.name == "nt":
+        return True  # os.kill() would terminate the process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Runs under another user
+    return True
+
+
+class BrokerManager(BaseManager):
+    """Serves the TokenBroker of the supervisor to the worker processes."""
+
+
+_broker = None
+
+
+def _get_broker() -> TokenBroker:
+    global _broker
+    if _broker is None:
+        _broker = TokenBroker()
+    return _broker
+
+
+BrokerManager.register("broker", callable=_get_broker)
+
+
+class _RemoteBucket:
+    def __init__(self, broker, client_id: str, rate: float, capacity: float):
+        """TokenBucket interface on top of the broker."""
+        self.broker = broker
+        self.client_id = client_id
+        self.rate = rate  # Only informative, the broker has the settings
+        self.capacity = capacity
+
+    def acquire(self, tokens: float = 1, timeout: float | None = None) -> bool:
+        return self.broker.acquire(self.client_id, tokens, timeout)
+
+    def block(self, seconds: float) -> None:
+        self.broker.block(self.client_id, seconds)
+
+    def blocked_for(self) -> float:
+        return self.broker.blocked_for(self.client_id)
+
+
+class _RemoteQuota:
+    def __init__(self, broker, client_id: str, daily_limit: int, state_file: str):
+        """QuotaCounter interface on top of the broker."""
+        self.broker = broker
+        self.client_id = client_id
+        self.daily_limit = daily_limit
+        self.state_file = state_file
+
+    @property
+    def used(self) -> int:
+        return self.broker.used(self.client_id)
+
+    def count(self, requests: int = 1) -> int:
+        return self.broker.count(self.client_id, requests)
+
+    def remaining(self) -> int | None:
+        return self.broker.remaining(self.client_id)
+
+
+class _RemoteTokenLock:
+    # Longer than a token request with the default timeouts of the HTTP client
+    LEASE_DURATION = 90
+    WAIT_TIMEOUT = 60
+
+    def __init__(self, broker, key: tuple):
+        """Lease of a credential in the broker, used like the lock of TokenStore."""
+        self.broker = broker
+        self.key = key
+        self.owner = None
+        self.acquired = False
+
+    def __enter__(self):
+        # A lease of a crashed process ends with the process or expires, the others are not
+        # blocked. Without the lease the token is not requested, the worker waits for the token
+        # like for a missing one.
+        self.owner = (os.getpid(), threading.get_ident())
+        self.acquired = self.broker.token_lease_acquire(self.key, self.owner, self.LEASE_DURATION, self.WAIT_TIMEOUT)
+        if not self.acquired:
+            raise KeyError("Token Sperre nicht erhalten, ein anderer Prozess fordert das Token an.")
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.acquired:
+            self.acquired = False
+            self.broker.token_lease_release(self.key, self.owner)
+        return False
+
+
+class _RemoteTokenStore:
+    def __init__(self, broker):
+        """TokenStore interface on top of the broker."""
+        self.broker = broker
+
+    def lock(self, key: tuple) -> _RemoteTokenLock:
+        return _RemoteTokenLock(self.broker, key)
+
+    def get(self, key: tuple) -> str:
+        return self.broker.token_get(key)
+
+    def put(self, key: tuple, token: str) -> None:
+        self.broker.token_put(key, token)
+
+    def invalidate(self, key: tuple, token: str) -> None:
+        self.broker.token_invalidate(key, token)
+
+
+def rate_limit_settings(config) -> dict:
+    """Arguments for RateLimiter from a configuration or profile."""
+    return {
+        "requests_per_minute": float(config.get_value("ratelimit", "requests_per_minute")),
+        "burst": int(config.get_value("ratelimit", "burst")),
+        "daily_limit": int(config.get_value("ratelimit", "daily_quota")),
+        "state_file": config.get_value("ratelimit", "state_file"),
+    }
+
+
+def use_broker(broker, configs: list) -> None:
+    """Route tokens and rate limits of this worker process through the broker.
+
+    Must be called before the workers start.
+
+    Args:
+        broker: Proxy of the TokenBroker.
+        configs (list): Configurations of the profiles of this process.
+    """
+    token_store.connect(_RemoteTokenStore(broker))
+    for config in configs:
+        client_id = config.get_value("auth", "client_id")
+        settings = rate_limit_settings(config)
+        limiter = RateLimiter(client_id[:8] or "default", **settings)
+        limiter.bucket = _RemoteBucket(
+            broker, client_id, settings["requests_per_minute"] / 60, settings["burst"]
+        )
+        limiter.quota = _RemoteQuota(
+            broker, client_id, settings["daily_limit"], settings["state_file"]
+        )
+        register_rate_limiter(client_id, limiter)
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from srgssr_news_downloader.utils.download_history import DownloadHistory
+from srgssr_news_downloader.utils.metrics import metrics
+from srgssr_news_downloader.utils.publisher import Publisher
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class PublishEvents:
+    def __init__(self):
+        """Numbered "new bulletin" events that threads can wait for."""
+        self._condition = threading.Condition()
+        self.sequence = 0
+        self.last_event = None
+
+    def publish(self, event: dict) -> None:
+        """Store a new event and wake up all waiting threads.
+
+        Args:
+            event (dict): JSON serializable event data.
+        """
+        with self._condition:
+            self.sequence += 1
+            self.last_event = dict(event, id=self.sequence)
+            self._condition.notify_all()
+
+    def wait(self, since: int, timeout: float) -> dict | None:
+        """Wait for an event newer than `since`.
+
+        Args:
+            since (int): Sequence number the caller already knows.
+            timeout (float): Maximum time to wait in seconds.
+
+        Returns:
+            dict | None: The newest event or None on timeout.
+        """
+        with self._condition:
+            # An ID from before a restart of the process counts as up to date
+            since = min(since, self.sequence)
+            self._condition.wait_for(lambda: self.sequence > since, timeout)
+            if self.sequence > since:
+                return self.last_event
+        return None
+
+
+_events = {}  # profile: PublishEvents
+_events_lock = threading.Lock()
+
+
+def get_publish_events(profile: str) -> PublishEvents:
+    """Return the events of a profile. They are kept when the worker restarts, the IDs keep increasing.
+
+    Args:
+        profile (str): Profile name, "" for the shared settings.
+
+    Returns:
+        PublishEvents: The events.
+    """
+    with _events_lock:
+        if profile not in _events:
+            _events[profile] = PublishEvents()
+        return _events[profile]
+
+
+class _ETagCache:
+    def __init__(self, history: DownloadHistory):
+        self.history = history
+        self._cache = {}  # path: (size, mtime_ns, etag)
+        self._lock = threading.Lock()
+
+    def get(self, path: str, stat: os.stat_result) -> str:
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+                return cached[2]
+
+        digest = None
+        for entry in reversed(self.history.entries()):
+            if entry.get("event") == "published" and os.path.normpath(entry.get("path", "")) == path:
+                digest = entry.get("file_sha256") or entry["sha256"]  # Changed by the pipeline
+                break
+        if digest is None:
+            file_hash = hashlib.sha256()
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(65536), b""):
+                    file_hash.update(chunk)
+            digest = file_hash.hexdigest()
+
+        etag = f'"{digest}"'
+        with self._lock:
+            self._cache[path] = (stat.st_size, stat.st_mtime_ns, etag)
+        return etag
+
+
+class _BulletinRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SRGSSRNewsDownloader"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        self.server.log.debug(f"Server: {self.address_string()} {format % args}")
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body: bool):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        publisher = self.server.publisher
+
+        if path in ("/latest", "/latest.mp3"):
+            file_path = publisher.current_version() or publisher.latest_path
+            self._send_file(file_path, "no-cache", send_body)
+        elif path == "/archive":
+            names = [os.path.basename(p) for p in publisher.list_versions()]
+            self._send_json(names, send_body)
+        elif path.startswith("/archive/"):
+            name = path[len("/archive/") :]
+            if "/" in name or "\\" in name or name.startswith("."):
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            file_path = os.path.join(publisher.version_dir, name)
+            # Versions never change, clients may cache them forever
+            self._send_file(file_path, "public, max-age=31536000, immutable", send_body)
+        elif path == "/wait":
+            try:
+                since = int(query.get("since", ["0"])[0])
+                timeout = float(query.get("timeout", ["30"])[0])
+            except ValueError:
+                self.send_error(HTTPStatus.BAD_REQUEST, "since and timeout must be numbers")
+                return
+            if not math.isfinite(timeout):
+                self.send_error(HTTPStatus.BAD_REQUEST, "timeout must be a number")
+                return
+            timeout = max(0.0, min(timeout, 300))
+            event = self.server.events.wait(since, timeout)
+            if event is None:
+                self.send_response(HTTPStatus.NO_CONTENT)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self._send_json(event, send_body)
+        elif path == "/events":
+            self._send_event_stream()
+        elif path == "/metrics":
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def _send_json(self, data, send_body: bool):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_file(self, file_path: str, cache_control: str, send_body: bool):
+        # Open first: the file descriptor stays valid even if "latest" is switched meanwhile
+        try:
+            file = open(file_path, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        with file:
+            stat = os.fstat(file.fileno())
+            etag = self.server.etags.get(os.path.normpath(file_path), stat)
+            size = stat.st_size
+
+            if self._etag_matches(self.headers.get("If-None-Match"), etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", cache_control)
+                self.end_headers()
+                return
+
+            start, end = 0, size - 1
+            status = HTTPStatus.OK
+            range_header = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            if range_header and (not if_range or if_range == etag):
+                byte_range = self._parse_range(range_header, size)
+                if byte_range is None:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+
+            self.send_response(status)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+            self.send_header("Cache-Control", cache_control)
+            if status == HTTPStatus.PARTIAL_CONTENT:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+
+            if send_body and end >= start:
+                self.wfile.flush()
+                # Zero-copy with os.sendfile where the OS supports it
+                self.connection.sendfile(file, start, end - start + 1)
+
+    @staticmethod
+    def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+        # Weak comparison (RFC 9110 13.1.2): "W/" is ignored, the tag itself must be equal
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*":
+                return True
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == etag:
+                return True
+        return False
+
+    @staticmethod
+    def _parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+        match = _RANGE_PATTERN.match(range_header.strip())
+        if not match or not any(match.groups()):
+            return None
+
+        first, last = match.groups()
+        if not first:  # Suffix range: last n bytes
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+
+        if start >= size or start > end:
+            return None
+        return start, end
+
+    def _send_event_stream(self):
+        try:
+            since = int(self.headers.get("Last-Event-ID", self.server.events.sequence))
+        except ValueError:
+            self.send_error(HTTPStatus.BAD_REQUEST, "Last-Event-ID must be a number")
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            while self.server.running:
+                event = self.server.events.wait(since, 15)
+                if event is None:
+                    self.wfile.write(b": keepalive\n\n")  # Detects closed clients
+                    continue
+                since = event["id"]
+                self.wfile.write(
+                    f"id: {since}\nevent: bulletin\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+                )
+        except OSError:
+            pass  # Client disconnected
+
+
+class BulletinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        publisher: Publisher,
+        history: DownloadHistory,
+        events: PublishEvents,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+    ):
+        """Small HTTP server that serves the latest bulletin and the archived versions.
+
+        Routes:
+            /latest.mp3: Current file (no-cache, strong ETag, Range)
+            /archive: JSON list of the version files
+            /archive/<name>: A version file (immutable)
+            /wait?since=<id>&timeout=<s>: Long-poll for the next published bulletin
+            /events: Server-Sent Events stream of published bulletins
+            /metrics: Metrics in the Prometheus text format
+
+        Args:
+            publisher (Publisher): Publisher of the worker.
+            history (DownloadHistory): History, used for the ETags.
+            events (PublishEvents): Events of published bulletins.
+            host (str): Listening address. Default "127.0.0.1".
+            port (int): Listening port. Default 8080.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.publisher = publisher
+        self.events = events
+        self.etags = _ETagCache(history)
+        self.running = False
+        self._thread = None
+
+        super().__init__((host, port), _BulletinRequestHandler)
+
+    def start(self) -> None:
+        """Serve requests in a background thread."""
+        self.running = True
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="BulletinServer", daemon=True
+        )
+        self._thread.start()
+        host, port = self.server_address[:2]
+        self.log.info(f"Server: Serving bulletins on http://{host}:{port}/latest.mp3")
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        self.running = False
+        self.shutdown()
+        self.server_close()
+        self.log.info("Server: Stopped.")
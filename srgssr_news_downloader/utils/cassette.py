@@ -0,0 +1,346 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.http_client import HTTPClient
+
+CASSETTE_VERSION = 1
+
+# Values of JSON responses that are not written to a cassette
+REDACTED_KEYS = ("access_token", "refresh_token")
+
+
+class CassetteResponse:
+    def __init__(self, status_code: int, headers: dict, url: str, body: bytes):
+        """A recorded response, with the interface of requests.Response used by the worker.
+
+        Args:
+            status_code (int): HTTP status code.
+            headers (dict): Response headers.
+            url (str): Requested URL.
+            body (bytes): Complete body.
+        """
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.url = url
+        self.content = body
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1):
+        for offset in range(0, len(self.content), chunk_size):
+            yield self.content[offset : offset + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+
+class Cassette:
+    def __init__(self, path: str):
+        """Recorded HTTP exchanges of a worker, stored as one JSON object per line.
+
+        The first line holds the Unix time the recording started, every other line one
+        exchange with its offset to the start: method, URL, status, response headers, body and
+        duration, or the error of a failed request. Text bodies are stored inline, media files
+        once per content in the folder "<path>.media". Tokens in JSON bodies are redacted and
+        request headers are not stored, a cassette contains no credentials.
+
+        Args:
+            path (str): Cassette file.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.path = path
+        self.media_dir = f"{path}.media"
+        self.start = None
+        self.interactions = []
+
+        self._index = {}  # (method, URL): ([offset, ...], [interaction, ...])
+        self._path_index = {}  # (method, host and path): ([offset, ...], [interaction, ...])
+        self._lock = threading.Lock()
+
+    def create(self, start: float) -> None:
+        """Start a new recording, an existing file is replaced.
+
+        Args:
+            start (float): Unix time of the start.
+        """
+        self.start = start
+        self.interactions = []
+        os.makedirs(self.media_dir, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"cassette": CASSETTE_VERSION, "start": start}) + "\n")
+
+    def load(self) -> None:
+        """Read a recording.
+
+        Raises:
+            KeyError: Raised if the file is no cassette.
+        """
+        with open(self.path, encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+                self.start = float(header["start"])
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                raise KeyError(f"Keine Aufzeichnung: {self.path}")
+            self.interactions = []
+            for line in f:
+                try:
+                    self.interactions.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Cut off when the recording was killed
+
+        self.interactions.sort(key=lambda interaction: interaction["offset"])
+        self._index = {}
+        self._path_index = {}
+        for interaction in self.interactions:
+            method, url = interaction["method"], interaction["url"]
+            for index, key in ((self._index, url), (self._path_index, _host_and_path(url))):
+                offsets, interactions = index.setdefault((method, key), ([], []))
+                offsets.append(interaction["offset"])
+                interactions.append(interaction)
+
+    @property
+    def duration(self) -> float:
+        """Seconds between the start and the last exchange."""
+        return self.interactions[-1]["offset"] if self.interactions else 0.0
+
+    def add(
+        self,
+        offset: float,
+        method: str,
+        url: str,
+        duration: float,
+        status: int | None = None,
+        headers: dict | None = None,
+        body: bytes = b"",
+        error: str = "",
+    ) -> dict:
+        """Append an exchange to the file.
+
+        Args:
+            offset (float): Seconds since the start when the request was sent.
+            method (str): HTTP method.
+            url (str): URL.
+            duration (float): Seconds until the body was received or the request failed.
+            status (int | None): HTTP status, None for a failed request. Default None.
+            headers (dict | None): Response headers. Default None.
+            body (bytes): Response body. Default b"".
+            error (str): Name of the exception of a failed request. Default "".
+
+        Returns:
+            dict: The stored exchange.
+        """
+        interaction = {
+            "offset": round(offset, 3),
+            "method": method,
+            "url": url,
+            "duration": round(duration, 4),
+        }
+        if error:
+            interaction["error"] = error
+        else:
+            interaction["status"] = status
+            interaction["headers"] = dict(headers or {})
+            content_type = CaseInsensitiveDict(interaction["headers"]).get("Content-Type", "")
+            if body and not content_type.startswith(("application/json", "text/")):
+                interaction["body_file"] = self._store_media(body)
+            else:
+                interaction["body"] = _redact(body.decode("utf-8", errors="replace"))
+
+        with self._lock:
+            self.interactions.append(interaction)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(interaction) + "\n")
+        return interaction
+
+    def find(self, method: str, url: str, offset: float, skip: int = 0) -> dict | None:
+        """Return the exchange a request would have got at a time of the recording.
+
+        The latest exchange of the same URL sent up to that time answers, the first one for
+        requests before it. Media URLs with another query string match on host and path.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL.
+            offset (float): Seconds since the start.
+            skip (int): Return the exchange this many places later, if there is one. Default 0.
+
+        Returns:
+            dict | None: The exchange or None if the URL was never requested.
+        """
+        candidates = self._index.get((method, url)) or self._path_index.get(
+            (method, _host_and_path(url))
+        )
+        if not candidates:
+            return None
+        offsets, interactions = candidates
+        position = max(bisect.bisect_right(offsets, offset) - 1, 0) + skip
+        return interactions[min(position, len(interactions) - 1)]
+
+    def response(self, interaction: dict) -> CassetteResponse:
+        """Build the response of a recorded exchange.
+
+        Args:
+            interaction (dict): Exchange of find().
+
+        Returns:
+            CassetteResponse: The response.
+        """
+        if "body_file" in interaction:
+            with open(os.path.join(self.media_dir, interaction["body_file"]), "rb") as f:
+                body = f.read()
+        else:
+            body = interaction.get("body", "").encode("utf-8")
+        return CassetteResponse(interaction["status"], interaction["headers"], interaction["url"], body)
+
+    def _store_media(self, body: bytes) -> str:
+        name = hashlib.sha256(body).hexdigest()
+        path = os.path.join(self.media_dir, name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(body)
+        return name
+
+
+def _host_and_path(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def _redact(body: str) -> str:
+    """Replace tokens in a JSON body, other bodies are returned unchanged."""
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError:
+        return body
+    if not isinstance(data, dict) or not any(key in data for key in REDACTED_KEYS):
+        return body
+    for key in REDACTED_KEYS:
+        if data.get(key):
+            data[key] = "redacted"
+    return json.dumps(data)
+
+
+class RecordingHTTPClient(HTTPClient):
+    def __init__(self, cassette: Cassette):
+        """HTTP client that writes every exchange to a cassette.
+
+        Requests are sent over HTTP/1.1. Streamed bodies are read completely before they are
+        handed to the worker, so the recorded duration includes the transfer.
+
+        Args:
+            cassette (Cassette): New cassette, see Cassette.create().
+        """
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, method: str, url: str, **kwargs) -> CassetteResponse:
+        offset = clock.time() - self.cassette.start
+        start = time.perf_counter()
+        try:
+            response = super().send(method, url, **kwargs)
+            body = response.content
+        except requests.exceptions.RequestException as ex:
+            self.cassette.add(offset, method, url, time.perf_counter() - start, error=type(ex).__name__)
+            raise
+        duration = time.perf_counter() - start
+        response.close()
+
+        headers = CaseInsensitiveDict(response.headers)
+        if headers.pop("Content-Encoding", None):
+            # The body is stored decoded
+            headers["Content-Length"] = str(len(body))
+        interaction = self.cassette.add(offset, method, url, duration, response.status_code, headers, body)
+        self.log.debug(f"Cassette: Recorded {method} {url} -> {response.status_code}")
+        return CassetteResponse(response.status_code, interaction["headers"], url, body)
+
+
+# Exceptions raised again for recorded failures, by name
+REPLAYED_ERRORS = {
+    "ConnectTimeout": requests.exceptions.ConnectTimeout,
+    "ReadTimeout": requests.exceptions.ReadTimeout,
+    "Timeout": requests.exceptions.Timeout,
+    "ConnectionError": requests.exceptions.ConnectionError,
+}
+
+
+class ReplayHTTPClient(HTTPClient):
+    def __init__(self, cassette: Cassette):
+        """HTTP client that answers from a cassette instead of the network.
+
+        The time of the recording is the time of the current clock since the cassette start,
+        so a replay under a VirtualClock started at Cassette.start sees the API as it was.
+        The recorded duration of an exchange passes on the clock. A recorded 401 is answered
+        until the worker requested a new token (a POST), later requests get the exchange
+        recorded after it. Every answered request is kept in `requests` for the report.
+
+        Args:
+            cassette (Cassette): Loaded cassette, see Cassette.load().
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.requests = []  # {offset, method, url, status, error, duration, media, matched}
+        self.first_seen = {}  # Episode date: offset of the first podcasts response listing it
+
+        self._rejected = {}  # id() of an answered 401: offset it was answered first
+        self._token_requested = None  # Offset of the last POST
+
+    def send(self, method: str, url: str, **kwargs) -> CassetteResponse:
+        offset = clock.time() - self.cassette.start
+        interaction = self.cassette.find(method, url, offset)
+        if interaction is not None and interaction.get("status") == 401:
+            rejected = self._rejected.setdefault(id(interaction), offset)
+            if self._token_requested is not None and self._token_requested > rejected:
+                interaction = self.cassette.find(method, url, offset, skip=1)
+        if method == "POST":
+            self._token_requested = offset
+        entry = {"offset": offset, "method": method, "url": url, "matched": interaction is not None}
+        self.requests.append(entry)
+
+        if interaction is None:
+            self.log.warning(f"Cassette: No recorded response for {method} {url}")
+            entry.update(status=404, duration=0.0, media=False)
+            return CassetteResponse(404, {"Content-Length": "0"}, url, b"")
+
+        entry.update(
+            status=interaction.get("status"),
+            error=interaction.get("error", ""),
+            duration=interaction["duration"],
+            media="body_file" in interaction,
+        )
+        clock.sleep(interaction["duration"])
+        if "error" in interaction:
+            raise REPLAYED_ERRORS.get(interaction["error"], requests.exceptions.RequestException)(
+                f"Replayed {interaction['error']}"
+            )
+
+        response = self.cassette.response(interaction)
+        if interaction["status"] == 200 and "body" in interaction:
+            self._remember_episodes(response, offset)
+        return response
+
+    def _remember_episodes(self, response: CassetteResponse, offset: float) -> None:
+        try:
+            podcasts = response.json().get("podcasts")
+        except (ValueError, AttributeError):
+            return
+        if podcasts and isinstance(podcasts, list) and "date" in podcasts[0]:
+            self.first_seen.setdefault(podcasts[0]["date"], offset)
+
+    def prewarm(self, url: str, timeout: float = 5) -> bool:
+        return True
@@ -0,0 +1,109 @@
+import threading
+import time
+from datetime import date, datetime
+
+
+class SystemClock:
+    """Time of the operating system."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def now(self, tz=None) -> datetime:
+        return datetime.now(tz)
+
+    def today(self) -> date:
+        return self.now().date()
+
+
+class VirtualClock(SystemClock):
+    def __init__(self, start: float):
+        """Clock that only moves when someone sleeps, a day of polling passes in seconds.
+
+        Args:
+            start (float): Unix time the clock starts at.
+        """
+        self._time = start
+        self._monotonic = 0.0
+        self._timers = []  # (unix time, callback)
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._time
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def now(self, tz=None) -> datetime:
+        return datetime.fromtimestamp(self._time, tz)
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward and run the callbacks that became due.
+
+        Args:
+            seconds (float): Seconds to move, negative values are ignored.
+        """
+        with self._lock:
+            seconds = max(seconds, 0)
+            self._time += seconds
+            self._monotonic += seconds
+            due = [timer for timer in self._timers if timer[0] <= self._time]
+            self._timers = [timer for timer in self._timers if timer[0] > self._time]
+        for _, callback in sorted(due, key=lambda timer: timer[0]):
+            callback()
+
+    def call_at(self, timestamp: float, callback) -> None:
+        """Run a callback once the clock reaches a Unix time.
+
+        Args:
+            timestamp (float): Unix time.
+            callback: Function without arguments.
+        """
+        with self._lock:
+            self._timers.append((timestamp, callback))
+
+
+class _CurrentClock:
+    def __init__(self):
+        """The clock used by the worker and its helpers, the system clock unless replaced."""
+        self.source = SystemClock()
+
+    def use(self, source: SystemClock) -> SystemClock:
+        """Replace the clock of the whole process, f.ex. with a VirtualClock for a replay.
+
+        Args:
+            source (SystemClock): New clock.
+
+        Returns:
+            SystemClock: The previous clock.
+        """
+        previous, self.source = self.source, source
+        return previous
+
+    def time(self) -> float:
+        return self.source.time()
+
+    def monotonic(self) -> float:
+        return self.source.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        self.source.sleep(seconds)
+
+    def now(self, tz=None) -> datetime:
+        return self.source.now(tz)
+
+    def today(self) -> date:
+        return self.source.today()
+
+
+# Process wide clock, like the shaper and the metrics registry
+clock = _CurrentClock()
@@ -0,0 +1,116 @@
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.metrics import metrics
+
+
+class ClockSkewEstimator:
+    def __init__(self, max_samples: int = 64, max_age: float = 6 * 3600, log_change: float = 1.0):
+        """Offset between the clock of each server and the local clock, from the HTTP Date headers.
+
+        A Date header has a resolution of one second and is set somewhere between sending the
+        request and receiving the response headers. Each response therefore bounds the offset
+        to [date - received, date + 1 - sent]. The bounds of the recent responses are
+        intersected, newest first, which narrows the estimate well below a second after some
+        dozen requests. An older response that does not fit the newer ones ends the
+        intersection, so a local clock that was set or drifted is followed at once.
+
+        Args:
+            max_samples (int): Responses kept per host. Default 64.
+            max_age (float): Seconds a response is used. Default 6 hours.
+            log_change (float): Seconds the offset has to change for a new log line. Default 1.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.max_samples = max_samples
+        self.max_age = max_age
+        self.log_change = log_change
+
+        self._samples = {}  # host: deque of (sent, low, high)
+        self._logged = {}  # host: last logged offset
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        """Return the host part of an URL, used as key."""
+        return urlsplit(url).netloc
+
+    def observe(self, url: str, headers, sent: float, received: float) -> None:
+        """Add the Date header of a response.
+
+        Responses from a cache (with an Age header) are ignored, their date is the one of the origin.
+
+        Args:
+            url (str): Requested URL.
+            headers: Response headers.
+            sent (float): Unix time before the request was sent.
+            received (float): Unix time after the response headers were received.
+        """
+        date = headers.get("Date")
+        if not date or "Age" in headers or received < sent:
+            return
+        try:
+            server_time = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return
+
+        host = self.host(url)
+        with self._lock:
+            samples = self._samples.setdefault(host, deque(maxlen=self.max_samples))
+            samples.append((sent, server_time - received, server_time + 1 - sent))
+            estimate = self._estimate(samples, received)
+            logged = self._logged.get(host)
+            changed = logged is None or abs(estimate[0] - logged) >= self.log_change
+            if changed:
+                self._logged[host] = estimate[0]
+
+        offset, uncertainty, used = estimate
+        metrics.set("clock_offset_seconds", round(offset, 3), host=host)
+        metrics.set("clock_offset_uncertainty_seconds", round(uncertainty, 3), host=host)
+        if changed:
+            self.log.info(
+                f"Clock: Server {host} is {offset:+.2f}s (±{uncertainty:.2f}s) from the local clock, "
+                f"{used} responses"
+            )
+
+    def _estimate(self, samples: deque, now: float) -> tuple[float, float, int]:
+        while samples and now - samples[0][0] > self.max_age:
+            samples.popleft()
+        low, high = float("-inf"), float("inf")
+        used = 0
+        for _, sample_low, sample_high in reversed(samples):
+            if sample_low > high or sample_high < low:
+                break
+            low, high = max(low, sample_low), min(high, sample_high)
+            used += 1
+        return (low + high) / 2, (high - low) / 2, used
+
+    def estimate(self, url: str) -> tuple[float, float] | None:
+        """Return the offset of the host of an URL.
+
+        Args:
+            url (str): URL on the host.
+
+        Returns:
+            tuple[float, float] | None: Seconds the server clock is ahead of the local clock and
+                the uncertainty in seconds, None if no response had a Date header yet.
+        """
+        with self._lock:
+            samples = self._samples.get(self.host(url))
+            if not samples:
+                return None
+            offset, uncertainty, _ = self._estimate(samples, clock.time())
+            return (offset, uncertainty) if samples else None
+
+    def offset(self, url: str) -> float | None:
+        """Return the seconds the clock of the host of an URL is ahead, None if unknown."""
+        estimate = self.estimate(url)
+        return None if estimate is None else estimate[0]
+
+
+# Process wide, all HTTP clients add their responses
+clock_skew = ClockSkewEstimator()
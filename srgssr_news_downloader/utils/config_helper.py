@@ -15,6 +15,137 @@ default_config: dict[str, dict[str, str]] = {
     "audio_file": {"filename": "{bu}_news", "filepath": ""},
 }
 
+# Settings with a working default. Missing keys are filled in on load, so they are not part of the validation.
+optional_config: dict[str, dict[str, str]] = {
+    "api": {
+        "revalidate_window": "1800",  # In seconds after episode date, 0 to disable
+    },
+    "http": {
+        "version": "1.1",  # Can be 1.1 / 2, HTTP/2 needs httpx[http2]
+        "clock_correction": "yes",  # Correct the publish lag by the clock offset measured from Date headers
+    },
+    "ratelimit": {
+        "requests_per_minute": "30",  # Requests to the API per credential
+        "burst": "5",  # Requests allowed at once
+        "daily_quota": "0",  # Requests per day of the API plan, 0 if unknown
+        "state_file": "",  # Optional file to share the daily count between instances
+    },
+    "retry": {
+        "failure_threshold": "5",  # Failures in a row until a server is paused
+        "reset_timeout": "60",  # In seconds until a paused server is tried again
+    },
+    "download": {
+        "max_rate_kbps": "0",  # Bandwidth limit in KiB/s, 0 is unlimited
+        "airtime_minutes": "",  # F.ex. "0,30", limit only around these minutes. Empty is always
+        "burst_until": "120",  # Seconds before airtime when the limit starts
+        "cap_duration": "600",  # Seconds after airtime when the limit ends
+        "max_concurrent": "0",  # Downloads at the same time in this process, 0 is unlimited
+        "max_download_seconds": "0",  # Use the smaller file if HD would take longer, 0 is off
+        "deadline_margin": "30",  # Seconds before airtime the file has to be ready
+        "progress_updates": "4",  # Progress reports per second to the window during a download
+    },
+    "prewarm": {
+        "lead_time": "30",  # Seconds before the expected publication to open connections, 0 is off
+        "window": "600",  # Seconds after the expected publication to keep connections open
+        "publish_interval": "3600",  # Seconds between two bulletins, used without airtime_minutes
+        "dns_ttl": "300",  # Seconds a DNS result is cached, 0 is off
+    },
+    "publish": {
+        "mode": "rename",  # Can be rename / symlink
+        "version_folder": "versions",  # Relative to audio_file filepath
+        "version_filename": "{bu}_news_{date}",  # {date} is the episode date as YYYYmmdd_HHMMSS
+        "keep_versions": "24",  # Minimum number of versions kept
+        "gc_grace_period": "300",  # In seconds
+        "history_filename": "download_history.jsonl",  # Inside the version folder
+    },
+    "server": {
+        "enabled": "no",  # Serve the latest file over HTTP
+        "host": "127.0.0.1",  # 0.0.0.0 for all network interfaces
+        "port": "8080",
+    },
+    "ha": {
+        "enabled": "no",  # Active/standby with other instances, only the leader polls
+        "mode": "file",  # Can be file / port
+        "lease_file": "",  # Empty is .news_downloader.lease in the audio_file filepath
+        "lease_duration": "30",  # Seconds until a standby takes over
+        "node_id": "",  # Empty is hostname and process id
+        "host": "127.0.0.1",  # Coordination port for mode port
+        "port": "47800",
+    },
+    "pool": {
+        "processes": "0",  # Worker processes of the headless mode, 0 is one per CPU
+        "restart_delay": "5",  # Seconds before a crashed worker process is restarted, doubles
+        "metrics_host": "127.0.0.1",
+        "metrics_port": "0",  # Metrics of all worker processes, 0 is off
+    },
+    "health": {
+        "host": "127.0.0.1",
+        "port": "0",  # HTTP health endpoint (/health, /health/live, /health/ready), 0 is off
+        "unix_socket": "",  # Path of a Unix socket with the same endpoint, empty is off
+        "stall_timeout": "300",  # Seconds without a loop iteration until a worker counts as stalled
+        "max_poll_age": "900",  # Seconds since the last successful poll until a worker is not ready
+    },
+    "performance": {
+        "history_days": "7",  # Days of cycle measurements kept in memory for the performance window
+    },
+    "tracing": {
+        "enabled": "no",  # Write the stage timings of every cycle
+        "file": "traces.jsonl",  # JSON lines, summary with python -m srgssr_news_downloader.trace_summary
+        "max_size_mb": "10",  # Rotated to <file>.1 above this size
+    },
+    "profiling": {
+        "mode": "cprofile",  # Can be cprofile / sampling, only used when started with --PROFILE
+        "folder": "profiles",  # Dumps of CPU and memory statistics
+        "dump_interval": "300",  # Seconds between two dumps
+        "sample_interval_ms": "10",  # Milliseconds between two samples of mode sampling
+        "memory_interval": "300",  # Seconds between two memory snapshots, 0 is off
+        "top": "30",  # Functions and lines in the summaries
+        "keep": "20",  # Dumps kept per kind
+    },
+    "notify": {
+        "webhook_url": "",  # POST JSON to this URL
+        "unix_socket": "",  # Path of a Unix socket, connected clients receive one JSON line
+        "command": "",  # Command line, gets JSON on stdin and NEWS_* environment variables
+        "retries": "3",
+        "timeout": "10",  # In seconds
+    },
+    "pipeline": {
+        "stages": "",  # Comma separated, f.ex. "id3, duration", or package.module:Class. Empty is off
+        "optional": "",  # Stages whose failure does not stop the publication
+        "processes": "1",  # Processes that run the stages, per profile
+        "timeout": "60",  # Seconds all stages of a file may take
+        "cache_folder": "pipeline_cache",  # Stage results by content hash, empty is off
+        "cache_entries": "200",  # Results kept in the cache
+        "cache_size_mb": "500",  # Size of the cache on disk, copies of tagged files included
+        "id3_title": "{bu} News {date}",  # {bu}, {date}, {id} and {title} of the episode
+        "id3_artist": "SRG SSR",
+        "id3_album": "{bu} News",
+        "id3_genre": "News",
+    },
+    "archive": {
+        "backend": "",  # Can be local / s3, empty is off
+        "key": "{bu}/{file}.mp3",  # Name in the archive, {file} is the version filename, {bu} and {date}
+        "folder": "",  # Archive folder of backend local, f.ex. a NAS share
+        "endpoint": "",  # Backend s3, f.ex. https://s3.eu-central-1.amazonaws.com or http://127.0.0.1:9000
+        "bucket": "",
+        "region": "us-east-1",
+        "access_key": "",
+        "secret_key": "",
+        "part_size_mb": "8",  # Size of the parts of a multipart upload, at least 5
+        "queue_parts": "2",  # Parts waiting for their upload, bounds the memory
+        "timeout": "30",  # In seconds per request
+    },
+    "validation": {
+        "enabled": "yes",  # Reject downloads that are no complete MP3 file
+        "min_duration": "10",  # In seconds
+        "max_junk_bytes": "4096",  # Invalid bytes tolerated between frames
+    },
+}
+
+
+# Sections of profiles, f.ex. [profile:radio_a], override settings with keys like "auth.client_id"
+PROFILE_PREFIX = "profile:"
+
 
 class ConfigHelper:
     def __init__(self, filename: str = "config.ini"):
@@ -40,6 +171,8 @@ class ConfigHelper:
         if not os.path.exists(self.filename):
             raise FileNotFoundError(f"Configuration file '{self.filename}' not found.")
 
+        # Defaults first, so older config files without the optional sections keep working
+        self._config.read_dict(optional_config)
         self._config.read(self.filename)
 
     def create_config(self) -> None:
@@ -51,6 +184,7 @@ class ConfigHelper:
         """
         # Read default values into config object and write new config file
         self._config.read_dict(default_config)
+        self._config.read_dict(optional_config)
         with open(self.filename, "w") as f:
             self._config.write(f)
 
@@ -80,18 +214,85 @@ class ConfigHelper:
                 f"Key '{key}' not found in section '{section}' in configuration"
             )
 
-    def set_value(self, section: str, key: str, value: str) -> None:
+    def get_bool(self, section: str, key: str) -> bool:
+        """
+        Get a yes/no value from the config object.
+
+        Args:
+            section (str): The configuration section (f.ex. "validation")
+            key (str): The key in the section (f.ex. "enabled")
+
+        Returns:
+            bool: True for "yes", "true", "on" and "1".
+
+        Raises:
+            KeyError: If section or key do not exist.
+            ValueError: If the value is no boolean.
+        """
+        value = self.get_value(section, key)
+        try:
+            return self._config.BOOLEAN_STATES[value.lower()]
+        except KeyError:
+            raise ValueError(
+                f"Key '{key}' in section '{section}' is not a boolean: '{value}'"
+            )
+
+    def get_section(self, section: str) -> dict[str, str]:
+        """Get all keys of a section, f.ex. the options of own pipeline stages.
+
+        Args:
+            section (str): The configuration section (f.ex. "pipeline")
+
+        Returns:
+            dict[str, str]: Keys and values, empty if the section does not exist.
+        """
+        if section not in self._config:
+            return {}
+        return dict(self._config[section])
+
+    def profiles(self) -> list[str]:
+        """Names of the [profile:NAME] sections, in the order of the file.
+
+        Returns:
+            list[str]: Profile names, empty if the file has no profiles.
+        """
+        return [
+            section[len(PROFILE_PREFIX) :]
+            for section in self._config.sections()
+            if section.startswith(PROFILE_PREFIX)
+        ]
+
+    def profile(self, name: str) -> "ProfileConfig":
+        """Return the settings of a profile.
+
+        Args:
+            name (str): Profile name.
+
+        Raises:
+            KeyError: If the profile does not exist.
+
+        Returns:
+            ProfileConfig: Settings of the profile.
+        """
+        if f"{PROFILE_PREFIX}{name}" not in self._config:
+            raise KeyError(f"Profile '{name}' not found in configuration")
+        return ProfileConfig(self, name)
+
+    def set_value(self, section: str, key: str, value: str, save: bool = True) -> None:
         """Set a value in the configuration and save it in the config file.
 
         Args:
             section (str): The configuration section (f.ex. "auth")
             key (str): The key in the section (f.ex. "auth_url")
             value (str): The value to set.
+            save (bool): Write the config file, False only changes the loaded values. Default True.
         """
         if section not in self._config:
             self._config[section] = {}
         self._config[section][key] = value
 
+        if not save:
+            return
         # Overwrite config file
         with open(self.filename, "w") as f:
             self._config.write(f)
@@ -114,3 +315,77 @@ class ConfigHelper:
                     raise KeyError(f"Missing key '{key}' in '{self.filename}'.")
 
         return True
+
+
+class ProfileConfig:
+    def __init__(self, config_helper: ConfigHelper, name: str):
+        """Settings of one profile, with the same getters as ConfigHelper.
+
+        Keys of the profile section are written as "section.key" and override the value of the
+        shared section. All other values come from the shared sections.
+
+        Args:
+            config_helper (ConfigHelper): Loaded configuration.
+            name (str): Profile name.
+        """
+        self.config_helper = config_helper
+        self.name = name
+        self.section = f"{PROFILE_PREFIX}{name}"
+
+    def get_value(self, section: str, key: str) -> str:
+        """
+        Get a value of the profile, or of the shared section if the profile does not set it.
+
+        Args:
+            section (str): The configuration section (f.ex. "auth")
+            key (str): The key in the section (f.ex. "client_id")
+
+        Returns:
+            str: Value of the section-key combination
+
+        Raises:
+            KeyError: If section or key do not exist.
+        """
+        try:
+            return self.config_helper.get_value(self.section, f"{section}.{key}")
+        except KeyError:
+            return self.config_helper.get_value(section, key)
+
+    def get_section(self, section: str) -> dict[str, str]:
+        """Get all keys of a section, with the values of the profile where it sets them.
+
+        Args:
+            section (str): The configuration section (f.ex. "pipeline")
+
+        Returns:
+            dict[str, str]: Keys and values, empty if the section does not exist.
+        """
+        values = self.config_helper.get_section(section)
+        prefix = f"{section}."
+        for key, value in self.config_helper.get_section(self.section).items():
+            if key.startswith(prefix):
+                values[key[len(prefix) :]] = value
+        return values
+
+    def get_bool(self, section: str, key: str) -> bool:
+        """
+        Get a yes/no value of the profile.
+
+        Args:
+            section (str): The configuration section (f.ex. "validation")
+            key (str): The key in the section (f.ex. "enabled")
+
+        Returns:
+            bool: True for "yes", "true", "on" and "1".
+
+        Raises:
+            KeyError: If section or key do not exist.
+            ValueError: If the value is no boolean.
+        """
+        value = self.get_value(section, key)
+        try:
+            return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+        except KeyError:
+            raise ValueError(
+                f"Key '{key}' in section '{section}' of profile '{self.name}' is not a boolean: '{value}'"
+            )
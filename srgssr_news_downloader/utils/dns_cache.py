@@ -0,0 +1,127 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+
+from urllib3.util import connection
+
+from srgssr_news_downloader.utils.metrics import metrics
+from srgssr_news_downloader.utils.tracing import tracer
+
+
+class DNSCache:
+    def __init__(self, ttl: float = 300):
+        """Process wide cache for host name resolutions of all HTTP connections.
+
+        The resolver of the standard library does not report the TTL of a record,
+        so all entries live for the configured time. If a resolution fails, an expired
+        entry is used rather than failing the download.
+
+        Args:
+            ttl (float): Seconds an entry is valid, 0 disables the cache. Default 300.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.ttl = ttl
+        self._entries = {}  # (host, port): (expires, addresses)
+        self._lock = threading.Lock()
+        self._original_create_connection = None
+        self._users = 0
+
+    def install(self) -> None:
+        """Route the connections of urllib3 (and requests) through the cache. Undo with uninstall()."""
+        with self._lock:
+            self._users += 1
+            if self._original_create_connection is not None:
+                return
+            self._original_create_connection = connection.create_connection
+            connection.create_connection = self.create_connection
+
+    def uninstall(self) -> None:
+        """Give the connections back to urllib3 once every install() was undone."""
+        with self._lock:
+            self._users = max(self._users - 1, 0)
+            if self._users or self._original_create_connection is None:
+                return
+            connection.create_connection = self._original_create_connection
+            self._original_create_connection = None
+
+    def resolve(self, host: str, port: int, refresh: bool = False) -> list[str]:
+        """Resolve a host name.
+
+        Args:
+            host (str): Host name.
+            port (int): Port.
+            refresh (bool): Ignore a valid entry and resolve again. Default False.
+
+        Raises:
+            socket.gaierror: Raised if the name can not be resolved and no entry is cached.
+
+        Returns:
+            list[str]: IP addresses in the order of the resolver.
+        """
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and not refresh and entry[0] > time.monotonic():
+            metrics.inc("dns_cache_total", result="hit")
+            return entry[1]
+
+        with tracer.span("dns", host=host) as span:
+            try:
+                infos = socket.getaddrinfo(
+                    host, port, connection.allowed_gai_family(), socket.SOCK_STREAM
+                )
+            except socket.gaierror as ex:
+                if entry is None:
+                    raise
+                self.log.warning(f"DNS: Resolving {host} failed, using expired entry: {repr(ex)}")
+                metrics.inc("dns_cache_total", result="stale")
+                span.set(stale=True)
+                return entry[1]
+
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if self.ttl:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        metrics.inc("dns_cache_total", result="miss")
+        return addresses
+
+    def invalidate(self, host: str, port: int) -> None:
+        """Remove the entry of a host."""
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def create_connection(
+        self,
+        address: tuple[str, int],
+        timeout=connection._DEFAULT_TIMEOUT,
+        source_address: tuple[str, int] | None = None,
+        socket_options=None,
+    ) -> socket.socket:
+        """Replacement of urllib3.util.connection.create_connection that uses the cache."""
+        host, port = address
+        create = self._original_create_connection or connection.create_connection
+        try:
+            ipaddress.ip_address(host.strip("[]"))
+            is_ip = True
+        except ValueError:
+            is_ip = False
+        if not self.ttl or is_ip:
+            return create(address, timeout, source_address, socket_options)
+
+        last_error = None
+        for ip in self.resolve(host, port):
+            try:
+                return create((ip, port), timeout, source_address, socket_options)
+            except OSError as ex:
+                last_error = ex
+
+        # None of the cached addresses works, the next attempt resolves again
+        self.invalidate(host, port)
+        raise last_error
+
+
+# Process wide cache, shared by all workers
+dns_cache = DNSCache()
@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import threading
+
+from srgssr_news_downloader.utils.clock import clock
+
+
+class DownloadHistory:
+    def __init__(self, filename: str, max_entries: int = 1000):
+        """Append-only history of downloads, stored as one JSON object per line.
+
+        Args:
+            filename (str): Path of the history file.
+            max_entries (int): Entries kept when the file is compacted. Default 1000.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.filename = filename
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = None  # Loaded on first access
+
+    def append(self, event: str, **fields) -> dict:
+        """Add an entry to the history and write it to the file.
+
+        Args:
+            event (str): Kind of entry, f.ex. "published", "dedup" or "rejected".
+            **fields: Additional values, must be JSON serializable.
+
+        Returns:
+            dict: The written entry.
+        """
+        entry = {"time": clock.now().astimezone().isoformat(), "event": event}
+        entry.update(fields)
+
+        with self._lock:
+            entries = self._load()
+            entries.append(entry)
+
+            try:
+                if len(entries) > 2 * self.max_entries:
+                    del entries[: -self.max_entries]
+                    self._rewrite(entries)
+                else:
+                    with open(self.filename, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+            except OSError as ex:
+                self.log.warning(f"History: Could not write {self.filename}: {repr(ex)}")
+
+        return entry
+
+    def last(self, event: str | None = None) -> dict | None:
+        """Return the newest entry, optionally only of one kind.
+
+        Args:
+            event (str | None): Only consider entries of this kind. Default None.
+
+        Returns:
+            dict | None: The entry or None if there is none.
+        """
+        with self._lock:
+            for entry in reversed(self._load()):
+                if event is None or entry.get("event") == event:
+                    return entry
+        return None
+
+    def entries(self) -> list[dict]:
+        """Return a copy of all entries, oldest first."""
+        with self._lock:
+            return list(self._load())
+
+    def reload(self) -> None:
+        """Drop the cached entries, f.ex. when another process wrote the file."""
+        with self._lock:
+            self._entries = None
+
+    def _load(self) -> list[dict]:
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = []
+        if not os.path.exists(self.filename):
+            return self._entries
+
+        with open(self.filename, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut off by a crash, skip it
+                    continue
+        return self._entries
+
+    def _rewrite(self, entries: list[dict]) -> None:
+        temp_filename = f"{self.filename}.tmp"
+        with open(temp_filename, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(temp_filename, self.filename)
@@ -0,0 +1,72 @@
+import os
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+
+
+@contextmanager
+def exclusive_file_lock(lock_file: str, timeout: float = 5, stale_after: float = 30):
+    """Hold a lock file, so instances on other machines sharing the folder wait for each other.
+
+    The lock file is created exclusively (O_EXCL), which also works on network shares. It holds
+    a token unique to this holder. A waiter removes the lock when the same token was in the file
+    for `stale_after` seconds of its own monotonic clock, so neither the clocks of the machines
+    nor the modification times of the share need to agree.
+
+    Args:
+        lock_file (str): Path of the lock file.
+        timeout (float): Seconds to wait for the lock. Default 5.
+        stale_after (float): A lock held this long is left over from a crashed instance
+            and gets removed. Default 30.
+
+    Raises:
+        TimeoutError: Raised if the lock is not released in time.
+    """
+    token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+    deadline = time.monotonic() + timeout
+    observed = None  # Token of the holder
+    observed_at = 0.0  # Monotonic time when the token was seen first
+    while True:
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(token)
+            break
+        except FileExistsError:
+            holder = _read_token(lock_file)
+            now = time.monotonic()
+            if holder is None:  # Released meanwhile
+                continue
+            if holder != observed:
+                observed, observed_at = holder, now
+            elif now - observed_at > stale_after:
+                # Lock of a crashed instance
+                _remove_if_held_by(lock_file, holder)
+                continue
+            if now > deadline:
+                raise TimeoutError(f"Lock '{lock_file}' not released.")
+            time.sleep(0.05)
+
+    try:
+        yield
+    finally:
+        # A lock that was taken over as stale belongs to another instance now
+        _remove_if_held_by(lock_file, token)
+
+
+def _read_token(lock_file: str) -> str | None:
+    try:
+        with open(lock_file, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _remove_if_held_by(lock_file: str, token: str) -> None:
+    if _read_token(lock_file) != token:
+        return
+    try:
+        os.remove(lock_file)
+    except FileNotFoundError:
+        pass
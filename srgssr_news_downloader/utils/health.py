@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.retry_policy import classify
+
+
+class WorkerHealth:
+    def __init__(self, profile: str = "", stall_timeout: float = 300, max_poll_age: float = 900):
+        """Liveness and readiness of one API worker.
+
+        The worker loop beats about once per second. A worker is live while it beats and has
+        neither stopped nor failed. It is ready while it is live and its last successful poll
+        of the API is recent, or while it is the standby of an HA setup.
+
+        Args:
+            profile (str): Profile name, "" without profiles. Default "".
+            stall_timeout (float): Seconds without a beat until the worker counts as stalled. Default 300.
+            max_poll_age (float): Seconds since the last successful poll until it is not ready. Default 900.
+        """
+        self.profile = profile
+        self.stall_timeout = stall_timeout
+        self.max_poll_age = max_poll_age
+
+        self.state = "starting"  # starting / running / standby / stopped / failed
+        self.started = clock.time()
+        self.last_beat = clock.time()
+        self.last_poll = None  # Time of the last successful poll
+        self.last_download = None  # Time of the last published or identical download
+        self.last_episode = ""  # Episode date of the last download
+        self.error = None  # {class, stage, text, since} of the current error
+        self.failures = 0  # Failures in a row
+        self._lock = threading.Lock()
+
+    def beat(self) -> None:
+        """Called by the worker loop, shows that the thread still runs."""
+        self.last_beat = clock.time()
+
+    def running(self, standby: bool = False) -> None:
+        """The configuration test passed, or the HA role changed.
+
+        Args:
+            standby (bool): True while another instance is the leader. Default False.
+        """
+        with self._lock:
+            self.state = "standby" if standby else "running"
+            self.last_beat = clock.time()
+
+    def success(self, stage: str, episode: str = "") -> None:
+        """A stage of the cycle succeeded, its error is cleared.
+
+        Args:
+            stage (str): "oauth", "api" or "media".
+            episode (str): Episode date of a download. Default "".
+        """
+        now = clock.time()
+        with self._lock:
+            if stage == "api":
+                self.last_poll = now
+            elif stage == "media":
+                self.last_download = now
+                self.last_episode = episode or self.last_episode
+            # A successful poll also proves the token
+            if self.error and (self.error["stage"] == stage or (stage == "api" and self.error["stage"] == "oauth")):
+                self.error = None
+                self.failures = 0
+
+    def failure(self, stage: str, error: Exception | str, text: str = "") -> None:
+        """A stage of the cycle failed.
+
+        Args:
+            stage (str): "config", "oauth", "api" or "media".
+            error (Exception | str): The raised exception or an error class like "no_data".
+            text (str): Description, the exception by default. Default "".
+        """
+        error_class = error if isinstance(error, str) else classify(error)
+        text = text or (error if isinstance(error, str) else repr(error))
+        with self._lock:
+            if self.error is None or self.error["class"] != error_class or self.error["stage"] != stage:
+                self.error = {"class": error_class, "stage": stage, "text": text, "since": _iso(clock.time())}
+            self.failures += 1
+
+    def stopped(self, failed: bool) -> None:
+        """The worker loop ended.
+
+        Args:
+            failed (bool): True if it ended on its own, f.ex. after wrong credentials.
+        """
+        with self._lock:
+            self.state = "failed" if failed else "stopped"
+
+    def snapshot(self) -> dict:
+        """Return the health as JSON serializable dict, ages in seconds."""
+        now = clock.time()
+        with self._lock:
+            beat_age = now - self.last_beat
+            poll_age = None if self.last_poll is None else now - self.last_poll
+            stalled = self.state in ("starting", "running", "standby") and beat_age > self.stall_timeout
+            live = self.state in ("starting", "running", "standby") and not stalled
+            ready = live and (
+                self.state == "standby" or (poll_age is not None and poll_age <= self.max_poll_age)
+            )
+            return {
+                "state": "stalled" if stalled else self.state,
+                "live": live,
+                "ready": ready,
+                "uptime": round(now - self.started, 1),
+                "beat_age": round(beat_age, 1),
+                "last_poll": _iso(self.last_poll),
+                "poll_age": None if poll_age is None else round(poll_age, 1),
+                "last_download": _iso(self.last_download),
+                "last_episode": self.last_episode,
+                "error": dict(self.error) if self.error else None,
+                "failures": self.failures,
+            }
+
+
+def _iso(timestamp: float | None) -> str | None:
+    return None if timestamp is None else datetime.fromtimestamp(timestamp).astimezone().isoformat(timespec="seconds")
+
+
+def summarize(profiles: dict) -> dict:
+    """Combine the snapshots of the workers into the report of the process.
+
+    Args:
+        profiles (dict): {profile: WorkerHealth.snapshot()}.
+
+    Returns:
+        dict: {status: "ok" / "degraded" / "failed", live, ready, time, profiles}. Without workers
+            the process is live but not ready.
+    """
+    live = all(p["live"] for p in profiles.values())
+    ready = bool(profiles) and all(p["ready"] for p in profiles.values())
+    return {
+        "status": "ok" if ready else "degraded" if live else "failed",
+        "live": live,
+        "ready": ready,
+        "time": _iso(clock.time()),
+        "profiles": {name or "default": snapshot for name, snapshot in profiles.items()},
+    }
+
+
+class HealthRegistry:
+    def __init__(self):
+        """Health of the API workers of this process."""
+        self._workers = {}  # profile: WorkerHealth
+        self._lock = threading.Lock()
+
+    def register(self, profile: str = "") -> WorkerHealth:
+        """Add the health of a new worker, replaces the one of a previous worker of the profile.
+
+        Args:
+            profile (str): Profile name. Default "".
+
+        Returns:
+            WorkerHealth: Health to update by the worker.
+        """
+        worker_health = WorkerHealth(profile)
+        with self._lock:
+            self._workers[profile] = worker_health
+        return worker_health
+
+    def unregister(self, worker_health: WorkerHealth) -> None:
+        """Remove the health of a stopped worker, unless a new worker of the profile registered."""
+        with self._lock:
+            if self._workers.get(worker_health.profile) is worker_health:
+                del self._workers[worker_health.profile]
+
+    def snapshot(self) -> dict:
+        """Return {profile: WorkerHealth.snapshot()}."""
+        with self._lock:
+            workers = dict(self._workers)
+        return {profile: worker_health.snapshot() for profile, worker_health in workers.items()}
+
+    def report(self) -> dict:
+        """Return the report of the process, see summarize()."""
+        return summarize(self.snapshot())
+
+
+class _HealthRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SRGSSRNewsDownloader"
+
+    def log_message(self, format, *args):
+        pass  # Polled every few seconds, not worth a log line
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body: bool):
+        path = self.path.split("?")[0].rstrip("/")
+        if path not in ("/health", "/health/live", "/health/ready"):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        report = self.server.report()
+        if path == "/health":
+            healthy, data = report["live"], report
+        else:
+            key = path.rpartition("/")[2]
+            healthy, data = report[key], {key: report[key], "status": report["status"]}
+
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(HTTPStatus.OK if healthy else HTTPStatus.SERVICE_UNAVAILABLE)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class _TCPHealthServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class _UnixHealthServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class HealthServer:
+    def __init__(self, report, host: str = "127.0.0.1", port: int = 0, unix_socket: str = ""):
+        """Answer health checks of supervisors and load balancers over HTTP.
+
+        Routes:
+            /health: Full report, 200 while all workers are live, else 503
+            /health/live: 200 while all workers are live, else 503
+            /health/ready: 200 while all workers are ready, else 503
+
+        Args:
+            report: Function without arguments that returns the report, see summarize().
+            host (str): Address of the TCP listener. Default "127.0.0.1".
+            port (int): Port of the TCP listener, 0 is off. Default 0.
+            unix_socket (str): Path of a Unix socket listener, "" is off. Default "".
+
+        Raises:
+            KeyError: Raised if a listener can not be opened.
+        """
+        self.log = logging.getLogger("news_downloader")
+        self.unix_socket = unix_socket
+        self._servers = []
+
+        try:
+            if port:
+                self._servers.append(_TCPHealthServer((host, port), _HealthRequestHandler))
+            if unix_socket:
+                if not hasattr(socket, "AF_UNIX"):
+                    raise KeyError("Unix Sockets werden auf diesem System nicht unterstützt.")
+                if os.path.exists(unix_socket):
+                    os.remove(unix_socket)  # Left over from a previous run
+                self._servers.append(_UnixHealthServer(unix_socket, _HealthRequestHandler))
+        except OSError as ex:
+            self.stop()
+            self.log.error(f"Health: Can not listen on {unix_socket or f'{host}:{port}'}: {repr(ex)}")
+            raise KeyError(f"Health Endpunkt {unix_socket or port} nicht verfügbar.")
+        for server in self._servers:
+            server.report = report
+
+    def start(self) -> None:
+        for server in self._servers:
+            threading.Thread(target=server.serve_forever, name="HealthServer", daemon=True).start()
+            self.log.info(f"Health: Listening on {server.server_address}")
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
+
+
+class SystemdNotifier:
+    def __init__(self):
+        """sd_notify messages to systemd, for services with Type=notify and WatchdogSec.
+
+        Uses the socket in $NOTIFY_SOCKET, does nothing if it is not set.
+        """
+        self.log = logging.getLogger("news_downloader")
+        self.address = os.environ.get("NOTIFY_SOCKET", "")
+        if self.address.startswith("@"):
+            self.address = "\0" + self.address[1:]  # Abstract namespace
+        if not hasattr(socket, "AF_UNIX"):
+            self.address = ""
+
+        # Watchdog interval, pinged twice as often as systemd expects
+        self.watchdog_interval = 0.0
+        watchdog_pid = os.environ.get("WATCHDOG_PID")
+        if os.environ.get("WATCHDOG_USEC") and (not watchdog_pid or watchdog_pid == str(os.getpid())):
+            self.watchdog_interval = int(os.environ["WATCHDOG_USEC"]) / 1e6 / 2
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.address)
+
+    def notify(self, **fields) -> bool:
+        """Send a state change, f.ex. notify(READY=1, STATUS="Running").
+
+        Returns:
+            bool: True if the message was sent.
+        """
+        if not self.address:
+            return False
+        message = "\n".join(f"{key}={value}" for key, value in fields.items()).encode("utf-8")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.sendto(message, self.address)
+        except OSError as ex:
+            self.log.warning(f"Health: sd_notify failed: {repr(ex)}")
+            return False
+        return True
+
+
+# Process wide registry, like the metrics registry
+health = HealthRegistry()
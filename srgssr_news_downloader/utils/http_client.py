@@ -0,0 +1,357 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+try:
+    import httpx
+except ImportError:  # Optional, only needed for HTTP/2
+    httpx = None
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.clock_skew import clock_skew
+from srgssr_news_downloader.utils.rate_limiter import RateLimiter
+from srgssr_news_downloader.utils.tracing import tracer
+
+
+class HTTPClient:
+    # (connect, read) seconds for requests without a timeout, a stalled server must not hang the worker
+    DEFAULT_TIMEOUT = (10, 60)
+
+    def __init__(self, rate_limiter: RateLimiter | None = None):
+        """Common entry point for all remote calls of the worker.
+
+        Uses one requests session, so connections to the same host are reused. Requests to the
+        SRGSSR API (rate_limited=True) go through the rate limiter of the credential.
+
+        Args:
+            rate_limiter (RateLimiter | None): Limiter for API requests. Default None.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        self._prewarm_unsupported = False  # Logged once
+
+    def request(
+        self, method: str, url: str, rate_limited: bool = False, **kwargs
+    ) -> requests.Response:
+        """Send a request.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL.
+            rate_limited (bool): Count the request against the API rate limit and quota. Default False.
+            **kwargs: Arguments for requests.Session.request(). Without a timeout
+                DEFAULT_TIMEOUT is used.
+
+        Raises:
+            RateLimitError: Raised on 429 or if the limiter has no token in time.
+
+        Returns:
+            requests.Response: The response.
+        """
+        if rate_limited and self.rate_limiter:
+            with tracer.span("rate_limit"):
+                self.rate_limiter.before_request()
+
+        with tracer.span("http", method=method, host=urlsplit(url).netloc) as span:
+            sent = clock.time()
+            response = self.send(method, url, **kwargs)
+            span.set(status=response.status_code)
+        # The Date headers show how far the clocks of the servers are off
+        clock_skew.observe(url, response.headers, sent, clock.time())
+
+        if rate_limited and self.rate_limiter:
+            self.rate_limiter.after_response(response)
+        return response
+
+    def send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request over the transport, without rate limiting."""
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.DEFAULT_TIMEOUT
+        start = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        # Until the response headers are parsed, including the setup of a new connection
+        tracer.record("ttfb", start, start + response.elapsed.total_seconds())
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def prewarm(self, url: str, timeout: float = 5) -> bool:
+        """Open a pooled connection to the host of an URL without sending a request.
+
+        DNS, TCP and TLS setup are done ahead, the next request to the host reuses the
+        connection. Connections that are still open are left alone. Skipped for hosts
+        that are reached through a proxy, and if the connection pool of requests and urllib3
+        (private methods, pinned to urllib3 2.x) does not offer the needed methods.
+
+        Args:
+            url (str): URL on the host.
+            timeout (float): Connect timeout in seconds. Default 5.
+
+        Returns:
+            bool: True if a connection to the host is open.
+        """
+        # Same settings as a request of the session, so the connection lands in the same pool
+        settings = self.session.merge_environment_settings(url, {}, None, None, None)
+        if settings["proxies"]:
+            return False
+
+        request = requests.Request("HEAD", url).prepare()
+        adapter = self.session.get_adapter(url)
+        try:
+            pool = adapter.get_connection_with_tls_context(
+                request, settings["verify"], cert=settings["cert"]
+            )
+            conn = pool._get_conn()
+        except AttributeError as ex:
+            if not self._prewarm_unsupported:
+                self._prewarm_unsupported = True
+                self.log.warning(f"HTTP: Pre-warming not supported by this requests/urllib3: {repr(ex)}")
+            return False
+        try:
+            if not conn.is_connected:
+                conn.timeout = timeout
+                conn.connect()
+                self.log.debug(f"HTTP: Connection to {urlsplit(url).netloc} opened ahead")
+            return True
+        except (OSError, urllib3.exceptions.HTTPError) as ex:
+            # urllib3 wraps refused and timed out connections in its own errors
+            self.log.warning(f"HTTP: Opening connection to {urlsplit(url).netloc} failed: {repr(ex)}")
+            conn.close()
+            return False
+        finally:
+            pool._put_conn(conn)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+
+
+@contextmanager
+def _requests_errors():
+    """Raise the exceptions of requests for errors of httpx, callers only know requests."""
+    try:
+        yield
+    except httpx.ConnectTimeout as ex:
+        raise requests.exceptions.ConnectTimeout(repr(ex)) from ex
+    except httpx.TimeoutException as ex:
+        raise requests.exceptions.Timeout(repr(ex)) from ex
+    except (httpx.ConnectError, httpx.RemoteProtocolError) as ex:
+        raise requests.exceptions.ConnectionError(repr(ex)) from ex
+    except httpx.HTTPError as ex:
+        raise requests.exceptions.RequestException(repr(ex)) from ex
+
+
+class HTTP2Response:
+    def __init__(self, response):
+        """Wraps a httpx response in the interface of requests.Response used by the worker.
+
+        Args:
+            response (httpx.Response): Response, streamed or read.
+        """
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def text(self) -> str:
+        with _requests_errors():
+            self._response.read()
+        return self._response.text
+
+    def json(self):
+        with _requests_errors():
+            self._response.read()
+        return self._response.json()
+
+    def iter_content(self, chunk_size: int = 1):
+        with _requests_errors():
+            yield from self._response.iter_bytes(chunk_size)
+
+    def close(self) -> None:
+        self._response.close()
+
+
+# Connection stages of httpcore and their span names, DNS is part of the TCP connect
+HTTP2_TRACE_STAGES = {
+    "connection.connect_tcp": "tcp_connect",
+    "connection.start_tls": "tls",
+}
+
+
+class HTTP2Client(HTTPClient):
+    def __init__(self, rate_limiter: RateLimiter | None = None, prior_knowledge: bool = False):
+        """HTTP client that multiplexes all requests to a host over one HTTP/2 connection.
+
+        Uses httpx with the h2 package (pip install httpx[http2]). Servers without HTTP/2
+        support are reached over HTTP/1.1. Accepts the same arguments as HTTPClient and
+        raises the same exceptions, so it can replace it.
+
+        Args:
+            rate_limiter (RateLimiter | None): Limiter for API requests. Default None.
+            prior_knowledge (bool): Speak HTTP/2 without negotiation, also on http:// URLs.
+                Only for servers known to support it. Default False.
+
+        Raises:
+            KeyError: Raised if httpx or h2 is not installed.
+        """
+        if httpx is None:
+            raise KeyError("HTTP/2 benötigt das Paket httpx[http2].")
+        try:
+            self.client = httpx.Client(
+                http1=not prior_knowledge, http2=True, timeout=self.httpx_timeout(self.DEFAULT_TIMEOUT)
+            )
+        except ImportError:
+            raise KeyError("HTTP/2 benötigt das Paket httpx[http2].")
+        super().__init__(rate_limiter)
+
+    @staticmethod
+    def httpx_timeout(timeout) -> "httpx.Timeout":
+        """Translate a timeout of requests, seconds or (connect, read), to httpx."""
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    def send(self, method: str, url: str, **kwargs) -> HTTP2Response:
+        """Send a request, the arguments are translated from requests to httpx."""
+        timeout = kwargs.pop("timeout", None)
+        if timeout is not None:
+            kwargs["timeout"] = self.httpx_timeout(timeout)
+        stream = kwargs.pop("stream", False)
+        auth = kwargs.pop("auth", None)
+        if isinstance(auth, requests.auth.HTTPBasicAuth):
+            auth = (auth.username, auth.password)
+        # requests.Session follows redirects for every method unless told otherwise
+        follow_redirects = kwargs.pop("allow_redirects", True)
+
+        start = time.perf_counter()
+        started = {}  # Stage: time.perf_counter()
+
+        def trace(event_name: str, info: dict) -> None:
+            # Connection events of httpcore, f.ex. "connection.start_tls.complete"
+            stage, _, state = event_name.rpartition(".")
+            if state == "started":
+                started[stage] = time.perf_counter()
+            elif stage.endswith("receive_response_headers") and state == "complete":
+                tracer.record("ttfb", start, time.perf_counter())
+            elif stage in HTTP2_TRACE_STAGES and stage in started:
+                tracer.record(
+                    HTTP2_TRACE_STAGES[stage], started[stage], time.perf_counter(), host=urlsplit(url).hostname
+                )
+
+        with _requests_errors():
+            request = self.client.build_request(method, url, **kwargs)
+            if tracer.exporter is not None:
+                request.extensions["trace"] = trace
+            response = self.client.send(
+                request, auth=auth, follow_redirects=follow_redirects, stream=stream
+            )
+        return HTTP2Response(response)
+
+    def prewarm(self, url: str, timeout: float = 5) -> bool:
+        """Open the connection to the host of an URL with a HEAD request to its root.
+
+        httpx has no way to connect without a request. The request is not rate limited.
+
+        Args:
+            url (str): URL on the host.
+            timeout (float): Timeout in seconds. Default 5.
+
+        Returns:
+            bool: True if the host answered.
+        """
+        parts = urlsplit(url)
+        try:
+            self.send("HEAD", f"{parts.scheme}://{parts.netloc}/", timeout=timeout)
+            return True
+        except requests.exceptions.RequestException as ex:
+            self.log.warning(f"HTTP: Opening connection to {parts.netloc} failed: {repr(ex)}")
+            return False
+
+    def close(self) -> None:
+        """Close all connections."""
+        self.client.close()
+        super().close()
+
+
+def create_http_client(version: str, rate_limiter: RateLimiter | None = None) -> HTTPClient:
+    """Create the client for the configured HTTP version.
+
+    Args:
+        version (str): "1.1" or "2".
+        rate_limiter (RateLimiter | None): Limiter for API requests. Default None.
+
+    Raises:
+        KeyError: Raised for an unknown version or if HTTP/2 is not available.
+
+    Returns:
+        HTTPClient: The client.
+    """
+    if version == "1.1":
+        return HTTPClient(rate_limiter)
+    if version == "2":
+        return HTTP2Client(rate_limiter)
+    raise KeyError(f"Unbekannte HTTP Version: {version}")
+
+
+_shared_clients = {}  # (version, name): [client, number of users]
+_shared_lock = threading.Lock()
+
+
+def acquire_http_client(
+    name: str, version: str, rate_limiter: RateLimiter | None = None
+) -> HTTPClient:
+    """Return the client shared by all workers with the same name (f.ex. the client ID).
+
+    Workers of the same credential reuse the connections of one client.
+
+    Args:
+        name (str): Name of the shared client.
+        version (str): "1.1" or "2".
+        rate_limiter (RateLimiter | None): Limiter for API requests. Default None.
+
+    Raises:
+        KeyError: Raised for an unknown version or if HTTP/2 is not available.
+
+    Returns:
+        HTTPClient: The client, give it back with release_http_client().
+    """
+    with _shared_lock:
+        entry = _shared_clients.get((version, name))
+        if entry is None:
+            entry = _shared_clients[(version, name)] = [create_http_client(version, rate_limiter), 0]
+        entry[1] += 1
+        entry[0].rate_limiter = rate_limiter
+        return entry[0]
+
+
+def release_http_client(client: HTTPClient) -> None:
+    """Give back a client, it is closed when the last worker released it.
+
+    Args:
+        client (HTTPClient): Client of acquire_http_client(), other clients are closed directly.
+    """
+    with _shared_lock:
+        for key, entry in _shared_clients.items():
+            if entry[0] is client:
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                del _shared_clients[key]
+                break
+    client.close()
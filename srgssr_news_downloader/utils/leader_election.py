@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from srgssr_news_downloader.utils.file_lock import exclusive_file_lock
+from srgssr_news_downloader.utils.metrics import metrics
+
+
+class Lease:
+    def __init__(self, node_id: str, lease_duration: float):
+        """Base class of the leadership leases. Only the holder of the lease polls and downloads.
+
+        Args:
+            node_id (str): Unique name of this instance.
+            lease_duration (float): Seconds until a lease that is not renewed expires.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.node_id = node_id
+        self.lease_duration = lease_duration
+
+    def update(self) -> bool:
+        """Acquire or renew the lease, called regularly.
+
+        Returns:
+            bool: True if this instance holds the lease.
+        """
+        raise NotImplementedError
+
+    def release(self) -> None:
+        """Give up the lease, a standby can take over right away."""
+
+
+class FileLease(Lease):
+    def __init__(self, path: str, node_id: str, lease_duration: float = 30):
+        """Lease stored in a file on the shared filesystem.
+
+        The holder increments a counter in the file on every renewal. A standby takes over
+        when the counter did not change for `lease_duration` seconds. Only local clocks measure
+        the time, so the clocks of the machines do not need to be in sync. A holder that can not
+        renew for half the lease duration steps down before a standby takes over.
+
+        Args:
+            path (str): Lease file on the share.
+            node_id (str): Unique name of this instance.
+            lease_duration (float): Seconds until a lease that is not renewed expires. Default 30.
+        """
+        super().__init__(node_id, lease_duration)
+
+        self.path = path
+        self.is_leader = False
+
+        self._renewed_at = 0.0  # Monotonic time of the last own renewal
+        self._observed = None  # (node, term, renewals) of the holder
+        self._observed_at = 0.0  # Monotonic time when the holder renewed last
+
+    def update(self) -> bool:
+        now = time.monotonic()
+        try:
+            with exclusive_file_lock(f"{self.path}.lock", timeout=self.lease_duration / 4):
+                state = self._read()
+                if state is None or state["node"] == self.node_id:
+                    term = state["term"] if state else 1
+                    renewals = state["renewals"] + 1 if state else 0
+                    self._write({"node": self.node_id, "term": term, "renewals": renewals})
+                    self._renewed_at = now
+                    return self._set_leader(True)
+
+                observed = (state["node"], state["term"], state["renewals"])
+                if observed != self._observed:
+                    self._observed, self._observed_at = observed, now
+                    return self._set_leader(False)
+
+                if now - self._observed_at < self.lease_duration:
+                    return self._set_leader(False)
+
+                self.log.warning(f"HA: Lease of {state['node']} expired, taking over.")
+                self._write({"node": self.node_id, "term": state["term"] + 1, "renewals": 0})
+                self._renewed_at = now
+                metrics.inc("ha_takeovers_total")
+                return self._set_leader(True)
+        except (OSError, ValueError, KeyError) as ex:
+            self.log.warning(f"HA: Lease file not usable: {repr(ex)}")
+            # Step down before a standby can assume the lease expired
+            if self.is_leader and now - self._renewed_at > self.lease_duration / 2:
+                self.log.error("HA: Lease could not be renewed, stepping down.")
+                return self._set_leader(False)
+            return self.is_leader
+
+    def release(self) -> None:
+        if not self.is_leader:
+            return
+        try:
+            with exclusive_file_lock(f"{self.path}.lock", timeout=self.lease_duration / 4):
+                state = self._read()
+                if state and state["node"] == self.node_id:
+                    os.remove(self.path)
+        except OSError as ex:
+            self.log.warning(f"HA: Lease not released: {repr(ex)}")
+        self._set_leader(False)
+
+    def _set_leader(self, is_leader: bool) -> bool:
+        self.is_leader = is_leader
+        return is_leader
+
+    def _read(self) -> dict | None:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, state: dict) -> None:
+        temp_file = f"{self.path}.{self.node_id}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_file, self.path)
+
+
+class PortLease(Lease):
+    def __init__(self, host: str, port: int, node_id: str, lease_duration: float = 30):
+        """Lease held by listening on a TCP port.
+
+        For instances on the same machine (or sharing a virtual IP). The operating system frees
+        the port when the holder exits or crashes, a standby takes over at its next attempt.
+
+        Args:
+            host (str): Address to bind.
+            port (int): Coordination port.
+            node_id (str): Unique name of this instance.
+            lease_duration (float): Interval of the attempts is a third of it. Default 30.
+        """
+        super().__init__(node_id, lease_duration)
+
+        self.host = host
+        self.port = port
+        self._socket = None
+
+    def update(self) -> bool:
+        if self._socket is not None:
+            return True
+        try:
+            self._socket = socket.create_server((self.host, self.port))
+        except OSError:
+            return False
+        self.log.info(f"HA: Coordination port {self.port} acquired.")
+        metrics.inc("ha_takeovers_total")
+        return True
+
+    def release(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class LeaderElector:
+    def __init__(self, lease: Lease):
+        """Renew a lease in a background thread, independent of long running downloads.
+
+        Args:
+            lease (Lease): Lease to hold.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.lease = lease
+        self.interval = lease.lease_duration / 3
+        self.is_leader = False
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Try to acquire the lease once and start the renewal thread."""
+        self._update()
+        self._thread = threading.Thread(target=self._run, name="LeaderElector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the renewal and release the lease."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.lease.release()
+        self.is_leader = False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def _update(self) -> None:
+        is_leader = self.lease.update()
+        if is_leader != self.is_leader:
+            self.log.info(f"HA: {self.lease.node_id} is {'leader' if is_leader else 'standby'}.")
+        self.is_leader = is_leader
+        metrics.set("ha_leader", int(is_leader), node=self.lease.node_id)
+
+
+def create_lease(
+    mode: str, node_id: str, lease_duration: float, path: str = "", host: str = "", port: int = 0
+) -> Lease:
+    """Create the lease for the configured mode.
+
+    Args:
+        mode (str): "file" or "port".
+        node_id (str): Unique name of this instance.
+        lease_duration (float): Seconds until a lease expires.
+        path (str): Lease file for mode "file".
+        host (str): Address for mode "port".
+        port (int): Port for mode "port".
+
+    Raises:
+        KeyError: Raised for an unknown mode.
+
+    Returns:
+        Lease: The lease.
+    """
+    if mode == "file":
+        return FileLease(path, node_id, lease_duration)
+    if mode == "port":
+        return PortLease(host, port, node_id, lease_duration)
+    raise KeyError(f"Unbekannter HA Modus: {mode}")
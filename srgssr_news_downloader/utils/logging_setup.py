@@ -35,5 +35,29 @@ def setup_logger() -> object:
     return logger
 
 
+class ProfileLogAdapter(logging.LoggerAdapter):
+    """Prefix the messages of a profile with its name, f.ex. "[radio_a] API: ..."."""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['profile']}] {msg}", kwargs
+
+
+def get_logger(profile: str = "") -> logging.Logger | logging.LoggerAdapter:
+    """Return the logger of a profile.
+
+    Profiles log to the child logger "news_downloader.<profile>", so they can get their own
+    handlers and levels. The messages also reach the handlers of the main logger.
+
+    Args:
+        profile (str): Profile name, empty for the main logger. Default "".
+
+    Returns:
+        logging.Logger | logging.LoggerAdapter: The logger.
+    """
+    if not profile:
+        return logging.getLogger("news_downloader")
+    return ProfileLogAdapter(logging.getLogger(f"news_downloader.{profile}"), {"profile": profile})
+
+
 # Initialize the logger
 logger = setup_logger()
@@ -0,0 +1,104 @@
+import logging
+
+import requests
+
+from srgssr_news_downloader.utils.http_client import HTTPClient
+
+
+class MediaProbe:
+    def __init__(self, http: HTTPClient, timeout: float = 10):
+        """Detect changed media files with cheap conditional requests instead of full downloads.
+
+        The validators (ETag, Last-Modified, Content-Length) of every downloaded file are remembered.
+        A probe sends them back in a conditional HEAD request, the server answers with 304 or headers only.
+
+        Args:
+            http (HTTPClient): Client for the requests.
+            timeout (float): Timeout for a probe request in seconds. Default 10.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.http = http
+        self.timeout = timeout
+        self._validators = {}  # url: {etag, last_modified, content_length}
+
+    def remember(self, url: str, headers) -> None:
+        """Store the validators of a downloaded file.
+
+        Args:
+            url (str): Media URL.
+            headers: Response headers of the download.
+        """
+        self._validators[url] = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_length": headers.get("Content-Length"),
+        }
+
+    def forget(self, url: str) -> None:
+        """Remove the stored validators of an URL.
+
+        Args:
+            url (str): Media URL.
+        """
+        self._validators.pop(url, None)
+
+    def has_changed(self, url: str) -> bool:
+        """Check if the file behind an URL changed since it was remembered.
+
+        Errors are logged and count as "not changed", a failing probe must never trigger downloads.
+
+        Args:
+            url (str): Media URL.
+
+        Returns:
+            bool: True if the server reports different content.
+        """
+        known = self._validators.get(url)
+        if known is None:
+            return False
+
+        headers = {}
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+
+        try:
+            response = self.http.head(
+                url, headers=headers, timeout=self.timeout, allow_redirects=True
+            )
+            if response.status_code in (405, 501):
+                # HEAD not supported, ask for the first byte only
+                headers["Range"] = "bytes=0-0"
+                response = self.http.get(
+                    url, headers=headers, timeout=self.timeout, stream=True
+                )
+                response.close()
+        except requests.exceptions.RequestException as ex:
+            self.log.warning(f"Probe: Request to {url} failed: {repr(ex)}")
+            return False
+
+        self.log.debug(f"Probe: {url} -> {response.status_code}")
+        if response.status_code == 304:
+            return False
+        if response.status_code not in (200, 206):
+            self.log.warning(f"Probe: Unexpected status {response.status_code} for {url}")
+            return False
+
+        current = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_length": response.headers.get("Content-Length"),
+        }
+        if response.status_code == 206:
+            # Content-Range: bytes 0-0/<total length>
+            content_range = response.headers.get("Content-Range", "")
+            current["content_length"] = content_range.rpartition("/")[2] or None
+
+        # Only compare what both responses know, missing headers are no change
+        for key, value in known.items():
+            if value and current[key] and value != current[key]:
+                self.log.info(f"Probe: {key} of {url} changed: {value} -> {current[key]}")
+                return True
+        return False
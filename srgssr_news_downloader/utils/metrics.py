@@ -0,0 +1,75 @@
+import threading
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Thread safe counters and gauges, rendered in the Prometheus text format."""
+        self._lock = threading.Lock()
+        self._values = {}  # (name, labels): value
+        self._types = {}  # name: "counter" / "gauge"
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increase a counter.
+
+        Args:
+            name (str): Metric name.
+            value (float): Amount to add. Default 1.
+            **labels: Label values of the series.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._types.setdefault(name, "counter")
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge.
+
+        Args:
+            name (str): Metric name.
+            value (float): New value.
+            **labels: Label values of the series.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._types.setdefault(name, "gauge")
+            self._values[key] = value
+
+    def get(self, name: str, **labels) -> float | None:
+        """Return the current value of a series or None if it was never set."""
+        with self._lock:
+            return self._values.get((name, tuple(sorted(labels.items()))))
+
+    def snapshot(self) -> dict:
+        """Return all series as {name: [(labels dict, value), ...]}."""
+        result = {}
+        with self._lock:
+            for (name, labels), value in self._values.items():
+                result.setdefault(name, []).append((dict(labels), value))
+        return result
+
+    def types(self) -> dict:
+        """Return the type of every metric as {name: "counter" / "gauge"}."""
+        with self._lock:
+            return dict(self._types)
+
+    def render_prometheus(self) -> str:
+        """Return all series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            types = dict(self._types)
+            values = sorted(self._values.items())
+
+        last_name = None
+        for (name, labels), value in values:
+            if name != last_name:
+                lines.append(f"# TYPE news_downloader_{name} {types[name]}")
+                last_name = name
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+            if label_text:
+                label_text = "{" + label_text + "}"
+            lines.append(f"news_downloader_{name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process wide registry, like the "news_downloader" logger
+metrics = MetricsRegistry()
@@ -0,0 +1,239 @@
+import hashlib
+
+# Bitrates in kbit/s, indexed by [version is MPEG1][layer][bitrate index]
+_BITRATES = {
+    True: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    False: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+
+# Sample rates in Hz, indexed by version bits and sample rate index
+_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG 1
+    0b10: (22050, 24000, 16000),  # MPEG 2
+    0b00: (11025, 12000, 8000),  # MPEG 2.5
+}
+
+_ACCEPTED_CONTENT_TYPES = (
+    "audio/mpeg",
+    "audio/mp3",
+    "audio/mpeg3",
+    "audio/x-mpeg",
+    "audio/x-mp3",
+    "application/octet-stream",
+)
+
+_ID3V1_SIZE = 128
+
+
+class MP3ValidationError(RuntimeError):
+    """Raised when a downloaded file is not a complete MP3 file."""
+
+
+def parse_frame_header(header: bytes) -> tuple[int, int, int] | None:
+    """Parse a 4 byte MPEG audio frame header.
+
+    Args:
+        header (bytes): The first 4 bytes of a frame.
+
+    Returns:
+        tuple[int, int, int] | None: (frame length in bytes, samples per frame, sample rate)
+            or None if the bytes are no valid frame header.
+    """
+    if header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+
+    version_bits = (header[1] >> 3) & 0b11
+    layer_bits = (header[1] >> 1) & 0b11
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0b11
+    padding = (header[2] >> 1) & 0b1
+
+    if version_bits == 0b01 or layer_bits == 0b00:
+        return None  # Reserved
+    if bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None  # Free format and bad values are not supported
+
+    mpeg1 = version_bits == 0b11
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+
+class MP3StreamValidator:
+    def __init__(
+        self, min_duration: float = 0.0, max_junk_bytes: int = 4096, check: bool = True
+    ):
+        """Validate an MP3 file chunk by chunk while it is downloaded.
+
+        The validator skips ID3v2 tags, walks the MPEG frame headers, sums up the duration and hashes
+        all bytes on the fly. The file never has to be read a second time.
+
+        Args:
+            min_duration (float): Minimal accepted duration in seconds. Default 0.
+            max_junk_bytes (int): Bytes between frames that are tolerated before the file is rejected. Default 4096.
+            check (bool): If False, only the hash and the byte count are computed. Default True.
+        """
+        self.min_duration = min_duration
+        self.max_junk_bytes = max_junk_bytes
+        self.check = check
+
+        self.content_length = None
+        self.bytes_received = 0
+        self.frames = 0
+        self.duration = 0.0
+        self.junk_bytes = 0
+        self.has_id3v2 = False
+        self.has_id3v1 = False
+
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._skip = 0  # Bytes still to skip from the stream (frame payload or tag)
+        self._started = False
+
+    @property
+    def sha256(self) -> str:
+        """Hex digest of all bytes fed so far."""
+        return self._hash.hexdigest()
+
+    def check_headers(self, headers) -> None:
+        """Check the HTTP response headers before the body is read.
+
+        Args:
+            headers: Response headers (case insensitive mapping).
+
+        Raises:
+            MP3ValidationError: If the content type is not an audio type or the content length is not
+                a number.
+        """
+        if not self.check:
+            return
+
+        content_type = headers.get("Content-Type", "")
+        content_type = content_type.split(";")[0].strip().lower()
+        if content_type and content_type not in _ACCEPTED_CONTENT_TYPES:
+            raise MP3ValidationError(f"Unexpected Content-Type '{content_type}'")
+
+        # Compressed transfers are decoded by requests, the length would not match
+        if "Content-Length" in headers and not headers.get("Content-Encoding"):
+            try:
+                content_length = int(headers["Content-Length"])
+            except ValueError:
+                content_length = -1
+            if content_length < 0:
+                raise MP3ValidationError(f"Invalid Content-Length '{headers['Content-Length']}'")
+            self.content_length = content_length
+
+    def feed(self, chunk: bytes) -> None:
+        """Process the next chunk of the download.
+
+        Args:
+            chunk (bytes): Data as received.
+
+        Raises:
+            MP3ValidationError: If the data can not be an MP3 file.
+        """
+        self.bytes_received += len(chunk)
+        self._hash.update(chunk)
+        if not self.check:
+            return
+
+        # Large skips (frame payloads) do not need to be copied into the buffer
+        if self._skip >= len(chunk):
+            self._skip -= len(chunk)
+            return
+        if self._skip:
+            chunk = chunk[self._skip :]
+            self._skip = 0
+
+        self._buffer += chunk
+        self._parse()
+
+    def finish(self) -> None:
+        """Check that the file is complete after the last chunk.
+
+        Raises:
+            MP3ValidationError: If the file is truncated, too short or contains no audio frames.
+        """
+        if not self.check:
+            return
+
+        if self.content_length is not None and self.bytes_received != self.content_length:
+            raise MP3ValidationError(
+                f"Received {self.bytes_received} of {self.content_length} bytes"
+            )
+
+        rest = bytes(self._buffer)
+        if self._skip:
+            raise MP3ValidationError("File ends in the middle of a frame")
+        if rest[:3] == b"TAG" and len(rest) == _ID3V1_SIZE:
+            self.has_id3v1 = True
+        elif rest:
+            # A partial header or payload at the end means the file was cut off
+            raise MP3ValidationError(f"{len(rest)} unexpected bytes at end of file")
+
+        if not self.frames:
+            raise MP3ValidationError("No MPEG audio frames found")
+        if self.duration < self.min_duration:
+            raise MP3ValidationError(
+                f"Duration {self.duration:.1f}s is shorter than {self.min_duration}s"
+            )
+
+    def _parse(self) -> None:
+        buffer = self._buffer
+        pos = 0
+        size = len(buffer)
+
+        if not self._started:
+            if size - pos < 10:
+                return
+            if buffer[pos : pos + 3] == b"ID3":
+                tag_size = (
+                    (buffer[pos + 6] & 0x7F) << 21
+                    | (buffer[pos + 7] & 0x7F) << 14
+                    | (buffer[pos + 8] & 0x7F) << 7
+                    | (buffer[pos + 9] & 0x7F)
+                )
+                if buffer[pos + 5] & 0x10:  # Footer present
+                    tag_size += 10
+                self.has_id3v2 = True
+                pos += 10 + tag_size
+            elif buffer[pos] != 0xFF:
+                raise MP3ValidationError("File does not start with an ID3 tag or MPEG frame")
+            self._started = True
+
+        while size - pos >= 4:
+            frame = parse_frame_header(buffer[pos : pos + 4])
+            if frame is None:
+                if buffer[pos : pos + 3] == b"TAG" and size - pos <= _ID3V1_SIZE:
+                    break  # Possibly the ID3v1 tag at the end, decided in finish()
+                pos += 1
+                self.junk_bytes += 1
+                if self.junk_bytes > self.max_junk_bytes:
+                    raise MP3ValidationError("Too much invalid data between MPEG frames")
+                continue
+
+            frame_length, samples, sample_rate = frame
+            self.frames += 1
+            self.duration += samples / sample_rate
+            pos += frame_length
+
+        if pos > size:
+            # Frame or tag continues in the next chunks
+            self._skip = pos - size
+            pos = size
+
+        del buffer[:pos]
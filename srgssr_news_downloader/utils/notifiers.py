@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import queue
+import shlex
+import socket
+import subprocess
+import threading
+import time
+
+import requests
+
+
+class Notifier:
+    """Base class of a notification target. Subclasses implement send()."""
+
+    name = "notifier"
+
+    def start(self) -> None:
+        """Prepare the notifier, called once before the first send()."""
+
+    def send(self, payload: dict) -> None:
+        """Deliver one notification.
+
+        Args:
+            payload (dict): JSON serializable notification data.
+
+        Raises:
+            Exception: Any exception marks the delivery as failed, it will be retried.
+        """
+        raise NotImplementedError()
+
+    def stop(self) -> None:
+        """Release resources, called once when the worker stops."""
+
+
+class WebhookNotifier(Notifier):
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 10):
+        """POST the payload as JSON to an URL.
+
+        Args:
+            url (str): Webhook URL.
+            timeout (float): Request timeout in seconds. Default 10.
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, payload: dict) -> None:
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        if not 200 <= response.status_code < 300:
+            raise RuntimeError(f"Webhook returned status {response.status_code}")
+
+
+class UnixSocketNotifier(Notifier):
+    name = "unix_socket"
+
+    def __init__(self, path: str):
+        """Broadcast the payload as one JSON line to all clients connected to a Unix domain socket.
+
+        Args:
+            path (str): Path of the socket file.
+
+        Raises:
+            KeyError: Raised if the system has no Unix domain sockets.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise KeyError("Unix Sockets werden auf diesem System nicht unterstützt.")
+
+        self.path = path
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Left over from a previous run
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        threading.Thread(target=self._accept, name="UnixSocketNotifier", daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return  # Socket closed in stop()
+            client.settimeout(5)
+            with self._lock:
+                self._clients.append(client)
+
+    def send(self, payload: dict) -> None:
+        message = (json.dumps(payload) + "\n").encode("utf-8")
+        with self._lock:
+            for client in list(self._clients):
+                try:
+                    client.sendall(message)
+                except OSError:
+                    # Disconnected clients are dropped, no retry for them
+                    self._clients.remove(client)
+                    client.close()
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class CommandNotifier(Notifier):
+    name = "command"
+
+    def __init__(self, command: str, timeout: float = 60):
+        """Run a local command with the payload as JSON on stdin.
+
+        The values are also available as environment variables NEWS_<KEY>, f.ex. NEWS_PATH.
+
+        Args:
+            command (str): Command line.
+            timeout (float): Maximum run time in seconds. Default 60.
+        """
+        self.command = shlex.split(command, posix=os.name != "nt")
+        self.timeout = timeout
+
+    def send(self, payload: dict) -> None:
+        env = dict(os.environ)
+        for key, value in payload.items():
+            env[f"NEWS_{key.upper()}"] = str(value)
+
+        result = subprocess.run(
+            self.command,
+            input=json.dumps(payload).encode("utf-8"),
+            env=env,
+            timeout=self.timeout,
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"Command returned {result.returncode}: {result.stderr.decode(errors='replace')}"
+            )
+
+
+class NotificationDispatcher:
+    def __init__(self, notifiers: list[Notifier], retries: int = 3, retry_delay: float = 2):
+        """Deliver notifications in a background thread, so a slow receiver never delays the worker.
+
+        Every notifier gets its own attempts. Failed deliveries are retried with a doubling delay.
+
+        Args:
+            notifiers (list[Notifier]): Notification targets.
+            retries (int): Retries after the first attempt. Default 3.
+            retry_delay (float): Delay before the first retry in seconds. Default 2.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.notifiers = notifiers
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the notifiers and the delivery thread."""
+        for notifier in list(self.notifiers):
+            try:
+                notifier.start()
+            except Exception as ex:
+                self.log.error(f"Notify: Could not start {notifier.name}: {repr(ex)}")
+                self.notifiers.remove(notifier)
+
+        self._thread = threading.Thread(
+            target=self._run, name="NotificationDispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def notify(self, payload: dict) -> None:
+        """Queue a notification for all notifiers. Returns immediately.
+
+        Args:
+            payload (dict): JSON serializable notification data.
+        """
+        for notifier in self.notifiers:
+            self._queue.put((time.monotonic(), notifier, payload, 0))
+
+    def stop(self) -> None:
+        """Stop the delivery thread and the notifiers. Pending retries are dropped."""
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout=5)
+        for notifier in self.notifiers:
+            notifier.stop()
+
+    def _run(self) -> None:
+        pending = []  # (due time, notifier, payload, attempt)
+
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(min(item[0] for item in pending) - time.monotonic(), 0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                return
+            if item:
+                pending.append(item)
+
+            now = time.monotonic()
+            due = [entry for entry in pending if entry[0] <= now]
+            for entry in due:
+                pending.remove(entry)
+                _, notifier, payload, attempt = entry
+                if not self._deliver(notifier, payload, attempt):
+                    if attempt < self.retries:
+                        delay = self.retry_delay * 2**attempt
+                        pending.append((now + delay, notifier, payload, attempt + 1))
+                    else:
+                        self.log.error(f"Notify: Giving up on {notifier.name} after {attempt + 1} attempts.")
+
+    def _deliver(self, notifier: Notifier, payload: dict, attempt: int) -> bool:
+        try:
+            notifier.send(payload)
+            self.log.debug(f"Notify: {notifier.name} delivered.")
+            return True
+        except Exception as ex:
+            self.log.warning(f"Notify: {notifier.name} failed (attempt {attempt + 1}): {repr(ex)}")
+            return False
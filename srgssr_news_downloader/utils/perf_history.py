@@ -0,0 +1,140 @@
+import bisect
+import csv
+import math
+import threading
+from array import array
+from datetime import datetime
+
+# Column name and array type code, one array per column
+COLUMNS = (
+    ("time", "d"),  # Unix time of the end of the cycle
+    ("poll_latency", "f"),  # Seconds of the API request, NaN if there was none
+    ("download_seconds", "f"),  # Seconds of the media download, NaN if there was none
+    ("publish_lag", "f"),  # Seconds between episode date and publication, NaN if nothing was published
+    ("errors", "H"),  # Failed remote calls in the cycle
+)
+
+# Upper bound of the rows of one buffer, 22 MB
+MAX_CAPACITY = 1_000_000
+
+
+class PerfHistory:
+    def __init__(self, capacity: int):
+        """Measurements of the last cycles in a fixed size ring buffer.
+
+        Every column is a preallocated array, so the memory use does not grow with the number of
+        cycles and a row costs 22 bytes instead of a Python object per value. When the buffer is
+        full, the oldest row is overwritten.
+
+        Args:
+            capacity (int): Number of rows kept.
+        """
+        self.capacity = max(1, min(capacity, MAX_CAPACITY))
+        self.version = 0  # Increased with every append, readers can skip unchanged data
+
+        self._columns = {
+            name: array(code, bytes(array(code).itemsize * self.capacity)) for name, code in COLUMNS
+        }
+        self._next = 0  # Row written next
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(
+        self,
+        timestamp: float,
+        poll_latency: float | None = None,
+        download_seconds: float | None = None,
+        publish_lag: float | None = None,
+        errors: int = 0,
+    ) -> None:
+        """Add the measurements of a cycle.
+
+        Args:
+            timestamp (float): Unix time of the cycle.
+            poll_latency (float | None): Seconds of the API request. Default None.
+            download_seconds (float | None): Seconds of the media download. Default None.
+            publish_lag (float | None): Seconds between episode date and publication. Default None.
+            errors (int): Failed remote calls. Default 0.
+        """
+        values = {
+            "time": timestamp,
+            "poll_latency": math.nan if poll_latency is None else poll_latency,
+            "download_seconds": math.nan if download_seconds is None else download_seconds,
+            "publish_lag": math.nan if publish_lag is None else publish_lag,
+            "errors": min(errors, 65535),
+        }
+        with self._lock:
+            for name, value in values.items():
+                self._columns[name][self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.version += 1
+
+    def series(self, since: float | None = None) -> dict[str, array]:
+        """Copy the rows in chronological order.
+
+        Args:
+            since (float | None): Only rows from this Unix time on, all if None. Default None.
+
+        Returns:
+            dict[str, array]: One array per column.
+        """
+        with self._lock:
+            if self._size < self.capacity:
+                result = {name: column[: self._size] for name, column in self._columns.items()}
+            else:
+                result = {
+                    name: column[self._next :] + column[: self._next]
+                    for name, column in self._columns.items()
+                }
+
+        if since is not None:
+            first = bisect.bisect_left(result["time"], since)
+            result = {name: column[first:] for name, column in result.items()}
+        return result
+
+    def to_csv(self, path: str, since: float | None = None) -> int:
+        """Write the rows to a CSV file, with the time in ISO format.
+
+        Args:
+            path (str): File path.
+            since (float | None): Only rows from this Unix time on, all if None. Default None.
+
+        Returns:
+            int: Number of written rows.
+        """
+        series = self.series(since)
+        names = [name for name, _ in COLUMNS]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            for row in zip(*(series[name] for name in names)):
+                writer.writerow(
+                    [datetime.fromtimestamp(row[0]).astimezone().isoformat(timespec="seconds")]
+                    + ["" if isinstance(value, float) and math.isnan(value) else round(value, 3) for value in row[1:]]
+                )
+        return len(series["time"])
+
+
+_histories = {}  # profile: PerfHistory
+_histories_lock = threading.Lock()
+
+
+def get_perf_history(profile: str, capacity: int) -> PerfHistory:
+    """Return the history of a profile. It is kept when the worker restarts after a config change.
+
+    Args:
+        profile (str): Profile name, "" for the shared settings.
+        capacity (int): Number of rows, a history with a different capacity is replaced.
+
+    Returns:
+        PerfHistory: The history.
+    """
+    with _histories_lock:
+        history = _histories.get(profile)
+        if history is None or history.capacity != max(1, min(capacity, MAX_CAPACITY)):
+            history = _histories[profile] = PerfHistory(capacity)
+        return history
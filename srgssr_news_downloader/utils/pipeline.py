@@ -0,0 +1,460 @@
+import concurrent.futures
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import struct
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from srgssr_news_downloader.utils.metrics import metrics
+from srgssr_news_downloader.utils.mp3_validator import MP3StreamValidator
+
+
+class PipelineError(RuntimeError):
+    """Raised when a required stage failed, the file must not be published."""
+
+
+class Processor:
+    """Base class of a pipeline stage. Subclasses implement process().
+
+    A stage runs in a process of the pipeline pool and gets the downloaded file before it is
+    published. Own stages are configured as "package.module:ClassName" and must be importable
+    by the pool processes.
+    """
+
+    name = "processor"
+    modifies = False  # True if process() changes the file
+    uses_context = True  # False if the result only depends on the file content
+
+    def __init__(self, options: dict):
+        """Set up the stage, called in the pool process for every file.
+
+        Args:
+            options (dict): Keys of [pipeline] that start with "<name>_", without the prefix.
+        """
+        self.options = options
+
+    def process(self, path: str, context: dict) -> dict:
+        """Process the file.
+
+        Args:
+            path (str): The file. Stages with `modifies` get a copy they may change in place.
+            context (dict): Episode data: episode_id, episode_date, title, business_unit,
+                duration, and the results of the previous stages under "stages".
+
+        Returns:
+            dict: JSON serializable result, stored in the download history.
+
+        Raises:
+            Exception: Any exception marks the stage as failed.
+        """
+        raise NotImplementedError()
+
+
+class DurationProcessor(Processor):
+    name = "duration"
+    uses_context = False
+
+    def process(self, path: str, context: dict) -> dict:
+        """Duration from the MPEG frames of the file, checks that it is still a complete MP3."""
+        validator = MP3StreamValidator()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(65536), b""):
+                validator.feed(chunk)
+        validator.finish()
+        return {
+            "duration": round(validator.duration, 3),
+            "frames": validator.frames,
+            "bitrate_kbps": round(validator.bytes_received * 8 / validator.duration / 1000, 1),
+        }
+
+
+class ID3Processor(Processor):
+    name = "id3"
+    modifies = True
+
+    # Text frames of ID3v2.3 and the option that fills them
+    FRAMES = (("TIT2", "title"), ("TPE1", "artist"), ("TALB", "album"), ("TCON", "genre"))
+
+    def process(self, path: str, context: dict) -> dict:
+        """Replace the ID3v2 tag at the start of the file, an ID3v1 tag at the end is kept.
+
+        Options are templates with {bu}, {date} (dd.mm.YYYY HH:MM), {id} and {title}.
+        """
+        episode_date = datetime.fromisoformat(context["episode_date"])
+        values = {
+            "bu": context.get("business_unit", "").upper(),
+            "date": episode_date.strftime("%d.%m.%Y %H:%M"),
+            "id": context.get("episode_id", ""),
+            "title": context.get("title", ""),
+        }
+        tags = {
+            frame: self.options[option].format(**values)
+            for frame, option in self.FRAMES
+            if self.options.get(option)
+        }
+        tags["TYER"] = episode_date.strftime("%Y")
+        tags["TDAT"] = episode_date.strftime("%d%m")
+        tags["TIME"] = episode_date.strftime("%H%M")
+        duration = context.get("stages", {}).get("duration", {}).get("duration") or context.get("duration")
+        if duration:
+            tags["TLEN"] = str(round(duration * 1000))
+
+        frames = b""
+        for frame, text in tags.items():
+            data = b"\x01" + text.encode("utf-16")  # UTF-16 with BOM, readable by every player
+            frames += frame.encode("ascii") + struct.pack(">IH", len(data), 0) + data
+        size = len(frames)
+        syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+        tag = b"ID3\x03\x00\x00" + syncsafe + frames
+
+        with open(path, "rb") as file:
+            audio = file.read()
+        if audio[:3] == b"ID3" and len(audio) >= 10:
+            old_size = sum((audio[6 + i] & 0x7F) << shift for i, shift in enumerate((21, 14, 7, 0)))
+            audio = audio[10 + old_size + (10 if audio[5] & 0x10 else 0) :]
+        with open(path, "wb") as file:
+            file.write(tag)
+            file.write(audio)
+        return {name: text for name, text in tags.items()}
+
+
+# Built-in stages by name
+PROCESSORS = {processor.name: processor for processor in (DurationProcessor, ID3Processor)}
+
+
+def load_processor(stage: str) -> type:
+    """Return the class of a stage.
+
+    Args:
+        stage (str): Name of a built-in stage or "package.module:ClassName".
+
+    Raises:
+        KeyError: Raised if the stage does not exist.
+    """
+    if stage in PROCESSORS:
+        return PROCESSORS[stage]
+    module_name, _, class_name = stage.partition(":")
+    try:
+        processor = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError):
+        raise KeyError(f"Unbekannte Pipeline Stufe: {stage}")
+    if not (isinstance(processor, type) and issubclass(processor, Processor)):
+        raise KeyError(f"Unbekannte Pipeline Stufe: {stage}")
+    return processor
+
+
+def stage_options(processor: type, options: dict) -> dict:
+    """Keys of [pipeline] that belong to a stage, without the "<name>_" prefix."""
+    prefix = f"{processor.name}_"
+    return {key[len(prefix) :]: value for key, value in options.items() if key.startswith(prefix)}
+
+
+def _file_hash(path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def run_stages(
+    stages: list[str],
+    options: dict,
+    path: str,
+    sha256: str,
+    context: dict,
+    cache_folder: str,
+    cache_entries: int,
+    cache_bytes: int = 500 * 1024 * 1024,
+) -> dict:
+    """Run the stages one after the other on a file, entry point of the pool processes.
+
+    Every stage result is cached under the content hash of its input (and the episode data if
+    the stage uses it), a file seen before is not processed again. A failed stage leaves the
+    file untouched, the following stages still run.
+
+    Args:
+        stages (list[str]): Stages in order.
+        options (dict): The [pipeline] settings.
+        path (str): The downloaded file, changed in place by modifying stages.
+        sha256 (str): Content hash of the file.
+        context (dict): Episode data, see Processor.process().
+        cache_folder (str): Folder of the cache, "" is off.
+        cache_entries (int): Results kept in the cache.
+        cache_bytes (int): Size of the cache on disk. Default 500 MiB.
+
+    Returns:
+        dict: {stages: [{name, ok, cached, seconds, result, error}], sha256} with the hash of
+            the final file.
+    """
+    results = []
+    context = dict(context, stages={})
+    if cache_folder:
+        os.makedirs(cache_folder, exist_ok=True)
+
+    for stage in stages:
+        start = time.perf_counter()
+        entry = {"name": stage, "ok": False, "cached": False, "result": {}, "error": ""}
+        try:
+            processor_class = load_processor(stage)
+            processor = processor_class(stage_options(processor_class, options))
+            key_data = {"stage": stage, "options": processor.options, "input": sha256}
+            if processor.uses_context:
+                key_data["context"] = context
+            key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+            cached = os.path.join(cache_folder, key) if cache_folder else ""
+
+            if cached and os.path.exists(f"{cached}.json"):
+                with open(f"{cached}.json", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if processor.modifies:
+                    shutil.copyfile(f"{cached}.mp3", path)
+                os.utime(f"{cached}.json")  # Most recently used
+                entry.update(ok=True, cached=True, result=stored["result"])
+                sha256 = stored["sha256"]
+            else:
+                if processor.modifies:
+                    # Work on a copy, a failed stage must not leave half a file
+                    work_path = f"{path}.{processor.name}"
+                    shutil.copyfile(path, work_path)
+                    try:
+                        result = processor.process(work_path, context)
+                        os.replace(work_path, path)
+                    finally:
+                        if os.path.exists(work_path):
+                            os.remove(work_path)
+                    sha256 = _file_hash(path)
+                else:
+                    result = processor.process(path, context)
+                entry.update(ok=True, result=result)
+                if cached:
+                    if processor.modifies:
+                        shutil.copyfile(path, f"{cached}.mp3")
+                    # The result is written last, it marks the entry as complete
+                    with open(f"{cached}.json.tmp", "w", encoding="utf-8") as f:
+                        json.dump({"result": result, "sha256": sha256}, f)
+                    os.replace(f"{cached}.json.tmp", f"{cached}.json")
+        except Exception as ex:
+            entry["error"] = repr(ex)
+        entry["seconds"] = round(time.perf_counter() - start, 4)
+        context["stages"][stage] = entry["result"]
+        results.append(entry)
+
+    if cache_folder:
+        _trim_cache(cache_folder, cache_entries, cache_bytes)
+    return {"stages": results, "sha256": sha256}
+
+
+def _trim_cache(cache_folder: str, cache_entries: int, cache_bytes: int) -> None:
+    """Remove the least recently used results, at most `cache_entries` and `cache_bytes` are left."""
+    try:
+        entries = []  # (mtime, [paths], size), oldest first
+        for name in os.listdir(cache_folder):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(cache_folder, name)
+            paths = [path, f"{path[: -len('.json')]}.mp3"]
+            sizes = [os.path.getsize(p) for p in paths if os.path.exists(p)]
+            entries.append((os.path.getmtime(path), paths, sum(sizes)))
+        entries.sort(key=lambda entry: entry[0])
+        total = sum(entry[2] for entry in entries)
+        for index, (_, paths, size) in enumerate(entries):
+            if len(entries) - index <= cache_entries and total <= cache_bytes:
+                break
+            # The result first, without it the copy of the file is not used
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
+    except OSError:
+        pass  # Another process trims at the same time
+
+
+_executors_lock = threading.Lock()
+_executors = {}  # name: [executor, processes, users]
+
+
+def _create_executor(processes: int) -> concurrent.futures.ProcessPoolExecutor:
+    # Spawn, forking a process with Qt and worker threads is not safe
+    return concurrent.futures.ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+
+
+def acquire_executor(name: str, processes: int) -> None:
+    """Start using the process pool of a profile.
+
+    Every profile has its own pool, so a hanging stage of one profile does not stop the files of
+    the others. The pool is created with the number of processes of the first user. Give it back
+    with release_executor().
+
+    Args:
+        name (str): Profile name, "" for the shared settings.
+        processes (int): Processes of the pool.
+    """
+    with _executors_lock:
+        entry = _executors.get(name)
+        if entry is None:
+            entry = _executors[name] = [_create_executor(max(processes, 1)), max(processes, 1), 0]
+        entry[2] += 1
+
+
+def release_executor(name: str) -> None:
+    """Stop using the pool of a profile, it is shut down when the last user released it."""
+    with _executors_lock:
+        entry = _executors.get(name)
+        if entry is None:
+            return
+        entry[2] -= 1
+        if entry[2] > 0:
+            return
+        del _executors[name]
+    entry[0].shutdown(wait=False, cancel_futures=True)
+
+
+def _current_executor(name: str) -> concurrent.futures.ProcessPoolExecutor:
+    with _executors_lock:
+        return _executors[name][0]
+
+
+def _replace_executor(name: str, old: concurrent.futures.ProcessPoolExecutor, terminate: bool = False) -> None:
+    """Start a new pool for a profile, unless it was replaced already.
+
+    Args:
+        name (str): Profile name.
+        old (concurrent.futures.ProcessPoolExecutor): The pool that failed.
+        terminate (bool): Kill the processes of the old pool and wait for them, f.ex. when a
+            stage hangs. Only files of this profile run in it. Default False.
+    """
+    with _executors_lock:
+        entry = _executors.get(name)
+        if entry is None or entry[0] is not old:
+            return
+        entry[0] = _create_executor(entry[1])
+    # Taken before the shutdown, which drops the reference
+    processes = list((getattr(old, "_processes", None) or {}).values())
+    if terminate:
+        for process in processes:
+            process.kill()
+    old.shutdown(wait=False, cancel_futures=True)
+    if terminate:
+        for process in processes:
+            process.join(5)
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: list[str],
+        optional: list[str] | None = None,
+        processes: int = 1,
+        timeout: float = 60,
+        cache_folder: str = "pipeline_cache",
+        cache_entries: int = 200,
+        cache_bytes: int = 500 * 1024 * 1024,
+        options: dict | None = None,
+        name: str = "",
+    ):
+        """Post-processing of downloaded files before they are published.
+
+        The stages run in order in the process pool of the profile, so tagging and analysis do
+        not hold the interpreter lock of the polling threads. The file is only published if all stages
+        that are not optional succeeded.
+
+        Args:
+            stages (list[str]): Stage names, see load_processor().
+            optional (list[str] | None): Stages whose failure does not stop the publication. Default None.
+            processes (int): Processes of the pool. Default 1.
+            timeout (float): Seconds all stages of a file may take. Default 60.
+            cache_folder (str): Folder of the result cache, "" is off. Default "pipeline_cache".
+            cache_entries (int): Results kept in the cache. Default 200.
+            cache_bytes (int): Size of the cache on disk, copies of changed files included.
+                Default 500 MiB.
+            options (dict | None): The [pipeline] settings for the stages. Default None.
+            name (str): Profile name, every profile has its own pool. Default "".
+
+        Raises:
+            KeyError: Raised for an unknown stage.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        for stage in stages:
+            load_processor(stage)  # Unknown stages fail at start, not at the first download
+        self.stages = stages
+        self.optional = set(optional or [])
+        self.processes = processes
+        self.timeout = timeout
+        self.cache_folder = os.path.abspath(cache_folder) if cache_folder else ""
+        self.cache_entries = cache_entries
+        self.cache_bytes = cache_bytes
+        self.options = dict(options or {})
+        self.name = name
+        self._started = False
+
+    def start(self) -> None:
+        if not self._started:
+            acquire_executor(self.name, self.processes)
+            self._started = True
+
+    def stop(self) -> None:
+        if self._started:
+            release_executor(self.name)
+            self._started = False
+
+    def run(self, path: str, sha256: str, context: dict) -> dict:
+        """Run all stages on a downloaded file and wait for them.
+
+        Args:
+            path (str): The downloaded file, may be changed by the stages.
+            sha256 (str): Content hash of the file.
+            context (dict): Episode data, see Processor.process().
+
+        Returns:
+            dict: See run_stages().
+
+        Raises:
+            PipelineError: Raised if a required stage failed or the pool did not answer in time.
+        """
+        executor = _current_executor(self.name)
+        try:
+            future = executor.submit(
+                run_stages,
+                self.stages,
+                self.options,
+                path,
+                sha256,
+                context,
+                self.cache_folder,
+                self.cache_entries,
+                self.cache_bytes,
+            )
+            result = future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            # cancel() does not stop a running stage, it would keep its process and could
+            # still write to the file. The processes are killed before the file is removed.
+            if not future.cancel():
+                _replace_executor(self.name, executor, terminate=True)
+            raise PipelineError(f"Stages did not finish within {self.timeout:.0f}s")
+        except BrokenProcessPool:
+            _replace_executor(self.name, executor)
+            raise PipelineError("Pipeline process crashed")
+
+        failed = []
+        for stage in result["stages"]:
+            status = "cached" if stage["cached"] else "ok" if stage["ok"] else "failed"
+            metrics.inc("pipeline_stages_total", stage=stage["name"], result=status)
+            if stage["ok"]:
+                self.log.debug(f"Pipeline: {stage['name']} {status} in {stage['seconds']:.3f}s")
+            elif stage["name"] in self.optional:
+                self.log.warning(f"Pipeline: Optional stage {stage['name']} failed: {stage['error']}")
+            else:
+                self.log.error(f"Pipeline: Stage {stage['name']} failed: {stage['error']}")
+                failed.append(stage["name"])
+        if failed:
+            raise PipelineError(f"Required stages failed: {', '.join(failed)}")
+        return result
@@ -0,0 +1,299 @@
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PyQt6.QtCore import Qt
+
+from srgssr_news_downloader.utils.broker import BrokerManager, rate_limit_settings, use_broker
+from srgssr_news_downloader.utils.config_helper import ConfigHelper
+from srgssr_news_downloader.utils.health import HealthServer, SystemdNotifier, health, summarize
+from srgssr_news_downloader.utils.logging_setup import get_logger
+from srgssr_news_downloader.utils.metrics import metrics
+from srgssr_news_downloader.utils.srgssr_api_helper import APIWorker
+
+# Seconds between two metric reports of a worker process
+METRICS_INTERVAL = 10
+# Seconds without a health report until the profiles of a worker process count as unresponsive
+HEALTH_STALE_AFTER = 30
+
+
+def _ignore_sigint() -> None:
+    # Ctrl+C reaches the whole process group, the supervisor decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def run_worker_process(
+    index: int,
+    config_file: str,
+    profiles: list[str],
+    broker_address: tuple,
+    authkey: bytes,
+) -> None:
+    """Entry point of a worker process, runs the API workers of some profiles in threads.
+
+    Args:
+        index (int): Number of the worker process.
+        config_file (str): Path of config.ini.
+        profiles (list[str]): Profiles of this process, [""] for the shared settings.
+        broker_address (tuple): Address of the broker of the supervisor.
+        authkey (bytes): Key of the broker.
+    """
+    log = get_logger()
+    _ignore_sigint()
+
+    config_helper = ConfigHelper(config_file)
+    config_helper.load_config()
+    configs = {
+        profile: config_helper.profile(profile) if profile else config_helper
+        for profile in profiles
+    }
+
+    manager = BrokerManager(address=broker_address, authkey=authkey)
+    manager.connect()
+    broker = manager.broker()
+    use_broker(broker, list(configs.values()))
+
+    threads = []
+    for profile, config in configs.items():
+        worker = APIWorker(config, profile)
+        last_status = {}
+
+        def log_status(label_dict, worker=worker, last_status=last_status):
+            text = label_dict.get("status_label", {}).get("text")
+            if text and text != last_status.get("text"):
+                last_status["text"] = text
+                worker.log.info(f"Status: {text}")
+
+        # No Qt event loop in worker processes, the slots run in the worker thread
+        worker.connection_status.connect(log_status, type=Qt.ConnectionType.DirectConnection)
+        worker.error.connect(
+            lambda ex, worker=worker: worker.log.exception(ex, exc_info=ex),
+            type=Qt.ConnectionType.DirectConnection,
+        )
+        thread = threading.Thread(target=worker.run, name=f"APIWorker-{profile}", daemon=True)
+        threads.append((worker, thread))
+        thread.start()
+
+    log.info(f"Pool: Worker process {index} runs {', '.join(p or 'default' for p in profiles)}")
+    # The broker tells the processes to stop, an Event shared by the processes would hang the
+    # supervisor if a process is killed while waiting on it
+    reported_at = time.monotonic()
+    while not broker.stop_requested():
+        time.sleep(1)
+        broker.report_health(index, health.snapshot())
+        if time.monotonic() - reported_at >= METRICS_INTERVAL:
+            broker.report_metrics(index, metrics.types(), metrics.snapshot())
+            reported_at = time.monotonic()
+        if not any(thread.is_alive() for _, thread in threads):
+            break
+
+    for worker, _ in threads:
+        worker.stop()
+    for _, thread in threads:
+        thread.join(timeout=30)
+    broker.report_metrics(index, metrics.types(), metrics.snapshot())
+    broker.report_health(index, health.snapshot())
+
+    # A process that stops on its own counts as crashed and gets restarted
+    sys.exit(0 if broker.stop_requested() else 1)
+
+
+class ProcessPoolSupervisor:
+    def __init__(self, config_helper: ConfigHelper, processes: int = 0, restart_delay: float = 5):
+        """Spread the profiles over several worker processes, for hosts with many stations.
+
+        Hashing, validation and post-processing of the profiles run in parallel instead of
+        sharing one interpreter lock. A broker in the supervisor hands out the OAuth tokens and
+        rate limits, so the processes do not request tokens or count requests twice. A crashed
+        process is restarted with a doubling delay. Under systemd with Type=notify, READY=1 is
+        sent once all workers run and WATCHDOG=1 as long as they are live.
+
+        Args:
+            config_helper (ConfigHelper): Loaded configuration.
+            processes (int): Number of worker processes, 0 is one per CPU. Default 0.
+            restart_delay (float): Seconds before the first restart of a crashed process. Default 5.
+        """
+        self.log = get_logger()
+
+        self.config_helper = config_helper
+        profiles = config_helper.profiles() or [""]
+        processes = min(processes or os.cpu_count() or 1, len(profiles))
+        self.shards = [profiles[i::processes] for i in range(processes)]
+        self.restart_delay = restart_delay
+
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+        self._manager = None
+        self._broker = None
+        self._authkey = os.urandom(16)
+        self._processes = {}  # index: Process
+        self._started = {}  # index: monotonic start time
+        self._restarts = {}  # index: (restart time, current delay)
+        self._metrics_server = None
+        self._health_server = None
+        self._notifier = SystemdNotifier()
+
+    def start(
+        self,
+        metrics_host: str = "127.0.0.1",
+        metrics_port: int = 0,
+        health_host: str = "127.0.0.1",
+        health_port: int = 0,
+        health_socket: str = "",
+    ) -> None:
+        """Start the broker, the worker processes and the optional metrics and health servers. Then call run().
+
+        Args:
+            metrics_host (str): Address of the metrics server. Default "127.0.0.1".
+            metrics_port (int): Port of the metrics server, 0 is off. Default 0.
+            health_host (str): Address of the health endpoint. Default "127.0.0.1".
+            health_port (int): Port of the health endpoint, 0 is off. Default 0.
+            health_socket (str): Unix socket of the health endpoint, "" is off. Default "".
+
+        Raises:
+            KeyError: Raised if the health endpoint can not listen.
+        """
+        self._manager = BrokerManager(address=("127.0.0.1", 0), authkey=self._authkey, ctx=self._context)
+        self._manager.start(initializer=_ignore_sigint)
+        self._broker = self._manager.broker()
+        for shard in self.shards:
+            for profile in shard:
+                config = self.config_helper.profile(profile) if profile else self.config_helper
+                self._broker.configure(config.get_value("auth", "client_id"), rate_limit_settings(config))
+
+        if health_port or health_socket:
+            try:
+                self._health_server = HealthServer(self.health_report, health_host, health_port, health_socket)
+            except KeyError:
+                self._manager.shutdown()
+                raise
+            self._health_server.start()
+
+        for index in range(len(self.shards)):
+            self._start_process(index)
+
+        if metrics_port:
+            broker = self._broker
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = broker.aggregated_metrics().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._metrics_server = ThreadingHTTPServer((metrics_host, metrics_port), MetricsHandler)
+            threading.Thread(target=self._metrics_server.serve_forever, daemon=True).start()
+
+    def health_report(self) -> dict:
+        """Health of the profiles of all worker processes, see health.summarize().
+
+        Profiles of a process without a recent report count as unresponsive, or as starting
+        right after the process was started.
+        """
+        reports = self._broker.health_reports()
+        profiles = {}
+        for index, shard in enumerate(self.shards):
+            age, snapshots = reports.get(index, (None, {}))
+            starting = time.monotonic() - self._started.get(index, 0) < HEALTH_STALE_AFTER
+            for profile in shard:
+                snapshot = snapshots.get(profile)
+                if snapshot is not None and age <= HEALTH_STALE_AFTER:
+                    profiles[profile] = snapshot
+                elif starting:
+                    profiles[profile] = {"state": "starting", "live": True, "ready": False}
+                else:
+                    profiles[profile] = dict(snapshot or {}, state="unresponsive", live=False, ready=False)
+        return summarize(profiles)
+
+    def run(self) -> None:
+        """Watch the worker processes until stop() is called, restart crashed ones, then shut down."""
+        ready_sent = False
+        last_watchdog = 0.0
+        last_status = ""
+        while not self._stopping:
+            time.sleep(1)
+            if self._notifier.enabled:
+                report = self.health_report()
+                states = [p["state"] for p in report["profiles"].values()]
+                if not ready_sent and report["live"] and "starting" not in states:
+                    ready_sent = self._notifier.notify(READY=1)
+                status = f"{report['status']}: " + ", ".join(
+                    f"{name} {p['state']}" for name, p in report["profiles"].items()
+                )
+                if status != last_status:
+                    self._notifier.notify(STATUS=status)
+                    last_status = status
+                # Missing pings let systemd restart the service
+                if (
+                    self._notifier.watchdog_interval
+                    and report["live"]
+                    and time.monotonic() - last_watchdog >= self._notifier.watchdog_interval
+                ):
+                    self._notifier.notify(WATCHDOG=1)
+                    last_watchdog = time.monotonic()
+
+            for index, process in self._processes.items():
+                if process.is_alive():
+                    continue
+
+                restart_at, delay = self._restarts.get(index, (0, self.restart_delay))
+                if not restart_at:
+                    # A process that ran for a while starts again with the shortest delay
+                    if time.monotonic() - self._started[index] > 600:
+                        delay = self.restart_delay
+                    self.log.error(
+                        f"Pool: Worker process {index} exited with code {process.exitcode}, "
+                        f"restart in {delay:.0f}s"
+                    )
+                    metrics.inc("pool_restarts_total", worker=str(index))
+                    self._restarts[index] = (time.monotonic() + delay, delay)
+                elif time.monotonic() >= restart_at:
+                    self._restarts[index] = (0, min(delay * 2, 300))
+                    self._start_process(index)
+
+        self._notifier.notify(STOPPING=1)
+        self._broker.request_stop()
+        for process in self._processes.values():
+            process.join(timeout=60)
+            if process.is_alive():
+                process.terminate()
+        if self._metrics_server:
+            self._metrics_server.shutdown()
+        if self._health_server:
+            self._health_server.stop()
+        self._manager.shutdown()
+        self.log.info("Pool: All worker processes stopped.")
+
+    def stop(self) -> None:
+        """Ask run() to stop all worker processes. Safe to call from a signal handler."""
+        self._stopping = True
+
+    def _start_process(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_worker_process,
+            args=(
+                index,
+                self.config_helper.filename,
+                self.shards[index],
+                self._manager.address,
+                self._authkey,
+            ),
+            name=f"NewsWorker-{index}",
+        )
+        self._broker.report_health(index, {})  # The report of a crashed process is outdated
+        process.start()
+        self._processes[index] = process
+        self._started[index] = time.monotonic()
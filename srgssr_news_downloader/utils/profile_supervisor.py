@@ -0,0 +1,86 @@
+from PyQt6.QtCore import QObject
+from PyQt6.QtCore import pyqtSignal as Signal
+
+from srgssr_news_downloader.utils.config_helper import ConfigHelper
+from srgssr_news_downloader.utils.health import HealthServer, health
+from srgssr_news_downloader.utils.logging_setup import get_logger
+from srgssr_news_downloader.utils.srgssr_api_helper import APIThread
+
+
+class ProfileSupervisor(QObject):
+    # Communication signals, the first argument is the profile name ("" without profiles)
+    connection_status = Signal(str, dict)
+    download_progress = Signal(str, dict)
+    error = Signal(str, object)
+
+    def __init__(self, config_helper: ConfigHelper):
+        """Run one API worker thread per profile of the configuration.
+
+        Without [profile:NAME] sections, a single worker runs with the shared settings.
+        Every worker has its own thread, status and log prefix, an error stops only its profile.
+        Profiles with the same credentials share token, rate limit and connections. The optional
+        health endpoint reports the workers of all profiles.
+
+        Args:
+            config_helper (ConfigHelper): Loaded configuration.
+        """
+        super().__init__()
+
+        self.log = get_logger()
+        self.config_helper = config_helper
+        self.threads = {}  # profile: APIThread
+        self.health_server = None
+
+    @property
+    def profiles(self) -> list[str]:
+        """Names of the configured profiles, [""] without profiles."""
+        return self.config_helper.profiles() or [""]
+
+    def start(self) -> None:
+        """Start the workers of all profiles and the health endpoint."""
+        self.start_health_server()
+        for profile in self.profiles:
+            self.start_profile(profile)
+
+    def start_profile(self, profile: str) -> None:
+        """Start the worker of one profile.
+
+        Args:
+            profile (str): Profile name, "" for the shared settings.
+        """
+        config = self.config_helper.profile(profile) if profile else self.config_helper
+        thread = APIThread(config, profile)
+        thread.worker.connection_status.connect(
+            lambda label_dict, profile=profile: self.connection_status.emit(profile, label_dict)
+        )
+        thread.worker.download_progress.connect(
+            lambda report, profile=profile: self.download_progress.emit(profile, report)
+        )
+        thread.worker.error.connect(lambda ex, profile=profile: self.error.emit(profile, ex))
+        self.threads[profile] = thread
+        thread.start()
+
+    def stop(self) -> None:
+        """Stop all workers and wait for them."""
+        # Signal all workers first, so they stop in parallel
+        for thread in self.threads.values():
+            thread.worker.stop()
+        for thread in self.threads.values():
+            thread.stop()
+        self.threads = {}
+        if self.health_server:
+            self.health_server.stop()
+            self.health_server = None
+
+    def start_health_server(self) -> None:
+        """Start the health endpoint if [health] has a port or a Unix socket."""
+        config_get = self.config_helper.get_value
+        port = int(config_get("health", "port"))
+        unix_socket = config_get("health", "unix_socket")
+        if not port and not unix_socket:
+            return
+        try:
+            self.health_server = HealthServer(health.report, config_get("health", "host"), port, unix_socket)
+        except KeyError:
+            return  # Logged, the workers run without health endpoint
+        self.health_server.start()
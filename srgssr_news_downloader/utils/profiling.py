@@ -0,0 +1,315 @@
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+# Frames of the profiler itself, left out of samples and memory statistics
+_OWN_FILES = (__file__, tracemalloc.__file__, cProfile.__file__, pstats.__file__)
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False):
+        """CPU and memory profiling of worker cycles and GUI updates, only with --PROFILE.
+
+        Code marks what is measured with begin() and end() or the profiled() decorator. Every
+        section (f.ex. "cycle-radio_a" or "gui") gets its own statistics.
+
+        Modes:
+            cprofile: Deterministic, every function call of a section is timed. Precise, but
+                slows the section down. Only one section is profiled at a time, a section that
+                starts while another one runs is skipped. Since Python 3.12 calls of other
+                threads running at the same time can show up in the statistics.
+            sampling: A background thread looks at the stacks of the threads inside a section
+                every few milliseconds. Low overhead, results in the folded stack format of
+                flame graph tools.
+
+        Statistics are written every dump interval and the files are rotated. With a memory
+        interval, tracemalloc snapshots are taken and the biggest allocation differences to the
+        previous snapshot are written.
+
+        Args:
+            enabled (bool): Turn profiling on, configure() does nothing if False. Default False.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.enabled = enabled
+        self.mode = ""  # Empty until configured
+        self.folder = "profiles"
+        self.dump_interval = 300.0
+        self.sample_interval = 0.01
+        self.memory_interval = 0.0
+        self.top = 30
+        self.keep = 20
+
+        self._local = threading.local()  # depth, section and skipped of a thread
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()  # Held by the thread that runs the cProfile
+        self._profiles = {}  # section: cProfile.Profile
+        self._next_dump = {}  # section: time.monotonic() of the next cProfile dump
+        self._active = {}  # thread id: section, for the sampler
+        self._samples = Counter()  # (section, folded stack): count
+        self._sections = Counter()  # section: number of runs since the last dump
+        self._skipped = Counter()  # section: runs not profiled since the last dump
+        self._threads_started = False
+
+    def configure(
+        self,
+        mode: str = "cprofile",
+        folder: str = "profiles",
+        dump_interval: float = 300,
+        sample_interval_ms: float = 10,
+        memory_interval: float = 300,
+        top: int = 30,
+        keep: int = 20,
+    ) -> None:
+        """Apply the settings and start the background threads. Does nothing without --PROFILE.
+
+        Args:
+            mode (str): "cprofile" or "sampling". Default "cprofile".
+            folder (str): Folder of the dumps. Default "profiles".
+            dump_interval (float): Seconds between two dumps. Default 300.
+            sample_interval_ms (float): Milliseconds between two samples. Default 10.
+            memory_interval (float): Seconds between two tracemalloc snapshots, 0 is off. Default 300.
+            top (int): Entries in the text summaries. Default 30.
+            keep (int): Files kept per kind. Default 20.
+
+        Raises:
+            KeyError: Raised for an unknown mode.
+        """
+        if not self.enabled:
+            return
+        if mode not in ("cprofile", "sampling"):
+            raise KeyError(f"Unbekannter Profiling Modus: {mode}")
+
+        with self._lock:
+            if self.mode and mode != self.mode:
+                self.log.warning(f"Profiling: Mode stays {self.mode} until restart")
+            else:
+                self.mode = mode
+            self.folder = folder
+            self.dump_interval = max(dump_interval, 1)
+            self.sample_interval = max(sample_interval_ms, 1) / 1000
+            self.memory_interval = memory_interval
+            self.top = top
+            self.keep = keep
+            os.makedirs(self.folder, exist_ok=True)
+
+            if self._threads_started:
+                return
+            self._threads_started = True
+
+        if self.mode == "sampling":
+            threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True).start()
+        if self.memory_interval > 0:
+            tracemalloc.start()
+            threading.Thread(target=self._memory_loop, name="profiler-memory", daemon=True).start()
+        self.log.info(f"Profiling: {self.mode} on, dumps in {os.path.abspath(self.folder)}")
+
+    def begin(self, section: str) -> None:
+        """Start measuring a section in the current thread. Nested sections belong to the outer one.
+
+        Args:
+            section (str): Name of the section.
+        """
+        if not self.mode:
+            return
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        if depth:
+            return
+        self._local.section = section
+
+        self._local.skipped = False
+        if self.mode == "sampling":
+            self._active[threading.get_ident()] = section
+            return
+
+        if not self._cprofile_lock.acquire(blocking=False):
+            self._local.skipped = True
+            return
+        if section not in self._profiles:
+            self._profiles[section] = cProfile.Profile()
+            self._next_dump[section] = time.monotonic() + self.dump_interval
+        try:
+            self._profiles[section].enable()
+        except ValueError:
+            # Another profiler or a debugger uses the profiling hook
+            self._local.skipped = True
+            self._cprofile_lock.release()
+
+    def end(self) -> None:
+        """Stop measuring the section of the current thread, the statistics are written when due."""
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            return
+        self._local.depth = depth - 1
+        if depth > 1:
+            return
+        section = self._local.section
+
+        with self._lock:
+            self._sections[section] += 1
+            if self._local.skipped:
+                self._skipped[section] += 1
+        if self.mode == "sampling":
+            self._active.pop(threading.get_ident(), None)
+            return
+        if self._local.skipped:
+            return
+
+        profile = self._profiles[section]
+        profile.disable()
+        due = time.monotonic() >= self._next_dump[section]
+        if due:
+            self._next_dump[section] = time.monotonic() + self.dump_interval
+            self._profiles[section] = cProfile.Profile()
+        self._cprofile_lock.release()
+        if due:
+            self._dump_cprofile(section, profile)
+
+    def _dump_cprofile(self, section: str, profile: cProfile.Profile) -> None:
+        with self._lock:
+            runs = self._sections.pop(section, 0)
+            skipped = self._skipped.pop(section, 0)
+        path = self._path("cpu", section, "pstats")
+        try:
+            stats = pstats.Stats(profile)
+            stats.dump_stats(path)
+            summary = io.StringIO()
+            stats.stream = summary
+            stats.sort_stats("cumulative").print_stats(self.top)
+            with open(f"{path[: -len('.pstats')]}.txt", "w", encoding="utf-8") as f:
+                f.write(f"{section}: {runs} runs, {skipped} not profiled, {stats.total_tt:.3f}s in profiled calls\n")
+                f.write(summary.getvalue())
+        except (OSError, TypeError) as ex:
+            # TypeError: the profile recorded no calls
+            self.log.warning(f"Profiling: Dump of {section} not written: {repr(ex)}")
+            return
+        self._rotate("cpu", "pstats")
+        self._rotate("cpu", "txt")
+        self.log.debug(f"Profiling: {section} written to {path}")
+
+    def _sample_loop(self) -> None:
+        next_dump = time.monotonic() + self.dump_interval
+        while True:
+            time.sleep(self.sample_interval)
+            frames = sys._current_frames()
+            for thread_id, section in list(self._active.items()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename not in _OWN_FILES:
+                        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self._samples[(section, ";".join(reversed(stack)))] += 1
+            del frames
+
+            if time.monotonic() >= next_dump:
+                next_dump = time.monotonic() + self.dump_interval
+                self._dump_samples()
+
+    def _dump_samples(self) -> None:
+        samples, self._samples = self._samples, Counter()
+        with self._lock:
+            runs, self._sections = self._sections, Counter()
+        if not samples:
+            return
+
+        path = self._path("samples", "all", "folded")
+        # Functions by the share of samples they were running in (self) or on the stack (total)
+        own, total = Counter(), Counter()
+        for (section, stack), count in samples.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        count = sum(samples.values())
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                for (section, stack), number in samples.items():
+                    f.write(f"{section};{stack} {number}\n")
+            with open(f"{path[: -len('.folded')]}.txt", "w", encoding="utf-8") as f:
+                f.write(f"{count} samples every {self.sample_interval * 1000:.0f} ms, runs: {dict(runs)}\n\n")
+                f.write(f"{'self %':>7} {'total %':>8}  function\n")
+                for frame, number in own.most_common(self.top):
+                    f.write(f"{number / count * 100:>7.1f} {total[frame] / count * 100:>8.1f}  {frame}\n")
+        except OSError as ex:
+            self.log.warning(f"Profiling: Samples not written: {repr(ex)}")
+            return
+        self._rotate("samples", "folded")
+        self._rotate("samples", "txt")
+
+    def _memory_loop(self) -> None:
+        filters = [tracemalloc.Filter(False, name) for name in _OWN_FILES] + [
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ]
+        previous = tracemalloc.take_snapshot().filter_traces(filters)
+        while True:
+            time.sleep(self.memory_interval)
+            snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+            current, peak = tracemalloc.get_traced_memory()
+            path = self._path("memory", "all", "txt")
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"Traced: {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n")
+                    f.write(f"Biggest changes in the last {self.memory_interval:.0f}s:\n")
+                    for stat in snapshot.compare_to(previous, "lineno")[: self.top]:
+                        f.write(f"{stat}\n")
+            except OSError as ex:
+                self.log.warning(f"Profiling: Memory snapshot not written: {repr(ex)}")
+            else:
+                self._rotate("memory", "txt")
+            previous = snapshot
+
+    def _path(self, kind: str, section: str, extension: str) -> str:
+        name = f"{kind}_{section}_{os.getpid()}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        return os.path.join(self.folder, f"{name}.{extension}")
+
+    def _rotate(self, kind: str, extension: str) -> None:
+        """Remove the oldest files of a kind, `keep` are left."""
+        try:
+            names = [
+                name for name in os.listdir(self.folder)
+                if name.startswith(f"{kind}_") and name.endswith(f".{extension}")
+            ]
+            paths = sorted((os.path.join(self.folder, name) for name in names), key=os.path.getmtime)
+            for path in paths[: max(len(paths) - self.keep, 0)]:
+                os.remove(path)
+        except OSError as ex:
+            self.log.warning(f"Profiling: Old dumps not removed: {repr(ex)}")
+
+
+def profiled(section: str):
+    """Decorator, measure a function as a section of the profiler.
+
+    Args:
+        section (str): Name of the section.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler.begin(section)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.end()
+
+        return wrapper
+
+    return decorator
+
+
+# Process wide profiler, like the --DEBUG switch of the logging
+profiler = Profiler(enabled="--PROFILE" in sys.argv)
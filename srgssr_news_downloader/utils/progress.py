@@ -0,0 +1,97 @@
+from collections import deque
+
+from srgssr_news_downloader.utils.clock import clock
+
+
+class DownloadProgress:
+    def __init__(self, total: int | None = None, updates_per_second: float = 4, deadline: float | None = None):
+        """Progress, throughput and ETA of one download, reported at a limited rate.
+
+        The download loop calls update() for every chunk. A report is only returned when the
+        last one is older than 1 / updates_per_second, so the receivers of the reports get the
+        same number of updates for small and large chunks.
+
+        Args:
+            total (int | None): Expected bytes from Content-Length, None if unknown. Default None.
+            updates_per_second (float): Maximum reports per second, 0 reports only start and end.
+                Default 4.
+            deadline (float | None): Seconds the download may take, None if there is none. Default None.
+        """
+        self.total = total
+        self.interval = 1 / updates_per_second if updates_per_second > 0 else float("inf")
+        self.deadline = deadline
+        self.received = 0
+
+        self._started = clock.monotonic()
+        self._next_report = self._started + self.interval
+        # (time, received) of the recent reports, the throughput is measured over them
+        self._samples = deque([(self._started, 0)], maxlen=8)
+
+    def update(self, size: int) -> dict | None:
+        """Count a received chunk.
+
+        Args:
+            size (int): Bytes of the chunk.
+
+        Returns:
+            dict | None: A report if one is due, else None.
+        """
+        self.received += size
+        now = clock.monotonic()
+        if now < self._next_report:
+            return None
+        self._next_report = now + self.interval
+        self._samples.append((now, self.received))
+        return self.report(now=now)
+
+    def report(self, done: bool = False, now: float | None = None) -> dict:
+        """Current state of the download.
+
+        Args:
+            done (bool): The download ended, successful or not. Default False.
+            now (float | None): clock.monotonic(), taken if None. Default None.
+
+        Returns:
+            dict: {
+                received: int,
+                total: int | None,
+                percent: float | None,
+                rate: float (bytes per second),
+                eta: float | None (seconds),
+                late: bool (the ETA is after the deadline),
+                done: bool
+            }
+        """
+        now = now or clock.monotonic()
+        first_time, first_received = self._samples[0]
+        elapsed = now - first_time
+        rate = (self.received - first_received) / elapsed if elapsed > 0 else 0.0
+
+        percent = eta = None
+        if self.total:
+            percent = min(self.received / self.total * 100, 100.0)
+            if rate > 0:
+                eta = max(self.total - self.received, 0) / rate
+
+        late = False
+        if not done and eta is not None and self.deadline is not None:
+            late = now - self._started + eta > self.deadline
+
+        return {
+            "received": self.received,
+            "total": self.total,
+            "percent": percent,
+            "rate": rate,
+            "eta": eta,
+            "late": late,
+            "done": done,
+        }
+
+
+def format_rate(rate: float) -> str:
+    """Human readable throughput, f.ex. "1.2 MB/s"."""
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if rate < 1000:
+            return f"{rate:.0f} {unit}" if unit == "B/s" else f"{rate:.1f} {unit}"
+        rate /= 1000
+    return f"{rate:.1f} GB/s"
@@ -0,0 +1,204 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+
+class Publisher:
+    def __init__(
+        self,
+        latest_path: str,
+        version_dir: str,
+        mode: str = "rename",
+        keep_versions: int = 24,
+        grace_period: int = 300,
+    ):
+        """Publish downloaded files as unique versions and switch the stable "latest" file atomically.
+
+        Every episode is written into its own file in the version folder. The "latest" file is only
+        ever replaced as a whole, either by a symlink swap or by renaming a hardlink (or copy) over it.
+        Readers that already have the old file open keep reading the old version.
+
+        Args:
+            latest_path (str): Stable path of the latest file (f.ex. ".../srf_news.mp3").
+            version_dir (str): Folder for the versioned files.
+            mode (str): "rename" or "symlink". Default "rename".
+            keep_versions (int): Minimum number of versions that are never deleted. Default 24.
+            grace_period (int): Seconds a superseded version is kept for readers. Default 300.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.latest_path = latest_path
+        self.version_dir = version_dir
+        self.mode = mode
+        self.keep_versions = keep_versions
+        self.grace_period = grace_period
+
+        self.temp_suffix = ".part"
+        self.version_ext = os.path.splitext(latest_path)[1] or ".mp3"
+
+        if self.mode not in ("rename", "symlink"):
+            raise KeyError("Publish Modus in Konfiguration fehlerhaft.")
+
+    def create_temp_file(self) -> str:
+        """Create an empty temporary file in the version folder to write a download into.
+
+        Returns:
+            str: Path of the temporary file.
+        """
+        os.makedirs(self.version_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=self.temp_suffix, dir=self.version_dir)
+        os.close(fd)
+        return temp_path
+
+    def discard(self, temp_path: str) -> None:
+        """Remove a temporary file of a failed or rejected download.
+
+        Args:
+            temp_path (str): Path returned by create_temp_file().
+        """
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        except OSError as ex:
+            self.log.warning(f"Publisher: Could not remove temporary file {temp_path}: {repr(ex)}")
+
+    def publish(self, temp_path: str, version_name: str) -> str:
+        """Move a completely written temporary file to its version path and switch "latest" to it.
+
+        Args:
+            temp_path (str): Path returned by create_temp_file().
+            version_name (str): Filename of the version without extension.
+
+        Returns:
+            str: Path of the published version file.
+        """
+        version_path = self._unique_version_path(version_name)
+        os.replace(temp_path, version_path)
+        self._switch_latest(version_path)
+        self.log.debug(f"Publisher: {self.latest_path} -> {version_path}")
+
+        try:
+            self.collect_garbage()
+        except OSError as ex:
+            self.log.warning(f"Publisher: Error while removing old versions: {repr(ex)}")
+
+        return version_path
+
+    def current_version(self) -> str | None:
+        """Return the version file "latest" currently points to, if it can be determined.
+
+        Returns:
+            str | None: Path of the version file or None.
+        """
+        if os.path.islink(self.latest_path):
+            target = os.readlink(self.latest_path)
+            return os.path.normpath(os.path.join(os.path.dirname(self.latest_path), target))
+
+        if not os.path.exists(self.latest_path):
+            return None
+
+        for version_path in self.list_versions():
+            try:
+                if os.path.samefile(version_path, self.latest_path):
+                    return version_path
+            except OSError:
+                continue
+        return None
+
+    def list_versions(self) -> list[str]:
+        """List all published version files, newest first.
+
+        Returns:
+            list[str]: Paths of the version files.
+        """
+        if not os.path.isdir(self.version_dir):
+            return []
+
+        versions = [
+            os.path.join(self.version_dir, name)
+            for name in os.listdir(self.version_dir)
+            if name.endswith(self.version_ext)
+        ]
+        return sorted(versions, key=os.path.getmtime, reverse=True)
+
+    def collect_garbage(self) -> None:
+        """Delete old versions and stale temporary files.
+
+        A version is only deleted when it is not among the newest `keep_versions`, is not the current
+        "latest" and was superseded more than `grace_period` seconds ago. Readers that opened it
+        shortly before the switch can therefore always finish reading.
+        """
+        now = time.time()
+        current = self.current_version()
+        versions = self.list_versions()
+        # Read before anything is removed, the next newer version may be removed first
+        published_at = [os.path.getmtime(version_path) for version_path in versions]
+
+        for index, version_path in enumerate(versions):
+            if index < self.keep_versions or version_path == current:
+                continue
+            # The version was superseded when the next newer version got published
+            superseded_at = published_at[index - 1]
+            if now - superseded_at > self.grace_period:
+                self.log.debug(f"Publisher: Removing old version {version_path}")
+                os.remove(version_path)
+
+        # Leftovers from crashed downloads
+        for name in os.listdir(self.version_dir):
+            temp_path = os.path.join(self.version_dir, name)
+            if name.endswith(self.temp_suffix) and now - os.path.getmtime(temp_path) > self.grace_period:
+                self.discard(temp_path)
+
+    def _unique_version_path(self, version_name: str) -> str:
+        version_path = os.path.join(self.version_dir, f"{version_name}{self.version_ext}")
+        count = 1
+        while os.path.exists(version_path):
+            version_path = os.path.join(self.version_dir, f"{version_name}_{count}{self.version_ext}")
+            count += 1
+        return version_path
+
+    def _switch_latest(self, version_path: str) -> None:
+        if self.mode == "symlink":
+            try:
+                self._switch_symlink(version_path)
+                return
+            except OSError as ex:
+                # Windows needs special privileges for symlinks
+                self.log.warning(f"Publisher: Symlink not possible, fallback to rename: {repr(ex)}")
+                self.mode = "rename"
+
+        self._switch_rename(version_path)
+
+    def _switch_symlink(self, version_path: str) -> None:
+        temp_link = f"{self.latest_path}.link{self.temp_suffix}"
+        if os.path.lexists(temp_link):
+            os.remove(temp_link)
+
+        target = os.path.relpath(version_path, os.path.dirname(self.latest_path) or ".")
+        os.symlink(target, temp_link)
+        os.replace(temp_link, self.latest_path)
+
+    def _switch_rename(self, version_path: str) -> None:
+        temp_latest = f"{self.latest_path}{self.temp_suffix}"
+        if os.path.lexists(temp_latest):
+            os.remove(temp_latest)
+
+        try:
+            os.link(version_path, temp_latest)
+        except OSError:
+            # Hardlinks are not supported on every share
+            shutil.copyfile(version_path, temp_latest)
+
+        # Windows refuses to replace a file that a reader holds open without delete sharing
+        for attempt in range(3):
+            try:
+                os.replace(temp_latest, self.latest_path)
+                return
+            except PermissionError:
+                if attempt == 2:
+                    self.discard(temp_latest)
+                    raise
+                time.sleep(0.5)
@@ -0,0 +1,308 @@
+import json
+import logging
+import os
+import threading
+from email.utils import parsedate_to_datetime
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.file_lock import exclusive_file_lock
+from srgssr_news_downloader.utils.metrics import metrics
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after: float):
+        """Raised when the API answered with 429 Too Many Requests.
+
+        Args:
+            retry_after (float): Seconds to wait before the next request.
+        """
+        super().__init__(f"Rate limit reached, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None, default: float = 60) -> float:
+    """Parse a Retry-After header, given in seconds or as HTTP date.
+
+    Args:
+        value (str | None): Header value.
+        default (float): Returned if the header is missing or invalid. Default 60.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    if not value:
+        return default
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_datetime = parsedate_to_datetime(value)
+        return max((retry_datetime - clock.now(retry_datetime.tzinfo)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """Classic token bucket, refilled continuously.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens (burst size).
+        """
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._last = clock.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1, timeout: float | None = None) -> bool:
+        """Take tokens, wait until enough are available.
+
+        Args:
+            tokens (float): Tokens to take. Default 1.
+            timeout (float | None): Maximum wait in seconds, None waits forever.
+
+        Returns:
+            bool: False if the timeout expired.
+        """
+        deadline = None if timeout is None else clock.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = clock.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                # A shortfall from rounding the refill is too small for any clock to wait for
+                if now >= self._blocked_until and self._tokens >= tokens * (1 - 1e-9):
+                    self._tokens -= tokens
+                    return True
+
+                wait = max(self._blocked_until - now, (tokens - self._tokens) / self.rate)
+
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            clock.sleep(min(wait, 1))
+
+    def block(self, seconds: float) -> None:
+        """Hand out no tokens for some time, f.ex. after a Retry-After.
+
+        Args:
+            seconds (float): Duration of the block.
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, clock.monotonic() + seconds)
+            self._tokens = 0
+
+    def blocked_for(self) -> float:
+        """Seconds until the bucket hands out tokens again after a block."""
+        with self._lock:
+            return max(self._blocked_until - clock.monotonic(), 0)
+
+
+class QuotaCounter:
+    def __init__(self, daily_limit: int = 0, state_file: str = ""):
+        """Count the API requests of the current day.
+
+        With a state file the count is shared between all instances that use the same file,
+        f.ex. on a network share.
+
+        Args:
+            daily_limit (int): Requests per day, 0 if unknown. Default 0.
+            state_file (str): Optional JSON file for the shared count. Default "".
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.daily_limit = daily_limit
+        self.state_file = state_file
+
+        self._day = clock.today().isoformat()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        """Requests counted today."""
+        with self._lock:
+            if self._day != clock.today().isoformat():
+                self._day, self._used = clock.today().isoformat(), 0
+            return self._used
+
+    def count(self, requests: int = 1) -> int:
+        """Count requests.
+
+        Args:
+            requests (int): Number of requests. Default 1.
+
+        Returns:
+            int: Requests used today.
+        """
+        with self._lock:
+            today = clock.today().isoformat()
+            if self._day != today:
+                self._day, self._used = today, 0
+
+            if self.state_file:
+                try:
+                    self._used = self._update_state_file(today, requests)
+                    return self._used
+                except OSError as ex:
+                    self.log.warning(f"Quota: State file not usable, counting locally: {repr(ex)}")
+
+            self._used += requests
+            return self._used
+
+    def remaining(self) -> int | None:
+        """Requests left today or None if the limit is unknown."""
+        if not self.daily_limit:
+            return None
+        return max(self.daily_limit - self.used, 0)
+
+    def _update_state_file(self, today: str, requests: int) -> int:
+        with exclusive_file_lock(f"{self.state_file}.lock"):
+            state = {}
+            if os.path.exists(self.state_file):
+                with open(self.state_file, encoding="utf-8") as f:
+                    state = json.load(f)
+            used = state.get("used", 0) if state.get("day") == today else 0
+            used += requests
+
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"day": today, "used": used}, f)
+            os.replace(temp_file, self.state_file)
+            return used
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 30,
+        burst: int = 5,
+        daily_limit: int = 0,
+        state_file: str = "",
+    ):
+        """Client side limiter for the requests of one API credential.
+
+        Args:
+            name (str): Name used in logs and metrics (f.ex. the client id).
+            requests_per_minute (float): Sustained request rate. Default 30.
+            burst (int): Requests allowed at once. Default 5.
+            daily_limit (int): Daily quota of the credential, 0 if unknown. Default 0.
+            state_file (str): Optional file to share the quota count between instances. Default "".
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.name = name
+        self.bucket = TokenBucket(requests_per_minute / 60, burst)
+        self.quota = QuotaCounter(daily_limit, state_file)
+
+    def before_request(self, timeout: float | None = 60) -> None:
+        """Wait for a token and count the request.
+
+        Args:
+            timeout (float | None): Maximum wait in seconds. Default 60.
+
+        Raises:
+            RateLimitError: Raised if no token is available in time.
+        """
+        if not self.bucket.acquire(timeout=timeout):
+            raise RateLimitError(self.bucket.blocked_for() or 1)
+
+        used = self.quota.count()
+        metrics.inc("api_requests_total", credential=self.name)
+        metrics.set("api_quota_used", used, credential=self.name)
+        if self.quota.daily_limit:
+            metrics.set("api_quota_limit", self.quota.daily_limit, credential=self.name)
+
+    def after_response(self, response) -> None:
+        """Check a response for rate limiting.
+
+        Args:
+            response: The response of the request.
+
+        Raises:
+            RateLimitError: Raised on 429 Too Many Requests.
+        """
+        if response.status_code != 429:
+            return
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        self.bucket.block(retry_after)
+        metrics.inc("api_rate_limited_total", credential=self.name)
+        self.log.warning(f"Rate limit: 429 received, pausing requests for {retry_after:.0f}s")
+        raise RateLimitError(retry_after)
+
+    def recommended_interval(self, base_interval: float, requests_per_cycle: float = 1) -> float:
+        """Polling interval that makes the remaining quota last until midnight.
+
+        The interval grows smoothly as the quota gets used up and is never shorter than the base.
+
+        Args:
+            base_interval (float): Configured interval in seconds.
+            requests_per_cycle (float): API requests per polling cycle. Default 1.
+
+        Returns:
+            float: Interval in seconds.
+        """
+        interval = base_interval
+        remaining = self.quota.remaining()
+        if remaining is not None:
+            now = clock.now()
+            seconds_left = 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+            if remaining <= requests_per_cycle:
+                interval = max(interval, seconds_left)
+            else:
+                interval = max(interval, seconds_left * requests_per_cycle / remaining)
+
+        interval = max(interval, self.bucket.blocked_for())
+        metrics.set("api_poll_interval_seconds", interval, credential=self.name)
+        return interval
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(client_id: str, **settings) -> RateLimiter:
+    """Return the process wide limiter of a credential, all workers with the same client id share it.
+
+    Args:
+        client_id (str): API client id.
+        **settings: Arguments for RateLimiter, applied to an existing limiter as well.
+
+    Returns:
+        RateLimiter: Shared limiter.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(client_id)
+        if limiter is None:
+            limiter = RateLimiter(client_id[:8] or "default", **settings)
+            _limiters[client_id] = limiter
+        else:
+            # Settings may have changed in the configuration, the counts are kept
+            if "requests_per_minute" in settings:
+                limiter.bucket.rate = settings["requests_per_minute"] / 60
+            if "burst" in settings:
+                limiter.bucket.capacity = settings["burst"]
+            if "daily_limit" in settings:
+                limiter.quota.daily_limit = settings["daily_limit"]
+            if "state_file" in settings:
+                limiter.quota.state_file = settings["state_file"]
+        return limiter
+
+
+def register_rate_limiter(client_id: str, limiter: RateLimiter) -> None:
+    """Use a prepared limiter for a credential, f.ex. one that is backed by the process pool broker.
+
+    Args:
+        client_id (str): API client id.
+        limiter (RateLimiter): Limiter returned by get_rate_limiter() from now on.
+    """
+    with _limiters_lock:
+        _limiters[client_id] = limiter
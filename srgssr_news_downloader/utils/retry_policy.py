@@ -0,0 +1,230 @@
+import logging
+import random
+import threading
+
+import requests
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.metrics import metrics
+from srgssr_news_downloader.utils.rate_limiter import RateLimitError
+
+
+class ServerError(Exception):
+    def __init__(self, status_code: int):
+        """Raised when a server answered with a 5xx status.
+
+        Args:
+            status_code (int): HTTP status code.
+        """
+        super().__init__(f"Server error {status_code}")
+        self.status_code = status_code
+
+
+class AuthError(RuntimeError):
+    """Raised when the API rejected the token (401)."""
+
+
+def classify(ex: Exception) -> str:
+    """Map an exception to the error class that decides the backoff curve.
+
+    Args:
+        ex (Exception): Raised exception.
+
+    Returns:
+        str: "connect", "timeout", "server", "auth", "rate_limit" or "other".
+    """
+    if isinstance(ex, RateLimitError):
+        return "rate_limit"
+    if isinstance(ex, AuthError):
+        return "auth"
+    if isinstance(ex, ServerError):
+        return "server"
+    if isinstance(ex, (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError)):
+        return "connect"
+    if isinstance(ex, requests.exceptions.Timeout):
+        return "timeout"
+    return "other"
+
+
+class BackoffCurve:
+    def __init__(self, first: float, base: float, factor: float, maximum: float):
+        """Exponential backoff with jitter.
+
+        Args:
+            first (float): Delay before the first retry (no jitter), f.ex. 0 for an immediate retry.
+            base (float): Upper bound of the second delay in seconds.
+            factor (float): Growth per attempt.
+            maximum (float): Upper bound of all delays in seconds.
+        """
+        self.first = first
+        self.base = base
+        self.factor = factor
+        self.maximum = maximum
+
+    def delay(self, attempt: int) -> float:
+        """Delay before a retry.
+
+        Args:
+            attempt (int): Number of failures in a row, starting at 0.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        if attempt == 0:
+            return self.first
+        cap = min(self.maximum, self.base * self.factor ** (attempt - 1))
+        # Jitter spreads the retries of many clients over the upper half of the window
+        return random.uniform(cap / 2, cap)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    MIN_WAIT = 1.0  # Seconds waited at least while the circuit is not closed
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60, max_reset_timeout: float = 900):
+        """Stop calling an endpoint after repeated failures, probe it again after a timeout.
+
+        Args:
+            failure_threshold (int): Failures in a row that open the circuit. Default 5.
+            reset_timeout (float): Seconds until the first probe. Default 60.
+            max_reset_timeout (float): Upper bound, the timeout doubles after each failed probe. Default 900.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self._timeout = reset_timeout
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check if a call may be made.
+
+        In half open state only one probe is allowed. A probe without recorded outcome (f.ex. the
+        call was skipped or failed in a way that does not count) expires after the timeout and
+        the next probe is handed out, so the circuit can not stay half open.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if clock.monotonic() - self._opened_at >= self._timeout:
+                self.state = self.HALF_OPEN
+                self._opened_at = clock.monotonic()  # Start of the probe
+                return True
+            return False
+
+    def remaining(self) -> float:
+        """Seconds until the next probe is allowed, 0 only if the circuit is closed."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(self._timeout - (clock.monotonic() - self._opened_at), self.MIN_WAIT)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._timeout = self.reset_timeout
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self._timeout = min(max(self._timeout * 2, self.MIN_WAIT), self.max_reset_timeout)
+                self._open()
+            elif self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = clock.monotonic()
+
+
+class RetryPolicy:
+    def __init__(self, update_cycle: float, failure_threshold: int = 5, reset_timeout: float = 60):
+        """Retry delays and circuit breakers for all remote calls of a worker.
+
+        Every endpoint ("oauth", "api", "media") has its own attempt count and circuit breaker.
+        The delay depends on the error class of the failure.
+
+        Args:
+            update_cycle (float): Configured update cycle, upper bound for most curves.
+            failure_threshold (int): Failures in a row that open a circuit. Default 5.
+            reset_timeout (float): Seconds until an open circuit gets probed. Default 60.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        maximum = max(update_cycle * 10, 60)
+        self.curves = {
+            "connect": BackoffCurve(first=5, base=10, factor=2, maximum=maximum),
+            "timeout": BackoffCurve(first=10, base=20, factor=2, maximum=maximum),
+            "server": BackoffCurve(first=15, base=30, factor=2, maximum=maximum),
+            # A rejected token is renewed right away once, then the retries slow down
+            "auth": BackoffCurve(first=0, base=max(update_cycle, 5), factor=2, maximum=maximum),
+            "rate_limit": BackoffCurve(first=update_cycle, base=update_cycle * 2, factor=2, maximum=maximum),
+            "other": BackoffCurve(first=update_cycle, base=update_cycle, factor=2, maximum=maximum),
+        }
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0  # All failed calls, for the performance history
+
+        self._attempts = {}
+        self._breakers = {}
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Return the circuit breaker of an endpoint."""
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self._breakers[endpoint]
+
+    def allow(self, endpoint: str) -> bool:
+        """Check if the endpoint may be called now."""
+        return self.breaker(endpoint).allow()
+
+    def success(self, endpoint: str) -> None:
+        """Record a successful call, resets backoff and circuit."""
+        self._attempts[endpoint] = 0
+        self.breaker(endpoint).record_success()
+        metrics.set("circuit_open", 0, endpoint=endpoint)
+
+    def failure(self, endpoint: str, ex: Exception) -> float:
+        """Record a failed call.
+
+        Args:
+            endpoint (str): Called endpoint.
+            ex (Exception): Raised exception.
+
+        Returns:
+            float: Seconds to wait before the next attempt.
+        """
+        error_class = classify(ex)
+        self.failures += 1
+        attempt = self._attempts.get(endpoint, 0)
+        self._attempts[endpoint] = attempt + 1
+
+        delay = self.curves[error_class].delay(attempt)
+        if isinstance(ex, RateLimitError):
+            delay = max(delay, ex.retry_after)
+
+        breaker = self.breaker(endpoint)
+        # Only failures of the endpoint itself count for the circuit, not rate limiting.
+        # A failed probe reopens the circuit whatever the reason, else it would stay half open.
+        if error_class in ("connect", "timeout", "server") or breaker.state == CircuitBreaker.HALF_OPEN:
+            breaker.record_failure()
+            if breaker.state == CircuitBreaker.OPEN:
+                self.log.warning(f"Retry: Circuit for {endpoint} open for {breaker.remaining():.0f}s")
+                metrics.set("circuit_open", 1, endpoint=endpoint)
+                delay = max(delay, breaker.remaining())
+
+        metrics.inc("remote_errors_total", endpoint=endpoint, error_class=error_class)
+        self.log.info(f"Retry: {endpoint} failed ({error_class}, attempt {attempt + 1}), retry in {delay:.1f}s")
+        return delay
+
+    def wait_time(self, endpoint: str) -> float:
+        """Seconds until an open circuit of the endpoint allows a probe."""
+        return self.breaker(endpoint).remaining()
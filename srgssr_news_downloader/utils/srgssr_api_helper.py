@@ -1,7 +1,10 @@
-import logging
+import hashlib
 import os
+import socket
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 
 import requests
 import validators
@@ -9,10 +12,56 @@ from PyQt6.QtCore import QObject, QThread
 from PyQt6.QtCore import pyqtSignal as Signal
 from requests.auth import HTTPBasicAuth
 
+from srgssr_news_downloader.utils.bandwidth import (
+    in_airtime_window,
+    seconds_until_airtime,
+    shaper,
+)
+from srgssr_news_downloader.utils.bulletin_server import BulletinServer, get_publish_events
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.clock_skew import clock_skew
+from srgssr_news_downloader.utils.dns_cache import dns_cache
+from srgssr_news_downloader.utils.download_history import DownloadHistory
+from srgssr_news_downloader.utils.health import health
+from srgssr_news_downloader.utils.http_client import (
+    HTTPClient,
+    acquire_http_client,
+    release_http_client,
+)
+from srgssr_news_downloader.utils.leader_election import LeaderElector, create_lease
+from srgssr_news_downloader.utils.logging_setup import get_logger
+from srgssr_news_downloader.utils.media_probe import MediaProbe
+from srgssr_news_downloader.utils.metrics import metrics
+from srgssr_news_downloader.utils.mp3_validator import (
+    MP3StreamValidator,
+    MP3ValidationError,
+)
+from srgssr_news_downloader.utils.notifiers import (
+    CommandNotifier,
+    NotificationDispatcher,
+    UnixSocketNotifier,
+    WebhookNotifier,
+)
+from srgssr_news_downloader.utils.perf_history import get_perf_history
+from srgssr_news_downloader.utils.pipeline import Pipeline, PipelineError
+from srgssr_news_downloader.utils.profiling import profiler
+from srgssr_news_downloader.utils.progress import DownloadProgress
+from srgssr_news_downloader.utils.publisher import Publisher
+from srgssr_news_downloader.utils.rate_limiter import RateLimitError, get_rate_limiter
+from srgssr_news_downloader.utils.retry_policy import AuthError, RetryPolicy, ServerError
+from srgssr_news_downloader.utils.storage import MB, StorageError, StorageWriter, create_storage
+from srgssr_news_downloader.utils.throughput import ThroughputEstimator
+from srgssr_news_downloader.utils.token_store import token_store
+from srgssr_news_downloader.utils.tracing import traced, tracer
+
+# API keys of the audio renditions, best first
+RENDITIONS = (("hd", "podcastHdUrl"), ("sd", "podcastSdUrl"))
+
 
 class APIWorker(QObject):
     # Communication signals
     connection_status = Signal(dict)
+    download_progress = Signal(dict)
     error = Signal(object)
 
     """
@@ -27,13 +76,16 @@ class APIWorker(QObject):
             }
         }
 
+    download_progress (dict): DownloadProgress.report(), a few times per second while downloading
+
     error (object): Exception Object, only called in uncaught exceptions
     """
 
-    def __init__(self, config_helper=object):
+    def __init__(self, config_helper=object, profile: str = "", http_client: HTTPClient | None = None):
         super().__init__()
 
-        self.log = logging.getLogger("news_downloader")
+        self.profile = profile
+        self.log = get_logger(profile)
 
         self.config_helper = config_helper
 
@@ -45,10 +97,60 @@ class APIWorker(QObject):
         self.api_url = str
         self.business_unit = str
         self.update_cycle = int
+        self.revalidate_window = int
 
         self.filepath = str
         self.filename = str
         self.savepath = str
+        self.version_filename = str
+        self.publisher = None
+        self.validation_enabled = bool
+        self.min_duration = float
+        self.max_junk_bytes = int
+        self.last_validator = None
+        self.pipeline = None
+        self.archive = None
+        self.archive_key = str
+        self.archive_threads = []  # Uploads completed in the background
+        self.dns_cache_installed = False
+        self.history = None
+        self.published_hash = None
+
+        self.rate_limiter = None
+        self.retry_policy = None
+        self.http = http_client or HTTPClient()
+        self.http_key = None  # (client ID, HTTP version) of the shared client
+        self.http_injected = http_client is not None  # F.ex. a replay, used instead of the shared client
+        self.clock_correction = bool
+        self.last_publish_lag = None  # Seconds between episode date and publication of the last file
+        self.media_probe = MediaProbe(self.http)
+
+        self.server_enabled = bool
+        self.server_host = str
+        self.server_port = int
+        self.bulletin_server = None
+
+        self.ha_enabled = bool
+        self.leader_elector = None
+        self.is_leader = True
+        self.publish_events = get_publish_events(self.profile)
+        self.notification_dispatcher = None
+        self.last_download_url = ""
+        self.last_download_rendition = "hd"
+        self.throughput = ThroughputEstimator()
+        self.max_download_seconds = int
+        self.deadline_margin = int
+        self.progress_updates = float
+        self.airtime_minutes = []
+        self.prewarm_lead_time = int
+        self.prewarm_window = int
+        self.publish_interval = int
+        self.media_hosts = []  # Recently used media URLs, one per host
+        self.last_prewarm = 0.0
+        self.perf_history = None
+        self.cycle_sample = {}  # Measurements of the running cycle for the performance history
+        self.health = health.register(profile)
+        self.stop_requested = False  # False when the loop ends on its own, f.ex. after an error
 
         self.response_content = {}
 
@@ -75,15 +177,189 @@ class APIWorker(QObject):
         self.api_url = config_get("api", "api_url")
         self.business_unit = config_get("api", "business_unit")
         self.update_cycle = int(config_get("api", "update_cycle"))
+        self.revalidate_window = int(config_get("api", "revalidate_window"))
 
         self.filepath = config_get("audio_file", "filepath")
         self.filename = config_get("audio_file", "filename")
         self.savepath = f"{self.filepath}/{self.filename}"
 
+        self.clock_correction = self.config_helper.get_bool("http", "clock_correction")
+
+        self.retry_policy = RetryPolicy(
+            self.update_cycle,
+            failure_threshold=int(config_get("retry", "failure_threshold")),
+            reset_timeout=float(config_get("retry", "reset_timeout")),
+        )
+
         # Reformat
         self.api_url = self.api_url.format(bu=self.business_unit)
         self.savepath = self.savepath.format(bu=self.business_unit)
 
+        # Versioned publishing
+        self.version_filename = config_get("publish", "version_filename")
+        self.publisher = Publisher(
+            latest_path=f"{self.savepath}.mp3",
+            version_dir=os.path.join(
+                self.filepath, config_get("publish", "version_folder")
+            ),
+            mode=config_get("publish", "mode"),
+            keep_versions=int(config_get("publish", "keep_versions")),
+            grace_period=int(config_get("publish", "gc_grace_period")),
+        )
+
+        self.history = DownloadHistory(
+            os.path.join(
+                self.filepath,
+                config_get("publish", "version_folder"),
+                config_get("publish", "history_filename"),
+            )
+        )
+        self.published_hash = None
+
+        # Helpers of this worker log with the profile prefix
+        for helper in (self.retry_policy, self.publisher, self.history, self.media_probe):
+            helper.log = self.log
+
+        # Local bulletin server
+        self.server_enabled = self.config_helper.get_bool("server", "enabled")
+        self.ha_enabled = self.config_helper.get_bool("ha", "enabled")
+        self.server_host = config_get("server", "host")
+        self.server_port = int(config_get("server", "port"))
+
+        # Media downloads
+        airtime_minutes = config_get("download", "airtime_minutes")
+        self.airtime_minutes = [int(m) for m in airtime_minutes.split(",") if m.strip()]
+        self.max_download_seconds = int(config_get("download", "max_download_seconds"))
+        self.deadline_margin = int(config_get("download", "deadline_margin"))
+        self.progress_updates = float(config_get("download", "progress_updates"))
+
+        # Connection pre-warming
+        self.prewarm_lead_time = int(config_get("prewarm", "lead_time"))
+        self.prewarm_window = int(config_get("prewarm", "window"))
+        self.publish_interval = int(config_get("prewarm", "publish_interval"))
+
+        # Measurements of every cycle, shown in the performance window
+        history_days = float(config_get("performance", "history_days"))
+        self.perf_history = get_perf_history(
+            self.profile, int(history_days * 86400 / max(self.update_cycle, 1))
+        )
+        self.health.stall_timeout = float(config_get("health", "stall_timeout"))
+        self.health.max_poll_age = float(config_get("health", "max_poll_age"))
+
+        # Name of the copy in the archive
+        self.archive_key = config_get("archive", "key")
+
+        # File validation
+        self.validation_enabled = self.config_helper.get_bool("validation", "enabled")
+        self.min_duration = float(config_get("validation", "min_duration"))
+        self.max_junk_bytes = int(config_get("validation", "max_junk_bytes"))
+
+    def start_shared_services(self):
+        """Configure and acquire what the worker shares with the process, called by run().
+
+        HTTP client and rate limiter of the credential, download shaper, DNS cache, tracer and
+        profiler, the pipeline and the archive. Undone by stop_shared_services().
+
+        Raises:
+            KeyError: Raised for an unknown HTTP version, pipeline stage, profiling mode or archive backend.
+        """
+        config_get = self.config_helper.get_value
+
+        # Rate limit, shared by all workers with the same credentials
+        self.rate_limiter = get_rate_limiter(
+            self.client_id,
+            requests_per_minute=float(config_get("ratelimit", "requests_per_minute")),
+            burst=int(config_get("ratelimit", "burst")),
+            daily_limit=int(config_get("ratelimit", "daily_quota")),
+            state_file=config_get("ratelimit", "state_file"),
+        )
+        # Connections, shared by all workers with the same credentials
+        http_key = (self.client_id, config_get("http", "version"))
+        if http_key != self.http_key and not self.http_injected:
+            release_http_client(self.http)
+            self.http = acquire_http_client(*http_key, self.rate_limiter)
+            self.media_probe.http = self.http
+            self.http_key = http_key
+        self.http.rate_limiter = self.rate_limiter
+
+        # Bandwidth of media downloads, shared by all workers of the process
+        shaper.configure(
+            max_rate=int(config_get("download", "max_rate_kbps")) * 1024,
+            airtime_minutes=self.airtime_minutes,
+            burst_until=int(config_get("download", "burst_until")),
+            cap_duration=int(config_get("download", "cap_duration")),
+            max_concurrent=int(config_get("download", "max_concurrent")),
+        )
+
+        dns_cache.ttl = int(config_get("prewarm", "dns_ttl"))
+        if dns_cache.ttl and not self.dns_cache_installed:
+            dns_cache.install()
+            self.dns_cache_installed = True
+
+        # Stage timings of every cycle, for the whole process
+        tracer.configure(
+            config_get("tracing", "file") if self.config_helper.get_bool("tracing", "enabled") else "",
+            max_bytes=int(config_get("tracing", "max_size_mb")) * 1024 * 1024,
+        )
+        # CPU and memory hot spots, only when started with --PROFILE
+        profiler.configure(
+            mode=config_get("profiling", "mode"),
+            folder=config_get("profiling", "folder"),
+            dump_interval=float(config_get("profiling", "dump_interval")),
+            sample_interval_ms=float(config_get("profiling", "sample_interval_ms")),
+            memory_interval=float(config_get("profiling", "memory_interval")),
+            top=int(config_get("profiling", "top")),
+            keep=int(config_get("profiling", "keep")),
+        )
+
+        # Post-processing of downloads before they are published
+        stages = [stage.strip() for stage in config_get("pipeline", "stages").split(",") if stage.strip()]
+        if stages:
+            self.pipeline = Pipeline(
+                stages,
+                optional=[stage.strip() for stage in config_get("pipeline", "optional").split(",") if stage.strip()],
+                processes=int(config_get("pipeline", "processes")),
+                timeout=float(config_get("pipeline", "timeout")),
+                cache_folder=config_get("pipeline", "cache_folder"),
+                cache_entries=int(config_get("pipeline", "cache_entries")),
+                cache_bytes=int(float(config_get("pipeline", "cache_size_mb")) * MB),
+                options=self.config_helper.get_section("pipeline"),
+                name=self.profile,
+            )
+            self.pipeline.log = self.log
+
+        # Copy of every download in an archive, written while downloading
+        self.archive = create_storage(
+            config_get("archive", "backend"),
+            folder=config_get("archive", "folder"),
+            endpoint=config_get("archive", "endpoint"),
+            bucket=config_get("archive", "bucket"),
+            access_key=config_get("archive", "access_key"),
+            secret_key=config_get("archive", "secret_key"),
+            region=config_get("archive", "region"),
+            part_size=int(float(config_get("archive", "part_size_mb")) * MB),
+            queue_parts=int(config_get("archive", "queue_parts")),
+            timeout=float(config_get("archive", "timeout")),
+        )
+        if self.archive:
+            self.archive.log = self.log
+
+    def stop_shared_services(self):
+        """Give back what start_shared_services() acquired, at the end of run()."""
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+        self.wait_for_archive()
+        self.archive = None
+        if self.dns_cache_installed:
+            dns_cache.uninstall()
+            self.dns_cache_installed = False
+        if not self.http_injected:
+            release_http_client(self.http)
+            self.http = HTTPClient()
+            self.media_probe.http = self.http
+            self.http_key = None
+
     def test_configuration(self):
         """Testing and validating the configurations.
 
@@ -108,7 +384,7 @@ class APIWorker(QObject):
             raise KeyError("OAUTH URL fehlerhaft")
 
         try:  # Oauth Connection Test
-            test_oauth_url = requests.get(self.oauth_url)
+            test_oauth_url = self.http.get(self.oauth_url, rate_limited=True)
             self.log.debug(f"oAuth connection test: {test_oauth_url.status_code}")
             if not test_oauth_url.status_code == 401:
                 raise KeyError("Verbindung zu oAuth Server nicht erfolgreich.")
@@ -123,7 +399,7 @@ class APIWorker(QObject):
             raise KeyError("API URL fehlerhaft")
 
         try:  # API Connection Test
-            test_api_url = requests.get(self.api_url)
+            test_api_url = self.http.get(self.api_url, rate_limited=True)
             self.log.debug(f"API connection test: {test_api_url.status_code}")
             if not test_api_url.status_code == 401:
                 raise KeyError("Verbindung zu API Server nicht erfolgreich.")
@@ -143,16 +419,38 @@ class APIWorker(QObject):
         if not self.filename:
             raise KeyError("Kein Dateiname in Konfiguration.")
 
+    @traced("get_auth_token")
     def get_auth_token(self):
-        """Fetch API Token from oAuth Server and save token in variable.
+        """Get an API Token, shared or from the oAuth Server, and save token in variable.
 
         Raises:
             RuntimeError: Raised in case of bad status code.
+            ServerError: Raised on a 5xx status.
+            KeyError: Raised in case the token is missing in response or the shared token lock
+                was not acquired in time.
+        """
+        key = (self.oauth_url, self.client_id, self.client_secret)
+        # Profiles with the same credentials share one token
+        with token_store.lock(key):
+            self.oauth_token = token_store.get(key)
+            if self.oauth_token:
+                self.log.debug("oAuth API: Using shared token.")
+                return
+            self.request_auth_token()
+            token_store.put(key, self.oauth_token)
+
+    def request_auth_token(self):
+        """Request a new token from the oAuth Server.
+
+        Raises:
+            RuntimeError: Raised in case of bad status code.
+            ServerError: Raised on a 5xx status.
             KeyError: Raised in case the token is missing in response.
         """
         data = {"grant_type": "client_credentials"}
-        response = requests.post(
+        response = self.http.post(
             self.oauth_url,
+            rate_limited=True,
             data=data,
             auth=HTTPBasicAuth(self.client_id, self.client_secret),
         )
@@ -174,6 +472,10 @@ class APIWorker(QObject):
             )
             raise RuntimeError()
 
+        if response.status_code >= 500:
+            self.log.error(f"oAuth API: Server error. Status: {response.status_code}")
+            raise ServerError(response.status_code)
+
         if not response.status_code == 200:
             self.log.error(
                 f"oAuth API: Error handling oauth request. Status: {response.status_code}"
@@ -200,11 +502,13 @@ class APIWorker(QObject):
             self.log.error(f"oAuth API: Server Response -> {response.text}")
             raise KeyError()
 
+    @traced("get_news_data")
     def get_news_data(self):
         """Fetch News data from SRG API and save data in variable.
 
         Raises:
-            RuntimeError: Raised if the auth token is invalid.
+            AuthError: Raised if the auth token is invalid.
+            ServerError: Raised on a 5xx status.
         """
         request_url = self.api_url
         headers = {
@@ -212,40 +516,537 @@ class APIWorker(QObject):
             "Content-Type": "application/json",
         }
 
-        response = requests.get(request_url, headers=headers)
+        start_time = clock.monotonic()
+        response = self.http.get(request_url, headers=headers, rate_limited=True)
+        self.cycle_sample["poll_latency"] = clock.monotonic() - start_time
         if response.status_code == 401:
-            raise RuntimeError()
+            raise AuthError()
+        if response.status_code >= 500:
+            raise ServerError(response.status_code)
         self.response_content = response.json()
         self.log.debug(self.response_content)
 
-    def download(self):
-        if "podcastHdUrl" not in self.latest_file_dict:
-            raise KeyError()
-        
-        mp3 = requests.get(self.latest_file_dict["podcastHdUrl"], stream=True)
+    @traced("fetch")
+    def fetch(self, url: str, archive_key: str = "") -> tuple[str, MP3StreamValidator, dict, StorageWriter | None]:
+        """Download a media file into a temporary file of the publisher.
 
-        if not mp3.status_code == 200:
-            self.log.error(
-                f"API: Error while trying to download latest audio file. Status -> {mp3.status_code}"
-            )
-            self.log.error(mp3.text)
-            raise RuntimeError()
+        Args:
+            url (str): Media URL.
+            archive_key (str): Name in the archive, the file is archived while it is downloaded.
+                "" or without archive it is not archived. Default "".
 
-        self.savepath_w_ext = f"{self.savepath}.mp3"
-        self.log.debug("API: Download succesful. Writing file.")
-        self.log.debug(f"API: Saving as {self.savepath_w_ext}")
+        Raises:
+            ServerError: Raised on a 5xx status.
+            RuntimeError: Raised on other bad status codes or if the file was rejected.
+
+        Returns:
+            tuple[str, MP3StreamValidator, dict, StorageWriter | None]: Temporary file path,
+                validator with hash and duration, response headers, archive writer to finish
+                or abort.
+        """
+        self.remember_media_host(url)
+        start_time = clock.monotonic()
+        mp3 = self.http.get(url, stream=True)
+        temp_path = None
+        archive = None
+        progress = None
         try:
-            with open(self.savepath_w_ext, "wb") as file:
-                for chunk in mp3.iter_content(chunk_size=1024):
+            if mp3.status_code >= 500:
+                self.log.error(f"API: Media server error. Status -> {mp3.status_code}")
+                raise ServerError(mp3.status_code)
+
+            if not mp3.status_code == 200:
+                self.log.error(
+                    f"API: Error while trying to download latest audio file. Status -> {mp3.status_code}"
+                )
+                self.log.error(mp3.text)
+                raise RuntimeError()
+
+            # The file is checked and hashed while it is written, nothing is read a second time
+            validator = MP3StreamValidator(
+                self.min_duration, self.max_junk_bytes, check=self.validation_enabled
+            )
+            validator.check_headers(mp3.headers)
+
+            try:
+                total = int(mp3.headers.get("Content-Length", 0)) or None
+            except ValueError:
+                total = None
+            # Reports are rate limited, the GUI gets the same number of updates for any chunk size
+            progress = DownloadProgress(total, self.progress_updates, self.download_deadline())
+            self.download_progress.emit(progress.report())
+
+            # Write into a temporary file first, "latest" is only switched when the file is complete
+            temp_path = self.publisher.create_temp_file()
+            self.log.debug("API: Download succesful. Writing file.")
+            # The same chunks go to the archive, the file is not read again for it
+            archive = self.archive.open(archive_key, total) if self.archive and archive_key else None
+            disk_time = 0.0
+            archive_time = 0.0
+            with tracer.span("transfer") as span, open(temp_path, "wb") as file:
+                for chunk in mp3.iter_content(chunk_size=65536):
+                    validator.feed(chunk)
+                    write_start = time.perf_counter()
                     file.write(chunk)
+                    disk_time += time.perf_counter() - write_start
+                    if archive:
+                        write_start = time.perf_counter()
+                        archive.write(chunk)  # Waits only if the archive falls behind
+                        archive_time += time.perf_counter() - write_start
+                    shaper.throttle(len(chunk))
+                    report = progress.update(len(chunk))
+                    if report:
+                        self.download_progress.emit(report)
+                span.set(
+                    bytes=validator.bytes_received,
+                    disk_ms=round(disk_time * 1000, 3),
+                    archive_ms=round(archive_time * 1000, 3),
+                )
+            validator.finish()
+            self.throughput.record(
+                url, validator.bytes_received, clock.monotonic() - start_time
+            )
+            self.cycle_sample["download_seconds"] = clock.monotonic() - start_time
+        except MP3ValidationError as ex:
+            self.log.error(f"API: Downloaded audio file rejected: {ex}")
+            self.discard_download(temp_path, archive)
+            self.history.append(
+                "rejected",
+                episode_date=self.latest_file_dict["date"],
+                url=url,
+                reason=str(ex),
+            )
+            raise ex
         except Exception as ex:
+            self.discard_download(temp_path, archive)
             raise ex
         finally:
-            self.log.info("API: New audiofile has been saved.")
-            self.last_download_datetime_obj = datetime.strptime(
-                self.latest_file_dict["date"], self.datetime_format
+            mp3.close()
+            if progress is not None:
+                self.download_progress.emit(progress.report(done=True))
+
+        return temp_path, validator, mp3.headers, archive
+
+    @traced("download")
+    def download(self) -> bool:
+        """Download the latest news file and publish it.
+
+        Raises:
+            KeyError: Raised if the API data contains no download URL.
+            RuntimeError: Raised if the download failed or the file was rejected.
+
+        Returns:
+            bool: True if a new file was published, False if it was identical to the published file.
+        """
+        rendition, url = self.select_rendition()
+
+        episode_datetime_obj = datetime.strptime(
+            self.latest_file_dict["date"], self.datetime_format
+        )
+        self.savepath_w_ext = f"{self.savepath}.mp3"
+        version_name = self.version_filename.format(
+            bu=self.business_unit, date=episode_datetime_obj.strftime("%Y%m%d_%H%M%S")
+        )
+        archive_key = self.archive_key.format(
+            bu=self.business_unit, date=episode_datetime_obj.strftime("%Y%m%d_%H%M%S"), file=version_name
+        )
+
+        # Limits the downloads of all workers in this process
+        with shaper.download_slot():
+            temp_path, validator, headers, archive = self.fetch(url, archive_key)
+        self.last_validator = validator
+        self.last_download_url = url
+        self.last_download_rendition = rendition
+        self.media_probe.remember(url, headers)
+
+        # Same audio as the published file: keep the file untouched, consumers do not reload
+        if validator.sha256 == self.get_published_hash():
+            self.publisher.discard(temp_path)
+            self.abort_archive(archive)
+            self.history.append(
+                "dedup",
+                episode_date=self.latest_file_dict["date"],
+                url=url,
+                rendition=rendition,
+                sha256=validator.sha256,
             )
+            self.log.info("API: Audio file is identical to the published file. Not replaced.")
+            self.last_download_datetime_obj = episode_datetime_obj
+            self.last_publish_lag = None
             self.response_content = {}
+            return False
+
+        # Tagging and analysis in the pipeline processes, the file is only published if they succeed
+        stage_results = {}
+        file_sha256 = validator.sha256
+        if self.pipeline:
+            context = {
+                "episode_id": self.latest_file_dict.get("id", ""),
+                "episode_date": self.latest_file_dict["date"],
+                "title": self.latest_file_dict.get("title", ""),
+                "business_unit": self.business_unit,
+                "duration": round(validator.duration, 3),
+            }
+            try:
+                with tracer.span("pipeline"):
+                    result = self.pipeline.run(temp_path, validator.sha256, context)
+            except PipelineError as ex:
+                self.log.error(f"API: Downloaded audio file not published: {ex}")
+                self.publisher.discard(temp_path)
+                self.abort_archive(archive)
+                self.history.append(
+                    "rejected",
+                    episode_date=self.latest_file_dict["date"],
+                    url=url,
+                    reason=str(ex),
+                )
+                raise
+            stage_results = {stage["name"]: stage["result"] for stage in result["stages"] if stage["ok"]}
+            file_sha256 = result["sha256"]
+
+        try:
+            with tracer.span("publish"):
+                version_path = self.publisher.publish(temp_path, version_name)
+        except PermissionError as ex:
+            self.log.error(f"API: Could not replace {self.savepath_w_ext}: {repr(ex)}")
+            self.abort_archive(archive)
+            raise RuntimeError()
+
+        # The hash of the download, identical downloads are detected before the pipeline
+        self.published_hash = validator.sha256
+        entry = {}
+        if stage_results:
+            entry["pipeline"] = stage_results
+        if file_sha256 != validator.sha256:
+            entry["file_sha256"] = file_sha256  # Changed by the pipeline
+        self.history.append(
+            "published",
+            episode_date=self.latest_file_dict["date"],
+            url=url,
+            rendition=rendition,
+            path=version_path,
+            sha256=validator.sha256,
+            size=validator.bytes_received,
+            duration=round(validator.duration, 3),
+            **entry,
+        )
+        self.finish_archive(archive, episode_date=self.latest_file_dict["date"], sha256=validator.sha256)
+
+        payload = {
+            "episode_id": self.latest_file_dict.get("id", ""),
+            "episode_date": self.latest_file_dict["date"],
+            "business_unit": self.business_unit,
+            "path": os.path.abspath(self.savepath_w_ext),
+            "version_path": os.path.abspath(version_path),
+            "file": os.path.basename(version_path),
+            "sha256": validator.sha256,
+            "duration": round(validator.duration, 3),
+            "rendition": rendition,
+            "pipeline": stage_results,
+            # Measured on the clock of the API server, which also dates the episodes
+            "publish_lag": round((self.server_now() - episode_datetime_obj).total_seconds(), 3),
+            "clock_offset": self.clock_offset(),
+        }
+        self.last_publish_lag = payload["publish_lag"]
+        self.cycle_sample["publish_lag"] = payload["publish_lag"]
+        metrics.set("publish_lag_seconds", payload["publish_lag"], profile=self.profile or "default")
+        self.publish_events.publish(payload)
+        if self.notification_dispatcher:
+            self.notification_dispatcher.notify(payload)
+
+        self.log.debug(f"API: Saved as {self.savepath_w_ext} -> {version_path}")
+        self.log.info(
+            f"API: New audiofile has been saved, {payload['publish_lag']:.1f}s after the episode date"
+            + ("" if payload["clock_offset"] is None else f" (clock offset {payload['clock_offset']:+.2f}s)")
+            + "."
+        )
+        if self.validation_enabled:
+            self.log.info(
+                f"API: Duration {validator.duration:.1f}s, {validator.frames} frames, sha256 {validator.sha256}"
+            )
+        self.last_download_datetime_obj = episode_datetime_obj
+        self.response_content = {}
+        return True
+
+    def finish_archive(self, archive: StorageWriter | None, episode_date: str, sha256: str) -> None:
+        """Complete the archive copy of a published file in the background, the publication does not wait.
+
+        The archive holds the file as downloaded, before the pipeline. Once stored, an "archived"
+        entry with its location and hash is added to the history. An error is logged, the
+        publication stands.
+
+        Args:
+            archive (StorageWriter | None): Writer returned by fetch().
+            episode_date (str): Date of the episode, as in the "published" entry.
+            sha256 (str): Content hash of the download.
+        """
+        if archive is None:
+            return
+        thread = threading.Thread(
+            target=self._finish_archive,
+            args=(archive, self.archive.name, episode_date, sha256),
+            name="ArchiveUpload",
+            daemon=True,
+        )
+        thread.start()
+        self.archive_threads = [t for t in self.archive_threads if t.is_alive()] + [thread]
+
+    def _finish_archive(self, archive: StorageWriter, backend: str, episode_date: str, sha256: str) -> None:
+        start = time.perf_counter()
+        try:
+            location = archive.finish()
+        except StorageError as ex:
+            self.log.error(f"Archive: Could not store the file: {ex}")
+            metrics.inc("archive_uploads_total", backend=backend, result="failed")
+            return
+        metrics.inc("archive_uploads_total", backend=backend, result="ok")
+        self.log.debug(f"Archive: Stored as {location} in {time.perf_counter() - start:.2f}s")
+        self.history.append("archived", episode_date=episode_date, archive=location, sha256=sha256)
+
+    def wait_for_archive(self, timeout: float = 60) -> None:
+        """Wait for the uploads still completed in the background, f.ex. before the worker stops.
+
+        Args:
+            timeout (float): Maximum time to wait for all uploads in seconds. Default 60.
+        """
+        deadline = time.monotonic() + timeout
+        for thread in self.archive_threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+            if thread.is_alive():
+                self.log.warning("Archive: Upload not completed before the worker stopped.")
+        self.archive_threads = []
+
+    def discard_download(self, temp_path: str | None, archive: StorageWriter | None) -> None:
+        """Remove the temporary file and the archive copy of a failed download, if created."""
+        if temp_path is not None:
+            self.publisher.discard(temp_path)
+        self.abort_archive(archive)
+
+    def abort_archive(self, archive: StorageWriter | None) -> None:
+        """Drop the archive copy of a download that is not published."""
+        if archive is not None:
+            archive.abort()
+
+    def download_deadline(self) -> float | None:
+        """Seconds a download may take: the configured maximum and the time until the next airtime.
+
+        Returns:
+            float | None: Seconds or None if no deadline is configured.
+        """
+        deadlines = []
+        if self.max_download_seconds:
+            deadlines.append(self.max_download_seconds)
+        until_airtime = seconds_until_airtime(self.airtime_minutes)
+        if until_airtime is not None:
+            deadlines.append(until_airtime - self.deadline_margin)
+        return min(deadlines) if deadlines else None
+
+    def hd_in_time(self, url: str) -> bool:
+        """Predict if the HD file can be downloaded before the deadline.
+
+        Uses the throughput measured on the host and the size from a HEAD request.
+        Without deadline or measurements the answer is always yes.
+
+        Args:
+            url (str): HD URL.
+
+        Returns:
+            bool: False if the download is predicted to miss the deadline.
+        """
+        deadline = self.download_deadline()
+        if deadline is None or self.throughput.estimate(url) is None:
+            return True
+
+        try:
+            response = self.http.head(url, timeout=5, allow_redirects=True)
+            size = int(response.headers.get("Content-Length", 0))
+        except (requests.exceptions.RequestException, ValueError):
+            return True
+        if not size:
+            return True
+
+        predicted = self.throughput.predict_seconds(url, size)
+        self.log.debug(f"API: HD download predicted {predicted:.1f}s, deadline {deadline:.0f}s")
+        return predicted <= deadline
+
+    def select_rendition(self) -> tuple[str, str]:
+        """Choose the audio rendition of the latest episode.
+
+        HD is preferred. A smaller rendition is used when HD is missing or predicted to arrive too late.
+
+        Raises:
+            KeyError: Raised if the API data contains no download URL.
+
+        Returns:
+            tuple[str, str]: Rendition name and URL.
+        """
+        available = [
+            (name, self.latest_file_dict[key])
+            for name, key in RENDITIONS
+            if self.latest_file_dict.get(key)
+        ]
+        if not available:
+            raise KeyError()
+
+        name, url = available[0]
+        if name == "hd" and len(available) > 1 and not self.hd_in_time(url):
+            self.log.info("API: HD file would miss the deadline, using smaller file.")
+            return available[1]
+        return name, url
+
+    def upgrade_pending(self, episode_datetime_obj: datetime) -> bool:
+        """Check if the current episode was downloaded in a smaller rendition and HD now fits in time.
+
+        Args:
+            episode_datetime_obj (datetime): Date of the current episode.
+
+        Returns:
+            bool: True if the episode should be downloaded again in HD.
+        """
+        if (
+            self.last_download_rendition == "hd"
+            or episode_datetime_obj != self.last_download_datetime_obj
+        ):
+            return False
+
+        hd_url = self.latest_file_dict.get("podcastHdUrl")
+        if not hd_url or not self.hd_in_time(hd_url):
+            return False
+        self.log.info("API: Upgrading current episode to HD.")
+        return True
+
+    def remember_media_host(self, url: str) -> None:
+        """Keep the URL as example of its host for pre-warming, the latest three hosts are kept.
+
+        Args:
+            url (str): Media URL.
+        """
+        host = urlsplit(url).netloc
+        self.media_hosts = [u for u in self.media_hosts if urlsplit(u).netloc != host][-2:]
+        self.media_hosts.append(url)
+
+    def in_publish_window(self) -> bool:
+        """Check if a new bulletin is expected soon or overdue.
+
+        The window opens `lead_time` seconds before the expected publication and closes
+        `window` seconds after it. The publication is expected at the configured airtime
+        minutes, or one publish interval after the last downloaded episode.
+
+        Returns:
+            bool: True if the time is in the window.
+        """
+        if self.airtime_minutes:
+            return in_airtime_window(
+                self.airtime_minutes, self.prewarm_lead_time, self.prewarm_window
+            )
+
+        if self.last_download_datetime_obj.year == 1:
+            return False
+        expected = self.last_download_datetime_obj + timedelta(seconds=self.publish_interval)
+        seconds = (expected - self.server_now()).total_seconds()
+        return -self.prewarm_window <= seconds <= self.prewarm_lead_time
+
+    def clock_offset(self) -> float | None:
+        """Seconds the clock of the API server is ahead of the local clock.
+
+        Returns:
+            float | None: Offset measured from the Date headers of the API, None if clock
+                correction is off or no response was measured yet.
+        """
+        if not self.clock_correction:
+            return None
+        offset = clock_skew.offset(self.api_url)
+        return None if offset is None else round(offset, 3)
+
+    def server_now(self) -> datetime:
+        """Current time on the clock of the API server, for comparisons with episode dates."""
+        return clock.now().astimezone() + timedelta(seconds=self.clock_offset() or 0)
+
+    def prewarm_connections(self) -> None:
+        """Resolve and connect to the API and media hosts ahead of an expected bulletin.
+
+        Runs at most every `lead_time` seconds in the publish window. Open connections are
+        only checked, so the download after the publication starts on a warm connection.
+        """
+        if not self.prewarm_lead_time or not self.in_publish_window():
+            return
+        if clock.monotonic() - self.last_prewarm < self.prewarm_lead_time:
+            return
+        self.last_prewarm = clock.monotonic()
+
+        if not self.media_hosts and self.history:
+            published = self.history.last("published")
+            if published and published.get("url"):
+                self.remember_media_host(published["url"])
+
+        for url in [self.oauth_url, self.api_url, *self.media_hosts]:
+            parts = urlsplit(url)
+            try:
+                dns_cache.resolve(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+            except OSError as ex:
+                self.log.warning(f"DNS: Resolving {parts.hostname} failed: {repr(ex)}")
+                continue
+            if self.http.prewarm(url):
+                metrics.inc("prewarmed_connections_total", host=parts.netloc)
+
+    def is_republished(self, episode_datetime_obj: datetime) -> bool:
+        """Check if the audio of the already downloaded episode was replaced, f.ex. by a correction.
+
+        Only checked within the revalidate window after the episode date, using a conditional
+        HEAD request instead of a download.
+
+        Args:
+            episode_datetime_obj (datetime): Date of the current episode.
+
+        Returns:
+            bool: True if the episode should be downloaded again.
+        """
+        if not self.revalidate_window or episode_datetime_obj != self.last_download_datetime_obj:
+            return False
+
+        episode_age = self.server_now() - episode_datetime_obj
+        if episode_age.total_seconds() > self.revalidate_window:
+            return False
+
+        url = self.latest_file_dict.get(dict(RENDITIONS)[self.last_download_rendition])
+        if not url:
+            return False
+        if url != self.last_download_url:
+            self.log.info("API: Download URL of current episode changed.")
+            return True
+        return self.media_probe.has_changed(url)
+
+    def get_published_hash(self) -> str | None:
+        """Return the sha256 of the currently published file.
+
+        Taken from the download history. The file itself is only hashed once, if the history does
+        not know it (f.ex. the first start after an update).
+
+        Returns:
+            str | None: Hex digest or None if nothing is published.
+        """
+        if self.published_hash:
+            return self.published_hash
+
+        if not os.path.exists(self.publisher.latest_path):
+            return None
+
+        last_published = self.history.last("published")
+        current_version = self.publisher.current_version()
+        if (
+            last_published
+            and current_version
+            and os.path.normpath(last_published.get("path", "")) == current_version
+        ):
+            self.published_hash = last_published["sha256"]
+            return self.published_hash
+
+        file_hash = hashlib.sha256()
+        with open(self.publisher.latest_path, "rb") as file:
+            for chunk in iter(lambda: file.read(65536), b""):
+                file_hash.update(chunk)
+        self.published_hash = file_hash.hexdigest()
+        return self.published_hash
 
     def run(self):
         api_update_count = 0
@@ -261,11 +1062,20 @@ class APIWorker(QObject):
             )
             self.log.debug("Populate config data")
             self.populate_config_data()
+            self.start_shared_services()
 
             self.log.info("Test config")
             self.test_configuration()
 
             self.log.info("Config test successful")
+
+            if self.server_enabled:
+                self.start_bulletin_server()
+            if self.ha_enabled:
+                self.start_leader_elector()
+            self.start_notification_dispatcher()
+            if self.pipeline:
+                self.pipeline.start()
             self.connection_status.emit(
                 {
                     "status_label": {"text": "Starte Routine"},
@@ -282,23 +1092,39 @@ class APIWorker(QObject):
                     },
                 }
             )
+            self.health.failure("config", "config", str(ex))
             self.running = False  # Kill worker in case of an error
         except Exception as ex:
             self.error.emit(ex)
+            self.health.failure("config", ex)
             self.running = False  # Kill worker in case of an error
 
+        cycle_interval = self.update_cycle
         while self.running:
             if force_update:
                 api_update_count = (
-                    self.update_cycle
+                    cycle_interval
                 )  # Update the count to force start the cycle
                 force_update = False
 
-            if api_update_count >= self.update_cycle and self.running:
+            if api_update_count >= cycle_interval and self.running:
                 self.log.debug("New cycle in worker routine starts.")
+                cycle = tracer.begin_trace("cycle", profile=self.profile)
+                profiler.begin(f"cycle-{self.profile or 'default'}")
+                self.cycle_sample = {}
+                failures = self.retry_policy.failures
+                retry_delay = None  # Set by failed calls, replaces the update cycle once
+                # A standby only waits for the lease, the leader does all API calls
+                standby = not self.check_leadership()
+                self.health.running(standby)
 
                 # oAuth Routine, run when we have no token
-                if not self.oauth_token:
+                if standby:
+                    pass
+                elif not self.oauth_token and not self.retry_policy.allow("oauth"):
+                    retry_delay = self.retry_policy.wait_time("oauth")
+                    self.emit_circuit_open("oAuth Server", retry_delay)
+                elif not self.oauth_token:
                     try:
                         self.connection_status.emit(
                             {
@@ -306,18 +1132,27 @@ class APIWorker(QObject):
                                     "text": "API Token wird angefordert..."
                                 },
                                 "download_label": {
-                                    "text": f"{self.last_download_datetime_obj}"
+                                    "text": self.download_label_text()
                                 },
                             }
                         )
                         self.log.debug("Getting new oAuth token.")
                         self.get_auth_token()
+                        self.retry_policy.success("oauth")
+                        self.health.success("oauth")
                         self.log.debug(f"Received new oAuth token: {self.oauth_token}")
                     except RuntimeError:
                         self.oauth_token = ""
+                        self.health.failure("oauth", "auth", "Credentials rejected by the oAuth server")
                         self.running = False
+                    except RateLimitError as ex:
+                        self.oauth_token = ""
+                        retry_delay = self.retry_policy.failure("oauth", ex)
+                        self.health.failure("oauth", ex)
+                        self.emit_rate_limited(ex)
                     except KeyError:
                         self.oauth_token = ""
+                        self.health.failure("oauth", "no_token")
                         self.connection_status.emit(
                             {
                                 "status_label": {
@@ -325,16 +1160,18 @@ class APIWorker(QObject):
                                     "color": "orange",
                                 },
                                 "download_label": {
-                                    "text": f"{self.last_download_datetime_obj}"
+                                    "text": self.download_label_text()
                                 },
                             }
                         )
-                    except requests.exceptions.ConnectTimeout:
+                    except (ServerError, requests.exceptions.RequestException) as ex:
                         self.oauth_token = ""
+                        retry_delay = self.retry_policy.failure("oauth", ex)
+                        self.health.failure("oauth", ex)
                         self.connection_status.emit(
                             {
                                 "status_label": {
-                                    "text": f"Verbindungsfehler zu oAuth Server. Neuversuch in {self.update_cycle}s",
+                                    "text": f"Verbindungsfehler zu oAuth Server. Neuversuch in {retry_delay:.0f}s",
                                     "color": "orange",
                                 },
                                 "download_label": {
@@ -344,6 +1181,8 @@ class APIWorker(QObject):
                         )
                     except Exception as ex:
                         self.oauth_token = ""
+                        retry_delay = self.retry_policy.failure("oauth", ex)
+                        self.health.failure("oauth", ex)
                         self.connection_status.emit(
                             {
                                 "status_label": {
@@ -358,7 +1197,12 @@ class APIWorker(QObject):
                         self.error.emit(ex)
 
                 # News Fetch routine, run when we have oAuth token
-                if self.oauth_token and self.running:
+                if standby:
+                    pass
+                elif self.oauth_token and self.running and not self.retry_policy.allow("api"):
+                    retry_delay = self.retry_policy.wait_time("api")
+                    self.emit_circuit_open("API Server", retry_delay)
+                elif self.oauth_token and self.running:
                     self.log.debug("API: Fetching news data.")
                     self.connection_status.emit(
                         {
@@ -366,23 +1210,37 @@ class APIWorker(QObject):
                                 "text": "News Daten werden angefordert..."
                             },
                             "download_label": {
-                                "text": f"{self.last_download_datetime_obj}"
+                                "text": self.download_label_text()
                             },
                         }
                     )
                     try:
                         self.get_news_data()
-                    except RuntimeError:
+                        self.retry_policy.success("api")
+                        self.health.success("api")
+                    except RuntimeError as ex:
                         self.log.info("API: oAuth token not valid or expired.")
                         self.response_content = {}  # Empty response content to skip download
+                        token_store.invalidate(
+                            (self.oauth_url, self.client_id, self.client_secret), self.oauth_token
+                        )
                         self.oauth_token = ""  # Empty token to force getting new token
-                        force_update = True  # Force start the next cycle
-                    except requests.exceptions.ConnectionError:
+                        # First retry is immediate, repeated 401s back off
+                        retry_delay = self.retry_policy.failure("api", ex)
+                        self.health.failure("api", ex)
+                    except RateLimitError as ex:
+                        self.response_content = {}
+                        retry_delay = self.retry_policy.failure("api", ex)
+                        self.health.failure("api", ex)
+                        self.emit_rate_limited(ex)
+                    except (ServerError, requests.exceptions.RequestException) as ex:
                         self.response_content = {}
+                        retry_delay = self.retry_policy.failure("api", ex)
+                        self.health.failure("api", ex)
                         self.connection_status.emit(
                             {
                                 "status_label": {
-                                    "text": f"Verbindungsfehler zu API Server. Neuversuch in {self.update_cycle}s",
+                                    "text": f"Verbindungsfehler zu API Server. Neuversuch in {retry_delay:.0f}s",
                                     "color": "orange",
                                 },
                                 "download_label": {
@@ -391,6 +1249,8 @@ class APIWorker(QObject):
                             }
                         )
                     except Exception as ex:
+                        retry_delay = self.retry_policy.failure("api", ex)
+                        self.health.failure("api", ex)
                         self.connection_status.emit(
                             {
                                 "status_label": {
@@ -405,16 +1265,22 @@ class APIWorker(QObject):
                         self.error.emit(ex)
 
                 # Download routine, run when we have new content from news fetch
-                if self.response_content:
+                if self.response_content and not self.retry_policy.allow("media"):
+                    retry_delay = self.retry_policy.wait_time("media")
+                    self.emit_circuit_open("Download Server", retry_delay)
+                    self.response_content = {}
+                elif self.response_content:
                     # Content check before Download
                     if "podcasts" in self.response_content and self.running:
                         try:
                             self.latest_file_dict = self.response_content["podcasts"][0]
+                            episode_datetime_obj = datetime.strptime(
+                                self.latest_file_dict["date"], self.datetime_format
+                            )
                             if (
-                                datetime.strptime(
-                                    self.latest_file_dict["date"], self.datetime_format
-                                )
-                                > self.last_download_datetime_obj
+                                episode_datetime_obj > self.last_download_datetime_obj
+                                or self.upgrade_pending(episode_datetime_obj)
+                                or self.is_republished(episode_datetime_obj)
                             ):
                                 self.log.info("API: Download news file.")
                                 self.connection_status.emit(
@@ -423,37 +1289,46 @@ class APIWorker(QObject):
                                             "text": "Download Audiofile..."
                                         },
                                         "download_label": {
-                                            "text": f"{self.last_download_datetime_obj}"
+                                            "text": self.download_label_text()
                                         },
                                     }
                                 )
                                 try:
                                     self.download()
+                                    self.retry_policy.success("media")
+                                    self.health.success("media", self.latest_file_dict["date"])
                                     # Success !
                                     self.connection_status.emit(
                                         {
                                             "status_label": {
-                                                "text": "Programm läuft ohne Fehler."
+                                                "text": self.running_status_text()
                                             },
                                             "download_label": {
-                                                "text": f"{self.last_download_datetime_obj}"
+                                                "text": self.download_label_text()
                                             },
                                         }
                                     )
-                                except RuntimeError:
+                                except (
+                                    RuntimeError,
+                                    ServerError,
+                                    requests.exceptions.RequestException,
+                                ) as ex:
+                                    retry_delay = self.retry_policy.failure("media", ex)
+                                    self.health.failure("media", ex)
                                     self.connection_status.emit(
                                         {
                                             "status_label": {
-                                                "text": f"Download Error. Neuversuch in {self.update_cycle}s",
+                                                "text": f"Download Error. Neuversuch in {retry_delay:.0f}s",
                                                 "color": "red",
                                             },
                                             "download_label": {
-                                                "text": f"{self.last_download_datetime_obj}"
+                                                "text": self.download_label_text()
                                             },
                                         }
                                     )
                                     self.response_content = {}
                                 except KeyError:
+                                    self.health.failure("media", "no_url")
                                     self.connection_status.emit(
                                         {
                                             "status_label": {
@@ -461,12 +1336,14 @@ class APIWorker(QObject):
                                                 "color": "orange",
                                             },
                                             "download_label": {
-                                                "text": f"{self.last_download_datetime_obj}"
+                                                "text": self.download_label_text()
                                             },
                                         }
                                     )
                                     self.response_content = {}
                                 except Exception as ex:
+                                    retry_delay = self.retry_policy.failure("media", ex)
+                                    self.health.failure("media", ex)
                                     self.connection_status.emit(
                                         {
                                             "status_label": {
@@ -484,10 +1361,10 @@ class APIWorker(QObject):
                                 self.connection_status.emit(
                                     {
                                         "status_label": {
-                                            "text": "Programm läuft ohne Fehler."
+                                            "text": self.running_status_text()
                                         },
                                         "download_label": {
-                                            "text": f"{self.last_download_datetime_obj}"
+                                            "text": self.download_label_text()
                                         },
                                     }
                                 )
@@ -502,7 +1379,7 @@ class APIWorker(QObject):
                                         "color": "orange",
                                     },
                                     "download_label": {
-                                        "text": f"{self.last_download_datetime_obj}"
+                                        "text": self.download_label_text()
                                     },
                                 }
                             )
@@ -511,6 +1388,7 @@ class APIWorker(QObject):
                         self.log.error(
                             "API: No Podcast data was received from API response."
                         )
+                        self.health.failure("api", "no_data")
                         self.connection_status.emit(
                             {
                                 "status_label": {
@@ -518,18 +1396,48 @@ class APIWorker(QObject):
                                     "color": "orange",
                                 },
                                 "download_label": {
-                                    "text": f"{self.last_download_datetime_obj}"
+                                    "text": self.download_label_text()
                                 },
                             }
                         )
                         self.response_content = {}
 
                 api_update_count = 0
+                # Slows down smoothly when the daily quota runs out or after a 429
+                cycle_interval = self.rate_limiter.recommended_interval(self.update_cycle)
+                if retry_delay is not None:
+                    cycle_interval = max(retry_delay, self.rate_limiter.bucket.blocked_for())
+                if not standby:
+                    self.perf_history.append(
+                        clock.time(), errors=self.retry_policy.failures - failures, **self.cycle_sample
+                    )
+                tracer.end_trace(cycle, standby=standby, next_cycle=cycle_interval)
+                profiler.end()
 
             if self.running:
+                self.prewarm_connections()
                 api_update_count += 1
-                time.sleep(1)
+                self.health.beat()
+                clock.sleep(1)
+
+        if self.leader_elector:
+            self.leader_elector.stop()
+            self.leader_elector = None
+        if self.bulletin_server:
+            self.bulletin_server.stop()
+            self.bulletin_server = None
+
+        self.is_leader = True
+        if self.notification_dispatcher:
+            self.notification_dispatcher.stop()
+            self.notification_dispatcher = None
+        self.stop_shared_services()
 
+        if self.stop_requested:
+            health.unregister(self.health)
+        else:
+            # Supervisors see the dead worker instead of a process that still runs
+            self.health.stopped(failed=True)
         self.log.info("API Worker finished work.")
         self.connection_status.emit(
             {
@@ -541,18 +1449,165 @@ class APIWorker(QObject):
             }
         )
 
+    def running_status_text(self) -> str:
+        """Status text of a successful cycle, with the quota use if the daily quota is known."""
+        text = "Programm läuft ohne Fehler."
+        if self.rate_limiter and self.rate_limiter.quota.daily_limit:
+            text += f" API Kontingent: {self.rate_limiter.quota.used}/{self.rate_limiter.quota.daily_limit}"
+        return text
+
+    def download_label_text(self) -> str:
+        """Date of the last downloaded episode, with its publish lag if it was published by this worker."""
+        text = f"{self.last_download_datetime_obj}"
+        if self.last_publish_lag is not None:
+            text += f" (Verzögerung {self.last_publish_lag:.0f}s)"
+        return text
+
+    def emit_circuit_open(self, server_name: str, wait_time: float):
+        """Show that calls to a server are paused after repeated failures.
+
+        Args:
+            server_name (str): Name of the server for the status text.
+            wait_time (float): Seconds until the next probe.
+        """
+        self.connection_status.emit(
+            {
+                "status_label": {
+                    "text": f"{server_name} nicht erreichbar. Nächster Versuch in {wait_time:.0f}s",
+                    "color": "orange",
+                },
+                "download_label": {"text": self.download_label_text()},
+            }
+        )
+
+    def emit_rate_limited(self, ex: RateLimitError):
+        """Show that the API rate limit was reached.
+
+        Args:
+            ex (RateLimitError): The raised exception.
+        """
+        self.log.warning(f"API: {ex}")
+        self.connection_status.emit(
+            {
+                "status_label": {
+                    "text": f"API Limit erreicht. Neuversuch in {ex.retry_after:.0f}s",
+                    "color": "orange",
+                },
+                "download_label": {"text": self.download_label_text()},
+            }
+        )
+
+    def start_notification_dispatcher(self):
+        """Create the configured notifiers and start delivering in the background."""
+        config_get = self.config_helper.get_value
+        timeout = float(config_get("notify", "timeout"))
+
+        notifiers = []
+        if config_get("notify", "webhook_url"):
+            notifiers.append(WebhookNotifier(config_get("notify", "webhook_url"), timeout))
+        if config_get("notify", "unix_socket"):
+            notifiers.append(UnixSocketNotifier(config_get("notify", "unix_socket")))
+        if config_get("notify", "command"):
+            notifiers.append(CommandNotifier(config_get("notify", "command"), timeout))
+
+        if notifiers:
+            self.notification_dispatcher = NotificationDispatcher(
+                notifiers, retries=int(config_get("notify", "retries"))
+            )
+            self.notification_dispatcher.start()
+
+    def start_leader_elector(self):
+        """Start the leader election with the other instances of the HA setup."""
+        config_get = self.config_helper.get_value
+        node_id = config_get("ha", "node_id") or f"{socket.gethostname()}-{os.getpid()}"
+        lease_file = config_get("ha", "lease_file") or os.path.join(
+            self.filepath, ".news_downloader.lease"
+        )
+        lease = create_lease(
+            config_get("ha", "mode"),
+            node_id,
+            float(config_get("ha", "lease_duration")),
+            path=lease_file,
+            host=config_get("ha", "host"),
+            port=int(config_get("ha", "port")),
+        )
+        self.leader_elector = LeaderElector(lease)
+        self.leader_elector.start()
+        self.is_leader = False
+
+    def check_leadership(self) -> bool:
+        """Check if this instance may poll and download. Takes over the state when it became leader.
+
+        Returns:
+            bool: True without HA or if this instance is the leader.
+        """
+        if self.leader_elector is None:
+            return True
+
+        if not self.leader_elector.is_leader:
+            if self.is_leader:
+                self.log.warning("HA: Lost leadership, switching to standby.")
+                self.oauth_token = ""
+                self.response_content = {}
+            self.is_leader = False
+            self.connection_status.emit(
+                {
+                    "status_label": {"text": "Standby. Eine andere Instanz ist aktiv."},
+                    "download_label": {"text": self.download_label_text()},
+                }
+            )
+            return False
+
+        if not self.is_leader:
+            self.take_over_state()
+            self.is_leader = True
+        return True
+
+    def take_over_state(self):
+        """Continue where the previous leader stopped, with the download history on the share."""
+        self.history.reload()
+        self.published_hash = None
+        last_published = self.history.last("published")
+        if last_published:
+            self.last_download_datetime_obj = datetime.strptime(
+                last_published["episode_date"], self.datetime_format
+            )
+            self.last_download_url = last_published.get("url", "")
+            self.last_download_rendition = last_published.get("rendition", "hd")
+        self.log.info(f"HA: Leader now, last download {self.last_download_datetime_obj}")
+
+    def start_bulletin_server(self):
+        """Start the local HTTP server for playout clients.
+
+        Raises:
+            KeyError: Raised if the server can not listen on the configured address.
+        """
+        try:
+            self.bulletin_server = BulletinServer(
+                self.publisher,
+                self.history,
+                self.publish_events,
+                self.server_host,
+                self.server_port,
+            )
+        except OSError as ex:
+            self.log.error(f"Server: Can not listen on {self.server_host}:{self.server_port}: {repr(ex)}")
+            raise KeyError(f"Server Port {self.server_port} nicht verfügbar.")
+        self.bulletin_server.start()
+
     def stop(self):
+        self.stop_requested = True
         self.running = False
 
 
 class APIThread(QThread):
-    def __init__(self, config_helper):
+    def __init__(self, config_helper, profile: str = ""):
         super().__init__()
 
-        self.log = logging.getLogger("news_downloader")
+        self.log = get_logger(profile)
 
         self.log.info("Initializing API Worker.")
-        self.worker = APIWorker(config_helper)
+        self.worker = APIWorker(config_helper, profile)
 
     def run(self):
         self.log.info("Starting API Worker.")
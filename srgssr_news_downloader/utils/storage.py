@@ -0,0 +1,586 @@
+import hashlib
+import hmac
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+
+import requests
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.clock_skew import clock_skew
+
+MB = 1024 * 1024
+# S3 rejects smaller parts, except the last one
+MIN_PART_SIZE = 5 * MB
+
+
+class StorageError(RuntimeError):
+    """Storing a file in the archive failed."""
+
+
+class StorageWriter:
+    """Receives a file chunk by chunk while it is downloaded. Subclasses implement the methods.
+
+    An error while writing is kept until finish(), the download itself is never interrupted.
+    """
+
+    def write(self, chunk: bytes) -> None:
+        """Add the next chunk of the file."""
+        raise NotImplementedError()
+
+    def finish(self) -> str:
+        """Complete the file after the last chunk.
+
+        Raises:
+            StorageError: Raised if the file could not be stored.
+
+        Returns:
+            str: Location of the stored file.
+        """
+        raise NotImplementedError()
+
+    def abort(self) -> None:
+        """Drop the file, f.ex. after the download was rejected. Never raises."""
+        raise NotImplementedError()
+
+
+class StorageBackend:
+    """Base class of an archive for downloaded files. Subclasses implement open()."""
+
+    name = "storage"
+
+    def open(self, key: str, size: int | None = None, content_type: str = "audio/mpeg") -> StorageWriter:
+        """Start storing a file.
+
+        Args:
+            key (str): Name of the file in the archive, may contain "/".
+            size (int | None): Size announced by the server, None if unknown. Default None.
+            content_type (str): Media type. Default "audio/mpeg".
+
+        Returns:
+            StorageWriter: Writer for the chunks of the file.
+        """
+        raise NotImplementedError()
+
+
+class LocalStorage(StorageBackend):
+    name = "local"
+
+    def __init__(self, folder: str):
+        """Archive in a local or mounted folder, f.ex. a NAS share.
+
+        Args:
+            folder (str): Root folder of the archive.
+        """
+        self.folder = folder
+
+    def open(self, key: str, size: int | None = None, content_type: str = "audio/mpeg") -> StorageWriter:
+        return _FileWriter(os.path.join(self.folder, *key.split("/")))
+
+
+class _FileWriter(StorageWriter):
+    def __init__(self, path: str):
+        # Written next to the target and renamed, readers never see half a file
+        self.path = path
+        self.temp_path = f"{path}.part"
+        self.error = None
+        self._file = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(self.temp_path, "wb")
+        except OSError as ex:
+            self.error = ex
+
+    def write(self, chunk: bytes) -> None:
+        if self.error:
+            return
+        try:
+            self._file.write(chunk)
+        except OSError as ex:
+            self.error = ex
+
+    def finish(self) -> str:
+        if not self.error:
+            try:
+                self._file.close()
+                os.replace(self.temp_path, self.path)
+                return self.path
+            except OSError as ex:
+                self.error = ex
+        self.abort()
+        raise StorageError(f"{self.path}: {repr(self.error)}")
+
+    def abort(self) -> None:
+        if self._file:
+            self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+
+class S3Storage(StorageBackend):
+    name = "s3"
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        part_size: int = 8 * MB,
+        queue_parts: int = 2,
+        timeout: float = 30,
+        retries: int = 2,
+    ):
+        """Archive in an S3 compatible object storage (AWS S3, MinIO, Ceph and others).
+
+        The file is uploaded while it is downloaded, nothing is read from disk again. A file whose
+        size is announced and fits into one part is streamed in a single PUT, others in a
+        multipart upload. A slow storage slows the download down instead of filling the memory:
+        at most (queue_parts + 2) * part_size bytes are held. Requests use path style URLs and
+        Signature Version 4, signed with the clock of the storage (see clock_skew).
+
+        Args:
+            endpoint (str): Base URL, f.ex. "https://s3.eu-central-1.amazonaws.com" or "http://127.0.0.1:9000".
+            bucket (str): Bucket name.
+            access_key (str): Access key ID.
+            secret_key (str): Secret access key.
+            region (str): Region of the bucket. Default "us-east-1".
+            part_size (int): Bytes per part, at least 5 MB. Default 8 MB.
+            queue_parts (int): Parts waiting for their upload. Default 2.
+            timeout (float): Timeout of a request in seconds. Default 30.
+            retries (int): Retries of a failed part after the first attempt. Default 2.
+
+        Raises:
+            KeyError: Raised if the settings are incomplete.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        if not (endpoint and bucket and access_key and secret_key):
+            raise KeyError("Archiv: endpoint, bucket, access_key und secret_key werden benötigt.")
+        if part_size < MIN_PART_SIZE:
+            raise KeyError("Archiv: part_size_mb muss mindestens 5 sein.")
+
+        self.endpoint = endpoint.rstrip("/")
+        self.host = urlsplit(self.endpoint).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = part_size
+        self.queue_parts = max(queue_parts, 1)
+        self.timeout = timeout
+        self.retries = retries
+
+        self.session = requests.Session()
+
+    def open(self, key: str, size: int | None = None, content_type: str = "audio/mpeg") -> StorageWriter:
+        if size is not None and size <= self.part_size:
+            return _StreamingPut(self, key, size, content_type)
+        return _MultipartUpload(self, key, content_type)
+
+    def location(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def request(
+        self,
+        method: str,
+        key: str,
+        params: dict | None = None,
+        body=b"",
+        headers: dict | None = None,
+        retries: int = 0,
+        payload_hash: str = "",
+    ) -> requests.Response:
+        """Send a signed request for an object.
+
+        Args:
+            method (str): HTTP method.
+            key (str): Object key.
+            params (dict | None): Query parameters. Default None.
+            body: Bytes or a file-like object with a length. Default b"".
+            headers (dict | None): Additional headers, they are signed. Default None.
+            retries (int): Retries on connection errors and 5xx, the body has to be bytes or
+                seekable. Default 0.
+            payload_hash (str): SHA-256 of a file-like body, else it is sent as unsigned
+                payload. Default "".
+
+        Raises:
+            StorageError: Raised on a connection error or a status that is not 2xx.
+
+        Returns:
+            requests.Response: The response.
+        """
+        path = quote(f"/{self.bucket}/{key}", safe="/-_.~")
+        query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(str(value), safe='-_.~')}"
+            for name, value in sorted((params or {}).items())
+        )
+        if isinstance(body, bytes):
+            payload_hash = hashlib.sha256(body).hexdigest()
+        payload_hash = payload_hash or "UNSIGNED-PAYLOAD"
+        url = f"{self.endpoint}{path}" + (f"?{query}" if query else "")
+
+        for attempt in range(retries + 1):
+            signed_headers = self.sign(method, path, query, payload_hash, headers or {})
+            if hasattr(body, "seek"):
+                body.seek(0)
+            sent = clock.time()
+            try:
+                response = self.session.request(
+                    method, url, data=body, headers=signed_headers, timeout=self.timeout
+                )
+            except requests.exceptions.RequestException as ex:
+                error = StorageError(f"{method} {key}: {repr(ex)}")
+            else:
+                clock_skew.observe(url, response.headers, sent, clock.time())
+                if 200 <= response.status_code < 300:
+                    return response
+                error = StorageError(f"{method} {key}: Status {response.status_code} {response.text[:200]}")
+                if response.status_code < 500:
+                    raise error
+            if attempt < retries:
+                self.log.warning(f"Archive: {error}, retrying")
+                clock.sleep(2**attempt)
+        raise error
+
+    def sign(self, method: str, path: str, query: str, payload_hash: str, headers: dict) -> dict:
+        """Return the headers of a request with the AWS Signature Version 4."""
+        # A local clock that is off by more than 15 minutes would be rejected
+        now = datetime.fromtimestamp(clock.time() + (clock_skew.offset(self.endpoint) or 0), timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+
+        headers = {name.lower(): str(value).strip() for name, value in headers.items()}
+        headers.update({"host": self.host, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date})
+        signed_names = ";".join(sorted(headers))
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                query,
+                "".join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+                signed_names,
+                payload_hash,
+            ]
+        )
+        string_to_sign = "\n".join(
+            ["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()]
+        )
+
+        signing_key = f"AWS4{self.secret_key}".encode()
+        for part in (amz_date[:8], self.region, "s3", "aws4_request"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_names}, Signature={signature}"
+        )
+        return headers
+
+
+class _Upload(StorageWriter):
+    """Upload in a background thread, fed through a bounded queue by write()."""
+
+    def __init__(self, storage: S3Storage, key: str, content_type: str, queue_size: int):
+        self.storage = storage
+        self.key = key
+        self.content_type = content_type
+        self.error = None
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._upload, name="ArchiveUpload", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> None:
+        # Blocks while the queue is full, the download waits for the upload
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _upload(self) -> None:
+        try:
+            self._run()
+        except Exception as ex:
+            self.error = self.error or ex
+        finally:
+            # Producers must not wait for a thread that is gone
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _run(self) -> None:
+        raise NotImplementedError()
+
+    def _close(self, item) -> None:
+        self._put(item)
+        self._thread.join()
+
+
+class _StreamingPut(_Upload):
+    def __init__(self, storage: S3Storage, key: str, size: int, content_type: str):
+        # One PUT whose body is read from the queue while the download runs
+        self.size = size
+        super().__init__(storage, key, content_type, max(storage.part_size // 65536, 4))
+
+    def write(self, chunk: bytes) -> None:
+        if self.error or not chunk:
+            return
+        self.written += len(chunk)
+        self._put(chunk)
+
+    def _run(self) -> None:
+        self.storage.request(
+            "PUT",
+            self.key,
+            body=_QueueReader(self._queue, self.size),
+            headers={"Content-Type": self.content_type, "Content-Length": str(self.size)},
+        )
+
+    def finish(self) -> str:
+        self._close(None)
+        if self.error:
+            raise StorageError(f"{self.storage.location(self.key)}: {self.error}")
+        return self.storage.location(self.key)
+
+    def abort(self) -> None:
+        self.error = self.error or StorageError("aborted")
+        self._close(_ABORT)
+
+
+_ABORT = object()
+
+
+class _QueueReader:
+    """Request body of a streaming PUT, the size is known up front so no chunked encoding is used."""
+
+    def __init__(self, chunks: queue.Queue, size: int):
+        self._chunks = chunks
+        self.size = size
+        self.sent = 0
+        self._pending = b""
+        self._ended = False  # The download ended with the announced size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _next(self):
+        chunk = self._chunks.get()
+        if chunk is _ABORT:
+            raise StorageError("aborted")
+        return chunk
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._pending:
+            if self._ended:
+                return b""
+            chunk = self._next()
+            if chunk is None:
+                if self.sent != self.size:
+                    raise StorageError(f"Received {self.sent} of {self.size} announced bytes")
+                self._ended = True
+                return b""
+            self._pending = chunk
+        if size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        if self.sent + len(data) > self.size:
+            raise StorageError(f"More than the {self.size} announced bytes received")
+        if self.sent + len(data) == self.size and not self._ended:
+            # The last bytes are held back until the download ended, the storage would keep a
+            # cut off file if more data followed
+            if self._pending or self._next() is not None:
+                raise StorageError(f"More than the {self.size} announced bytes received")
+            self._ended = True
+        self.sent += len(data)
+        return data
+
+
+class _PartReader:
+    """Request body of a part, the chunks are sent as they are instead of joined into one copy."""
+
+    def __init__(self, chunks: list[bytes]):
+        self._chunks = chunks
+        self.size = sum(len(chunk) for chunk in chunks)
+        self._index = 0
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def sha256(self) -> str:
+        digest = hashlib.sha256()
+        for chunk in self._chunks:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def seek(self, position: int) -> None:
+        # Only rewinding for a retry is needed
+        self._index = self._offset = 0
+
+    def tell(self) -> int:
+        return sum(len(chunk) for chunk in self._chunks[: self._index]) + self._offset
+
+    def read(self, size: int = -1) -> bytes:
+        if self._index >= len(self._chunks):
+            return b""
+        chunk = self._chunks[self._index]
+        if size < 0 or self._offset + size >= len(chunk):
+            data = chunk[self._offset :] if self._offset else chunk
+            self._index += 1
+            self._offset = 0
+            return data
+        data = chunk[self._offset : self._offset + size]
+        self._offset += size
+        return data
+
+
+class _MultipartUpload(_Upload):
+    def __init__(self, storage: S3Storage, key: str, content_type: str):
+        self.upload_id = None
+        self._chunks = []  # Chunks of the next part
+        self._buffered = 0
+        self._parts = []  # (number, ETag)
+        super().__init__(storage, key, content_type, storage.queue_parts)
+
+    def write(self, chunk: bytes) -> None:
+        if self.error or not chunk:
+            return
+        self.written += len(chunk)
+        self._chunks.append(chunk)
+        self._buffered += len(chunk)
+        if self._buffered >= self.storage.part_size:
+            self._put(self._chunks)
+            self._chunks = []
+            self._buffered = 0
+
+    def _run(self) -> None:
+        response = self.storage.request(
+            "POST", self.key, params={"uploads": ""}, headers={"Content-Type": self.content_type}
+        )
+        self.upload_id = _xml_text(response.content, "UploadId")
+        while True:
+            part = self._queue.get()
+            if part is None or part is _ABORT:
+                return
+            number = len(self._parts) + 1
+            body = _PartReader(part)
+            response = self.storage.request(
+                "PUT",
+                self.key,
+                params={"partNumber": number, "uploadId": self.upload_id},
+                body=body,
+                retries=self.storage.retries,
+                payload_hash=body.sha256(),
+            )
+            self._parts.append((number, response.headers.get("ETag", "")))
+
+    def finish(self) -> str:
+        if not self.error and (self._chunks or not self.written):
+            self._put(self._chunks)  # The last part may be smaller
+        self._chunks = []
+        self._close(None)
+        try:
+            if self.error:
+                raise StorageError(f"{self.storage.location(self.key)}: {self.error}")
+            body = "<CompleteMultipartUpload>{}</CompleteMultipartUpload>".format(
+                "".join(
+                    f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                    for number, etag in self._parts
+                )
+            ).encode()
+            response = self.storage.request(
+                "POST", self.key, params={"uploadId": self.upload_id}, body=body, retries=self.storage.retries
+            )
+            # The status is sent before the parts are combined, a late error is in the body
+            if _xml_text(response.content, "Code"):
+                raise StorageError(f"{self.storage.location(self.key)}: {response.text[:200]}")
+        except StorageError:
+            self._abort_upload()
+            raise
+        return self.storage.location(self.key)
+
+    def abort(self) -> None:
+        self.error = self.error or StorageError("aborted")
+        self._chunks = []
+        self._close(_ABORT)
+        self._abort_upload()
+
+    def _abort_upload(self) -> None:
+        if not self.upload_id:
+            return
+        try:
+            self.storage.request("DELETE", self.key, params={"uploadId": self.upload_id})
+        except StorageError as ex:
+            # The storage removes the parts with its lifecycle rules
+            self.storage.log.warning(f"Archive: Could not abort upload of {self.key}: {ex}")
+        self.upload_id = None
+
+
+def _xml_text(content: bytes, tag: str) -> str:
+    """Return the text of the first element with a tag, namespaces ignored, "" if missing."""
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return ""
+    for element in root.iter():
+        if element.tag.rpartition("}")[2] == tag:
+            return element.text or ""
+    return ""
+
+
+def create_storage(
+    backend: str,
+    folder: str = "",
+    endpoint: str = "",
+    bucket: str = "",
+    access_key: str = "",
+    secret_key: str = "",
+    region: str = "us-east-1",
+    part_size: int = 8 * MB,
+    queue_parts: int = 2,
+    timeout: float = 30,
+) -> StorageBackend | None:
+    """Create the archive for the configured backend.
+
+    Args:
+        backend (str): "local", "s3" or "" for no archive.
+        folder (str): Folder of backend "local".
+        endpoint, bucket, access_key, secret_key, region, part_size, queue_parts, timeout: See S3Storage.
+
+    Raises:
+        KeyError: Raised for an unknown backend or incomplete settings.
+
+    Returns:
+        StorageBackend | None: The archive, None if it is off.
+    """
+    if not backend:
+        return None
+    if backend == "local":
+        if not folder:
+            raise KeyError("Archiv: folder wird benötigt.")
+        return LocalStorage(folder)
+    if backend == "s3":
+        return S3Storage(
+            endpoint,
+            bucket,
+            access_key,
+            secret_key,
+            region=region,
+            part_size=part_size,
+            queue_parts=queue_parts,
+            timeout=timeout,
+        )
+    raise KeyError(f"Unbekanntes Archiv: {backend}")
@@ -0,0 +1,71 @@
+import threading
+from urllib.parse import urlsplit
+
+
+class ThroughputEstimator:
+    def __init__(self, alpha: float = 0.3, min_bytes: int = 65536):
+        """Moving estimate of the download throughput per host.
+
+        Uses an exponentially weighted moving average, recent downloads count more.
+
+        Args:
+            alpha (float): Weight of a new measurement, between 0 and 1. Default 0.3.
+            min_bytes (int): Smaller transfers are ignored, they only measure latency. Default 65536.
+        """
+        self.alpha = alpha
+        self.min_bytes = min_bytes
+
+        self._estimates = {}  # host: bytes per second
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        """Return the host part of an URL, used as key."""
+        return urlsplit(url).netloc
+
+    def record(self, url: str, size: int, seconds: float) -> None:
+        """Add a measurement.
+
+        Args:
+            url (str): Downloaded URL.
+            size (int): Received bytes.
+            seconds (float): Duration of the transfer.
+        """
+        if size < self.min_bytes or seconds <= 0:
+            return
+
+        rate = size / seconds
+        host = self.host(url)
+        with self._lock:
+            previous = self._estimates.get(host)
+            if previous is None:
+                self._estimates[host] = rate
+            else:
+                self._estimates[host] = self.alpha * rate + (1 - self.alpha) * previous
+
+    def estimate(self, url: str) -> float | None:
+        """Return the estimated throughput of the host of an URL.
+
+        Args:
+            url (str): URL on the host.
+
+        Returns:
+            float | None: Bytes per second, None if nothing was measured yet.
+        """
+        with self._lock:
+            return self._estimates.get(self.host(url))
+
+    def predict_seconds(self, url: str, size: int) -> float | None:
+        """Predict the download time of a file.
+
+        Args:
+            url (str): URL of the file.
+            size (int): Size of the file in bytes.
+
+        Returns:
+            float | None: Seconds or None if the host has no estimate yet.
+        """
+        rate = self.estimate(url)
+        if not rate:
+            return None
+        return size / rate
@@ -0,0 +1,54 @@
+import threading
+
+
+class TokenStore:
+    def __init__(self):
+        """OAuth tokens shared by all workers of the process that use the same credentials.
+
+        Keys are (auth URL, client ID, client secret), so a wrong secret never gets the token
+        of a correct one.
+        """
+        self._tokens = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._remote = None
+
+    def connect(self, remote) -> None:
+        """Use the store of another process instead, f.ex. the broker of the process pool.
+
+        Args:
+            remote: Object with the methods of TokenStore.
+        """
+        self._remote = remote
+
+    def lock(self, key: tuple) -> threading.Lock:
+        """Lock of a credential, held while requesting a token, so only one worker requests it."""
+        if self._remote:
+            return self._remote.lock(key)
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: tuple) -> str:
+        """Return the stored token or an empty string."""
+        if self._remote:
+            return self._remote.get(key)
+        with self._lock:
+            return self._tokens.get(key, "")
+
+    def put(self, key: tuple, token: str) -> None:
+        if self._remote:
+            return self._remote.put(key, token)
+        with self._lock:
+            self._tokens[key] = token
+
+    def invalidate(self, key: tuple, token: str) -> None:
+        """Remove a rejected token. A newer token of another worker is kept."""
+        if self._remote:
+            return self._remote.invalidate(key, token)
+        with self._lock:
+            if self._tokens.get(key) == token:
+                del self._tokens[key]
+
+
+# Process wide store, shared by all workers
+token_store = TokenStore()
@@ -0,0 +1,253 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from urllib3 import connection
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, trace_id: str, parent_id: str | None, name: str, start: float, attributes: dict):
+        """A timed stage of a worker cycle.
+
+        Args:
+            trace_id (str): Id of the cycle.
+            parent_id (str | None): Id of the enclosing span, None for the cycle itself.
+            name (str): Stage name, f.ex. "get_news_data" or "tls".
+            start (float): time.perf_counter() at the start.
+            attributes (dict): Details like host, status or bytes.
+        """
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+
+class _NoSpan:
+    """Returned outside of a traced cycle, so callers never check for None."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Trace:
+    def __init__(self, root: Span):
+        self.root = root
+        self.wall_start = time.time()  # Wall clock time of root.start
+        self.stack = [root]
+        self.spans = [root]
+
+
+class JSONLinesExporter:
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024):
+        """Append finished cycles to a file, one JSON object per span.
+
+        The fields follow the span model of OpenTelemetry (trace_id, span_id, parent_id, name,
+        start, duration, attributes). The file is rotated to "<path>.1" when it gets too big.
+
+        Args:
+            path (str): File path.
+            max_bytes (int): Size that triggers the rotation, 0 never rotates. Default 10 MiB.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, trace: _Trace) -> None:
+        lines = []
+        for span in trace.spans:
+            record = {
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start": round(trace.wall_start + span.start - trace.root.start, 6),
+                "duration_ms": round((span.end - span.start) * 1000, 3),
+                "attributes": span.attributes,
+            }
+            if span.error:
+                record["error"] = span.error
+            lines.append(json.dumps(record, default=str))
+
+        with self._lock:
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            # One write per cycle, lines of other processes are not mixed into it
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+class Tracer:
+    def __init__(self):
+        """Records the stages of worker cycles as spans.
+
+        Every worker thread has its own current cycle. Spans outside of a cycle and all spans
+        while tracing is off cost a single check and are not recorded.
+        """
+        self.log = logging.getLogger("news_downloader")
+
+        self.exporter = None
+        self._local = threading.local()
+        self._installed = False
+
+    def configure(self, path: str, max_bytes: int = 10 * 1024 * 1024) -> None:
+        """Turn tracing on or off for the whole process.
+
+        Args:
+            path (str): File for the spans, empty turns tracing off.
+            max_bytes (int): Size that triggers the rotation of the file. Default 10 MiB.
+        """
+        if not path:
+            self.exporter = None
+            return
+        if self.exporter is None or self.exporter.path != path:
+            self.exporter = JSONLinesExporter(path, max_bytes)
+            self.install()
+        self.exporter.max_bytes = max_bytes
+
+    def install(self) -> None:
+        """Time the connection setup of urllib3 (and requests): TCP connect and TLS handshake."""
+        if self._installed:
+            return
+        self._installed = True
+        tracer = self
+        new_conn = connection.HTTPConnection._new_conn
+        https_connect = connection.HTTPSConnection.connect
+
+        def _new_conn(conn):
+            with tracer.span("tcp_connect", host=conn.host, port=conn.port):
+                sock = new_conn(conn)
+            conn._tcp_connected_at = time.perf_counter()
+            return sock
+
+        def connect(conn):
+            start = time.perf_counter()
+            try:
+                https_connect(conn)
+            finally:
+                # The handshake starts when the TCP connection is up
+                tls_start = getattr(conn, "_tcp_connected_at", start)
+                tracer.record("tls", tls_start, time.perf_counter(), host=conn.host)
+
+        connection.HTTPConnection._new_conn = _new_conn
+        connection.HTTPSConnection.connect = connect
+
+    def begin_trace(self, name: str, **attributes) -> Span | None:
+        """Start a cycle in the current thread.
+
+        Args:
+            name (str): Name of the cycle.
+            **attributes: Details of the cycle, f.ex. the profile.
+
+        Returns:
+            Span | None: The root span for end_trace(), None if tracing is off.
+        """
+        if self.exporter is None:
+            self._local.trace = None
+            return None
+        root = Span(os.urandom(16).hex(), None, name, time.perf_counter(), attributes)
+        self._local.trace = _Trace(root)
+        return root
+
+    def end_trace(self, root: Span | None, **attributes) -> None:
+        """Finish the cycle of the current thread and export its spans.
+
+        Args:
+            root (Span | None): Span of begin_trace().
+            **attributes: Details known at the end of the cycle.
+        """
+        trace = getattr(self._local, "trace", None)
+        self._local.trace = None
+        if root is None or trace is None or trace.root is not root:
+            return
+        root.end = time.perf_counter()
+        root.set(**attributes)
+        exporter = self.exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export(trace)
+        except OSError as ex:
+            self.log.warning(f"Tracing: Spans not written: {repr(ex)}")
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a stage inside the current cycle.
+
+        Args:
+            name (str): Stage name.
+            **attributes: Details of the stage.
+
+        Yields:
+            Span: The span, add details with set(). A dummy outside of a cycle.
+        """
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            yield _NO_SPAN
+            return
+
+        span = Span(trace.root.trace_id, trace.stack[-1].span_id, name, time.perf_counter(), attributes)
+        trace.spans.append(span)
+        trace.stack.append(span)
+        try:
+            yield span
+        except BaseException as ex:
+            span.error = repr(ex)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            trace.stack.pop()
+
+    def record(self, name: str, start: float, end: float, **attributes) -> None:
+        """Add a stage that was timed elsewhere to the current span.
+
+        Args:
+            name (str): Stage name.
+            start (float): time.perf_counter() at the start.
+            end (float): time.perf_counter() at the end.
+            **attributes: Details of the stage.
+        """
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return
+        span = Span(trace.root.trace_id, trace.stack[-1].span_id, name, start, attributes)
+        span.end = end
+        trace.spans.append(span)
+
+
+def traced(name: str):
+    """Decorator, run a function as a span of the current cycle.
+
+    Args:
+        name (str): Stage name.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Process wide tracer, every worker thread records its own cycles
+tracer = Tracer()
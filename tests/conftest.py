@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from srgssr_news_downloader.utils.clock import VirtualClock, clock
+from srgssr_news_downloader.utils.config_helper import ConfigHelper
+from srgssr_news_downloader.utils.srgssr_api_helper import APIWorker
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413  # MPEG1 Layer 3, 128 kbit/s, 44.1 kHz, 417 bytes
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body: bool):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        media = self.server.files.get(self.path)
+        if media is None:
+            self.send_error(404)
+            return
+        if self.command not in media.get("methods", ("GET", "HEAD")):
+            self.send_error(405)
+            return
+
+        headers = dict(media.get("headers", {}))
+        etag = headers.get("ETag")
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        time.sleep(media.get("delay", 0))
+        body = media.get("body", b"")
+        headers.setdefault("Content-Type", "audio/mpeg")
+        headers.setdefault("Content-Length", str(len(body)))
+        self.send_response(media.get("status", 200))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class MediaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        """Serves the entries of `files` (path: {"body", "headers", "status", "methods", "delay"}) and keeps all requests."""
+        super().__init__(("127.0.0.1", 0), _MediaHandler)
+        self.files = {}
+        self.requests = []
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+    def hits(self, path: str, method: str = "GET") -> int:
+        return sum(1 for m, p, _ in self.requests if (m, p) == (method, path))
+
+
+@pytest.fixture
+def virtual_clock():
+    virtual = VirtualClock(1_700_000_000)
+    previous = clock.use(virtual)
+    yield virtual
+    clock.use(previous)
+
+
+@pytest.fixture
+def build_mp3():
+    def build(seconds: float = 2, fill: int = 0) -> bytes:
+        """MP3 file of the given length, `fill` makes the audio of two files differ."""
+        frame = FRAME[:4] + bytes([fill]) * (len(FRAME) - 4)
+        return frame * int(seconds * 44100 / 1152 + 1)
+
+    return build
+
+
+@pytest.fixture
+def media_server():
+    server = MediaServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = ConfigHelper(str(tmp_path / "config.ini"))
+    config.create_config()
+    config.set_value("audio_file", "filepath", str(tmp_path / "out"))
+    config.set_value("validation", "min_duration", "1")
+    os.makedirs(tmp_path / "out")
+    return config
+
+
+@pytest.fixture
+def worker(config):
+    """Worker with the configuration read, but not running. Set `latest_file_dict` to download."""
+    worker = APIWorker(config)
+    worker.populate_config_data()
+    worker.latest_file_dict = {"id": "e1", "date": "2025-01-01T10:00:00+01:00"}
+    yield worker
+    worker.stop_shared_services()
+
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from srgssr_news_downloader.utils.bandwidth import (
+    BandwidthShaper,
+    in_airtime_window,
+    seconds_until_airtime,
+)
+from srgssr_news_downloader.utils.clock import VirtualClock, clock
+
+
+@pytest.fixture
+def at_time():
+    previous = clock.source
+
+    def use(hour: int, minute: int, second: int = 0) -> VirtualClock:
+        virtual = VirtualClock(datetime(2025, 1, 1, hour, minute, second).timestamp())
+        clock.use(virtual)
+        return virtual
+
+    yield use
+    clock.use(previous)
+
+
+def test_seconds_until_airtime():
+    assert seconds_until_airtime([0, 30], datetime(2025, 1, 1, 10, 55)) == 300
+    assert seconds_until_airtime([0, 30], datetime(2025, 1, 1, 10, 15)) == 900
+    # Airtime just passed: the next one
+    assert seconds_until_airtime([0], datetime(2025, 1, 1, 11, 0)) == 3600
+    assert seconds_until_airtime([], datetime(2025, 1, 1, 11, 0)) is None
+
+
+@pytest.mark.parametrize(
+    "now, expected",
+    [
+        (datetime(2025, 1, 1, 10, 57), False),
+        (datetime(2025, 1, 1, 10, 58), True),  # Across the hour
+        (datetime(2025, 1, 1, 11, 0), True),
+        (datetime(2025, 1, 1, 11, 10), True),
+        (datetime(2025, 1, 1, 11, 10, 1), False),
+        (datetime(2025, 1, 1, 23, 59), True),  # Across the day
+    ],
+)
+def test_airtime_window(now, expected):
+    assert in_airtime_window([0], before=120, after=600, now=now) is expected
+
+
+def test_unlimited_without_configuration(at_time):
+    at_time(10, 0)
+    shaper = BandwidthShaper()
+    shaper.throttle(10_000_000)
+    assert clock.monotonic() == 0
+    assert shaper.current_limit() == 0
+
+
+def test_rate_is_limited(at_time):
+    at_time(10, 0)
+    shaper = BandwidthShaper()
+    shaper.configure(max_rate=100_000)
+    for _ in range(20):
+        shaper.throttle(65536)
+    # One second of burst, the rest at the configured rate
+    assert clock.monotonic() == pytest.approx((20 * 65536 - 100_000) / 100_000, abs=0.01)
+
+
+def test_limit_only_around_airtime(at_time):
+    shaper = BandwidthShaper()
+    shaper.configure(max_rate=100_000, airtime_minutes=[0], burst_until=120, cap_duration=600)
+
+    at_time(10, 30)
+    for _ in range(20):
+        shaper.throttle(65536)
+    assert clock.monotonic() == 0
+
+    at_time(10, 59)
+    assert shaper.current_limit() == 100_000
+    for _ in range(20):
+        shaper.throttle(65536)
+    assert clock.monotonic() > 10
+
+
+def test_reconfigure_off(at_time):
+    at_time(10, 0)
+    shaper = BandwidthShaper()
+    shaper.configure(max_rate=1000)
+    shaper.configure(max_rate=0)
+    shaper.throttle(10_000_000)
+    assert clock.monotonic() == 0
+
+
+def test_download_slots():
+    shaper = BandwidthShaper()
+    shaper.configure(max_concurrent=1)
+    first, second = threading.Event(), threading.Event()
+    release = threading.Event()
+
+    def download(started: threading.Event):
+        with shaper.download_slot():
+            started.set()
+            release.wait(5)
+
+    threads = [threading.Thread(target=download, args=(started,)) for started in (first, second)]
+    threads[0].start()
+    assert first.wait(5)
+    threads[1].start()
+    time.sleep(0.2)
+    assert not second.is_set()
+
+    release.set()
+    assert second.wait(5)
+    for thread in threads:
+        thread.join()
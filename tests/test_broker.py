@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from srgssr_news_downloader.utils.broker import (
+    BrokerManager,
+    TokenBroker,
+    _RemoteBucket,
+    _RemoteQuota,
+    _RemoteTokenStore,
+)
+from srgssr_news_downloader.utils.metrics import MetricsRegistry
+from srgssr_news_downloader.utils.process_supervisor import ProcessPoolSupervisor
+
+KEY = ("https://oauth.example/token", "client", "secret")
+AUTHKEY = b"test-broker"
+
+
+def hold_lease(address: tuple, acquired) -> None:
+    """Take the lease of KEY and hang, like a worker stuck in a token request."""
+    manager = BrokerManager(address=address, authkey=AUTHKEY)
+    manager.connect()
+    store = _RemoteTokenStore(manager.broker())
+    with store.lock(KEY):
+        acquired.set()
+        time.sleep(600)
+
+
+def request_token(address: tuple, tokens) -> None:
+    """Get the token like APIWorker.get_auth_token(), a new one if none is stored."""
+    manager = BrokerManager(address=address, authkey=AUTHKEY)
+    manager.connect()
+    store = _RemoteTokenStore(manager.broker())
+    with store.lock(KEY):
+        token = store.get(KEY) or f"token-{os.getpid()}"
+        store.put(KEY, token)
+    tokens.put(token)
+
+
+@pytest.fixture
+def manager():
+    context = multiprocessing.get_context("spawn")
+    manager = BrokerManager(address=("127.0.0.1", 0), authkey=AUTHKEY, ctx=context)
+    manager.start()
+    yield manager, context
+    manager.shutdown()
+
+
+def test_killed_holder_does_not_block_the_token(manager):
+    manager, context = manager
+    acquired = context.Event()
+    holder = context.Process(target=hold_lease, args=(manager.address, acquired))
+    holder.start()
+    assert acquired.wait(30)
+    holder.kill()
+    holder.join()
+
+    tokens = context.Queue()
+    start = time.monotonic()
+    requester = context.Process(target=request_token, args=(manager.address, tokens))
+    requester.start()
+    token = tokens.get(timeout=30)
+    requester.join()
+    # Taken over at once, not after the lease expired
+    assert time.monotonic() - start < 20
+    assert token.startswith("token-")
+    assert manager.broker().token_get(KEY) == token
+
+
+def test_live_holder_blocks_until_release():
+    broker = TokenBroker()
+    assert broker.token_lease_acquire(KEY, (os.getpid(), 1), 60, 0)
+    assert not broker.token_lease_acquire(KEY, (os.getpid(), 2), 60, 0.1)
+
+    threading.Timer(0.2, broker.token_lease_release, (KEY, (os.getpid(), 1))).start()
+    start = time.monotonic()
+    assert broker.token_lease_acquire(KEY, (os.getpid(), 2), 60, 5)
+    assert time.monotonic() - start < 1
+
+
+def test_expired_lease_is_taken_over():
+    broker = TokenBroker()
+    assert broker.token_lease_acquire(KEY, (os.getpid(), 1), 0.2, 0)
+    assert broker.token_lease_acquire(KEY, (os.getpid(), 2), 60, 5)
+    # The late release of the first owner leaves the new lease alone
+    broker.token_lease_release(KEY, (os.getpid(), 1))
+    assert not broker.token_lease_acquire(KEY, (os.getpid(), 3), 60, 0)
+
+
+def test_rate_limit_shared_by_workers():
+    broker = TokenBroker()
+    settings = {"requests_per_minute": 60, "burst": 2, "daily_limit": 3, "state_file": ""}
+    broker.configure("client", settings)
+    first, second = _RemoteBucket(broker, "client", 1, 2), _RemoteBucket(broker, "client", 1, 2)
+    assert first.acquire(timeout=0)
+    assert second.acquire(timeout=0)
+    assert not first.acquire(timeout=0)
+
+    quotas = [_RemoteQuota(broker, "client", 3, "") for _ in range(2)]
+    quotas[0].count()
+    quotas[1].count(2)
+    assert quotas[0].used == 3
+    assert quotas[1].remaining() == 0
+
+    # A reload changes the limiter in place, the count stays
+    broker.configure("client", dict(settings, daily_limit=10))
+    assert quotas[0].remaining() == 7
+
+
+def test_metrics_aggregated_over_processes():
+    broker = TokenBroker()
+    for worker in (0, 1):
+        registry = MetricsRegistry()
+        registry.inc("downloads_total", 2, profile="srf")
+        registry.set("last_download_timestamp", 100 + worker, profile="srf")
+        broker.report_metrics(worker, registry.types(), registry.snapshot())
+    text = broker.aggregated_metrics()
+    assert 'news_downloader_downloads_total{profile="srf"} 4' in text
+    assert 'news_downloader_last_download_timestamp{profile="srf",worker="0"} 100' in text
+    assert 'news_downloader_last_download_timestamp{profile="srf",worker="1"} 101' in text
+
+
+def test_profiles_sharded_over_processes(config):
+    for name in ("srf", "rts", "rsi"):
+        config.set_value(f"profile:{name}", "api.business_unit", name)
+    assert ProcessPoolSupervisor(config, processes=2).shards == [["srf", "rsi"], ["rts"]]
+    assert ProcessPoolSupervisor(config, processes=8).shards == [["srf"], ["rts"], ["rsi"]]
+
+
+def test_crashed_process_is_restarted(config, media_server):
+    # The API answers 404, the worker keeps retrying until it is stopped
+    config.set_value("auth", "auth_url", media_server.url("/token"))
+    config.set_value("api", "api_url", media_server.url("/{bu}/podcasts"))
+    supervisor = ProcessPoolSupervisor(config, processes=1, restart_delay=0.1)
+    supervisor.start()
+    runner = threading.Thread(target=supervisor.run)
+    runner.start()
+    try:
+        first = supervisor._processes[0]
+        first.kill()
+        deadline = time.monotonic() + 30
+        while supervisor._processes[0] is first and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert supervisor._processes[0] is not first
+        assert supervisor._processes[0].is_alive()
+    finally:
+        supervisor.stop()
+        runner.join(90)
+    assert not supervisor._processes[0].is_alive()
+    assert supervisor._processes[0].exitcode == 0
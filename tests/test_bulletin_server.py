@@ -0,0 +1,155 @@
+import hashlib
+import http.client
+import json
+import threading
+
+import pytest
+import requests
+
+from srgssr_news_downloader.utils.bulletin_server import BulletinServer, PublishEvents
+from srgssr_news_downloader.utils.download_history import DownloadHistory
+from srgssr_news_downloader.utils.publisher import Publisher
+
+AUDIO = b"0123456789"
+
+
+@pytest.fixture
+def server(tmp_path):
+    publisher = Publisher(str(tmp_path / "srf_news.mp3"), str(tmp_path / "versions"))
+    history = DownloadHistory(str(tmp_path / "versions" / "history.jsonl"))
+    temp_path = publisher.create_temp_file()
+    with open(temp_path, "wb") as f:
+        f.write(AUDIO)
+    version_path = publisher.publish(temp_path, "srf_news_20250101_100000")
+    history.append("published", path=version_path, sha256="abc")
+
+    server = BulletinServer(publisher, history, PublishEvents(), port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def url(server: BulletinServer, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+
+def test_latest_with_etag_from_history(server):
+    response = requests.get(url(server, "/latest.mp3"))
+    assert response.status_code == 200
+    assert response.content == AUDIO
+    assert response.headers["ETag"] == '"abc"'
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_etag_without_history(server):
+    server.etags.history = DownloadHistory(server.etags.history.filename + ".missing")
+    response = requests.head(url(server, "/latest.mp3"))
+    assert response.headers["ETag"] == f'"{hashlib.sha256(AUDIO).hexdigest()}"'
+
+
+@pytest.mark.parametrize(
+    "if_none_match", ['"abc"', 'W/"abc"', '"old", "abc"', '"old" ,W/"abc"', "*"]
+)
+def test_not_modified(server, if_none_match):
+    response = requests.get(url(server, "/latest.mp3"), headers={"If-None-Match": if_none_match})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == '"abc"'
+
+
+@pytest.mark.parametrize("if_none_match", ['"ab"', '"abcd"', '"xabcx"', "abc", '""'])
+def test_other_etags_are_modified(server, if_none_match):
+    response = requests.get(url(server, "/latest.mp3"), headers={"If-None-Match": if_none_match})
+    assert response.status_code == 200
+    assert response.content == AUDIO
+
+
+@pytest.mark.parametrize(
+    "byte_range, content, content_range",
+    [
+        ("bytes=2-4", b"234", "bytes 2-4/10"),
+        ("bytes=7-", b"789", "bytes 7-9/10"),
+        ("bytes=-3", b"789", "bytes 7-9/10"),
+        ("bytes=8-100", b"89", "bytes 8-9/10"),
+        ("bytes=-100", AUDIO, "bytes 0-9/10"),
+    ],
+)
+def test_range(server, byte_range, content, content_range):
+    response = requests.get(url(server, "/latest.mp3"), headers={"Range": byte_range})
+    assert response.status_code == 206
+    assert response.content == content
+    assert response.headers["Content-Range"] == content_range
+
+
+@pytest.mark.parametrize("byte_range", ["bytes=10-", "bytes=5-2", "bytes=-", "items=0-1", "bytes=0-1,3-4"])
+def test_unsatisfiable_range(server, byte_range):
+    response = requests.get(url(server, "/latest.mp3"), headers={"Range": byte_range})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */10"
+
+
+def test_if_range(server):
+    response = requests.get(url(server, "/latest.mp3"), headers={"Range": "bytes=0-1", "If-Range": '"abc"'})
+    assert response.status_code == 206
+    # Changed meanwhile: the whole new file instead of a part
+    response = requests.get(url(server, "/latest.mp3"), headers={"Range": "bytes=0-1", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == AUDIO
+
+
+def test_archive(server):
+    assert requests.get(url(server, "/archive")).json() == ["srf_news_20250101_100000.mp3"]
+    response = requests.get(url(server, "/archive/srf_news_20250101_100000.mp3"))
+    assert response.content == AUDIO
+    assert "immutable" in response.headers["Cache-Control"]
+    assert requests.get(url(server, "/archive/..%2Fsrf_news.mp3")).status_code == 404
+    assert requests.get(url(server, "/archive/.hidden")).status_code == 404
+    assert requests.get(url(server, "/archive/missing.mp3")).status_code == 404
+
+
+def test_wait_returns_next_event(server):
+    threading.Timer(0.2, server.events.publish, args=({"file": "a.mp3"},)).start()
+    response = requests.get(url(server, "/wait?since=0&timeout=5"))
+    assert response.json() == {"file": "a.mp3", "id": 1}
+    # Already published: returned at once
+    assert requests.get(url(server, "/wait?since=0&timeout=5")).json()["id"] == 1
+
+
+def test_wait_timeout(server):
+    server.events.publish({"file": "a.mp3"})
+    assert requests.get(url(server, "/wait?since=1&timeout=0.1")).status_code == 204
+    # An ID from before a restart is clamped to the current one
+    assert requests.get(url(server, "/wait?since=99&timeout=0.1")).status_code == 204
+
+
+@pytest.mark.parametrize("query", ["since=x", "timeout=x", "timeout=nan", "timeout=inf"])
+def test_wait_bad_parameters(server, query):
+    assert requests.get(url(server, f"/wait?{query}")).status_code == 400
+
+
+def read_event(response: http.client.HTTPResponse) -> tuple[bytes, dict]:
+    lines = [response.fp.readline() for _ in range(4)]
+    assert lines[1] == b"event: bulletin\n"
+    assert lines[3] == b"\n"
+    return lines[0], json.loads(lines[2][len(b"data: ") :])
+
+
+def test_event_stream(server):
+    server.events.publish({"file": "a.mp3"})
+    server.events.publish({"file": "b.mp3"})
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+    connection.request("GET", "/events", headers={"Last-Event-ID": "0"})
+    response = connection.getresponse()
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "text/event-stream"
+
+    # The newest event, the ones in between are not replayed
+    assert read_event(response) == (b"id: 2\n", {"file": "b.mp3", "id": 2})
+    server.events.publish({"file": "c.mp3"})
+    assert read_event(response) == (b"id: 3\n", {"file": "c.mp3", "id": 3})
+    connection.close()
+
+
+def test_event_stream_bad_id(server):
+    assert requests.get(url(server, "/events"), headers={"Last-Event-ID": "x"}).status_code == 400
@@ -0,0 +1,137 @@
+import json
+import os
+
+import pytest
+import requests
+
+from srgssr_news_downloader.utils.cassette import Cassette, RecordingHTTPClient, ReplayHTTPClient
+
+API = "https://api.example/podcasts"
+TOKEN = "https://api.example/token"
+JSON = {"Content-Type": "application/json"}
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    cassette = Cassette(str(tmp_path / "day.cassette"))
+    cassette.create(1_700_000_000)
+    return cassette
+
+
+def reload(cassette: Cassette) -> Cassette:
+    loaded = Cassette(cassette.path)
+    loaded.load()
+    return loaded
+
+
+def test_tokens_are_redacted(cassette):
+    body = json.dumps({"access_token": "secret-token", "expires_in": 3600}).encode()
+    cassette.add(1, "POST", TOKEN, 0.1, 200, JSON, body)
+    cassette.add(2, "GET", API, 0.1, 200, JSON, b'{"podcasts": []}')
+    cassette.add(3, "GET", API, 0.1, 200, {"Content-Type": "text/plain"}, b"access_token")
+
+    with open(cassette.path, encoding="utf-8") as f:
+        assert "secret-token" not in f.read()
+    loaded = reload(cassette)
+    assert loaded.response(loaded.find("POST", TOKEN, 1)).json() == {"access_token": "redacted", "expires_in": 3600}
+    assert loaded.response(loaded.find("GET", API, 2)).text == '{"podcasts": []}'
+    assert loaded.response(loaded.find("GET", API, 3)).text == "access_token"
+
+
+def test_media_stored_once(cassette):
+    audio = {"Content-Type": "audio/mpeg"}
+    cassette.add(1, "GET", "https://cdn.example/a.mp3?token=1", 1, 200, audio, b"\xff\xfbaudio")
+    cassette.add(2, "GET", "https://cdn.example/a.mp3?token=2", 1, 200, audio, b"\xff\xfbaudio")
+    with open(cassette.path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+    assert len(os.listdir(cassette.media_dir)) == 1
+
+    loaded = reload(cassette)
+    # Another query string matches on host and path
+    interaction = loaded.find("GET", "https://cdn.example/a.mp3?token=3", 5)
+    assert interaction["url"].endswith("token=2")
+    assert loaded.response(interaction).content == b"\xff\xfbaudio"
+
+
+def test_find_latest_exchange_up_to_offset(cassette):
+    for offset, status in ((10, 500), (20, 200), (30, 304)):
+        cassette.add(offset, "GET", API, 0.1, status, JSON, b"{}")
+    loaded = reload(cassette)
+    assert loaded.find("GET", API, 5)["status"] == 500  # Before the first one
+    assert loaded.find("GET", API, 20)["status"] == 200
+    assert loaded.find("GET", API, 29.9)["status"] == 200
+    assert loaded.find("GET", API, 100)["status"] == 304
+    assert loaded.find("GET", API, 20, skip=1)["status"] == 304
+    assert loaded.find("GET", API, 20, skip=5)["status"] == 304
+    assert loaded.find("HEAD", API, 20) is None
+    assert loaded.find("GET", "https://other.example/podcasts", 20) is None
+    assert loaded.duration == 30
+
+
+def test_load(cassette, tmp_path):
+    cassette.add(1, "GET", API, 0.1, 200, JSON, b"{}")
+    with open(cassette.path, "a", encoding="utf-8") as f:
+        f.write('{"offset": 2, "meth')  # Killed while writing
+    assert len(reload(cassette).interactions) == 1
+
+    other = tmp_path / "other.txt"
+    other.write_text("not a cassette\n")
+    with pytest.raises(KeyError):
+        Cassette(str(other)).load()
+
+
+def test_recording(cassette, media_server, virtual_clock):
+    cassette.start = virtual_clock.time() - 60
+    body = b'{"access_token": "secret-token"}'
+    media_server.files["/token"] = {"body": body, "headers": JSON}
+    http = RecordingHTTPClient(cassette)
+    try:
+        response = http.get(media_server.url("/token"))
+        # The worker gets the real token, only the file is redacted
+        assert response.json() == {"access_token": "secret-token"}
+        with pytest.raises(requests.exceptions.ConnectionError):
+            http.get("http://127.0.0.1:9/podcasts", timeout=2)
+    finally:
+        http.close()
+
+    loaded = reload(cassette)
+    recorded, failed = loaded.interactions
+    assert recorded["offset"] == 60
+    assert recorded["status"] == 200
+    assert json.loads(recorded["body"]) == {"access_token": "redacted"}
+    assert failed["error"] == "ConnectionError"
+    assert "status" not in failed
+
+
+@pytest.fixture
+def replay(cassette, virtual_clock):
+    """Cassette of an expired token: 401, new token, 200."""
+    cassette.add(10, "GET", API, 0.5, 401, JSON, b'{"fault": "expired"}')
+    cassette.add(11, "POST", TOKEN, 0.2, 200, JSON, b'{"access_token": "t"}')
+    cassette.add(12, "GET", API, 0.5, 200, JSON, b'{"podcasts": [{"date": "2025-01-01T10:00:00+01:00"}]}')
+    cassette.add(20, "GET", API, 30, error="ReadTimeout")
+    virtual_clock.advance(cassette.start + 10 - virtual_clock.time())
+    return ReplayHTTPClient(reload(cassette))
+
+
+def test_replayed_401_until_new_token(replay, virtual_clock):
+    assert replay.get(API).status_code == 401
+    assert virtual_clock.time() - replay.cassette.start == 10.5  # The recorded duration passed
+    assert replay.get(API).status_code == 401  # No new token yet
+    replay.post(TOKEN)
+    response = replay.get(API)  # Still before the recorded 200
+    assert response.status_code == 200
+    assert replay.first_seen == {"2025-01-01T10:00:00+01:00": pytest.approx(11.2)}
+    assert [entry["status"] for entry in replay.requests] == [401, 401, 200, 200]
+
+
+def test_replayed_errors_and_unknown_urls(replay, virtual_clock):
+    virtual_clock.advance(10)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        replay.get(API)
+    assert replay.requests[-1]["error"] == "ReadTimeout"
+
+    response = replay.get("https://other.example/podcasts")
+    assert response.status_code == 404
+    assert not replay.requests[-1]["matched"]
+    assert replay.prewarm(API)
@@ -0,0 +1,94 @@
+import math
+from email.utils import formatdate
+
+import pytest
+
+from srgssr_news_downloader.utils.clock_skew import ClockSkewEstimator, clock_skew
+from srgssr_news_downloader.utils.http_client import HTTPClient
+
+URL = "https://api.example/podcasts"
+START = 1_700_000_000
+
+
+def date_header(server_time: float) -> dict:
+    # Whole seconds, like every HTTP server
+    return {"Date": formatdate(math.floor(server_time), usegmt=True)}
+
+
+def request(estimator: ClockSkewEstimator, sent: float, offset: float, rtt: float = 0.1, url: str = URL) -> None:
+    """A response dated halfway through the request by a server `offset` seconds ahead."""
+    estimator.observe(url, date_header(sent + rtt / 2 + offset), sent, sent + rtt)
+
+
+def test_single_response_bounds(virtual_clock):
+    estimator = ClockSkewEstimator()
+    estimator.observe(URL, date_header(START + 5), START + 0.2, START + 0.4)
+    # Server time 1005.0 to 1005.999 between local 1000.2 and 1000.4
+    offset, uncertainty = estimator.estimate(URL)
+    assert offset - uncertainty == pytest.approx(4.6)
+    assert offset + uncertainty == pytest.approx(5.8)
+
+
+def test_intersection_narrows_estimate(virtual_clock):
+    estimator = ClockSkewEstimator()
+    for index in range(40):
+        # Requests at different fractions of a second, each sees the second flip elsewhere
+        request(estimator, START + index * 7.37, offset=5.3)
+    offset, uncertainty = estimator.estimate("https://api.example/other/path")
+    assert uncertainty < 0.1
+    assert abs(offset - 5.3) <= uncertainty
+    assert estimator.offset("https://cdn.example/a.mp3") is None
+
+
+def test_clock_step_is_followed_at_once(virtual_clock):
+    estimator = ClockSkewEstimator()
+    for index in range(40):
+        request(estimator, START + index * 7.37, offset=5.3)
+    # The local clock was set back by 10 seconds
+    request(estimator, START + 400, offset=15.3)
+    offset, uncertainty = estimator.estimate(URL)
+    assert 14.8 <= offset - uncertainty and offset + uncertainty <= 16
+    request(estimator, START + 407.5, offset=15.3)
+    assert abs(estimator.offset(URL) - 15.3) < 0.5
+
+
+def test_ignored_responses(virtual_clock):
+    estimator = ClockSkewEstimator()
+    estimator.observe(URL, {}, START, START + 0.1)
+    estimator.observe(URL, {"Date": "yesterday"}, START, START + 0.1)
+    estimator.observe(URL, dict(date_header(START + 60), Age="60"), START, START + 0.1)  # From a cache
+    estimator.observe(URL, date_header(START), START + 0.1, START)  # Clock set back during the request
+    assert estimator.estimate(URL) is None
+
+
+def test_old_responses_expire(virtual_clock):
+    estimator = ClockSkewEstimator(max_age=3600)
+    request(estimator, virtual_clock.time(), offset=5.3)
+    virtual_clock.advance(3601)
+    request(estimator, virtual_clock.time(), offset=-2.5)
+    offset, uncertainty = estimator.estimate(URL)
+    assert offset - uncertainty <= -2.5 <= offset + uncertainty
+    assert uncertainty > 0.4  # Only the new response
+
+
+def test_client_measures_server(media_server):
+    media_server.files["/podcasts"] = {"body": b"{}"}
+    http = HTTPClient()
+    try:
+        http.get(media_server.url("/podcasts"))
+    finally:
+        http.close()
+    # Same machine, the Date header of the test server is within a second of the local clock
+    offset, uncertainty = clock_skew.estimate(media_server.url("/"))
+    assert offset - uncertainty <= 0 <= offset + uncertainty
+    assert uncertainty <= 0.6
+
+
+def test_worker_uses_server_time(worker, virtual_clock):
+    for index in range(40):
+        request(clock_skew, virtual_clock.time() - 300 + index * 7.37, offset=-90, url=worker.api_url)
+    worker.clock_correction = True
+    assert worker.clock_offset() == pytest.approx(-90, abs=0.1)
+    assert (worker.server_now().timestamp() - virtual_clock.time()) == pytest.approx(-90, abs=0.1)
+    worker.clock_correction = False
+    assert worker.clock_offset() is None
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+
+from srgssr_news_downloader.utils.download_history import DownloadHistory
+from srgssr_news_downloader.utils.srgssr_api_helper import APIWorker
+
+
+def test_history_append_and_last(tmp_path):
+    history = DownloadHistory(str(tmp_path / "history.jsonl"))
+    history.append("published", sha256="a")
+    history.append("dedup", sha256="a")
+    assert history.last()["event"] == "dedup"
+    assert history.last("published")["sha256"] == "a"
+    assert history.last("rejected") is None
+
+    reloaded = DownloadHistory(history.filename)
+    assert [entry["event"] for entry in reloaded.entries()] == ["published", "dedup"]
+
+
+def test_history_skips_cut_off_line(tmp_path):
+    filename = tmp_path / "history.jsonl"
+    filename.write_text(json.dumps({"event": "published", "sha256": "a"}) + '\n{"event": "publ')
+    history = DownloadHistory(str(filename))
+    assert history.last()["sha256"] == "a"
+
+
+def test_history_compaction(tmp_path):
+    history = DownloadHistory(str(tmp_path / "history.jsonl"), max_entries=3)
+    for number in range(7):
+        history.append("published", number=number)
+    assert [entry["number"] for entry in history.entries()] == [4, 5, 6]
+    history.reload()
+    assert [entry["number"] for entry in history.entries()] == [4, 5, 6]
+
+
+def test_identical_download_is_not_published(worker, media_server, build_mp3):
+    media_server.files["/a.mp3"] = {"body": build_mp3()}
+    worker.latest_file_dict["podcastHdUrl"] = media_server.url("/a.mp3")
+
+    assert worker.download()
+    latest = worker.publisher.latest_path
+    published = os.stat(latest)
+
+    assert not worker.download()
+    assert os.stat(latest).st_ino == published.st_ino
+    assert len(worker.publisher.list_versions()) == 1
+    assert worker.history.last()["event"] == "dedup"
+    assert not [name for name in os.listdir(worker.publisher.version_dir) if name.endswith(".part")]
+
+
+def test_changed_download_is_published(worker, media_server, build_mp3):
+    media_server.files["/a.mp3"] = {"body": build_mp3()}
+    worker.latest_file_dict["podcastHdUrl"] = media_server.url("/a.mp3")
+    assert worker.download()
+
+    corrected = build_mp3(fill=1)
+    media_server.files["/a.mp3"] = {"body": corrected}
+    assert worker.download()
+    with open(worker.publisher.latest_path, "rb") as f:
+        assert f.read() == corrected
+    assert worker.history.last("published")["sha256"] == hashlib.sha256(corrected).hexdigest()
+
+
+def test_published_hash_after_restart(worker, config, media_server, build_mp3):
+    media_server.files["/a.mp3"] = {"body": build_mp3()}
+    worker.latest_file_dict["podcastHdUrl"] = media_server.url("/a.mp3")
+    worker.download()
+    expected = worker.published_hash
+
+    restarted = APIWorker(config)
+    restarted.populate_config_data()
+    # Known from the history, the file is not read
+    restarted.history.append("published", path=restarted.publisher.current_version(), sha256="h")
+    assert restarted.get_published_hash() == "h"
+
+    # Unknown to the history, f.ex. a file from an older version: the file is hashed
+    restarted.published_hash = None
+    restarted.history.append("published", path="elsewhere.mp3", sha256="h")
+    assert restarted.get_published_hash() == expected
+
+
+def test_nothing_published(worker):
+    assert worker.get_published_hash() is None
@@ -0,0 +1,216 @@
+import json
+import os
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+import requests
+
+from srgssr_news_downloader.utils.health import (
+    HealthRegistry,
+    HealthServer,
+    SystemdNotifier,
+    WorkerHealth,
+    health,
+    summarize,
+)
+from srgssr_news_downloader.utils.srgssr_api_helper import APIWorker
+
+
+def test_ready_after_successful_poll(virtual_clock):
+    worker = WorkerHealth("srf", stall_timeout=60, max_poll_age=600)
+    snapshot = worker.snapshot()
+    assert (snapshot["state"], snapshot["live"], snapshot["ready"]) == ("starting", True, False)
+
+    worker.running()
+    worker.success("api")
+    assert worker.snapshot()["ready"]
+    virtual_clock.advance(601)
+    worker.beat()
+    snapshot = worker.snapshot()
+    assert snapshot["live"] and not snapshot["ready"]
+    assert snapshot["poll_age"] == 601
+
+    worker.running(standby=True)  # The standby does not poll
+    assert worker.snapshot()["ready"]
+
+
+def test_stalled_without_beat(virtual_clock):
+    worker = WorkerHealth(stall_timeout=60)
+    worker.running()
+    worker.success("api")
+    virtual_clock.advance(61)
+    snapshot = worker.snapshot()
+    assert (snapshot["state"], snapshot["live"], snapshot["ready"]) == ("stalled", False, False)
+    worker.beat()
+    assert worker.snapshot()["state"] == "running"
+
+
+def test_stopped_worker_is_not_live():
+    worker = WorkerHealth()
+    worker.running()
+    worker.stopped(failed=True)
+    assert worker.snapshot()["state"] == "failed"
+    assert not worker.snapshot()["live"]
+
+
+def test_error_until_stage_succeeds(virtual_clock):
+    worker = WorkerHealth()
+    worker.failure("oauth", requests.exceptions.ConnectTimeout("timeout"))
+    since = worker.snapshot()["error"]["since"]
+    virtual_clock.advance(60)
+    worker.failure("oauth", requests.exceptions.ConnectTimeout("timeout"))
+    error = worker.snapshot()["error"]
+    assert error["stage"] == "oauth"
+    assert error["since"] == since  # The same error goes on
+    assert worker.snapshot()["failures"] == 2
+
+    worker.success("media")
+    assert worker.snapshot()["error"] is not None
+    worker.success("api")  # Proves the token as well
+    assert worker.snapshot()["error"] is None
+    assert worker.snapshot()["failures"] == 0
+
+    worker.failure("media", "no_data", "Keine Episode")
+    assert worker.snapshot()["error"]["class"] == "no_data"
+    worker.success("media", episode="2025-01-01T10:00:00+01:00")
+    assert worker.snapshot()["error"] is None
+    assert worker.snapshot()["last_episode"] == "2025-01-01T10:00:00+01:00"
+
+
+def profile(live: bool, ready: bool) -> dict:
+    return {"live": live, "ready": ready}
+
+
+def test_summarize():
+    assert summarize({"srf": profile(True, True), "": profile(True, True)})["status"] == "ok"
+    assert summarize({"srf": profile(True, True), "rts": profile(True, False)})["status"] == "degraded"
+    report = summarize({"srf": profile(True, True), "": profile(False, False)})
+    assert (report["status"], report["live"], report["ready"]) == ("failed", False, False)
+    assert set(report["profiles"]) == {"srf", "default"}
+    # A process without workers is live but not ready
+    assert summarize({})["status"] == "degraded"
+
+
+def test_registry_keeps_new_worker():
+    registry = HealthRegistry()
+    old = registry.register("srf")
+    new = registry.register("srf")
+    registry.unregister(old)
+    assert registry.snapshot()["srf"]["state"] == "starting"
+    registry.unregister(new)
+    assert registry.snapshot() == {}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def health_server(tmp_path):
+    registry = HealthRegistry()
+    port = free_port()
+    server = HealthServer(registry.report, "127.0.0.1", port, str(tmp_path / "health.sock"))
+    server.start()
+    yield registry, f"http://127.0.0.1:{port}", server.unix_socket
+    server.stop()
+    assert not os.path.exists(server.unix_socket)
+
+
+def get(url: str) -> tuple[int, dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as ex:
+        return ex.code, json.load(ex)
+
+
+def test_health_endpoint(health_server):
+    registry, url, _ = health_server
+    worker = registry.register("srf")
+    worker.running()
+    status, report = get(f"{url}/health")
+    assert status == 200
+    assert report["profiles"]["srf"]["state"] == "running"
+    assert get(f"{url}/health/live") == (200, {"live": True, "status": "degraded"})
+    assert get(f"{url}/health/ready/") == (503, {"ready": False, "status": "degraded"})
+
+    worker.success("api")
+    assert get(f"{url}/health/ready?verbose=1")[0] == 200
+    worker.stopped(failed=True)
+    assert get(f"{url}/health")[0] == 503
+    assert requests.head(f"{url}/health/live", timeout=5).status_code == 503
+    assert requests.get(f"{url}/metrics", timeout=5).status_code == 404
+
+
+def test_health_over_unix_socket(health_server):
+    registry, _, path = health_server
+    registry.register("srf").running()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(path)
+        sock.sendall(b"GET /health/live HTTP/1.0\r\n\r\n")
+        response = b""
+        while chunk := sock.recv(4096):
+            response += chunk
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.0 200")
+    assert json.loads(body) == {"live": True, "status": "degraded"}
+
+
+def test_port_in_use():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        with pytest.raises(KeyError):
+            HealthServer(dict, "127.0.0.1", sock.getsockname()[1])
+
+
+@pytest.fixture
+def notify_socket(tmp_path, monkeypatch):
+    path = str(tmp_path / "notify.sock")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.settimeout(5)
+    monkeypatch.setenv("NOTIFY_SOCKET", path)
+    yield sock
+    sock.close()
+
+
+def test_sd_notify(notify_socket, monkeypatch):
+    monkeypatch.setenv("WATCHDOG_USEC", "20000000")
+    monkeypatch.setenv("WATCHDOG_PID", str(os.getpid()))
+    notifier = SystemdNotifier()
+    assert notifier.enabled
+    assert notifier.watchdog_interval == 10
+    assert notifier.notify(READY=1, STATUS="ok: srf running")
+    assert notify_socket.recv(1024) == b"READY=1\nSTATUS=ok: srf running"
+
+    # The watchdog of another process, f.ex. the parent
+    monkeypatch.setenv("WATCHDOG_PID", "1")
+    assert SystemdNotifier().watchdog_interval == 0
+
+
+def test_sd_notify_off(monkeypatch):
+    monkeypatch.delenv("NOTIFY_SOCKET", raising=False)
+    notifier = SystemdNotifier()
+    assert not notifier.enabled
+    assert not notifier.notify(READY=1)
+
+    monkeypatch.setenv("NOTIFY_SOCKET", "@news-downloader-test")
+    assert SystemdNotifier().address == "\0news-downloader-test"
+    monkeypatch.setenv("NOTIFY_SOCKET", "/nonexistent/notify.sock")
+    assert not SystemdNotifier().notify(READY=1)  # Logged, not raised
+
+
+def test_dead_worker_is_reported(config):
+    # No client id, the configuration test fails and the worker loop ends at once
+    worker = APIWorker(config, "health-test")
+    worker.run()
+    snapshot = health.snapshot()["health-test"]
+    assert (snapshot["state"], snapshot["live"]) == ("failed", False)
+    assert snapshot["error"]["stage"] == "config"
+    health.unregister(worker.health)
@@ -0,0 +1,81 @@
+import base64
+
+import pytest
+import requests
+from requests.auth import HTTPBasicAuth
+
+from srgssr_news_downloader.utils.http_client import (
+    HTTP2Client,
+    HTTPClient,
+    acquire_http_client,
+    create_http_client,
+    release_http_client,
+)
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+
+@pytest.fixture(params=[HTTPClient, HTTP2Client])
+def http(request):
+    client = request.param()
+    yield client
+    client.close()
+
+
+def test_stream(http, media_server):
+    media_server.files["/a.mp3"] = {"body": b"x" * 100_000, "headers": {"ETag": '"v1"'}}
+    response = http.get(media_server.url("/a.mp3"), stream=True)
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"v1"'
+    assert b"".join(response.iter_content(chunk_size=4096)) == b"x" * 100_000
+    response.close()
+
+
+def test_json_and_basic_auth(http, media_server):
+    media_server.files["/token"] = {"body": b'{"access_token": "t"}', "headers": {"Content-Type": "application/json"}}
+    response = http.get(media_server.url("/token"), auth=HTTPBasicAuth("id", "secret"))
+    assert response.json() == {"access_token": "t"}
+    assert media_server.requests[-1][2]["Authorization"] == "Basic " + base64.b64encode(b"id:secret").decode()
+
+
+def test_redirects(http, media_server):
+    media_server.files["/old.mp3"] = {"status": 302, "headers": {"Location": media_server.url("/a.mp3")}}
+    media_server.files["/a.mp3"] = {"body": b"audio"}
+    assert http.get(media_server.url("/old.mp3")).text == "audio"
+    assert http.head(media_server.url("/old.mp3")).status_code == 200
+    assert http.head(media_server.url("/old.mp3"), allow_redirects=False).status_code == 302
+
+
+def test_errors_are_requests_exceptions(http, media_server):
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http.get("http://127.0.0.1:9/a.mp3", timeout=2)
+
+    media_server.files["/slow.mp3"] = {"body": b"audio", "delay": 1}
+    with pytest.raises(requests.exceptions.Timeout):
+        http.get(media_server.url("/slow.mp3"), timeout=(2, 0.2))
+
+
+def test_httpx_timeout():
+    timeout = HTTP2Client.httpx_timeout((3, 30))
+    assert (timeout.connect, timeout.read) == (3, 30)
+    assert HTTP2Client.httpx_timeout(5).connect == 5
+
+
+def test_create_by_version():
+    assert type(create_http_client("1.1")) is HTTPClient
+    assert type(create_http_client("2")) is HTTP2Client
+    with pytest.raises(KeyError):
+        create_http_client("3")
+
+
+def test_shared_per_name():
+    first = acquire_http_client("test-client", "2")
+    second = acquire_http_client("test-client", "2")
+    assert first is second
+    assert acquire_http_client("test-client", "1.1") is not first
+    release_http_client(first)
+    assert not first.client.is_closed
+    release_http_client(second)
+    assert first.client.is_closed
+    assert acquire_http_client("test-client", "2") is not first
@@ -0,0 +1,177 @@
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from srgssr_news_downloader.utils.file_lock import exclusive_file_lock
+from srgssr_news_downloader.utils.leader_election import FileLease, LeaderElector, PortLease, create_lease
+
+LEASE_DURATION = 0.3
+
+
+@pytest.fixture
+def lease_file(tmp_path):
+    return str(tmp_path / "news.lease")
+
+
+def read_lease(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_one_leader(lease_file):
+    first = FileLease(lease_file, "a", LEASE_DURATION)
+    second = FileLease(lease_file, "b", LEASE_DURATION)
+    assert first.update()
+    assert not second.update()
+    assert read_lease(lease_file) == {"node": "a", "term": 1, "renewals": 0}
+
+
+def test_renewed_lease_is_kept(lease_file):
+    first = FileLease(lease_file, "a", LEASE_DURATION)
+    second = FileLease(lease_file, "b", LEASE_DURATION)
+    first.update()
+    for _ in range(6):
+        time.sleep(LEASE_DURATION / 3)
+        assert first.update()
+        assert not second.update()
+    assert read_lease(lease_file)["renewals"] == 6
+
+
+def test_takeover_after_expiry(lease_file):
+    first = FileLease(lease_file, "a", LEASE_DURATION)
+    second = FileLease(lease_file, "b", LEASE_DURATION)
+    first.update()
+    assert not second.update()  # Starts watching the counter
+    time.sleep(LEASE_DURATION + 0.05)
+    assert second.update()
+    assert read_lease(lease_file) == {"node": "b", "term": 2, "renewals": 0}
+    # The old holder comes back and sees the new one
+    assert not first.update()
+
+
+def test_takeover_ignores_file_times(lease_file):
+    first = FileLease(lease_file, "a", LEASE_DURATION)
+    second = FileLease(lease_file, "b", LEASE_DURATION)
+    first.update()
+    second.update()
+    # A clock far ahead on the holder's machine does not keep the lease alive
+    future = time.time() + 3600
+    os.utime(lease_file, (future, future))
+    time.sleep(LEASE_DURATION + 0.05)
+    assert second.update()
+
+
+def test_release_hands_over_at_once(lease_file):
+    first = FileLease(lease_file, "a", LEASE_DURATION)
+    second = FileLease(lease_file, "b", LEASE_DURATION)
+    first.update()
+    first.release()
+    assert not first.is_leader
+    assert second.update()
+
+
+def test_holder_steps_down_when_file_unusable(lease_file):
+    lease = FileLease(lease_file, "a", LEASE_DURATION)
+    assert lease.update()
+    os.remove(lease_file)
+    os.mkdir(lease_file)
+    assert lease.update()  # Still within half the lease duration
+    time.sleep(LEASE_DURATION / 2 + 0.05)
+    assert not lease.update()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_port_lease():
+    port = free_port()
+    first = PortLease("127.0.0.1", port, "a")
+    second = PortLease("127.0.0.1", port, "b")
+    try:
+        assert first.update()
+        assert first.update()
+        assert not second.update()
+        first.release()
+        assert second.update()
+    finally:
+        first.release()
+        second.release()
+
+
+def test_create_lease(lease_file):
+    assert isinstance(create_lease("file", "a", 30, path=lease_file), FileLease)
+    assert isinstance(create_lease("port", "a", 30, host="127.0.0.1", port=1), PortLease)
+    with pytest.raises(KeyError):
+        create_lease("zookeeper", "a", 30)
+
+
+def test_elector_renews_in_background(lease_file):
+    elector = LeaderElector(FileLease(lease_file, "a", LEASE_DURATION))
+    standby = FileLease(lease_file, "b", LEASE_DURATION)
+    elector.start()
+    try:
+        assert elector.is_leader
+        standby.update()
+        time.sleep(LEASE_DURATION * 2)
+        assert not standby.update()
+        assert read_lease(lease_file)["renewals"] >= 3
+    finally:
+        elector.stop()
+    assert not elector.is_leader
+    assert standby.update()
+
+
+def test_file_lock_excludes(tmp_path):
+    lock_file = str(tmp_path / "state.lock")
+    inside = []
+
+    def hold():
+        with exclusive_file_lock(lock_file, timeout=5):
+            inside.append(threading.get_ident())
+            time.sleep(0.05)
+            assert len(inside) == 1
+            inside.pop()
+
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not os.path.exists(lock_file)
+
+
+def test_file_lock_timeout(tmp_path):
+    lock_file = str(tmp_path / "state.lock")
+    with exclusive_file_lock(lock_file):
+        with pytest.raises(TimeoutError):
+            with exclusive_file_lock(lock_file, timeout=0.1):
+                pass
+
+
+def test_stale_file_lock_by_token_not_mtime(tmp_path):
+    lock_file = tmp_path / "state.lock"
+    lock_file.write_text("crashed-host:1:abc")
+    # Written by a machine with a clock an hour ahead, the age of the file says nothing
+    future = time.time() + 3600
+    os.utime(lock_file, (future, future))
+
+    start = time.monotonic()
+    with exclusive_file_lock(str(lock_file), timeout=5, stale_after=0.2):
+        assert time.monotonic() - start >= 0.2
+        assert lock_file.read_text() != "crashed-host:1:abc"
+    assert not lock_file.exists()
+
+
+def test_taken_over_lock_is_not_removed(tmp_path):
+    lock_file = tmp_path / "state.lock"
+    with exclusive_file_lock(str(lock_file)):
+        # Considered stale by another instance, which holds it now
+        lock_file.write_text("other-host:2:def")
+    assert lock_file.read_text() == "other-host:2:def"
@@ -0,0 +1,100 @@
+import pytest
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.http_client import HTTPClient
+from srgssr_news_downloader.utils.media_probe import MediaProbe
+
+
+@pytest.fixture
+def probe():
+    http = HTTPClient()
+    yield MediaProbe(http, timeout=2)
+    http.close()
+
+
+def remember(probe: MediaProbe, url: str, **headers) -> None:
+    probe.remember(url, {name.replace("_", "-"): value for name, value in headers.items()})
+
+
+def test_unchanged_etag(probe, media_server):
+    media_server.files["/a.mp3"] = {"body": b"audio", "headers": {"ETag": '"v1"'}}
+    remember(probe, media_server.url("/a.mp3"), ETag='"v1"', Content_Length="5")
+    assert not probe.has_changed(media_server.url("/a.mp3"))
+    method, _, headers = media_server.requests[-1]
+    assert method == "HEAD"
+    assert headers["If-None-Match"] == '"v1"'
+
+
+def test_changed_etag(probe, media_server):
+    media_server.files["/a.mp3"] = {"body": b"audio", "headers": {"ETag": '"v2"'}}
+    remember(probe, media_server.url("/a.mp3"), ETag='"v1"')
+    assert probe.has_changed(media_server.url("/a.mp3"))
+
+
+def test_changed_length_without_etag(probe, media_server):
+    media_server.files["/a.mp3"] = {"body": b"corrected audio"}
+    remember(probe, media_server.url("/a.mp3"), Content_Length="5")
+    assert probe.has_changed(media_server.url("/a.mp3"))
+
+
+def test_missing_validators_are_no_change(probe, media_server):
+    media_server.files["/a.mp3"] = {"body": b"audio", "headers": {"ETag": '"v1"'}}
+    remember(probe, media_server.url("/a.mp3"))
+    assert not probe.has_changed(media_server.url("/a.mp3"))
+
+
+def test_range_request_without_head(probe, media_server):
+    media_server.files["/a.mp3"] = {
+        "body": b"a",
+        "status": 206,
+        "headers": {"Content-Range": "bytes 0-0/15"},
+        "methods": ("GET",),
+    }
+    remember(probe, media_server.url("/a.mp3"), Content_Length="5")
+    assert probe.has_changed(media_server.url("/a.mp3"))
+    assert media_server.requests[-1][2]["Range"] == "bytes=0-0"
+
+    remember(probe, media_server.url("/a.mp3"), Content_Length="15")
+    assert not probe.has_changed(media_server.url("/a.mp3"))
+
+
+def test_errors_are_no_change(probe, media_server):
+    remember(probe, media_server.url("/missing.mp3"), ETag='"v1"')
+    assert not probe.has_changed(media_server.url("/missing.mp3"))
+
+    remember(probe, "http://127.0.0.1:9/a.mp3", ETag='"v1"')
+    assert not probe.has_changed("http://127.0.0.1:9/a.mp3")
+
+
+def test_unknown_url_is_not_probed(probe, media_server):
+    assert not probe.has_changed(media_server.url("/a.mp3"))
+    probe.remember(media_server.url("/a.mp3"), {"ETag": '"v1"'})
+    probe.forget(media_server.url("/a.mp3"))
+    assert not probe.has_changed(media_server.url("/a.mp3"))
+    assert not media_server.requests
+
+
+def test_republished_episode(worker, media_server, build_mp3, virtual_clock):
+    media_server.files["/a.mp3"] = {"body": build_mp3(), "headers": {"ETag": '"v1"'}}
+    date = clock.now().astimezone().strftime(worker.datetime_format)
+    worker.latest_file_dict = {"date": date, "podcastHdUrl": media_server.url("/a.mp3")}
+    worker.download()
+    episode_date = worker.last_download_datetime_obj
+    assert not worker.is_republished(episode_date)
+
+    media_server.files["/a.mp3"] = {"body": build_mp3(fill=1), "headers": {"ETag": '"v2"'}}
+    assert worker.is_republished(episode_date)
+
+    # Only within the revalidate window after the episode date
+    virtual_clock.advance(worker.revalidate_window + 1)
+    assert not worker.is_republished(episode_date)
+
+
+def test_changed_url_is_republished(worker, media_server, build_mp3, virtual_clock):
+    media_server.files["/a.mp3"] = {"body": build_mp3()}
+    date = clock.now().astimezone().strftime(worker.datetime_format)
+    worker.latest_file_dict = {"date": date, "podcastHdUrl": media_server.url("/a.mp3")}
+    worker.download()
+
+    worker.latest_file_dict["podcastHdUrl"] = media_server.url("/b.mp3")
+    assert worker.is_republished(worker.last_download_datetime_obj)
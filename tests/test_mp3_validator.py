@@ -0,0 +1,109 @@
+import hashlib
+
+import pytest
+
+from srgssr_news_downloader.utils.mp3_validator import (
+    MP3StreamValidator,
+    MP3ValidationError,
+    parse_frame_header,
+)
+
+FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413  # MPEG1 Layer 3, 128 kbit/s, 44.1 kHz, 417 bytes
+ID3V2 = b"ID3\x03\x00\x00\x00\x00\x00\x20" + b"\x00" * 32
+ID3V1 = b"TAG" + b"\x00" * 125
+
+
+def validate(data: bytes, chunk_size: int = 1000, **kwargs) -> MP3StreamValidator:
+    validator = MP3StreamValidator(**kwargs)
+    for offset in range(0, len(data), chunk_size):
+        validator.feed(data[offset : offset + chunk_size])
+    validator.finish()
+    return validator
+
+
+def test_frame_header():
+    assert parse_frame_header(FRAME[:4]) == (417, 1152, 44100)
+    assert parse_frame_header(b"\xff\xfb\x92\x64") == (418, 1152, 44100)  # Padding
+    assert parse_frame_header(b"\xff\xf3\x90\x64") == (261, 576, 22050)  # MPEG2 Layer 3, 80 kbit/s
+    assert parse_frame_header(b"\xff\xfb\xf0\x64") is None  # Bad bitrate
+    assert parse_frame_header(b"\xff\xfb\x9c\x64") is None  # Reserved sample rate
+    assert parse_frame_header(b"ID3\x03") is None
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 417, 65536])
+def test_valid_file_any_chunk_size(chunk_size):
+    data = ID3V2 + FRAME * 100 + ID3V1
+    validator = validate(data, chunk_size)
+    assert validator.frames == 100
+    assert validator.duration == pytest.approx(100 * 1152 / 44100)
+    assert validator.has_id3v2 and validator.has_id3v1
+    assert validator.bytes_received == len(data)
+    assert validator.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_truncated_frame():
+    with pytest.raises(MP3ValidationError, match="middle of a frame"):
+        validate(FRAME * 10 + FRAME[:200])
+
+
+def test_truncated_header():
+    with pytest.raises(MP3ValidationError, match="unexpected bytes"):
+        validate(FRAME * 10 + FRAME[:3])
+
+
+def test_not_an_mp3():
+    with pytest.raises(MP3ValidationError, match="does not start"):
+        validate(b"<html><body>Not found</body></html>")
+
+
+def test_junk_between_frames():
+    validator = validate(FRAME * 5 + b"\x00" * 100 + FRAME * 5, max_junk_bytes=100)
+    assert validator.frames == 10
+    assert validator.junk_bytes == 100
+    with pytest.raises(MP3ValidationError, match="Too much invalid data"):
+        validate(FRAME * 5 + b"\x00" * 101 + FRAME * 5, max_junk_bytes=100)
+
+
+def test_too_short():
+    with pytest.raises(MP3ValidationError, match="shorter"):
+        validate(FRAME * 10, min_duration=1)
+
+
+def test_only_tags():
+    with pytest.raises(MP3ValidationError, match="No MPEG audio frames"):
+        validate(ID3V2 + ID3V1)
+
+
+def test_content_length_mismatch():
+    data = FRAME * 10
+    validator = MP3StreamValidator()
+    validator.check_headers({"Content-Type": "audio/mpeg", "Content-Length": str(len(data) + 1)})
+    validator.feed(data)
+    with pytest.raises(MP3ValidationError, match=f"Received {len(data)} of {len(data) + 1}"):
+        validator.finish()
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-1", "12, 12"])
+def test_malformed_content_length(content_length):
+    validator = MP3StreamValidator()
+    with pytest.raises(MP3ValidationError, match="Invalid Content-Length"):
+        validator.check_headers({"Content-Type": "audio/mpeg", "Content-Length": content_length})
+
+
+def test_encoded_content_length_ignored():
+    validator = MP3StreamValidator()
+    validator.check_headers({"Content-Length": "10", "Content-Encoding": "gzip"})
+    assert validator.content_length is None
+
+
+def test_content_type():
+    MP3StreamValidator().check_headers({"Content-Type": "audio/MPEG; charset=binary"})
+    with pytest.raises(MP3ValidationError, match="Content-Type"):
+        MP3StreamValidator().check_headers({"Content-Type": "text/html"})
+
+
+def test_check_disabled_only_hashes():
+    validator = validate(b"not an mp3", check=False)
+    validator.check_headers({"Content-Type": "text/html", "Content-Length": "x"})
+    assert validator.frames == 0
+    assert validator.sha256 == hashlib.sha256(b"not an mp3").hexdigest()
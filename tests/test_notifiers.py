@@ -0,0 +1,173 @@
+import json
+import os
+import shlex
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from srgssr_news_downloader.utils.notifiers import (
+    CommandNotifier,
+    NotificationDispatcher,
+    Notifier,
+    UnixSocketNotifier,
+    WebhookNotifier,
+)
+
+PAYLOAD = {"file": "srf_news_20250101_100000.mp3", "path": "/srv/srf_news.mp3"}
+
+
+class RecordingNotifier(Notifier):
+    def __init__(self, failures: int = 0, delay: float = 0):
+        self.failures = failures
+        self.delay = delay
+        self.attempts = []  # Monotonic times
+        self.delivered = threading.Event()
+
+    def send(self, payload: dict) -> None:
+        self.attempts.append(time.monotonic())
+        time.sleep(self.delay)
+        if len(self.attempts) <= self.failures:
+            raise RuntimeError("receiver down")
+        self.payload = payload
+        self.delivered.set()
+
+
+class BrokenNotifier(Notifier):
+    name = "broken"
+
+    def start(self) -> None:
+        raise OSError("no socket")
+
+
+@pytest.fixture
+def dispatch():
+    dispatchers = []
+
+    def create(notifiers, **kwargs):
+        dispatcher = NotificationDispatcher(notifiers, **kwargs)
+        dispatcher.start()
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield create
+    for dispatcher in dispatchers:
+        dispatcher.stop()
+
+
+def test_slow_receiver_does_not_block(dispatch):
+    slow, fast = RecordingNotifier(delay=0.5), RecordingNotifier()
+    dispatcher = dispatch([slow, fast])
+    start = time.monotonic()
+    dispatcher.notify(PAYLOAD)
+    assert time.monotonic() - start < 0.1
+    assert slow.delivered.wait(2) and fast.delivered.wait(2)
+    assert fast.payload == PAYLOAD
+
+
+def test_retry_with_doubling_delay(dispatch):
+    notifier = RecordingNotifier(failures=2)
+    dispatch([notifier], retries=3, retry_delay=0.1).notify(PAYLOAD)
+    assert notifier.delivered.wait(2)
+    first, second, third = notifier.attempts
+    assert second - first == pytest.approx(0.1, abs=0.05)
+    assert third - second == pytest.approx(0.2, abs=0.05)
+
+
+def test_gives_up_after_retries(dispatch):
+    notifier = RecordingNotifier(failures=10)
+    dispatch([notifier], retries=2, retry_delay=0.05).notify(PAYLOAD)
+    time.sleep(0.5)
+    assert len(notifier.attempts) == 3
+    assert not notifier.delivered.is_set()
+
+
+def test_notifier_that_fails_to_start_is_dropped(dispatch):
+    notifier = RecordingNotifier()
+    dispatcher = dispatch([BrokenNotifier(), notifier])
+    assert dispatcher.notifiers == [notifier]
+    dispatcher.notify(PAYLOAD)
+    assert notifier.delivered.wait(2)
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append(json.loads(body))
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def webhook():
+    server = HTTPServer(("127.0.0.1", 0), _WebhookHandler)
+    server.received = []
+    server.status = 204
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_webhook(webhook):
+    notifier = WebhookNotifier(f"http://127.0.0.1:{webhook.server_port}/hook", timeout=2)
+    notifier.send(PAYLOAD)
+    assert webhook.received == [PAYLOAD]
+
+    webhook.status = 500
+    with pytest.raises(RuntimeError, match="500"):
+        notifier.send(PAYLOAD)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="No Unix domain sockets")
+def test_unix_socket(tmp_path):
+    path = str(tmp_path / "news.sock")
+    notifier = UnixSocketNotifier(path)
+    notifier.start()
+    try:
+        clients = []
+        for _ in range(2):
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(path)
+            client.settimeout(2)
+            clients.append(client)
+        deadline = time.monotonic() + 2
+        while len(notifier._clients) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        notifier.send(PAYLOAD)
+        for client in clients:
+            assert json.loads(client.makefile().readline()) == PAYLOAD
+
+        # A disconnected client is dropped, the others still get the message
+        clients[0].close()
+        for _ in range(3):
+            notifier.send(PAYLOAD)
+        assert len(notifier._clients) == 1
+        clients[1].close()
+    finally:
+        notifier.stop()
+    assert not os.path.exists(path)
+
+
+def test_command(tmp_path):
+    output = tmp_path / "out.json"
+    script = (
+        "import json, os, sys; "
+        f"json.dump([json.load(sys.stdin), os.environ['NEWS_FILE']], open({str(output)!r}, 'w'))"
+    )
+    CommandNotifier(f"{shlex.quote(sys.executable)} -c {shlex.quote(script)}", timeout=10).send(PAYLOAD)
+    assert json.loads(output.read_text()) == [PAYLOAD, PAYLOAD["file"]]
+
+
+def test_failing_command():
+    command = f"{shlex.quote(sys.executable)} -c 'import sys; sys.exit(\"no space left\")'"
+    with pytest.raises(RuntimeError, match="no space left"):
+        CommandNotifier(command, timeout=10).send(PAYLOAD)
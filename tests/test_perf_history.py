@@ -0,0 +1,79 @@
+import csv
+import math
+
+from srgssr_news_downloader.utils.perf_history import COLUMNS, MAX_CAPACITY, PerfHistory, get_perf_history
+
+
+def test_row_is_22_bytes():
+    history = PerfHistory(1000)
+    row_bytes = sum(column.itemsize for column in history._columns.values())
+    assert row_bytes == 22
+    assert sum(len(column) * column.itemsize for column in history._columns.values()) == 22 * 1000
+    # Preallocated, appending does not grow the arrays
+    history.append(1.0, poll_latency=0.5)
+    assert {len(column) for column in history._columns.values()} == {1000}
+
+
+def test_capacity_is_clamped():
+    assert PerfHistory(0).capacity == 1
+    assert PerfHistory(MAX_CAPACITY + 1).capacity == MAX_CAPACITY
+
+
+def test_wraparound_keeps_newest_rows_in_order():
+    history = PerfHistory(4)
+    for i in range(3):
+        history.append(100 + i, errors=i)
+    assert len(history) == 3
+    assert list(history.series()["time"]) == [100, 101, 102]
+
+    for i in range(3, 10):
+        history.append(100 + i, errors=i)
+    series = history.series()
+    assert len(history) == 4
+    assert history.version == 10
+    assert list(series["time"]) == [106, 107, 108, 109]
+    assert list(series["errors"]) == [6, 7, 8, 9]
+    assert set(series) == {name for name, _ in COLUMNS}
+
+
+def test_series_since():
+    history = PerfHistory(3)
+    for i in range(5):
+        history.append(100 + i)
+    assert list(history.series(since=103)["time"]) == [103, 104]
+    assert list(history.series(since=50)["time"]) == [102, 103, 104]
+    assert len(history.series(since=200)["poll_latency"]) == 0
+
+
+def test_missing_values_and_error_limit():
+    history = PerfHistory(2)
+    history.append(100, download_seconds=1.5, errors=70000)
+    series = history.series()
+    assert math.isnan(series["poll_latency"][0])
+    assert math.isnan(series["publish_lag"][0])
+    assert series["download_seconds"][0] == 1.5
+    assert series["errors"][0] == 65535
+
+
+def test_to_csv(tmp_path):
+    history = PerfHistory(10)
+    history.append(1_700_000_000, poll_latency=0.12345, publish_lag=42)
+    history.append(1_700_000_060, errors=1)
+    path = tmp_path / "perf.csv"
+    assert history.to_csv(str(path), since=1_700_000_000) == 2
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == [name for name, _ in COLUMNS]
+    assert rows[1][1:] == ["0.123", "", "42.0", "0"]
+    assert rows[2][1:] == ["", "", "", "1"]
+    assert rows[1][0].startswith("2023-11-14T")
+
+
+def test_history_kept_per_profile():
+    history = get_perf_history("test-perf", 10)
+    history.append(100)
+    assert get_perf_history("test-perf", 10) is history
+    assert get_perf_history("test-other", 10) is not history
+    resized = get_perf_history("test-perf", 20)
+    assert resized is not history and len(resized) == 0
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from srgssr_news_downloader.utils import pipeline as pipeline_module
+from srgssr_news_downloader.utils.pipeline import (
+    Pipeline,
+    PipelineError,
+    Processor,
+    _trim_cache,
+    acquire_executor,
+    load_processor,
+    release_executor,
+    run_stages,
+)
+
+CONTEXT = {
+    "episode_id": "e1",
+    "episode_date": "2025-01-01T10:00:00+01:00",
+    "title": "Nachrichten",
+    "business_unit": "srf",
+}
+OPTIONS = {"id3_title": "{bu} News {date}", "id3_artist": "{bu}"}
+
+
+class BrokenStage(Processor):
+    name = "broken"
+    modifies = True
+
+    def process(self, path: str, context: dict) -> dict:
+        with open(path, "ab") as file:
+            file.write(b"half written")
+        raise ValueError("broken")
+
+
+class SlowStage(Processor):
+    name = "slow"
+
+    def process(self, path: str, context: dict) -> dict:
+        time.sleep(30)
+        return {}
+
+
+@pytest.fixture
+def audio(tmp_path, build_mp3):
+    path = tmp_path / "latest.mp3"
+    path.write_bytes(build_mp3(seconds=2))
+    return path
+
+
+def sha256(path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_stages(audio):
+    original = audio.read_bytes()
+    result = run_stages(["duration", "id3"], OPTIONS, str(audio), sha256(audio), CONTEXT, "", 10)
+    duration, id3 = result["stages"]
+    assert duration["ok"] and duration["result"]["duration"] == pytest.approx(2, abs=0.03)
+    assert id3["result"]["TIT2"] == "SRF News 01.01.2025 10:00"
+    assert id3["result"]["TLEN"] == str(round(duration["result"]["duration"] * 1000))
+    tagged = audio.read_bytes()
+    assert tagged.startswith(b"ID3\x03") and tagged.endswith(original)
+    assert result["sha256"] == sha256(audio)
+
+    # A second tag replaces the first one
+    run_stages(["id3"], {"id3_title": "Neu"}, str(audio), result["sha256"], CONTEXT, "", 10)
+    assert audio.read_bytes().endswith(original)
+    assert b"N\x00e\x00u\x00" in audio.read_bytes()
+    assert "SRF News".encode("utf-16-le") not in audio.read_bytes()
+
+
+def test_cache_hits_and_misses(audio, tmp_path):
+    cache = str(tmp_path / "cache")
+    original = audio.read_bytes()
+    first = run_stages(["duration", "id3"], OPTIONS, str(audio), sha256(audio), CONTEXT, cache, 10)
+    tagged = audio.read_bytes()
+    assert [stage["cached"] for stage in first["stages"]] == [False, False]
+
+    audio.write_bytes(original)
+    second = run_stages(["duration", "id3"], OPTIONS, str(audio), sha256(audio), CONTEXT, cache, 10)
+    assert [stage["cached"] for stage in second["stages"]] == [True, True]
+    assert second["stages"][1]["result"] == first["stages"][1]["result"]
+    assert audio.read_bytes() == tagged  # The tagged copy from the cache
+    assert second["sha256"] == first["sha256"]
+
+    # Another episode: the tag changes, the duration of the same content does not
+    audio.write_bytes(original)
+    other = dict(CONTEXT, episode_id="e2")
+    third = run_stages(["duration", "id3"], OPTIONS, str(audio), sha256(audio), other, cache, 10)
+    assert [stage["cached"] for stage in third["stages"]] == [True, False]
+    # Other options are another entry as well
+    audio.write_bytes(original)
+    fourth = run_stages(["id3"], {"id3_title": "x"}, str(audio), sha256(audio), CONTEXT, cache, 10)
+    assert not fourth["stages"][0]["cached"]
+
+
+def test_failed_stage_leaves_file(audio):
+    original = audio.read_bytes()
+    result = run_stages(
+        ["test_pipeline:BrokenStage", "unknown", "duration"], {}, str(audio), sha256(audio), CONTEXT, "", 10
+    )
+    broken, unknown, duration = result["stages"]
+    assert broken["error"] == "ValueError('broken')"
+    assert not unknown["ok"] and "Unbekannte Pipeline Stufe" in unknown["error"]
+    assert duration["ok"]
+    assert audio.read_bytes() == original
+    assert os.listdir(audio.parent) == [audio.name]
+
+
+def test_load_processor():
+    assert load_processor("id3").name == "id3"
+    assert load_processor("test_pipeline:SlowStage") is SlowStage
+    for stage in ("nomodule:Stage", "test_pipeline:Missing", "test_pipeline:CONTEXT", "id4"):
+        with pytest.raises(KeyError):
+            load_processor(stage)
+    with pytest.raises(KeyError):
+        Pipeline(["duration", "id4"])
+
+
+def add_entry(folder, name: str, age: float, media: int = 0) -> None:
+    (folder / f"{name}.json").write_text("{}")
+    if media:
+        (folder / f"{name}.mp3").write_bytes(b"x" * media)
+    mtime = time.time() - age
+    os.utime(folder / f"{name}.json", (mtime, mtime))
+
+
+def test_trim_cache_by_entries_and_bytes(tmp_path):
+    for index in range(5):
+        add_entry(tmp_path, f"e{index}", age=100 - index)
+    _trim_cache(str(tmp_path), 3, 10**9)
+    assert sorted(os.listdir(tmp_path)) == ["e2.json", "e3.json", "e4.json"]
+
+    add_entry(tmp_path, "big", age=200, media=1000)
+    add_entry(tmp_path, "new", age=0, media=1000)
+    _trim_cache(str(tmp_path), 10, 1500)
+    # The least recently used entries go first, until the rest fits
+    assert sorted(os.listdir(tmp_path)) == ["e2.json", "e3.json", "e4.json", "new.json", "new.mp3"]
+
+
+def test_pool_per_profile():
+    acquire_executor("test-a", 1)
+    acquire_executor("test-a", 2)
+    acquire_executor("test-b", 1)
+    try:
+        executors = pipeline_module._executors
+        assert executors["test-a"][0] is not executors["test-b"][0]
+        assert executors["test-a"][1:] == [1, 2]
+        release_executor("test-a")
+        assert "test-a" in executors
+    finally:
+        release_executor("test-a")
+        release_executor("test-b")
+    assert "test-a" not in executors and "test-b" not in executors
+
+
+def test_pipeline_run(audio):
+    pipeline = Pipeline(
+        ["duration", "test_pipeline:BrokenStage"],
+        optional=["test_pipeline:BrokenStage"],
+        cache_folder="",
+        name="test-run",
+    )
+    pipeline.start()
+    try:
+        result = pipeline.run(str(audio), sha256(audio), CONTEXT)
+        assert [stage["ok"] for stage in result["stages"]] == [True, False]
+
+        pipeline.optional = set()
+        with pytest.raises(PipelineError, match="BrokenStage"):
+            pipeline.run(str(audio), sha256(audio), CONTEXT)
+    finally:
+        pipeline.stop()
+
+
+def test_hanging_stage_is_killed(audio):
+    pipeline = Pipeline(["test_pipeline:SlowStage"], timeout=1, cache_folder="", name="test-slow")
+    pipeline.start()
+    try:
+        hanging = pipeline_module._current_executor("test-slow")
+        with pytest.raises(PipelineError, match="within"):
+            pipeline.run(str(audio), sha256(audio), CONTEXT)
+        assert pipeline_module._current_executor("test-slow") is not hanging
+        pipeline.stages = ["duration"]
+        assert pipeline.run(str(audio), sha256(audio), CONTEXT)["stages"][0]["ok"]
+    finally:
+        pipeline.stop()
@@ -0,0 +1,173 @@
+import socket
+import time
+from datetime import datetime
+
+import pytest
+from urllib3.util import connection
+
+from srgssr_news_downloader.utils.clock import VirtualClock, clock
+from srgssr_news_downloader.utils.dns_cache import DNSCache
+from srgssr_news_downloader.utils.http_client import HTTPClient
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    """Fake getaddrinfo, answers with the addresses in `resolver.addresses` and counts the calls."""
+
+    class Resolver:
+        addresses = ["127.0.0.1"]
+        calls = 0
+
+        def getaddrinfo(self, host, port, family=0, type=0):
+            self.calls += 1
+            if not self.addresses:
+                raise socket.gaierror("Name or service not known")
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (ip, port)) for ip in self.addresses]
+
+    resolver = Resolver()
+    monkeypatch.setattr(socket, "getaddrinfo", resolver.getaddrinfo)
+    return resolver
+
+
+def test_resolve_is_cached(resolver):
+    cache = DNSCache(ttl=0.2)
+    assert cache.resolve("media.example", 443) == ["127.0.0.1"]
+    assert cache.resolve("media.example", 443) == ["127.0.0.1"]
+    assert resolver.calls == 1
+    cache.resolve("media.example", 443, refresh=True)
+    assert resolver.calls == 2
+    time.sleep(0.3)
+    cache.resolve("media.example", 443)
+    assert resolver.calls == 3
+
+
+def test_expired_entry_when_resolver_fails(resolver):
+    cache = DNSCache(ttl=0.01)
+    cache.resolve("media.example", 443)
+    time.sleep(0.05)
+    resolver.addresses = []
+    assert cache.resolve("media.example", 443) == ["127.0.0.1"]
+    with pytest.raises(socket.gaierror):
+        cache.resolve("other.example", 443)
+
+
+def test_no_cache_without_ttl(resolver):
+    cache = DNSCache(ttl=0)
+    cache.resolve("media.example", 443)
+    cache.resolve("media.example", 443)
+    assert resolver.calls == 2
+
+
+def test_install_until_last_user_uninstalls():
+    original = connection.create_connection
+    cache = DNSCache()
+    cache.install()
+    cache.install()
+    assert connection.create_connection == cache.create_connection
+    cache.uninstall()
+    assert connection.create_connection == cache.create_connection
+    cache.uninstall()
+    assert connection.create_connection is original
+    cache.uninstall()  # More uninstalls than installs are ignored
+    assert connection.create_connection is original
+
+
+def test_connect_tries_next_address(resolver, media_server):
+    # 127.0.0.2 is loopback as well, but nothing listens there
+    resolver.addresses = ["127.0.0.2", "127.0.0.1"]
+    cache = DNSCache()
+    sock = cache.create_connection(("media.example", media_server.server_port), timeout=2)
+    assert sock.getpeername()[0] == "127.0.0.1"
+    sock.close()
+
+    resolver.addresses = ["127.0.0.2"]
+    cache.invalidate("media.example", media_server.server_port)
+    with pytest.raises(OSError):
+        cache.create_connection(("media.example", media_server.server_port), timeout=2)
+    # Not cached any longer, the next attempt resolves again
+    resolver.addresses = ["127.0.0.1"]
+    cache.create_connection(("media.example", media_server.server_port), timeout=2).close()
+
+
+def test_prewarm_opens_pooled_connection(media_server):
+    media_server.files["/a.mp3"] = {"body": b"audio"}
+    http = HTTPClient()
+    try:
+        assert http.prewarm(media_server.url("/a.mp3"))
+        assert not media_server.requests  # Connected, nothing sent
+        assert http.prewarm(media_server.url("/a.mp3"))
+        assert http.get(media_server.url("/a.mp3")).content == b"audio"
+        assert not http.prewarm("http://127.0.0.1:9/a.mp3", timeout=1)
+    finally:
+        http.close()
+
+
+def test_prewarm_without_pool_methods(media_server, monkeypatch):
+    http = HTTPClient()
+    adapter = http.session.get_adapter(media_server.url("/"))
+    monkeypatch.delattr(type(adapter), "get_connection_with_tls_context")
+    try:
+        assert not http.prewarm(media_server.url("/a.mp3"))
+        assert http._prewarm_unsupported
+    finally:
+        http.close()
+
+
+@pytest.fixture
+def at_time():
+    previous = clock.source
+
+    def use(hour: int, minute: int, second: int = 0) -> VirtualClock:
+        virtual = VirtualClock(datetime(2025, 1, 1, hour, minute, second).timestamp())
+        clock.use(virtual)
+        return virtual
+
+    yield use
+    clock.use(previous)
+
+
+def test_publish_window_after_last_episode(worker, at_time):
+    worker.prewarm_lead_time, worker.prewarm_window, worker.publish_interval = 30, 600, 3600
+    at_time(10, 59, 30)
+    assert not worker.in_publish_window()  # Nothing downloaded yet
+
+    worker.last_download_datetime_obj = datetime(2025, 1, 1, 10, 0).astimezone()
+    assert worker.in_publish_window()
+    at_time(10, 59, 29)
+    assert not worker.in_publish_window()
+    at_time(11, 10)
+    assert worker.in_publish_window()
+    at_time(11, 10, 1)
+    assert not worker.in_publish_window()
+
+
+def test_publish_window_at_airtime(worker, at_time):
+    worker.airtime_minutes = [0, 30]
+    worker.prewarm_lead_time, worker.prewarm_window = 60, 300
+    at_time(10, 29)
+    assert worker.in_publish_window()
+    at_time(10, 40)
+    assert not worker.in_publish_window()
+
+
+def test_prewarm_once_per_lead_time(worker, media_server, at_time, monkeypatch):
+    worker.airtime_minutes = [0]
+    worker.prewarm_lead_time, worker.prewarm_window = 120, 300
+    worker.oauth_url = worker.api_url = media_server.url("/api")
+    worker.history.append("published", url=media_server.url("/media/a.mp3"))
+    warmed = []
+    monkeypatch.setattr(worker.http, "prewarm", lambda url: warmed.append(url) or True)
+
+    at_time(10, 30)
+    worker.prewarm_connections()
+    assert not warmed
+
+    virtual = at_time(10, 59)
+    worker.last_prewarm = -worker.prewarm_lead_time
+    worker.prewarm_connections()
+    assert warmed == [media_server.url("/api"), media_server.url("/api"), media_server.url("/media/a.mp3")]
+    worker.prewarm_connections()
+    assert len(warmed) == 3
+    virtual.advance(120)
+    worker.prewarm_connections()
+    assert len(warmed) == 6
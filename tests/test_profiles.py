@@ -0,0 +1,105 @@
+import logging
+import threading
+
+import pytest
+
+from srgssr_news_downloader.utils.config_helper import ConfigHelper
+from srgssr_news_downloader.utils.logging_setup import get_logger
+from srgssr_news_downloader.utils.srgssr_api_helper import APIWorker
+from srgssr_news_downloader.utils.token_store import TokenStore
+
+KEY = ("https://oauth.example/token", "client", "secret")
+
+
+@pytest.fixture
+def profiles(config):
+    config.set_value("auth", "client_id", "shared-id")
+    config.set_value("profile:srf", "api.business_unit", "srf")
+    config.set_value("profile:rts", "api.business_unit", "rts")
+    config.set_value("profile:rts", "auth.client_id", "rts-id")
+    config.set_value("profile:rts", "pipeline.stages", "id3")
+    return config
+
+
+def test_profiles_in_file_order(profiles):
+    assert profiles.profiles() == ["srf", "rts"]
+    reloaded = ConfigHelper(profiles.filename)
+    reloaded.load_config()
+    assert reloaded.profiles() == ["srf", "rts"]
+    with pytest.raises(KeyError):
+        profiles.profile("rsi")
+
+
+def test_profile_overrides_shared_values(profiles):
+    rts = profiles.profile("rts")
+    assert rts.get_value("auth", "client_id") == "rts-id"
+    assert profiles.profile("srf").get_value("auth", "client_id") == "shared-id"
+    assert rts.get_value("api", "update_cycle") == profiles.get_value("api", "update_cycle")
+    with pytest.raises(KeyError):
+        rts.get_value("api", "missing")
+
+    pipeline = rts.get_section("pipeline")
+    assert pipeline["stages"] == "id3"
+    assert pipeline["timeout"] == profiles.get_value("pipeline", "timeout")
+
+
+def test_profile_bool(profiles):
+    profiles.set_value("profile:srf", "server.enabled", "maybe")
+    with pytest.raises(ValueError, match="profile 'srf'"):
+        profiles.profile("srf").get_bool("server", "enabled")
+    assert profiles.profile("rts").get_bool("server", "enabled") is False
+
+
+def test_profile_log_prefix(caplog):
+    with caplog.at_level(logging.INFO, logger="news_downloader"):
+        get_logger("rts").info("API: Started.")
+    assert caplog.records[-1].getMessage() == "[rts] API: Started."
+    assert caplog.records[-1].name == "news_downloader.rts"
+    assert get_logger() is logging.getLogger("news_downloader")
+
+
+def test_workers_of_a_credential_share_the_client(profiles):
+    workers = {name: APIWorker(profiles.profile(name), name) for name in ("srf", "rts")}
+    workers[""] = APIWorker(profiles)
+    try:
+        for worker in workers.values():
+            worker.populate_config_data()
+            worker.start_shared_services()
+        assert workers["srf"].http is workers[""].http
+        assert workers["srf"].rate_limiter is workers[""].rate_limiter
+        assert workers["rts"].http is not workers["srf"].http
+        assert workers["rts"].business_unit == "rts"
+        assert workers["rts"].pipeline is not None and workers["srf"].pipeline is None
+    finally:
+        for worker in workers.values():
+            worker.stop_shared_services()
+
+
+def test_token_store_lock_per_credential():
+    store = TokenStore()
+    assert store.lock(KEY) is store.lock(KEY)
+    assert store.lock(KEY) is not store.lock((KEY[0], "other", KEY[2]))
+
+    requests = []
+
+    def get_token():
+        with store.lock(KEY):
+            if not store.get(KEY):
+                requests.append(1)
+                store.put(KEY, "token")
+
+    threads = [threading.Thread(target=get_token) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(requests) == 1
+
+
+def test_token_store_keeps_newer_token():
+    store = TokenStore()
+    store.put(KEY, "new")
+    store.invalidate(KEY, "old")  # Rejected token of a slower worker
+    assert store.get(KEY) == "new"
+    store.invalidate(KEY, "new")
+    assert store.get(KEY) == ""
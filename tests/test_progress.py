@@ -0,0 +1,71 @@
+import pytest
+from PyQt6.QtCore import Qt
+
+from srgssr_news_downloader.utils.progress import DownloadProgress, format_rate
+
+
+def test_reports_are_rate_limited(virtual_clock):
+    progress = DownloadProgress(total=1000, updates_per_second=4)
+    reports = []
+    for _ in range(100):
+        virtual_clock.advance(0.01)
+        reports.append(progress.update(10))
+    # 1s of chunks every 10ms, at most 4 reports
+    assert len([report for report in reports if report]) == 4
+    assert progress.received == 1000
+
+
+def test_report(virtual_clock):
+    progress = DownloadProgress(total=1000, deadline=5)
+    virtual_clock.advance(1)
+    report = progress.update(100)
+    assert report == {
+        "received": 100,
+        "total": 1000,
+        "percent": 10,
+        "rate": 100,
+        "eta": 9,
+        "late": True,  # 1s + 9s is after the deadline
+        "done": False,
+    }
+    assert not progress.report(done=True)["late"]
+
+
+def test_rate_of_recent_reports(virtual_clock):
+    progress = DownloadProgress(updates_per_second=1)
+    for _ in range(8):
+        virtual_clock.advance(1)
+        progress.update(100)
+    for _ in range(8):
+        virtual_clock.advance(1)
+        report = progress.update(1000)
+    assert report["rate"] == pytest.approx(1000)
+    assert report["percent"] is None and report["eta"] is None
+
+
+def test_only_start_and_end_without_updates(virtual_clock):
+    progress = DownloadProgress(total=100, updates_per_second=0)
+    virtual_clock.advance(3600)
+    assert progress.update(200) is None
+    assert progress.report()["percent"] == 100
+
+
+def test_format_rate():
+    assert format_rate(512) == "512 B/s"
+    assert format_rate(51_200) == "51.2 KB/s"
+    assert format_rate(12_300_000) == "12.3 MB/s"
+    assert format_rate(2e9) == "2.0 GB/s"
+
+
+def test_download_emits_throttled_progress(worker, media_server, build_mp3):
+    body = build_mp3(seconds=30)
+    media_server.files["/a.mp3"] = {"body": body}
+    worker.latest_file_dict["podcastHdUrl"] = media_server.url("/a.mp3")
+    worker.progress_updates = 0
+    reports = []
+    worker.download_progress.connect(reports.append, type=Qt.ConnectionType.DirectConnection)
+
+    assert worker.download()
+    assert len(body) > 3 * 65536  # Several chunks, still only the first and the last report
+    assert [report["done"] for report in reports] == [False, True]
+    assert reports[-1]["received"] == reports[-1]["total"] == len(body)
@@ -0,0 +1,112 @@
+import os
+import time
+
+import pytest
+
+from srgssr_news_downloader.utils.publisher import Publisher
+
+
+@pytest.fixture(params=["rename", "symlink"])
+def publisher(request, tmp_path):
+    return Publisher(
+        str(tmp_path / "srf_news.mp3"),
+        str(tmp_path / "versions"),
+        mode=request.param,
+        keep_versions=2,
+        grace_period=60,
+    )
+
+
+def publish(publisher: Publisher, name: str, content: bytes) -> str:
+    temp_path = publisher.create_temp_file()
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    return publisher.publish(temp_path, name)
+
+
+def age(path: str, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_publish_switches_latest(publisher):
+    first = publish(publisher, "srf_news_1000", b"first")
+    assert read(publisher.latest_path) == b"first"
+    assert publisher.current_version() == first
+
+    second = publish(publisher, "srf_news_1100", b"second")
+    assert read(publisher.latest_path) == b"second"
+    assert publisher.current_version() == second
+    assert read(first) == b"first"
+    assert not [name for name in os.listdir(publisher.version_dir) if name.endswith(".part")]
+
+
+def test_open_reader_keeps_old_version(publisher):
+    publish(publisher, "srf_news_1000", b"first")
+    with open(publisher.latest_path, "rb") as reader:
+        publish(publisher, "srf_news_1100", b"second")
+        assert reader.read() == b"first"
+    assert read(publisher.latest_path) == b"second"
+
+
+def test_same_name_gets_unique_version(publisher):
+    first = publish(publisher, "srf_news_1000", b"first")
+    corrected = publish(publisher, "srf_news_1000", b"corrected")
+    assert first != corrected
+    assert os.path.basename(corrected) == "srf_news_1000_1.mp3"
+    assert read(first) == b"first"
+    assert read(publisher.latest_path) == b"corrected"
+
+
+def test_discard_removes_temp_file(publisher):
+    temp_path = publisher.create_temp_file()
+    publisher.discard(temp_path)
+    assert not os.path.exists(temp_path)
+    publisher.discard(temp_path)  # Already gone
+
+
+def test_gc_keeps_newest_and_grace_period(publisher):
+    versions = [publish(publisher, f"srf_news_{hour}", str(hour).encode()) for hour in range(5)]
+    for version_path, seconds in zip(versions, [500, 400, 300, 50, 10]):
+        age(version_path, seconds)
+
+    publisher.collect_garbage()
+    remaining = publisher.list_versions()
+    # Superseded 400s and 300s ago
+    assert versions[0] not in remaining
+    assert versions[1] not in remaining
+    # Superseded 50s ago, a reader may still have it open
+    assert versions[2] in remaining
+    # Newest two are always kept
+    assert versions[3] in remaining and versions[4] in remaining
+    assert read(publisher.latest_path) == b"4"
+
+
+def test_gc_never_removes_latest(publisher):
+    versions = [publish(publisher, f"srf_news_{hour}", str(hour).encode()) for hour in range(4)]
+    for index, version_path in enumerate(versions):
+        age(version_path, 1000 - index * 100)
+    # The oldest file is the current one, f.ex. after a manual rollback
+    age(versions[3], 2000)
+    publisher.collect_garbage()
+    assert versions[3] in publisher.list_versions()
+    assert read(publisher.latest_path) == b"3"
+
+
+def test_gc_removes_stale_temp_files(publisher):
+    stale = publisher.create_temp_file()
+    fresh = publisher.create_temp_file()
+    age(stale, 120)
+    publisher.collect_garbage()
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(KeyError):
+        Publisher(str(tmp_path / "latest.mp3"), str(tmp_path / "versions"), mode="copy")
@@ -0,0 +1,151 @@
+import json
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+
+import pytest
+
+from srgssr_news_downloader.utils.clock import clock
+from srgssr_news_downloader.utils.rate_limiter import (
+    QuotaCounter,
+    RateLimiter,
+    RateLimitError,
+    TokenBucket,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
+
+class Response:
+    def __init__(self, status_code: int, **headers):
+        self.status_code = status_code
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+
+
+def until_midnight() -> float:
+    now = clock.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+def test_burst_then_rate(virtual_clock):
+    bucket = TokenBucket(rate=0.5, capacity=3)
+    for _ in range(3):
+        assert bucket.acquire()
+    assert clock.monotonic() == 0
+
+    assert bucket.acquire()
+    assert clock.monotonic() == pytest.approx(2)
+
+    # Refilled up to the burst size only
+    virtual_clock.advance(100)
+    start = clock.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.monotonic() - start == pytest.approx(2)
+
+
+def test_timeout_does_not_wait(virtual_clock):
+    bucket = TokenBucket(rate=0.1, capacity=1)
+    bucket.acquire()
+    assert not bucket.acquire(timeout=5)
+    assert clock.monotonic() == 0
+    assert bucket.acquire(timeout=10.5)
+
+
+def test_rounding_does_not_stall_virtual_clock(virtual_clock):
+    bucket = TokenBucket(rate=100_000, capacity=100_000)
+    for _ in range(20):
+        assert bucket.acquire(65536, timeout=60)
+    assert clock.monotonic() == pytest.approx((20 * 65536 - 100_000) / 100_000)
+
+
+def test_block(virtual_clock):
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.block(30)
+    assert bucket.blocked_for() == 30
+    assert not bucket.acquire(timeout=29)
+    assert bucket.acquire(timeout=31)
+    assert clock.monotonic() == pytest.approx(30)
+    assert bucket.blocked_for() == 0
+
+
+def test_parse_retry_after(virtual_clock):
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("-5") == 0
+    assert parse_retry_after(None) == 60
+    assert parse_retry_after("soon", default=10) == 10
+    http_date = format_datetime(clock.now().astimezone() + timedelta(seconds=90), usegmt=False)
+    assert parse_retry_after(http_date) == pytest.approx(90)
+
+
+def test_quota_resets_at_midnight(virtual_clock):
+    quota = QuotaCounter(daily_limit=10)
+    quota.count(3)
+    assert quota.used == 3
+    assert quota.remaining() == 7
+    virtual_clock.advance(until_midnight() + 1)
+    assert quota.used == 0
+    assert quota.count() == 1
+    assert QuotaCounter().remaining() is None
+
+
+def test_quota_shared_by_state_file(tmp_path, virtual_clock):
+    state_file = str(tmp_path / "quota.json")
+    first, second = QuotaCounter(100, state_file), QuotaCounter(100, state_file)
+    first.count(2)
+    assert second.count(3) == 5
+    assert first.count() == 6
+    with open(state_file) as f:
+        assert json.load(f) == {"day": clock.today().isoformat(), "used": 6}
+
+    # A count from yesterday is not continued
+    virtual_clock.advance(until_midnight() + 1)
+    assert second.count() == 1
+
+
+def test_quota_without_usable_state_file(tmp_path, virtual_clock):
+    quota = QuotaCounter(100, str(tmp_path / "missing" / "quota.json"))
+    assert quota.count() == 1
+    assert quota.count() == 2
+
+
+def test_limiter_raises_when_no_token(virtual_clock):
+    limiter = RateLimiter("test", requests_per_minute=6, burst=1)
+    limiter.before_request()
+    with pytest.raises(RateLimitError):
+        limiter.before_request(timeout=5)
+    assert limiter.quota.used == 1
+
+
+def test_429_blocks_requests(virtual_clock):
+    limiter = RateLimiter("test", requests_per_minute=60, burst=5)
+    limiter.after_response(Response(200))
+    with pytest.raises(RateLimitError) as error:
+        limiter.after_response(Response(429, Retry_After="45"))
+    assert error.value.retry_after == 45
+    assert limiter.recommended_interval(10) == 45
+    with pytest.raises(RateLimitError):
+        limiter.before_request(timeout=10)
+    virtual_clock.advance(45)
+    limiter.before_request(timeout=0)
+
+
+def test_interval_stretches_with_quota(virtual_clock):
+    limiter = RateLimiter("test", daily_limit=1000)
+    seconds_left = 86400 - (clock.now().hour * 3600 + clock.now().minute * 60 + clock.now().second)
+    assert limiter.recommended_interval(1) == pytest.approx(seconds_left / 1000)
+    assert limiter.recommended_interval(60) == 60
+
+    limiter.quota.count(999)
+    assert limiter.recommended_interval(60) == seconds_left
+
+
+def test_shared_per_client_id():
+    limiter = get_rate_limiter("test-shared", requests_per_minute=30, burst=5)
+    limiter.quota.count(2)
+    again = get_rate_limiter("test-shared", requests_per_minute=60, burst=2)
+    assert again is limiter
+    assert limiter.bucket.rate == 1
+    assert limiter.bucket.capacity == 2
+    assert limiter.quota.used == 2
+    assert get_rate_limiter("test-other") is not limiter
@@ -0,0 +1,82 @@
+import pytest
+
+from srgssr_news_downloader.utils.throughput import ThroughputEstimator
+
+MB = 1024 * 1024
+
+
+def test_moving_average_per_host():
+    estimator = ThroughputEstimator(alpha=0.5)
+    estimator.record("https://cdn.example/a.mp3", 10 * MB, 10)
+    estimator.record("https://cdn.example/b.mp3", 10 * MB, 5)
+    assert estimator.estimate("https://cdn.example/other.mp3") == pytest.approx(1.5 * MB)
+    assert estimator.estimate("https://other.example/a.mp3") is None
+    assert estimator.predict_seconds("https://cdn.example/c.mp3", 3 * MB) == pytest.approx(2)
+    assert estimator.predict_seconds("https://other.example/a.mp3", MB) is None
+
+
+def test_small_transfers_are_ignored():
+    estimator = ThroughputEstimator(min_bytes=65536)
+    estimator.record("https://cdn.example/a.mp3", 1000, 0.001)
+    estimator.record("https://cdn.example/a.mp3", MB, 0)
+    assert estimator.estimate("https://cdn.example/a.mp3") is None
+
+
+@pytest.fixture
+def renditions(worker, media_server, build_mp3):
+    media_server.files["/hd.mp3"] = {"body": build_mp3(seconds=20)}
+    media_server.files["/sd.mp3"] = {"body": build_mp3(seconds=2)}
+    worker.latest_file_dict.update(
+        podcastHdUrl=media_server.url("/hd.mp3"), podcastSdUrl=media_server.url("/sd.mp3")
+    )
+    worker.max_download_seconds = 10
+    return worker
+
+
+def test_hd_without_measurements(renditions, media_server):
+    assert renditions.select_rendition() == ("hd", media_server.url("/hd.mp3"))
+    assert not media_server.requests  # No size check without an estimate
+
+
+def test_hd_without_deadline(renditions, media_server):
+    renditions.max_download_seconds = 0
+    renditions.throughput.record(media_server.url("/"), MB, 100)
+    assert renditions.select_rendition()[0] == "hd"
+
+
+def test_sd_when_hd_misses_deadline(renditions, media_server):
+    size = len(media_server.files["/hd.mp3"]["body"])
+    renditions.throughput.record(media_server.url("/"), size, 20)  # HD would take 20s
+    assert renditions.select_rendition() == ("sd", media_server.url("/sd.mp3"))
+    assert media_server.hits("/hd.mp3", "HEAD") == 1
+
+    renditions.throughput.record(media_server.url("/"), size, 1)
+    renditions.throughput.record(media_server.url("/"), size, 1)
+    renditions.throughput.record(media_server.url("/"), size, 1)
+    assert renditions.select_rendition()[0] == "hd"
+
+
+def test_sd_only(renditions, media_server):
+    del renditions.latest_file_dict["podcastHdUrl"]
+    assert renditions.select_rendition() == ("sd", media_server.url("/sd.mp3"))
+    del renditions.latest_file_dict["podcastSdUrl"]
+    with pytest.raises(KeyError):
+        renditions.select_rendition()
+
+
+def test_upgrade_to_hd(renditions, media_server):
+    size = len(media_server.files["/hd.mp3"]["body"])
+    renditions.throughput.record(media_server.url("/"), size, 20)
+    assert renditions.download()
+    assert renditions.last_download_rendition == "sd"
+    episode_date = renditions.last_download_datetime_obj
+
+    # Still too slow
+    assert not renditions.upgrade_pending(episode_date)
+
+    renditions.throughput = ThroughputEstimator()
+    assert renditions.upgrade_pending(episode_date)
+    assert renditions.download()
+    assert renditions.last_download_rendition == "hd"
+    assert not renditions.upgrade_pending(episode_date)
+    assert renditions.history.last("published")["rendition"] == "hd"
@@ -0,0 +1,101 @@
+import pytest
+
+from srgssr_news_downloader.utils.retry_policy import AuthError, CircuitBreaker, RetryPolicy, ServerError
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_opens_after_threshold(virtual_clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.remaining() == 60
+
+
+def test_single_probe_after_timeout(virtual_clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    virtual_clock.advance(59)
+    assert not breaker.allow()
+    virtual_clock.advance(1)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    assert breaker.remaining() > 0
+
+
+def test_successful_probe_closes(virtual_clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    virtual_clock.advance(60)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.remaining() == 0
+
+
+def test_failed_probe_reopens_with_backoff(virtual_clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, max_reset_timeout=100)
+    open_breaker(breaker)
+    virtual_clock.advance(60)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.remaining() == 100  # Doubled, capped
+    virtual_clock.advance(100)
+    assert breaker.allow()
+
+
+def test_probe_without_outcome_expires(virtual_clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    virtual_clock.advance(60)
+    assert breaker.allow()
+    # Nothing recorded, f.ex. there was nothing to download
+    virtual_clock.advance(59)
+    assert not breaker.allow()
+    assert breaker.remaining() == pytest.approx(1)
+    virtual_clock.advance(1)
+    assert breaker.allow()
+
+
+def test_no_zero_wait_while_not_closed(virtual_clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    open_breaker(breaker)
+    assert breaker.remaining() >= CircuitBreaker.MIN_WAIT
+    assert breaker.allow()
+    assert breaker.remaining() >= CircuitBreaker.MIN_WAIT
+
+
+@pytest.mark.parametrize("error", [RuntimeError("invalid mp3"), AuthError("401"), KeyError("url")])
+def test_probe_failing_for_any_reason_reopens(virtual_clock, error):
+    policy = RetryPolicy(update_cycle=10, failure_threshold=2, reset_timeout=0)
+    policy.failure("media", ServerError(503))
+    policy.failure("media", ServerError(503))
+    assert policy.breaker("media").state == CircuitBreaker.OPEN
+    assert policy.allow("media")
+
+    delay = policy.failure("media", error)
+    assert policy.breaker("media").state == CircuitBreaker.OPEN
+    assert delay >= CircuitBreaker.MIN_WAIT
+    assert policy.wait_time("media") > 0
+    assert not policy.allow("media")
+    virtual_clock.advance(policy.wait_time("media"))
+    assert policy.allow("media")
+    policy.success("media")
+    assert policy.breaker("media").state == CircuitBreaker.CLOSED
+    assert policy.wait_time("media") == 0
+
+
+def test_other_errors_do_not_open(virtual_clock):
+    policy = RetryPolicy(update_cycle=10, failure_threshold=1)
+    policy.failure("api", RuntimeError("other"))
+    assert policy.allow("api")
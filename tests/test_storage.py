@@ -0,0 +1,238 @@
+import os
+import queue
+import threading
+
+import pytest
+
+from benchmarks.archive_upload import ACCESS_KEY, SECRET_KEY, StandInS3, StandInServer
+from srgssr_news_downloader.utils.mp3_validator import MP3ValidationError
+from srgssr_news_downloader.utils.retry_policy import ServerError
+from srgssr_news_downloader.utils.storage import (
+    _ABORT,
+    MB,
+    LocalStorage,
+    S3Storage,
+    StorageError,
+    _MultipartUpload,
+    _QueueReader,
+    _StreamingPut,
+    create_storage,
+)
+
+CHUNK = 65536
+
+
+def reader(chunks: list, size: int) -> _QueueReader:
+    chunk_queue = queue.Queue()
+    for chunk in chunks:
+        chunk_queue.put(chunk)
+    return _QueueReader(chunk_queue, size)
+
+
+def read_all(body: _QueueReader, size: int = 3) -> bytes:
+    data = b""
+    while chunk := body.read(size):
+        data += chunk
+    return data
+
+
+def test_queue_reader_exact_size():
+    body = reader([b"abcd", b"efgh", None], 8)
+    assert len(body) == 8
+    assert read_all(body) == b"abcdefgh"
+    assert body.sent == 8
+    assert body.read() == b""
+
+
+def test_queue_reader_short_body():
+    body = reader([b"abcd", None], 8)
+    with pytest.raises(StorageError, match="Received 4 of 8"):
+        read_all(body)
+
+
+def test_queue_reader_overlong_body():
+    with pytest.raises(StorageError, match="More than the 8"):
+        read_all(reader([b"abcd", b"efgh", b"i", None], 8))
+    with pytest.raises(StorageError, match="More than the 8"):
+        read_all(reader([b"abcdefghi", None], 8), size=100)
+
+
+def test_queue_reader_holds_back_last_bytes():
+    chunk_queue = queue.Queue()
+    body = _QueueReader(chunk_queue, 4)
+    chunk_queue.put(b"abcd")
+    result = []
+    thread = threading.Thread(target=lambda: result.append(body.read()))
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()  # The last bytes wait until the download ended
+    chunk_queue.put(None)
+    thread.join(5)
+    assert result == [b"abcd"]
+
+
+def test_queue_reader_abort():
+    with pytest.raises(StorageError, match="aborted"):
+        read_all(reader([b"ab", _ABORT], 8))
+
+
+@pytest.fixture
+def s3():
+    StandInS3.objects, StandInS3.uploads = {}, {}
+    server = StandInServer(("127.0.0.1", 0), StandInS3)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    storage = S3Storage(f"http://127.0.0.1:{server.server_port}", "news", ACCESS_KEY, SECRET_KEY, part_size=5 * MB)
+    yield storage
+    storage.session.close()
+    server.shutdown()
+    server.server_close()
+
+
+def upload(storage: S3Storage, data: bytes, size: int | None, key: str = "2025/news.mp3") -> str:
+    writer = storage.open(key, size)
+    for offset in range(0, len(data), CHUNK):
+        writer.write(data[offset : offset + CHUNK])
+    return writer.finish()
+
+
+def test_streaming_put(s3):
+    data = os.urandom(MB)
+    assert isinstance(s3.open("a.mp3", len(data)), _StreamingPut)
+    assert upload(s3, data, len(data)) == "s3://news/2025/news.mp3"
+    assert StandInS3.objects[("news", "2025/news.mp3")] == data
+
+
+@pytest.mark.parametrize("received", [MB - 100, MB + 100])
+def test_streaming_put_with_wrong_size(s3, received):
+    data = os.urandom(received)
+    with pytest.raises(StorageError):
+        upload(s3, data, MB)
+    assert not StandInS3.objects
+
+
+def test_multipart_upload(s3):
+    data = os.urandom(12 * MB)
+    writer = s3.open("a.mp3", len(data))
+    assert isinstance(writer, _MultipartUpload)
+    writer.abort()
+    assert upload(s3, data, len(data)) == "s3://news/2025/news.mp3"
+    assert StandInS3.objects[("news", "2025/news.mp3")] == data
+    assert not StandInS3.uploads
+
+
+@pytest.mark.parametrize("size", [0, 1000])
+def test_multipart_upload_of_unknown_size(s3, size):
+    data = os.urandom(size)
+    upload(s3, data, None)
+    assert StandInS3.objects[("news", "2025/news.mp3")] == data
+
+
+def test_aborted_multipart_upload(s3):
+    writer = s3.open("a.mp3")
+    for _ in range(6 * MB // CHUNK):
+        writer.write(b"x" * CHUNK)
+    writer.abort()
+    assert not StandInS3.uploads
+    assert not StandInS3.objects
+    with pytest.raises(StorageError, match="aborted"):
+        writer.finish()
+
+
+def test_rejected_signature(s3):
+    s3.secret_key = "wrong"
+    with pytest.raises(StorageError, match="SignatureDoesNotMatch"):
+        upload(s3, b"audio", 5)
+    with pytest.raises(StorageError, match="403"):
+        upload(s3, b"audio", None)
+
+
+def test_local_storage(tmp_path):
+    storage = LocalStorage(str(tmp_path / "archive"))
+    assert upload(storage, b"audio" * 100_000, None) == str(tmp_path / "archive" / "2025" / "news.mp3")
+    assert (tmp_path / "archive" / "2025" / "news.mp3").read_bytes() == b"audio" * 100_000
+
+    writer = storage.open("2025/other.mp3")
+    writer.write(b"audio")
+    writer.abort()
+    assert sorted(os.listdir(tmp_path / "archive" / "2025")) == ["news.mp3"]
+
+    (tmp_path / "file").write_text("")
+    with pytest.raises(StorageError):
+        upload(LocalStorage(str(tmp_path / "file")), b"audio", None)
+
+
+def test_create_storage(tmp_path):
+    assert create_storage("") is None
+    assert isinstance(create_storage("local", folder=str(tmp_path)), LocalStorage)
+    for backend, settings in (
+        ("local", {}),
+        ("s3", {"endpoint": "http://127.0.0.1:9000", "bucket": "news"}),
+        ("s3", {"endpoint": "http://127.0.0.1:9000", "bucket": "news", "access_key": "a", "secret_key": "s", "part_size": MB}),
+        ("ftp", {}),
+    ):
+        with pytest.raises(KeyError):
+            create_storage(backend, **settings)
+
+
+@pytest.fixture
+def closed_responses(worker, monkeypatch):
+    """Responses of the worker's HTTP client, to check that they were closed."""
+    responses = []
+    get = worker.http.get
+
+    def tracked_get(url, **kwargs):
+        response = get(url, **kwargs)
+        response.was_closed = False
+        close = response.close
+
+        def tracked_close():
+            response.was_closed = True
+            close()
+
+        response.close = tracked_close
+        responses.append(response)
+        return response
+
+    monkeypatch.setattr(worker.http, "get", tracked_get)
+    return responses
+
+
+def temp_files(worker) -> list[str]:
+    if not os.path.exists(worker.publisher.version_dir):
+        return []
+    return [name for name in os.listdir(worker.publisher.version_dir) if name.endswith(worker.publisher.temp_suffix)]
+
+
+@pytest.mark.parametrize("status, error", [(404, RuntimeError), (503, ServerError)])
+def test_failed_fetch_leaves_nothing(worker, media_server, closed_responses, tmp_path, status, error):
+    worker.archive = LocalStorage(str(tmp_path / "archive"))
+    media_server.files["/a.mp3"] = {"body": b"Not found", "status": status}
+    with pytest.raises(error):
+        worker.fetch(media_server.url("/a.mp3"), "news.mp3")
+    assert closed_responses and all(response.was_closed for response in closed_responses)
+    assert not temp_files(worker)
+    assert not os.path.exists(tmp_path / "archive")
+
+
+def test_rejected_fetch_aborts_archive(worker, media_server, closed_responses, tmp_path):
+    worker.archive = LocalStorage(str(tmp_path / "archive"))
+    media_server.files["/a.mp3"] = {"body": b"<html>Wartungsarbeiten</html>" * 100}
+    with pytest.raises(MP3ValidationError):
+        worker.fetch(media_server.url("/a.mp3"), "news.mp3")
+    assert closed_responses[0].was_closed
+    assert not temp_files(worker)
+    assert os.listdir(tmp_path / "archive") == []
+
+
+def test_fetch_tees_into_archive(worker, media_server, build_mp3, tmp_path):
+    body = build_mp3(seconds=20)
+    worker.archive = LocalStorage(str(tmp_path / "archive"))
+    media_server.files["/a.mp3"] = {"body": body}
+    temp_path, validator, _, archive = worker.fetch(media_server.url("/a.mp3"), "2025/news.mp3")
+    assert archive.finish() == str(tmp_path / "archive" / "2025" / "news.mp3")
+    with open(temp_path, "rb") as f:
+        assert f.read() == body
+    assert (tmp_path / "archive" / "2025" / "news.mp3").read_bytes() == body
+    assert validator.bytes_received == len(body)
+    assert media_server.hits("/a.mp3") == 1  # Read once for both copies
@@ -0,0 +1,118 @@
+import json
+import sys
+
+import pytest
+
+from srgssr_news_downloader import trace_summary
+from srgssr_news_downloader.utils.http_client import HTTPClient
+from srgssr_news_downloader.utils.tracing import Tracer, traced, tracer
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    tracer.configure(path)
+    yield path
+    tracer.configure("")
+
+
+def read_spans(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_nested_spans(tmp_path):
+    local = Tracer()
+    local.exporter = None
+    assert local.begin_trace("cycle") is None
+    with local.span("ignored") as span:
+        span.set(status=200)  # Dummy outside of a cycle
+
+    path = str(tmp_path / "traces.jsonl")
+    local.configure(path)
+    root = local.begin_trace("cycle", profile="srf")
+    with local.span("download"):
+        with local.span("http", host="cdn.example") as http:
+            http.set(status=200)
+        local.record("ttfb", http.start, http.end)
+        with pytest.raises(OSError):
+            with local.span("publish"):
+                raise OSError("disk full")
+    local.end_trace(root, standby=False)
+
+    spans = {span["name"]: span for span in read_spans(path)}
+    assert list(spans) == ["cycle", "download", "http", "ttfb", "publish"]
+    assert {span["trace_id"] for span in spans.values()} == {root.trace_id}
+    assert spans["cycle"]["parent_id"] is None
+    assert spans["cycle"]["attributes"] == {"profile": "srf", "standby": False}
+    assert spans["http"]["parent_id"] == spans["download"]["span_id"]
+    assert spans["ttfb"]["parent_id"] == spans["download"]["span_id"]
+    assert spans["http"]["attributes"] == {"host": "cdn.example", "status": 200}
+    assert spans["publish"]["error"] == "OSError('disk full')"
+    assert "error" not in spans["download"]
+    assert spans["cycle"]["duration_ms"] >= spans["download"]["duration_ms"]
+
+
+def test_end_trace_of_other_cycle_is_ignored(tmp_path):
+    local = Tracer()
+    path = tmp_path / "traces.jsonl"
+    local.configure(str(path))
+    first = local.begin_trace("cycle")
+    local.begin_trace("cycle")  # Replaces the unfinished one
+    local.end_trace(first)
+    assert not path.exists()
+
+
+def test_rotation(tmp_path):
+    local = Tracer()
+    path = tmp_path / "traces.jsonl"
+    local.configure(str(path), max_bytes=100)
+    for _ in range(3):
+        local.end_trace(local.begin_trace("cycle", profile="x" * 100))
+    assert len(read_spans(str(path))) == 1
+    assert len(read_spans(f"{path}.1")) == 1
+
+
+def test_http_request_spans(trace_file, media_server):
+    media_server.files["/a.mp3"] = {"body": b"audio"}
+
+    @traced("download")
+    def download():
+        return http.get(media_server.url("/a.mp3")).content
+
+    http = HTTPClient()
+    try:
+        root = tracer.begin_trace("cycle")
+        assert download() == b"audio"
+        tracer.end_trace(root)
+    finally:
+        http.close()
+
+    spans = read_spans(trace_file)
+    by_name = {span["name"]: span for span in spans}
+    assert {"download", "http", "tcp_connect", "ttfb"} <= set(by_name)
+    assert by_name["http"]["parent_id"] == by_name["download"]["span_id"]
+    assert by_name["http"]["attributes"]["host"] == f"127.0.0.1:{media_server.server_port}"
+    assert by_name["tcp_connect"]["parent_id"] == by_name["http"]["span_id"]
+
+
+def test_summary(trace_file, monkeypatch, capsys):
+    for profile, stages in (("srf", 1), ("rts", 2)):
+        root = tracer.begin_trace("cycle", profile=profile)
+        for _ in range(stages):
+            with tracer.span("download"):
+                pass
+        tracer.end_trace(root)
+    with open(trace_file, "a", encoding="utf-8") as f:
+        f.write('{"trace_id": "cut')  # Cut off by a crash
+
+    monkeypatch.setattr(sys, "argv", ["trace_summary", trace_file, "--profile", "rts"])
+    trace_summary.main()
+    output = capsys.readouterr().out
+    assert output.startswith("1 cycles, slowest 1:")
+    assert " rts " in output and " srf " not in output
+    assert [line.split()[:2] for line in output.splitlines() if line.startswith("download ")] == [["download", "2"]]
+
+    monkeypatch.setattr(sys, "argv", ["trace_summary", trace_file, "--profile", "rsi"])
+    trace_summary.main()
+    assert capsys.readouterr().out == "No cycles found.\n"